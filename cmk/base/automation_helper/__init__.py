@@ -123,6 +123,7 @@ def _application():
         reloader_config=config.reloader_config,
         reload_config=_reload_automation_config,
         clear_caches_before_each_call=_clear_caches_before_each_call,
+        read_only_workers=config.server_config.read_only_workers,
     )
 
 
@@ -5,16 +5,20 @@
 
 import asyncio
 import io
+import multiprocessing
 import sys
 import time
 from collections.abc import AsyncGenerator, Awaitable, Callable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from contextlib import asynccontextmanager, contextmanager, redirect_stderr, redirect_stdout
-from dataclasses import dataclass
-from typing import assert_never, Protocol
+from dataclasses import dataclass, field
+from typing import assert_never, Final, Protocol
 
 from fastapi import FastAPI, Request
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from pydantic import BaseModel
+from redis.client import PubSubWorkerThread
 
 from cmk.ccc import tty
 from cmk.ccc import version as cmk_version
@@ -47,12 +51,89 @@ class AutomationEngine(Protocol):
     ) -> ABCAutomationResult | AutomationError: ...
 
 
+# Automations that neither modify the configuration nor depend on global state
+# left behind by a previous call. In concurrent mode they are executed by a pool
+# of forked worker processes that share the loaded configuration copy-on-write.
+READ_ONLY_AUTOMATIONS: Final = frozenset(
+    {
+        "active-check",
+        "analyse-host",
+        "analyse-service",
+        "analyze-host-rule-effectiveness",
+        "analyze-host-rule-matches",
+        "analyze-service-rule-matches",
+        "diag-host",
+        "diag-special-agent",
+        "find-unknown-check-parameter-rule-sets",
+        "get-agent-output",
+        "get-check-information",
+        "get-configuration",
+        "get-section-information",
+        "get-service-name",
+        "get-services-labels",
+        "notification-analyse",
+        "notification-get-bulks",
+        "scan-parents",
+        "service-discovery-preview",
+        "special-agent-discovery-preview",
+    }
+)
+
+
+@dataclass
+class _Metrics:
+    in_flight: int = 0
+    waiting_for_lock: int = 0
+    completed: int = 0
+    concurrently_completed: int = 0
+    started: int = 0
+    total_wait_time: float = 0.0
+    max_wait_time: float = 0.0
+
+    @property
+    def mean_wait_time(self) -> float:
+        # Not all completed automations have been started (e.g. a failed reload)
+        return self.total_wait_time / self.started if self.started else 0.0
+
+    def record_start(self, received_at: float, started_at: float) -> None:
+        wait_time = max(0.0, started_at - received_at)
+        self.started += 1
+        self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+
+
 @dataclass
 class _State:
     automation_or_reload_lock: asyncio.Lock
     last_reload_at: float
     plugins: AgentBasedPlugins | None
     loading_result: config.LoadingResult | None
+    read_only_pool: ProcessPoolExecutor | None = None
+    metrics: _Metrics = field(default_factory=_Metrics)
+    # Kept up to date by the change subscription, so that automations can decide
+    # whether a reload is required without asking Redis.  Without a subscription
+    # they ask Redis per call.
+    last_detected_change: float = 0.0
+    changes_subscribed: bool = False
+    change_detected: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def record_change(self, last_detected_change: float) -> None:
+        self.last_detected_change = max(self.last_detected_change, last_detected_change)
+
+    def notify_change(self, last_detected_change: float) -> None:
+        self.record_change(last_detected_change)
+        self.change_detected.set()
+
+    @property
+    def reload_required(self) -> bool:
+        return self.last_reload_at < self.last_detected_change
+
+    def discard_read_only_pool(self) -> None:
+        # Workers forked from the previous configuration finish their current
+        # automation and exit, new requests get a pool forked from the new one.
+        if self.read_only_pool is not None:
+            self.read_only_pool.shutdown(wait=False)
+            self.read_only_pool = None
 
 
 @dataclass(frozen=True)
@@ -62,11 +143,22 @@ class _ApplicationDependencies:
     reloader_config: ReloaderConfig
     reload_config: Callable[[AgentBasedPlugins], config.LoadingResult]
     clear_caches_before_each_call: Callable[[ConfigCache], None]
+    read_only_workers: int
     state: _State
 
 
 class HealthCheckResponse(BaseModel, frozen=True):
     last_reload_at: float
+    last_detected_change: float = 0.0
+
+
+class MetricsResponse(BaseModel, frozen=True):
+    in_flight: int
+    waiting_for_lock: int
+    completed: int
+    concurrently_completed: int
+    mean_wait_time: float
+    max_wait_time: float
 
 
 def make_application(
@@ -76,6 +168,7 @@ def make_application(
     reloader_config: ReloaderConfig,
     reload_config: Callable[[AgentBasedPlugins], config.LoadingResult],
     clear_caches_before_each_call: Callable[[ConfigCache], None],
+    read_only_workers: int = 0,
 ) -> FastAPI:
     app = FastAPI(
         lifespan=_lifespan,
@@ -89,6 +182,7 @@ def make_application(
         reloader_config=reloader_config,
         reload_config=reload_config,
         clear_caches_before_each_call=clear_caches_before_each_call,
+        read_only_workers=read_only_workers,
         state=_State(
             automation_or_reload_lock=asyncio.Lock(),
             last_reload_at=0,
@@ -99,6 +193,7 @@ def make_application(
 
     app.post("/automation")(_automation_endpoint)
     app.get("/health")(_health_endpoint)
+    app.get("/metrics")(_metrics_endpoint)
 
     FastAPIInstrumentor.instrument_app(app)
 
@@ -116,6 +211,20 @@ async def _lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     tty.reinit()
     dependencies.state.loading_result = dependencies.reload_config(plugins)
 
+    loop = asyncio.get_running_loop()
+    try:
+        subscription: PubSubWorkerThread | None = dependencies.changes_cache.subscribe_to_changes(
+            lambda last_change: loop.call_soon_threadsafe(
+                dependencies.state.notify_change, last_change
+            )
+        )
+    except CacheError as err:
+        LOGGER.error("[cache] Not subscribed to changes, polling instead", exc_info=err)
+        subscription = None
+    dependencies.state.changes_subscribed = subscription is not None
+    # Subscribe first, then read: a change published in between is not lost.
+    _sync_last_change(dependencies.changes_cache, dependencies.state)
+
     reloader_task = asyncio.create_task(
         _reloader_task(
             config=dependencies.reloader_config,
@@ -130,6 +239,9 @@ async def _lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     yield
 
     reloader_task.cancel()
+    if subscription is not None:
+        subscription.stop()
+    dependencies.state.discard_read_only_pool()
 
 
 async def _reloader_task(
@@ -141,8 +253,9 @@ async def _reloader_task(
 ) -> None:
     LOGGER.info("[reloader] Operational")
     while True:
-        if (cached_last_change := _retrieve_last_change(cache)) < state.last_reload_at:
-            await delayer_factory(config.poll_interval)
+        if (cached_last_change := _sync_last_change(cache, state)) < state.last_reload_at:
+            # Changes are pushed to us, polling is only a fallback for lost messages.
+            await _wait_for_change(state, delayer_factory(config.poll_interval))
             continue
 
         last_change = cached_last_change
@@ -155,7 +268,7 @@ async def _reloader_task(
         while True:
             await delayer_factory(current_cooldown)
 
-            cached_last_change = _retrieve_last_change(cache)
+            cached_last_change = _sync_last_change(cache, state)
 
             if cached_last_change == last_change:
                 async with state.automation_or_reload_lock:
@@ -165,6 +278,7 @@ async def _reloader_task(
                     LOGGER.info("[reloader] Triggering reload")
                     state.last_reload_at = time.time()
                     state.loading_result = reload_callback()
+                    state.discard_read_only_pool()
                     break
 
             else:
@@ -180,25 +294,156 @@ async def _reloader_task(
                 )
 
 
-def _retrieve_last_change(cache: Cache) -> float:
+async def _wait_for_change(state: _State, fallback_delay: Awaitable[None]) -> None:
+    change = asyncio.ensure_future(state.change_detected.wait())
+    delay = asyncio.ensure_future(fallback_delay)
     try:
-        return cache.get_last_detected_change()
+        await asyncio.wait((change, delay), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        change.cancel()
+        delay.cancel()
+        state.change_detected.clear()
+
+
+def _sync_last_change(cache: Cache, state: _State) -> float:
+    """Merge the last change stored in Redis into the in-memory state
+
+    This is only done by the reloader and at startup, and per automation call only
+    if the changes are not pushed to us.
+    """
+    try:
+        state.record_change(cache.get_last_detected_change())
     except CacheError as err:
         LOGGER.error("[reloader] Cache failure", exc_info=err)
-        return 0
+    return state.last_detected_change
 
 
 async def _automation_endpoint(request: Request, payload: AutomationPayload) -> AutomationResponse:
     dependencies: _ApplicationDependencies = request.app.state.dependencies
-    async with dependencies.state.automation_or_reload_lock:
-        return _execute_automation_endpoint(
-            payload,
+    metrics = dependencies.state.metrics
+    received_at = time.time()
+    metrics.in_flight += 1
+    try:
+        if dependencies.read_only_workers and payload.name in READ_ONLY_AUTOMATIONS:
+            return await _execute_read_only_automation(payload, dependencies, received_at)
+
+        metrics.waiting_for_lock += 1
+        async with dependencies.state.automation_or_reload_lock:
+            metrics.waiting_for_lock -= 1
+            metrics.record_start(received_at, time.time())
+            return _execute_automation_endpoint(
+                payload,
+                dependencies.automation_engine,
+                dependencies.changes_cache,
+                dependencies.reload_config,
+                dependencies.clear_caches_before_each_call,
+                dependencies.state,
+            )
+    finally:
+        metrics.in_flight -= 1
+        metrics.completed += 1
+
+
+async def _execute_read_only_automation(
+    payload: AutomationPayload,
+    dependencies: _ApplicationDependencies,
+    received_at: float,
+) -> AutomationResponse:
+    state = dependencies.state
+    try:
+        response, started_at = await _submit_read_only_automation(payload, dependencies)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed by the OOM killer), which breaks the whole pool.
+        LOGGER.warning("[automation] Read-only worker pool broken, retrying in a new one")
+        response, started_at = await _submit_read_only_automation(payload, dependencies)
+    state.metrics.record_start(received_at, started_at)
+    state.metrics.concurrently_completed += 1
+    return response
+
+
+async def _submit_read_only_automation(
+    payload: AutomationPayload,
+    dependencies: _ApplicationDependencies,
+) -> tuple[AutomationResponse, float]:
+    state = dependencies.state
+    # Only the (cheap) staleness check and a possible reload are serialized.
+    async with state.automation_or_reload_lock:
+        _reload_if_required(dependencies.changes_cache, dependencies.reload_config, state)
+        if state.read_only_pool is None:
+            state.read_only_pool = _create_read_only_pool(dependencies)
+        pool = state.read_only_pool
+        try:
+            future: Future[tuple[AutomationResponse, float]] = pool.submit(
+                _run_read_only_automation, payload
+            )
+        except BrokenProcessPool:
+            state.discard_read_only_pool()
+            raise
+
+    try:
+        return await asyncio.wrap_future(future)
+    except BrokenProcessPool:
+        if state.read_only_pool is pool:
+            state.discard_read_only_pool()
+        raise
+
+
+def _create_read_only_pool(dependencies: _ApplicationDependencies) -> ProcessPoolExecutor:
+    """Create the pool of read-only workers, forked from the loaded configuration
+
+    All workers are forked on the first submit, before the pool starts its management
+    thread, from the event loop thread while it holds the automation_or_reload_lock. Only
+    that thread is copied into the workers. The other threads of this process do not leave
+    anything behind that the workers use:
+    * The Redis subscription thread: the workers never touch its connection, and redis-py
+      does not reuse pooled connections inherited across a fork (it checks the PID).
+    * The OpenTelemetry span processor thread: restarted in the child by its at-fork hook.
+    The locks of the logging handlers are reinitialized after a fork by Python itself.
+    """
+    state = dependencies.state
+    return ProcessPoolExecutor(
+        max_workers=dependencies.read_only_workers,
+        # fork, so that the workers share the loaded configuration
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_read_only_worker,
+        initargs=(
             dependencies.automation_engine,
-            dependencies.changes_cache,
-            dependencies.reload_config,
             dependencies.clear_caches_before_each_call,
-            dependencies.state,
-        )
+            state.plugins,
+            state.loading_result,
+        ),
+    )
+
+
+_read_only_worker_state: (
+    tuple[
+        AutomationEngine,
+        Callable[[ConfigCache], None],
+        AgentBasedPlugins | None,
+        config.LoadingResult | None,
+    ]
+    | None
+) = None
+
+
+def _init_read_only_worker(
+    engine: AutomationEngine,
+    clear_caches_before_each_call: Callable[[ConfigCache], None],
+    plugins: AgentBasedPlugins | None,
+    loading_result: config.LoadingResult | None,
+) -> None:
+    global _read_only_worker_state
+    _read_only_worker_state = (engine, clear_caches_before_each_call, plugins, loading_result)
+
+
+def _run_read_only_automation(payload: AutomationPayload) -> tuple[AutomationResponse, float]:
+    started_at = time.time()
+    assert _read_only_worker_state is not None
+    engine, clear_caches_before_each_call, plugins, loading_result = _read_only_worker_state
+    return (
+        _run_automation(payload, engine, clear_caches_before_each_call, plugins, loading_result),
+        started_at,
+    )
 
 
 def _execute_automation_endpoint(
@@ -209,12 +454,24 @@ def _execute_automation_endpoint(
     clear_caches_before_each_call: Callable[[ConfigCache], None],
     state: _State,
 ) -> AutomationResponse:
-    LOGGER.info(
-        '[automation] Processing automation command "%s" with args: %s',
-        payload.name,
-        payload.args,
+    _reload_if_required(cache, reload_config, state)
+    return _run_automation(
+        payload,
+        engine,
+        clear_caches_before_each_call,
+        state.plugins,
+        state.loading_result,
     )
-    if cache.reload_required(state.last_reload_at):
+
+
+def _reload_if_required(
+    cache: Cache,
+    reload_config: Callable[[AgentBasedPlugins], config.LoadingResult],
+    state: _State,
+) -> None:
+    if not state.changes_subscribed:
+        _sync_last_change(cache, state)
+    if state.reload_required:
         state.last_reload_at = time.time()
         if not state.plugins:
             # This should never happen. AFAICS, we have to make the plugins optional,
@@ -225,8 +482,22 @@ def _execute_automation_endpoint(
             # bare the risk of accidentally operating with the empty set of plugins.
             raise RuntimeError("Plugins are not loaded yet")
         state.loading_result = reload_config(state.plugins)
+        state.discard_read_only_pool()
         LOGGER.warning("[automation] configurations were reloaded due to a stale state.")
 
+
+def _run_automation(
+    payload: AutomationPayload,
+    engine: AutomationEngine,
+    clear_caches_before_each_call: Callable[[ConfigCache], None],
+    plugins: AgentBasedPlugins | None,
+    loading_result: config.LoadingResult | None,
+) -> AutomationResponse:
+    LOGGER.info(
+        '[automation] Processing automation command "%s" with args: %s',
+        payload.name,
+        payload.args,
+    )
     buffer_stdout = io.StringIO()
     buffer_stderr = io.StringIO()
     with (
@@ -242,15 +513,15 @@ def _execute_automation_endpoint(
         _redirect_stdin(io.StringIO(payload.stdin)),
         temporary_log_level(cmk_logger, payload.log_level),
     ):
-        if state.loading_result:
-            clear_caches_before_each_call(state.loading_result.config_cache)
+        if loading_result:
+            clear_caches_before_each_call(loading_result.config_cache)
         try:
             automation_start_time = time.time()
             result_or_error_code: ABCAutomationResult | int = engine.execute(
                 payload.name,
                 list(payload.args),
-                state.plugins,
-                state.loading_result,
+                plugins,
+                loading_result,
             )
             automation_end_time = time.time()
         except SystemExit as system_exit:
@@ -305,4 +576,20 @@ def _redirect_stdin(stream: io.StringIO) -> Iterator[None]:
 
 async def _health_endpoint(request: Request) -> HealthCheckResponse:
     dependencies: _ApplicationDependencies = request.app.state.dependencies
-    return HealthCheckResponse(last_reload_at=dependencies.state.last_reload_at)
+    return HealthCheckResponse(
+        last_reload_at=dependencies.state.last_reload_at,
+        last_detected_change=dependencies.state.last_detected_change,
+    )
+
+
+async def _metrics_endpoint(request: Request) -> MetricsResponse:
+    dependencies: _ApplicationDependencies = request.app.state.dependencies
+    metrics = dependencies.state.metrics
+    return MetricsResponse(
+        in_flight=metrics.in_flight,
+        waiting_for_lock=metrics.waiting_for_lock,
+        completed=metrics.completed,
+        concurrently_completed=metrics.concurrently_completed,
+        mean_wait_time=metrics.mean_wait_time,
+        max_wait_time=metrics.max_wait_time,
+    )
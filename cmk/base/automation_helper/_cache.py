@@ -4,12 +4,18 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 import dataclasses
+from collections.abc import Callable
+from time import sleep
 from typing import Final, Self
 
 import redis
+from redis.client import PubSubWorkerThread
 from redis.exceptions import ConnectionError
 
+from ._log import LOGGER
+
 LAST_DETECTED_CHANGE_TOPIC: Final = "last_change_detected"
+LAST_DETECTED_CHANGE_CHANNEL: Final = "last_change_detected_channel"
 
 
 @dataclasses.dataclass(frozen=True)
@@ -23,9 +29,26 @@ class Cache:
     def store_last_detected_change(self, time: float) -> None:
         try:
             self._client.set(LAST_DETECTED_CHANGE_TOPIC, time)
+            self._client.publish(LAST_DETECTED_CHANGE_CHANNEL, time)
         except ConnectionError as err:
             raise CacheError("Failed to store timestamp of detected change.") from err
 
+    def subscribe_to_changes(self, callback: Callable[[float], None]) -> PubSubWorkerThread:
+        """Call `callback` with the timestamp of every change published from now on
+
+        The callback is executed in a separate thread. Stop it via `.stop()`.
+        """
+        try:
+            pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(
+                **{LAST_DETECTED_CHANGE_CHANNEL: lambda message: callback(float(message["data"]))}
+            )
+        except ConnectionError as err:
+            raise CacheError("Failed to subscribe to detected changes.") from err
+        return pubsub.run_in_thread(
+            sleep_time=1.0, daemon=True, exception_handler=_log_subscription_error
+        )
+
     def get_last_detected_change(self) -> float:
         try:
             return float(self._client.get(LAST_DETECTED_CHANGE_TOPIC) or 0.0)
@@ -37,3 +60,11 @@ class Cache:
 
 
 class CacheError(Exception): ...
+
+
+def _log_subscription_error(
+    err: BaseException, _pubsub: redis.client.PubSub, _thread: PubSubWorkerThread
+) -> None:
+    # Keep the subscription thread alive, the next read re-establishes the connection.
+    LOGGER.error("[cache] Subscription failure", exc_info=err)
+    sleep(1.0)
@@ -18,6 +18,9 @@ class ServerConfig(BaseModel, frozen=True):
     access_log: Path
     error_log: Path
     num_workers: int
+    # Number of forked processes per worker that execute read-only automations
+    # concurrently. 0 runs all automations one after another.
+    read_only_workers: int = 0
 
 
 class Schedule(BaseModel, frozen=True):
@@ -68,6 +71,10 @@ def default_config(
             # possible that the reloader task is never executed. This is not a problem, since the
             # automation endpoint anyway reloads on its own if needed.
             num_workers=2,
+            # Read-only automations sidestep the issues above: they are executed in processes
+            # forked from the worker (sharing the loaded configuration copy-on-write), so neither
+            # global state nor forking interferes with the worker itself.
+            read_only_workers=4,
         ),
         watcher_config=WatcherConfig(
             schedules=[
@@ -38,7 +38,7 @@ from typing import (
 import cmk.ccc.cleanup
 import cmk.ccc.debug
 import cmk.ccc.version as cmk_version
-from cmk.ccc import tty
+from cmk.ccc import store, tty
 from cmk.ccc.exceptions import MKGeneralException, MKIPAddressLookupError
 from cmk.ccc.hostaddress import HostAddress, HostName, Hosts
 from cmk.ccc.site import omd_site, SiteId
@@ -790,8 +790,10 @@ class SetFolderPathDict(SetFolderPathAbstract, dict):
         return super().__setitem__(cluster_name, value)
 
 
-def _load_config_file(file_to_load: Path, into_dict: dict[str, Any]) -> None:
-    exec(compile(file_to_load.read_text(), file_to_load, "exec"), into_dict, into_dict)  # nosec B102 # BNS:aee528
+def _load_config_file(
+    file_to_load: Path, into_dict: dict[str, Any], code_cache: store.CodeCache
+) -> None:
+    exec(code_cache.compile(file_to_load), into_dict, into_dict)  # nosec B102 # BNS:aee528
 
 
 def _load_config(with_conf_d: bool) -> set[str]:
@@ -810,10 +812,15 @@ def _load_config(with_conf_d: bool) -> set[str]:
 
     global_dict |= helper_vars
 
+    # Parsing the big rules.mk files takes long, their code is cached
+    code_cache = store.CodeCache(
+        temp_dir=cmk.utils.paths.tmp_dir, root_dir=cmk.utils.paths.omd_root
+    )
+
     # Load assorted experimental parameters if any
     experimental_config = cmk.utils.paths.make_experimental_config_file()
     if experimental_config.exists():
-        _load_config_file(experimental_config, global_dict)
+        _load_config_file(experimental_config, global_dict, code_cache)
 
     host_storage_loaders = get_host_storage_loaders(config_storage_format)
     for path in get_config_file_paths(with_conf_d):
@@ -834,9 +841,11 @@ def _load_config(with_conf_d: bool) -> set[str]:
             clusters.set_current_path(current_path)
 
             if path.name == "hosts.mk":
-                apply_hosts_file_to_object(path.with_suffix(""), host_storage_loaders, global_dict)
+                apply_hosts_file_to_object(
+                    path.with_suffix(""), host_storage_loaders, global_dict, code_cache=code_cache
+                )
             else:
-                _load_config_file(path, global_dict)
+                _load_config_file(path, global_dict, code_cache)
 
             if not isinstance(all_hosts, SetFolderPathList):
                 raise MKGeneralException(
@@ -855,6 +864,11 @@ def _load_config(with_conf_d: bool) -> set[str]:
                 console.error(f"Cannot read in configuration file {path}: {e}", file=sys.stderr)
             sys.exit(1)
 
+    console.verbose(
+        f"Loaded the code of {code_cache.hits + code_cache.misses} configuration files"
+        f" ({code_cache.hits} cached, {code_cache.misses} compiled)"
+    )
+
     # Cleanup global helper vars
     for helper_var in helper_vars:
         del global_dict[helper_var]
@@ -3001,12 +3015,16 @@ class ConfigCache:
                 return SNMPBackendEnum.INLINE
             if host_backend == "classic":
                 return SNMPBackendEnum.CLASSIC
+            if host_backend == "bulk":
+                return SNMPBackendEnum.BULK
             raise MKGeneralException(f"Bad Host SNMP Backend configuration: {host_backend}")
 
         if with_inline_snmp and snmp_backend_default == "inline":
             return SNMPBackendEnum.INLINE
         if snmp_backend_default == "classic":
             return SNMPBackendEnum.CLASSIC
+        if snmp_backend_default == "bulk":
+            return SNMPBackendEnum.BULK
         # Note: in the above case we raise here.
         # I am not sure if this different behavior is intentional.
         return SNMPBackendEnum.CLASSIC
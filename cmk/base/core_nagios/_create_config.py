@@ -5,15 +5,19 @@
 """Code for support of Nagios (and compatible) cores"""
 
 import base64
+import functools
 import itertools
+import multiprocessing
 import sys
+import time
 from collections import Counter
 from collections.abc import Callable, Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import suppress
 from io import StringIO
 from pathlib import Path
 from socket import AddressFamily
-from typing import Any, assert_never, IO, Literal
+from typing import Any, assert_never, Final, IO, Literal
 
 import cmk.ccc.debug
 from cmk.ccc import store, tty
@@ -23,8 +27,10 @@ from cmk.ccc.hostaddress import HostAddress, HostName, Hosts
 from cmk.utils import config_warnings, ip_lookup, password_store
 from cmk.utils.config_path import VersionedConfigPath
 from cmk.utils.ip_lookup import IPStackConfig
+from cmk.utils.iterables import chunks
 from cmk.utils.labels import LabelManager, Labels
 from cmk.utils.licensing.handler import LicensingHandler
+from cmk.utils.log import console
 from cmk.utils.macros import replace_macros_in_str
 from cmk.utils.notify import NotificationHostConfig, write_notify_host_file
 from cmk.utils.notify_types import Contact
@@ -50,11 +56,16 @@ from cmk.base.core_config import (
 
 from cmk.server_side_calls_backend import ActiveServiceData
 
+from ._host_objects import config_digest, host_fingerprint, HostObjects, HostObjectsStore
 from ._precompile_host_checks import precompile_hostchecks, PrecompileMode
 
 _ContactgroupName = str
 ObjectSpec = dict[str, Any]
 
+# Hosts differ a lot in the time it takes to create their objects (e.g. the number of services).
+# With a few chunks per worker, a worker done early takes over the remaining chunks.
+CHUNKS_PER_PROCESS: Final = 4
+
 
 class NagiosCore(core_config.MonitoringCore):
     @classmethod
@@ -81,6 +92,7 @@ class NagiosCore(core_config.MonitoringCore):
         service_depends_on: Callable[[HostAddress, ServiceName], Sequence[ServiceName]],
     ) -> None:
         self._config_cache = config_cache
+        start = time.perf_counter()
         self._create_core_config(
             Path(config_path),
             service_name_config,
@@ -90,10 +102,12 @@ class NagiosCore(core_config.MonitoringCore):
             ip_address_of,
             service_depends_on,
         )
+        start = _report_phase("Created the Nagios configuration", start)
         store.save_text_to_file(
             plugin_index.make_index_file(Path(config_path)),
             plugin_index.create_plugin_index(plugins),
         )
+        start = _report_phase("Created the plug-in index", start)
         self._precompile_hostchecks(
             Path(config_path),
             service_name_config,
@@ -103,6 +117,7 @@ class NagiosCore(core_config.MonitoringCore):
                 PrecompileMode.DELAYED if config.delay_precompile else PrecompileMode.INSTANT
             ),
         )
+        _report_phase("Precompiled the host checks", start)
 
     def _create_core_config(
         self,
@@ -142,6 +157,12 @@ class NagiosCore(core_config.MonitoringCore):
             passwords=passwords,
             ip_address_of=ip_address_of,
             service_depends_on=service_depends_on,
+            processes=config.nagios_config_processes,
+            host_objects_store=(
+                HostObjectsStore(cmk.utils.paths.var_dir / "core" / "nagios_host_objects.pkl")
+                if config.nagios_config_incremental
+                else None
+            ),
         )
 
         store.save_text_to_file(cmk.utils.paths.nagios_objects_file, config_buffer.getvalue())
@@ -203,6 +224,22 @@ class NagiosConfig:
     def write_object(self, name: str, spec: ObjectSpec) -> None:
         self._outfile.write(_format_nagios_object(name, spec))
 
+    def add_host_objects(self, host_objects: HostObjects) -> None:
+        self.write_str(host_objects.text)
+        self.hostgroups_to_define.update(host_objects.hostgroups_to_define)
+        self.servicegroups_to_define.update(host_objects.servicegroups_to_define)
+        self.contactgroups_to_define.update(host_objects.contactgroups_to_define)
+        self.checknames_to_define.update(host_objects.checknames_to_define)
+        self.active_checks_to_define.update(host_objects.active_checks_to_define)
+        self.custom_commands_to_define.update(host_objects.custom_commands_to_define)
+        self.hostcheck_commands_to_define.extend(host_objects.hostcheck_commands_to_define)
+
+
+def _report_phase(phase: str, start: float) -> float:
+    now = time.perf_counter()
+    console.verbose(f"{phase} in {now - start:.2f}s")
+    return now
+
 
 def _validate_licensing(
     hosts: Hosts, licensing_handler: LicensingHandler, licensing_counter: Counter
@@ -224,29 +261,85 @@ def create_config(
     passwords: Mapping[str, str],
     ip_address_of: config.IPLookup,
     service_depends_on: Callable[[HostAddress, ServiceName], Sequence[ServiceName]],
+    *,
+    processes: int = 1,
+    host_objects_store: HostObjectsStore | None = None,
 ) -> None:
+    """Writes the Nagios objects of the hosts and everything they need
+
+    The objects of the hosts may be created in several processes. With a store of the host
+    objects, the ones of hosts with an unchanged fingerprint are taken from the last run.
+    """
     cfg = NagiosConfig(outfile, hostnames)
 
     _output_conf_header(cfg)
 
-    licensing_counter = Counter("services")
+    start = time.perf_counter()
+    fingerprints: dict[HostName, str] = {}
+    reused: dict[HostName, HostObjects] = {}
+    if host_objects_store is not None:
+        last_host_objects = host_objects_store.load()
+        digest = config_digest(plugins, passwords)
+        for hostname in hostnames:
+            nodes = config_cache.nodes(hostname)
+            fingerprints[hostname] = host_fingerprint(
+                digest,
+                [
+                    config_cache.get_host_attributes(host_name, ip_address_of)
+                    for host_name in (hostname, *nodes)
+                ],
+                (hostname, *nodes),
+            )
+            if (last := last_host_objects.get(hostname)) and last[0] == fingerprints[hostname]:
+                reused[hostname] = last[1]
+        start = _report_phase(f"Computed the fingerprints of {len(hostnames)} hosts", start)
+
+    to_create = [hostname for hostname in hostnames if hostname not in reused]
+    created = dict(
+        zip(
+            to_create,
+            _create_all_host_objects(
+                to_create,
+                functools.partial(
+                    _create_host_objects,
+                    config_cache,
+                    service_name_config,
+                    plugins,
+                    stored_passwords=passwords,
+                    ip_address_of=ip_address_of,
+                    service_depends_on=service_depends_on,
+                ),
+                processes,
+            ),
+        )
+    )
+    start = _report_phase(
+        f"Created the objects of {len(created)} hosts ({len(reused)} unchanged)", start
+    )
+
+    licensing_counter = Counter(services=0)
     all_notify_host_configs: dict[HostName, NotificationHostConfig] = {}
     for hostname in hostnames:
-        all_notify_host_configs[hostname] = _create_nagios_config_host(
-            cfg,
-            config_cache,
-            service_name_config,
-            plugins,
-            hostname,
-            passwords,
-            licensing_counter,
-            ip_address_of,
-            service_depends_on,
-        )
+        if (host_objects := reused.get(hostname)) is not None:
+            for warning in host_objects.warnings:
+                config_warnings.warn(warning)
+        else:
+            host_objects = created[hostname]
+        cfg.add_host_objects(host_objects)
+        licensing_counter["services"] += host_objects.num_services
+        all_notify_host_configs[hostname] = host_objects.notification_config
 
     _validate_licensing(config_cache.hosts_config, licensing_handler, licensing_counter)
 
     write_notify_host_file(config_path, all_notify_host_configs)
+    if host_objects_store is not None:
+        host_objects_store.save(
+            {
+                hostname: (fingerprints[hostname], reused.get(hostname) or created[hostname])
+                for hostname in hostnames
+            }
+        )
+    start = _report_phase("Wrote the host objects", start)
 
     _create_nagios_config_contacts(cfg)
     if hostnames:
@@ -260,6 +353,7 @@ def create_config(
     if config.extra_nagios_conf:
         cfg.write_str("\n# extra_nagios_conf\n\n")
         cfg.write_str(config.extra_nagios_conf)
+    _report_phase("Created the global objects", start)
 
 
 def _output_conf_header(cfg: NagiosConfig) -> None:
@@ -272,6 +366,89 @@ def _output_conf_header(cfg: NagiosConfig) -> None:
     )
 
 
+def _create_all_host_objects(
+    hostnames: Sequence[HostName],
+    create_host_objects: Callable[[HostName], HostObjects],
+    processes: int,
+) -> list[HostObjects]:
+    if processes <= 1 or len(hostnames) <= 1:
+        return [create_host_objects(hostname) for hostname in hostnames]
+
+    # The first host fills the caches of the config cache, the forked workers share them
+    first = create_host_objects(hostnames[0])
+    others = hostnames[1:]
+    global _worker_create_host_objects
+    _worker_create_host_objects = create_host_objects
+    try:
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            # fork, so that the workers share the loaded configuration
+            mp_context=multiprocessing.get_context("fork"),
+        ) as executor:
+            created = [
+                host_objects
+                for chunk in executor.map(
+                    _create_host_objects_in_worker, chunks(others, processes * CHUNKS_PER_PROCESS)
+                )
+                for host_objects in chunk
+            ]
+    finally:
+        _worker_create_host_objects = None
+
+    # The workers have already shown their warnings
+    for host_objects in created:
+        config_warnings.g_configuration_warnings.extend(host_objects.warnings)
+    return [first, *created]
+
+
+_worker_create_host_objects: Callable[[HostName], HostObjects] | None = None
+
+
+def _create_host_objects_in_worker(hostnames: Sequence[HostName]) -> list[HostObjects]:
+    assert _worker_create_host_objects is not None
+    return [_worker_create_host_objects(hostname) for hostname in hostnames]
+
+
+def _create_host_objects(
+    config_cache: ConfigCache,
+    service_name_config: PassiveServiceNameConfig,
+    plugins: Mapping[CheckPluginName, CheckPlugin],
+    hostname: HostName,
+    *,
+    stored_passwords: Mapping[str, str],
+    ip_address_of: config.IPLookup,
+    service_depends_on: Callable[[HostAddress, ServiceName], Sequence[ServiceName]],
+) -> HostObjects:
+    num_warnings = len(config_warnings.g_configuration_warnings)
+    outfile = StringIO()
+    cfg = NagiosConfig(outfile, [hostname])
+    licensing_counter = Counter(services=0)
+    notification_config = _create_nagios_config_host(
+        cfg,
+        config_cache,
+        service_name_config,
+        plugins,
+        hostname,
+        stored_passwords,
+        licensing_counter,
+        ip_address_of,
+        service_depends_on,
+    )
+    return HostObjects(
+        text=outfile.getvalue(),
+        notification_config=notification_config,
+        num_services=licensing_counter["services"],
+        warnings=tuple(config_warnings.g_configuration_warnings[num_warnings:]),
+        hostgroups_to_define=frozenset(cfg.hostgroups_to_define),
+        servicegroups_to_define=frozenset(cfg.servicegroups_to_define),
+        contactgroups_to_define=frozenset(cfg.contactgroups_to_define),
+        checknames_to_define=frozenset(cfg.checknames_to_define),
+        active_checks_to_define=cfg.active_checks_to_define,
+        custom_commands_to_define=frozenset(cfg.custom_commands_to_define),
+        hostcheck_commands_to_define=tuple(cfg.hostcheck_commands_to_define),
+    )
+
+
 def _create_nagios_config_host(
     cfg: NagiosConfig,
     config_cache: ConfigCache,
@@ -348,7 +525,8 @@ def create_nagios_host_spec(
             host_spec[key] = value
 
     def host_check_via_service_status(service: ServiceName) -> CoreCommand:
-        command = "check-mk-host-custom-%d" % (len(cfg.hostcheck_commands_to_define) + 1)
+        # Named after the host, the objects of the hosts are created independently of each other
+        command = f"check-mk-host-custom-{hostname}"
         service_with_hostname = replace_macros_in_str(
             service,
             {"$HOSTNAME$": hostname},
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""The Nagios objects of single hosts and the store of the last ones created
+
+The object definitions of a host only depend on the configuration, the plugins and some data of
+the host itself: its attributes (including the discovered labels and the looked up addresses) and
+its autochecks, for clusters also the ones of the nodes. A fingerprint of all that tells whether
+the objects created last time can be used again.
+"""
+
+import hashlib
+import os
+import sys
+from collections.abc import Iterable, Mapping
+from contextlib import suppress
+from dataclasses import dataclass
+from pathlib import Path
+
+import cmk.ccc.version as cmk_version
+from cmk.ccc import store
+from cmk.ccc.hostaddress import HostName
+
+import cmk.utils.paths
+from cmk.utils.log import console
+from cmk.utils.notify import NotificationHostConfig
+
+from cmk.checkengine.plugins import CheckPlugin, CheckPluginName
+
+from cmk.base import config
+from cmk.base.config import HostgroupName, ObjectAttributes, ServicegroupName
+from cmk.base.core_config import CoreCommand, CoreCommandName
+
+type HostFingerprint = str
+
+
+@dataclass(frozen=True)
+class HostObjects:
+    """The object definitions of a host and what they need to be defined elsewhere"""
+
+    text: str
+    notification_config: NotificationHostConfig
+    num_services: int
+    warnings: tuple[str, ...]
+    hostgroups_to_define: frozenset[HostgroupName]
+    servicegroups_to_define: frozenset[ServicegroupName]
+    contactgroups_to_define: frozenset[str]
+    checknames_to_define: frozenset[CheckPluginName]
+    active_checks_to_define: Mapping[str, str]
+    custom_commands_to_define: frozenset[CoreCommandName]
+    hostcheck_commands_to_define: tuple[tuple[CoreCommand, str], ...]
+
+
+def config_digest(
+    plugins: Mapping[CheckPluginName, CheckPlugin], passwords: Mapping[str, str]
+) -> str:
+    """A digest of the inputs of the object creation shared by all hosts"""
+    digest = hashlib.sha256(cmk_version.__version__.encode())
+    for path in config.get_config_file_paths(with_conf_d=True):
+        digest.update(f"\0{path}\0".encode())
+        with suppress(FileNotFoundError):
+            digest.update(path.read_bytes())
+    # The local plugins, also the ones of the server side calls
+    for directory in (cmk.utils.paths.local_lib_dir, cmk.utils.paths.local_checks_dir):
+        for dirpath, _dirnames, filenames in sorted(os.walk(directory)):
+            for filename in sorted(filenames):
+                with suppress(FileNotFoundError):
+                    stat = (path := Path(dirpath, filename)).stat()
+                    digest.update(f"\0{path}\0{stat.st_size}\0{stat.st_mtime_ns}".encode())
+    digest.update(
+        repr(sorted((str(name), plugin.service_name) for name, plugin in plugins.items())).encode()
+    )
+    digest.update(repr(sorted(passwords.items())).encode())
+    return digest.hexdigest()
+
+
+def host_fingerprint(
+    digest_of_config: str,
+    attributes: Iterable[ObjectAttributes],
+    autochecks_hosts: Iterable[HostName],
+) -> HostFingerprint:
+    digest = hashlib.sha256(digest_of_config.encode())
+    for attrs in attributes:
+        digest.update(repr(sorted(attrs.items())).encode())
+    for host_name in autochecks_hosts:
+        digest.update(f"\0{host_name}\0".encode())
+        with suppress(FileNotFoundError):
+            digest.update((cmk.utils.paths.autochecks_dir / f"{host_name}.mk").read_bytes())
+    return digest.hexdigest()
+
+
+class HostObjectsStore:
+    """The host objects of the last config creation, with the fingerprints they were created for"""
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+
+    def load(self) -> dict[HostName, tuple[HostFingerprint, HostObjects]]:
+        try:
+            return store.load_object_from_pickle_file(self._path, default={})
+        except Exception as e:
+            # Stale or broken, everything is created again
+            console.verbose(f"Cannot load {self._path}: {e}", file=sys.stderr)
+            return {}
+
+    def save(self, host_objects: Mapping[HostName, tuple[HostFingerprint, HostObjects]]) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        store.save_object_to_pickle_file(self._path, dict(host_objects))
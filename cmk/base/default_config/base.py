@@ -55,6 +55,8 @@ tcp_connect_timeout = 5.0
 tcp_connect_timeouts: list[RuleSpec[float]] = []
 use_dns_cache = True  # prevent DNS by using own cache file
 delay_precompile = False  # delay Python compilation to Nagios execution
+nagios_config_processes = 1  # create the Nagios objects of the hosts in parallel
+nagios_config_incremental = False  # reuse the objects of unchanged hosts
 restart_locking: Literal["abort", "wait"] | None = "abort"
 check_submission: Literal["file", "pipe"] = "file"
 default_host_group = "check_mk"
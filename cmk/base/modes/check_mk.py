@@ -196,6 +196,8 @@ def parse_snmp_backend(backend: object) -> SNMPBackendEnum | None:
             return SNMPBackendEnum.INLINE
         case "classic":
             return SNMPBackendEnum.CLASSIC
+        case "bulk":
+            return SNMPBackendEnum.BULK
         case "stored-walk":
             return SNMPBackendEnum.STORED_WALK
         case _:
@@ -332,7 +334,7 @@ _SNMP_BACKEND_OPTION: Final = Option(
     long_option="snmp-backend",
     short_help="Override default SNMP backend",
     argument=True,
-    argument_descr="inline|classic|stored-walk",
+    argument_descr="inline|classic|bulk|stored-walk",
 )
 
 # .
@@ -333,6 +333,7 @@ class ConfigFromWATO(TypedDict):
     remote_status: tuple[int, bool, Sequence[str] | None] | None
     replication: Replication | None
     retention_interval: int
+    rule_evaluation_processes: int
     rule_optimizer: bool
     rule_packs: Sequence[ECRulePack]
     rules: Collection[Rule]
@@ -341,6 +342,7 @@ class ConfigFromWATO(TypedDict):
     snmp_credentials: Collection[SNMPCredential]
     socket_queue_len: int
     statistics_interval: int
+    status_server_threads: int
     translate_snmptraps: SNMPTrapTranslation
 
 
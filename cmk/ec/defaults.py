@@ -40,6 +40,7 @@ def default_config() -> ConfigFromWATO:
         actions=[],
         debug_rules=False,
         rule_optimizer=True,
+        rule_evaluation_processes=1,
         log_level=LogConfig(
             {
                 "cmk.mkeventd": logging.INFO,
@@ -63,6 +64,7 @@ def default_config() -> ConfigFromWATO:
         remote_status=None,
         socket_queue_len=10,
         eventsocket_queue_len=10,
+        status_server_threads=4,
         hostname_translation=TranslationOptions(),
         archive_orphans=False,
         archive_mode="sqlite",
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""The open events of the Event Console, indexed for the rule processing"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+
+from cmk.ccc.hostaddress import HostName
+
+from .event import Event
+
+HostKey = tuple[HostName, HostName | None]  # host, core_host
+
+
+class EventStore:
+    """The open events in the order they have been created
+
+    Besides keeping the events, the store maintains indexes by event ID, rule ID and
+    (host, core_host). Whoever changes a stored event has to call changed() afterwards: it keeps
+    the host index up to date and records the change for the next incremental save of the state.
+    All methods returning several events return a copy, so the store may be changed while working
+    through them.
+    """
+
+    def __init__(self, events: Sequence[Event] = ()) -> None:
+        self._by_id: dict[int, Event] = {}
+        self._by_rule: dict[str | None, dict[int, Event]] = {}
+        self._by_host: dict[HostName, dict[HostName | None, dict[int, Event]]] = {}
+        self._host_keys: dict[int, HostKey] = {}
+        self._changed: set[int] = set()  # since the last take_changes()
+        self._removed: set[int] = set()
+        for event in events:
+            self.add(event)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[Event]:
+        return iter(list(self._by_id.values()))
+
+    def get(self, event_id: int) -> Event | None:
+        return self._by_id.get(event_id)
+
+    def add(self, event: Event) -> None:
+        event_id = event["id"]
+        self._by_id[event_id] = event
+        self._by_rule.setdefault(event["rule_id"], {})[event_id] = event
+        self._add_to_host_index(event_id, event)
+        self._changed.add(event_id)
+
+    def remove(self, event: Event) -> bool:
+        """Remove the event, returns False in case it is not part of the store"""
+        event_id = event["id"]
+        if self._by_id.pop(event_id, None) is None:
+            return False
+        _remove_from(self._by_rule, event["rule_id"], event_id)
+        self._remove_from_host_index(event_id)
+        self._changed.discard(event_id)
+        self._removed.add(event_id)
+        return True
+
+    def changed(self, event: Event) -> None:
+        """Take note of a change of the event, does nothing in case it is not part of the store"""
+        event_id = event["id"]
+        if event_id not in self._by_id:
+            return
+        self._changed.add(event_id)
+        if self._host_keys[event_id] != _host_key(event):
+            self._remove_from_host_index(event_id)
+            self._add_to_host_index(event_id, event)
+
+    def take_changes(self) -> tuple[list[Event], list[int]]:
+        """The events added or changed and the IDs of the events removed since the last call"""
+        changed = [self._by_id[event_id] for event_id in sorted(self._changed)]
+        removed = sorted(self._removed)
+        self._changed = set()
+        self._removed = set()
+        return changed, removed
+
+    def select(self, rule_id: str | None, host: HostName | None = None) -> list[Event]:
+        """The events of the rule in creation order, optionally only the ones of the host
+
+        The host is compared to the host field of the events, whatever their core host is."""
+        of_rule = self._by_rule.get(rule_id, {})
+        if host is None:
+            return list(of_rule.values())
+        of_host = self._by_host.get(host, {})
+        if len(of_rule) <= sum(len(events) for events in of_host.values()):
+            return [event for event in of_rule.values() if event["host"] == host]
+        return sorted(
+            (
+                event
+                for events in of_host.values()
+                for event in events.values()
+                if event["rule_id"] == rule_id
+            ),
+            key=lambda event: event["id"],
+        )
+
+    def oldest(self) -> Event | None:
+        return next(iter(self._by_id.values()), None)
+
+    def oldest_of_rule(self, rule_id: str | None) -> Event | None:
+        return next(iter(self._by_rule.get(rule_id, {}).values()), None)
+
+    def oldest_of_host(self, host: HostName) -> Event | None:
+        return min(
+            (event for events in self._by_host.get(host, {}).values() for event in events.values()),
+            key=lambda event: event["id"],
+            default=None,
+        )
+
+    def of_hosts(self, hosts: set[HostName]) -> list[Event]:
+        """The events having one of the hosts as host field, in creation order"""
+        return sorted(
+            (
+                event
+                for host in hosts
+                for events in self._by_host.get(host, {}).values()
+                for event in events.values()
+            ),
+            key=lambda event: event["id"],
+        )
+
+    def of_hosts_ignoring_case(self, hosts: Iterable[str]) -> list[Event]:
+        """Like of_hosts(), but the hosts are compared case insensitively"""
+        wanted = {host.lower() for host in hosts}
+        return self.of_hosts({host for host in self._by_host if host.lower() in wanted})
+
+    def count_of_rule(self, rule_id: str | None) -> int:
+        return len(self._by_rule.get(rule_id, {}))
+
+    def count_of_host(self, host_key: HostKey) -> int:
+        host, core_host = host_key
+        return len(self._by_host.get(host, {}).get(core_host, {}))
+
+    def counts_by_rule(self) -> Mapping[str | None, int]:
+        return {rule_id: len(events) for rule_id, events in self._by_rule.items()}
+
+    def counts_by_host(self) -> Mapping[HostKey, int]:
+        return {
+            (host, core_host): len(events)
+            for host, by_core_host in self._by_host.items()
+            for core_host, events in by_core_host.items()
+        }
+
+    def _add_to_host_index(self, event_id: int, event: Event) -> None:
+        host, core_host = self._host_keys[event_id] = _host_key(event)
+        self._by_host.setdefault(host, {}).setdefault(core_host, {})[event_id] = event
+
+    def _remove_from_host_index(self, event_id: int) -> None:
+        host, core_host = self._host_keys.pop(event_id)
+        by_core_host = self._by_host[host]
+        _remove_from(by_core_host, core_host, event_id)
+        if not by_core_host:
+            del self._by_host[host]
+
+
+def _host_key(event: Event) -> HostKey:
+    return event["host"], event["core_host"]
+
+
+def _remove_from[K](index: dict[K, dict[int, Event]], key: K, event_id: int) -> None:
+    events = index[key]
+    del events[event_id]
+    if not events:
+        del index[key]
@@ -4,8 +4,8 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 import itertools
-import shlex
-import subprocess
+import math
+import re
 import threading
 import time
 from collections.abc import Callable, Iterable, Sequence
@@ -19,6 +19,7 @@ from cmk.utils.render import date_and_time
 from .config import Config
 from .event import Event, scrub_string
 from .history import _log_event, ActiveHistoryPeriod, get_logfile, History, HistoryWhat, quote_tab
+from .history_file_index import HistoryFileIndex, HistoryFileIndexes, index_path, POSTINGS_FIELDS
 from .query import Columns, OperatorName, QueryFilter, QueryGET
 from .settings import Settings
 
@@ -39,6 +40,7 @@ class FileHistory(History):
         self._history_columns = history_columns
         self._lock = threading.Lock()
         self._active_history_period = ActiveHistoryPeriod()
+        self._indexes = HistoryFileIndexes()
 
     def flush(self) -> None:
         _expire_logfiles(self._settings, self._config, self._logger, self._lock, True)
@@ -82,8 +84,6 @@ class FileHistory(History):
         limit = query.limit
         self._logger.debug("Limit: %r", limit)
 
-        grep_pipeline = _grep_pipeline(filters)
-
         time_filters = [
             (f.operator_name, f.argument) for f in filters if f.column_name.split("_")[-1] == "time"
         ]
@@ -92,6 +92,7 @@ class FileHistory(History):
             _least_upper_bound_for_filters(time_filters),
         )
         self._logger.debug("time range: %r", time_range)
+        line_filter = LineFilter(filters)
 
         # We do not want to open all files. So our strategy is:
         # look for "time" filters and first apply the filter to
@@ -101,25 +102,30 @@ class FileHistory(History):
         # Use the later logfiles first, to get the newer log entries
         # first. When a limit is reached, the newer entries should
         # be processed in most cases. We assume that now.
-        # To keep a consistent order of log entries, we should care
-        # about sorting the log lines in reverse, but that seems to
-        # already be done by the GUI, so we don't do that twice. Skipping
-        # this # will lead into some lines of a single file to be limited in
-        # wrong order. But this should be better than before.
+        # Within a file, the index of the file narrows down the lines
+        # to read, which are processed from the youngest to the oldest.
         history_entries: list[Any] = []
-        for path in sorted(self._settings.paths.history_dir.value.glob("*.log"), reverse=True):
+        paths = sorted(self._settings.paths.history_dir.value.glob("*.log"), reverse=True)
+        for path in paths:
             if limit is not None and limit <= 0:
                 self._logger.debug("query limit reached")
                 break
             if not _intersects(time_range, _get_logfile_timespan(path)):
                 self._logger.debug("skipping history file %s because of time filters", path)
                 continue
-            tac = f"nl -b a {shlex.quote(str(path))} | tac"  # Process younger lines first
-            cmd = " | ".join([tac] + grep_pipeline)
-            self._logger.debug("preprocessing history file with command [%s]", cmd)
-            new_entries = parse_history_file(
-                self._history_columns, path, query.filter_row, cmd, limit, self._logger
-            )
+            try:
+                new_entries = parse_history_file(
+                    self._history_columns,
+                    path,
+                    line_filter,
+                    query.filter_row,
+                    limit,
+                    self._logger,
+                    indexes=self._indexes,
+                    growing=path == paths[0],
+                )
+            except FileNotFoundError:
+                continue  # expired meanwhile
             history_entries += new_entries
             if limit is not None:
                 limit -= len(new_entries)
@@ -152,6 +158,7 @@ def _expire_logfiles(
                         "Deleting log file %s (age %s)", path, date_and_time(path.stat().st_mtime)
                     )
                     path.unlink()
+                    index_path(path).unlink(missing_ok=True)
         except Exception as e:
             if settings.options.debug:
                 raise
@@ -173,42 +180,78 @@ _GREPABLE_COLUMNS = {
 }
 
 
-def _grep_pipeline(filters: Iterable[QueryFilter]) -> list[str]:
-    """
-    Optimization: use grep in order to reduce amount of read lines based on some frequently used
-    filters. It's OK if the filters don't match 100% accurately on the right lines. If in doubt, you
-    can output more lines than necessary. This is only a kind of prefiltering.
-
-    >>> _grep_pipeline([])
-    []
-
-    >>> _grep_pipeline([QueryFilter("event_core_host", '=', lambda x: True, '|| ping')])
-    ["grep -F -e '|| ping'"]
+class LineFilter:
+    """Preselects the lines of a history file which may match the filters of a query
 
+    It's OK to select more lines than necessary, the filters are applied to the parsed lines
+    afterwards. Equality filters on indexed columns are answered by the postings of the index,
+    the other filters on text columns by searching the raw lines, like grep did it before.
     """
-    return [
-        command
-        for f in filters
-        if f.column_name in _GREPABLE_COLUMNS
-        for command in [_grep_command(f.operator_name, str(f.argument))]
-        if command is not None
-    ]
-
-
-def _grep_command(operator_name: OperatorName, argument: str) -> str | None:
-    if operator_name == "=":
-        return f"grep -F {_grep_pattern(argument)}"
-    if operator_name == "=~":
-        return f"grep -F -i {_grep_pattern(argument)}"
-    if operator_name == "~":
-        return f"grep -E {_grep_pattern(argument)}"
-    if operator_name == "~~":
-        return f"grep -E -i {_grep_pattern(argument)}"
-    return None
 
-
-def _grep_pattern(argument: str) -> str:
-    return f"-e {shlex.quote(argument)}"
+    def __init__(self, filters: Iterable[QueryFilter]) -> None:
+        # Inclusive bounds, even for the strict comparisons
+        self.since: float | None = None
+        self.until: float | None = None
+        self.postings: list[tuple[str, list[bytes]]] = []
+        self.needles: list[bytes] = []
+        self.folded_needles: list[str] = []
+        self.patterns: list[re.Pattern[str]] = []
+        self.folded_patterns: list[re.Pattern[str]] = []
+        for f in filters:
+            if f.column_name == "history_time":
+                if f.operator_name in ("=", ">=", ">"):
+                    self.since = f.argument if self.since is None else max(self.since, f.argument)
+                if f.operator_name in ("=", "<=", "<"):
+                    self.until = f.argument if self.until is None else min(self.until, f.argument)
+            elif f.column_name in POSTINGS_FIELDS and f.operator_name in ("=", "=~", "in"):
+                # The postings are case insensitive, just like "=~" and "in"
+                arguments = f.argument if f.operator_name == "in" else [f.argument]
+                self.postings.append((f.column_name, [quote_tab(str(arg)) for arg in arguments]))
+            elif f.column_name not in _GREPABLE_COLUMNS:
+                continue
+            elif f.operator_name == "=":
+                self.needles.append(quote_tab(str(f.argument)))
+            elif f.operator_name == "=~":
+                self.folded_needles.append(str(f.argument).lower())
+            elif f.operator_name in ("~", "~~"):
+                try:
+                    pattern = re.compile(
+                        str(f.argument) if f.operator_name == "~" else str(f.argument).lower()
+                    )
+                except re.error:
+                    continue  # Reported by the filter itself
+                (self.patterns if f.operator_name == "~" else self.folded_patterns).append(pattern)
+
+    def candidates(self, index: HistoryFileIndex) -> list[int]:
+        """The indexes of the lines to read, from the youngest to the oldest"""
+        first = 0 if self.since is None else index.first_line_since(self.since)
+        lines: Sequence[int] = range(first, len(index))
+        if self.postings:
+            selected = set.intersection(
+                *(index.lines_with(column, values) for column, values in self.postings)
+            )
+            lines = sorted(nr for nr in selected if nr >= first)
+        if self.since is not None or self.until is not None:
+            since = -math.inf if self.since is None else self.since
+            until = math.inf if self.until is None else self.until
+            lines = [nr for nr in lines if since <= index.times[nr] <= until]
+        return list(reversed(lines))
+
+    def may_match(self, line: bytes) -> bool:
+        if not all(needle in line for needle in self.needles):
+            return False
+        if not (self.folded_needles or self.patterns or self.folded_patterns):
+            return True
+        text = line.decode("utf-8", "replace").rstrip("\n")
+        folded_text = text.lower()
+        if not all(needle in folded_text for needle in self.folded_needles):
+            return False
+        # Per column, so that anchored patterns work
+        columns = text.split("\t")
+        folded_columns = folded_text.split("\t")
+        return all(any(p.search(c) for c in columns) for p in self.patterns) and all(
+            any(p.search(c) for c in folded_columns) for p in self.folded_patterns
+        )
 
 
 def _greatest_lower_bound_for_filters(
@@ -263,26 +306,25 @@ def _intersects(
 def parse_history_file(
     history_columns: Sequence[tuple[str, Any]],
     path: Path,
+    line_filter: LineFilter,
     filter_row: Callable[[Sequence[Any]], bool],
-    cmd: str,
     limit: int | None,
     logger: Logger,
+    *,
+    indexes: HistoryFileIndexes,
+    growing: bool,
 ) -> list[Any]:
     entries: list[Any] = []
-    with subprocess.Popen(
-        cmd,
-        shell=True,  # nosec B602 # BNS:67522a
-        close_fds=True,
-        stdout=subprocess.PIPE,
-    ) as grep:
-        if grep.stdout is None:
-            raise Exception("Huh? stdout vanished...")
-
-        for line in grep.stdout:
+    with path.open("rb") as f:
+        index = indexes.load(path, f, growing=growing)
+        for line_index, line in index.read_lines(f.fileno(), line_filter.candidates(index)):
             if limit is not None and len(entries) > limit:
                 break
+            if not line_filter.may_match(line):
+                continue
             try:
                 parts: list[Any] = line.decode("utf-8").rstrip("\n").split("\t")
+                parts.insert(0, line_index + 1)  # add line number
                 convert_history_line(history_columns, parts)
                 if filter_row(parts):
                     entries.append(parts)
@@ -300,8 +342,7 @@ def parse_history_file_python(
     """Pure python reader for history files. Used for update config, where filtering is not needed.
 
     To avoid slurping the whole file in memory this generator yields chunks of entries.
-    This is not faster than the grep approach(parse_history_file()), but it's more memory efficient
-    and does not need to fork a subprocess and other cmk specific stuff.
+    Unlike parse_history_file() it neither needs nor maintains the index of the file.
     """
     with open(path, "rb") as f:
         for chunk in itertools.batched(f, 100_000):
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Sidecar indexes of the EC history files
+
+The index of a history file knows the offset and the time of each line, and holds postings lists
+for the columns which are typically filtered for equality. The postings are keyed by a hash of the
+case folded value, so a lookup may yield lines which do not match: the caller still has to filter
+the lines.
+
+The index covers the file up to the size it has been built for. It is extended when the file has
+grown and built again when the file has been replaced or truncated. The index of the file which
+is currently written to is kept in memory and only persisted once the history has moved on to
+the next file.
+"""
+
+import bisect
+import math
+import os
+import threading
+import zlib
+from array import array
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Final
+
+from cmk.ccc import store
+
+# The positions of the indexed columns within a line of a history file
+POSTINGS_FIELDS: Final = {
+    "event_id": 4,
+    "event_host": 11,
+    "event_rule_id": 17,
+}
+
+# Increase when the layout of the index changes, older indexes are built again
+INDEX_VERSION: Final = 2
+
+
+def index_path(path: Path) -> Path:
+    # Hidden and without the .log suffix, so that it is not mistaken for a history file
+    return path.with_name(f".{path.name}.index")
+
+
+def value_hash(value: bytes) -> int:
+    # Folded like the case insensitive operators of the queries do it
+    return zlib.crc32(
+        value.decode("utf-8", "surrogateescape").lower().encode("utf-8", "surrogateescape")
+    )
+
+
+@dataclass
+class HistoryFileIndex:
+    inode: int
+    version: int = 0  # Not set in the indexes of older versions
+    size: int = 0
+    offsets: array[int] = field(default_factory=lambda: array("q"))  # start of each line
+    times: array[float] = field(default_factory=lambda: array("d"))  # NaN for invalid lines
+    max_times: array[float] = field(default_factory=lambda: array("d"))  # the latest time so far
+    postings: dict[str, dict[int, array[int]]] = field(
+        default_factory=lambda: {column: {} for column in POSTINGS_FIELDS}
+    )
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def extend(self, f: BinaryIO) -> None:
+        """Index the complete lines of the file after the indexed part"""
+        f.seek(self.size)
+        max_time = self.max_times[-1] if self.max_times else -math.inf
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # Still being written
+            line_index = len(self.offsets)
+            self.offsets.append(self.size)
+            self.size += len(line)
+            fields = line.split(b"\t")
+            try:
+                line_time = float(fields[0])
+            except ValueError:
+                line_time = math.nan
+            else:
+                max_time = max(max_time, line_time)
+            self.times.append(line_time)
+            self.max_times.append(max_time)
+            for column, position in POSTINGS_FIELDS.items():
+                if position < len(fields):
+                    self.postings[column].setdefault(
+                        value_hash(fields[position]), array("I")
+                    ).append(line_index)
+
+    def first_line_since(self, timestamp: float) -> int:
+        """All lines before the returned one are older than timestamp"""
+        return bisect.bisect_left(self.max_times, timestamp)
+
+    def lines_with(self, column: str, values: Iterable[bytes]) -> set[int]:
+        """The lines which may have one of the values in the column"""
+        postings = self.postings[column]
+        return {
+            line_index for value in values for line_index in postings.get(value_hash(value), ())
+        }
+
+    def read_lines(self, fd: int, line_indexes: Sequence[int]) -> Iterable[tuple[int, bytes]]:
+        for line_index in line_indexes:
+            end = self.offsets[line_index + 1] if line_index + 1 < len(self) else self.size
+            start = self.offsets[line_index]
+            yield line_index, os.pread(fd, end - start, start)
+
+
+def _load_persisted_index(path: Path) -> HistoryFileIndex | None:
+    try:
+        index = store.load_object_from_pickle_file(index_path(path), default=None)
+    except Exception:
+        return None  # It's only an index
+    return index if isinstance(index, HistoryFileIndex) else None
+
+
+def _update_index(index: HistoryFileIndex | None, f: BinaryIO) -> tuple[HistoryFileIndex, bool]:
+    """Return the up to date index of the opened file and whether it has been changed"""
+    stat = os.fstat(f.fileno())
+    if (
+        index is None
+        or index.version != INDEX_VERSION
+        or index.inode != stat.st_ino
+        or index.size > stat.st_size
+    ):
+        index = HistoryFileIndex(inode=stat.st_ino, version=INDEX_VERSION)
+    indexed_size = index.size
+    if index.size < stat.st_size:
+        index.extend(f)
+    return index, index.size != indexed_size
+
+
+class HistoryFileIndexes:
+    """Loads the indexes of the history files, keeping the one of the growing file in memory"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._growing: tuple[Path, HistoryFileIndex] | None = None
+
+    def load(self, path: Path, f: BinaryIO, *, growing: bool) -> HistoryFileIndex:
+        with self._lock:
+            if self._growing is not None and self._growing[0] == path:
+                index, _extended = _update_index(self._growing[1], f)
+                changed = True  # Not persisted so far
+                self._growing = None
+            else:
+                index, changed = _update_index(_load_persisted_index(path), f)
+
+            if growing:
+                if self._growing is not None and self._growing[0].exists():
+                    # The history has moved on to another file
+                    store.save_object_to_pickle_file(index_path(self._growing[0]), self._growing[1])
+                self._growing = (path, index)
+            elif changed:
+                store.save_object_to_pickle_file(index_path(path), index)
+            return index
@@ -4,12 +4,15 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 """EC History sqlite backend."""
 
+import enum
 import itertools
 import json
+import queue
 import sqlite3
+import threading
 import time
-from collections.abc import Iterable, Sequence
-from dataclasses import dataclass
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass, field
 from datetime import timedelta
 from logging import Logger
 from pathlib import Path
@@ -18,6 +21,7 @@ from typing import Final, Literal
 from .config import Config
 from .event import Event
 from .history import History, HistoryWhat
+from .perfcounters import Perfcounters
 from .query import Columns, QueryFilter, QueryGET
 from .settings import Options, Paths, Settings
 
@@ -70,6 +74,14 @@ SQLITE_INDEXES = [
     f"CREATE INDEX IF NOT EXISTS idx_{column} ON history ({column});" for column in INDEXED_COLUMNS
 ]
 
+INSERT_STATEMENT: Final = f"""INSERT INTO
+    history ({", ".join(TABLE_COLUMNS[1:])})
+        VALUES ({", ".join(itertools.repeat("?", len(TABLE_COLUMNS[1:])))});"""  # nosec B608 # BNS:6b6392
+
+# Limits of a group commit of the history writer
+MAX_BATCH_SIZE: Final = 1000
+MAX_BATCH_DELAY: Final = 0.2  # seconds
+
 
 def configure_sqlite_types() -> None:
     """
@@ -130,6 +142,110 @@ def filters_to_sqlite_query(filters: Iterable[QueryFilter]) -> tuple[str, list[o
     )
 
 
+class _Stop(enum.Enum):
+    STOP = enum.auto()
+
+
+@dataclass(frozen=True)
+class _Flush:
+    committed: threading.Event = field(default_factory=threading.Event)
+
+
+class HistoryWriter:
+    """Writes history rows in a background thread, with one commit per batch of rows
+
+    A batch is written as soon as it holds max_batch_size rows or max_batch_delay seconds after
+    its first row has been queued, whatever comes first. The thread is started with the first
+    row, so that the EC can create the history before daemonizing.
+    """
+
+    def __init__(
+        self,
+        write_rows: Callable[[Sequence[Sequence[object]]], None],
+        logger: Logger,
+        perfcounters: Perfcounters | None = None,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_batch_delay: float = MAX_BATCH_DELAY,
+    ) -> None:
+        self._write_rows = write_rows
+        self._logger = logger
+        self._perfcounters = perfcounters
+        self._max_batch_size = max_batch_size
+        self._max_batch_delay = max_batch_delay
+        self._queue: queue.Queue[Sequence[object] | _Flush | _Stop] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._thread_lock = threading.Lock()
+
+    def put(self, row: Sequence[object]) -> None:
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="HistoryWriter", daemon=True)
+                self._thread.start()
+        self._queue.put(row)
+        self._update_queue_depth()
+
+    def drain(self) -> None:
+        """Write the rows queued so far right away and wait for them to be committed
+
+        Rows queued by other threads meanwhile are not waited for."""
+        flush = _Flush()
+        with self._thread_lock:
+            if self._thread is None:
+                return
+            self._queue.put(flush)
+        flush.committed.wait()
+
+    def stop(self) -> None:
+        """Write the queued rows and end the thread"""
+        with self._thread_lock:
+            if self._thread is None:
+                return
+            self._queue.put(_Stop.STOP)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            batch, marker = self._collect_batch()
+            if batch:
+                self._write_batch(batch)
+            if isinstance(marker, _Flush):
+                marker.committed.set()
+            elif marker is _Stop.STOP:
+                return
+
+    def _collect_batch(self) -> tuple[list[Sequence[object]], _Flush | _Stop | None]:
+        batch: list[Sequence[object]] = []
+        deadline = None
+        while len(batch) < self._max_batch_size:
+            try:
+                item = self._queue.get(
+                    timeout=None if deadline is None else max(0.0, deadline - time.monotonic())
+                )
+            except queue.Empty:
+                break
+            if isinstance(item, _Flush | _Stop):
+                return batch, item
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self._max_batch_delay
+        return batch, None
+
+    def _write_batch(self, batch: Sequence[Sequence[object]]) -> None:
+        start = time.monotonic()
+        try:
+            self._write_rows(batch)
+        except Exception:
+            self._logger.exception("Cannot write %d history entries", len(batch))
+        if self._perfcounters is not None:
+            self._perfcounters.count_time("history", time.monotonic() - start)
+        self._update_queue_depth()
+
+    def _update_queue_depth(self) -> None:
+        if self._perfcounters is not None:
+            self._perfcounters.set_gauge("history_queue_depth", self._queue.qsize())
+
+
 @dataclass
 class SQLiteSettings:
     paths: Paths
@@ -151,6 +267,7 @@ class SQLiteHistory(History):
         logger: Logger,
         event_columns: Columns,
         history_columns: Columns,
+        perfcounters: Perfcounters | None = None,
     ):
         self._settings = settings
         self._config = config
@@ -159,6 +276,9 @@ class SQLiteHistory(History):
         self._history_columns = history_columns
         self._last_housekeeping = 0.0
         self._page_size = 4096
+        # Serializes the use of the connection by the history writer and the other threads
+        self._lock = threading.Lock()
+        self._writer = HistoryWriter(self._insert_rows, logger, perfcounters)
 
         if isinstance(self._settings.database, Path):
             self._settings.database.parent.mkdir(parents=True, exist_ok=True)
@@ -222,30 +342,31 @@ class SQLiteHistory(History):
 
     def flush(self) -> None:
         """Delete all entries the history table."""
-        with self.conn as connection:
+        self._writer.drain()
+        with self._lock, self.conn as connection:
             connection.execute("DELETE FROM history;")
 
     def add(self, event: Event, what: HistoryWhat, who: str = "", addinfo: str = "") -> None:
-        """Add a single entry to the history table.
+        """Queue a single entry for the history table.
 
-        No need to include the line column, as it is autoincremented.
+        The entries are written by the history writer in the background. No need to include
+        the line column, as it is autoincremented.
         """
-        with self.conn as connection:
-            cur = connection.cursor()
-            cur.execute(
-                f"""INSERT INTO
-                    history ({", ".join(TABLE_COLUMNS[1:])})
-                        VALUES ({", ".join(itertools.repeat("?", len(TABLE_COLUMNS[1:])))});""",  # nosec B608 # BNS:6b6392
-                tuple(
-                    itertools.chain(
-                        (time.time(), what, who, addinfo),
-                        [
-                            event.get(colname.removeprefix("event_"), defval)
-                            for colname, defval in self._event_columns
-                        ],
-                    )
-                ),
+        self._writer.put(
+            tuple(
+                itertools.chain(
+                    (time.time(), what, who, addinfo),
+                    [
+                        event.get(colname.removeprefix("event_"), defval)
+                        for colname, defval in self._event_columns
+                    ],
+                )
             )
+        )
+
+    def drain(self) -> None:
+        """Wait until all entries added so far are written to the history table."""
+        self._writer.drain()
 
     def add_entries(self, entries: Sequence[Sequence[object]]) -> None:
         """Add multiple entries to the history table.
@@ -253,14 +374,11 @@ class SQLiteHistory(History):
         Used only by the cmk-update-config during EC history migration to sqlite.
         The first column is the line number, which is autoincremented, so ignored in TABLE_COLUMNS.
         """
-        with self.conn as connection:
-            cur = connection.cursor()
-            cur.executemany(
-                f"""INSERT INTO
-                    history ({", ".join(TABLE_COLUMNS[1:])})
-                        VALUES ({", ".join(itertools.repeat("?", len(TABLE_COLUMNS[1:])))});""",  # nosec B608 # BNS:6b6392
-                (entry[1:] for entry in entries),
-            )
+        self._insert_rows([entry[1:] for entry in entries])
+
+    def _insert_rows(self, rows: Sequence[Sequence[object]]) -> None:
+        with self._lock, self.conn as connection:
+            connection.executemany(INSERT_STATEMENT, rows)
 
     def get(self, query: QueryGET) -> Iterable[Sequence[object]]:
         """Retrieve entries from the history table.
@@ -271,7 +389,8 @@ class SQLiteHistory(History):
         if query.limit:
             sqlite_query += " LIMIT ?"
             sqlite_arguments += f" {query.limit + 1}"
-        with self.conn as connection:
+        self._writer.drain()
+        with self._lock, self.conn as connection:
             cur = connection.cursor()
             cur.execute(sqlite_query, sqlite_arguments)
             return cur.fetchall()
@@ -284,7 +403,8 @@ class SQLiteHistory(History):
         now = time.time()
         if now - self._last_housekeeping > self._config["sqlite_housekeeping_interval"]:
             delta = now - timedelta(days=self._config["history_lifetime"]).total_seconds()
-            with self.conn as connection:
+            self._writer.drain()
+            with self._lock, self.conn as connection:
                 cur = connection.cursor()
                 cur.execute("DELETE FROM history WHERE time <= ?;", (delta,))
             # should be executed outside of the transaction
@@ -293,18 +413,21 @@ class SQLiteHistory(History):
 
     def _vacuum(self) -> None:
         """Run VACUUM command only if the free pages in DB are greater than 50 Mb."""
-        with self.conn as connection:
-            freelist_count = connection.execute("PRAGMA freelist_count").fetchone()[0]
-            freelist_size = freelist_count * self._page_size
+        with self._lock:
+            with self.conn as connection:
+                freelist_count = connection.execute("PRAGMA freelist_count").fetchone()[0]
+                freelist_size = freelist_count * self._page_size
 
-        if freelist_size > self._config["sqlite_freelist_size"]:
-            self.conn.execute("VACUUM;")
+            if freelist_size > self._config["sqlite_freelist_size"]:
+                self.conn.execute("VACUUM;")
 
     def close(self) -> None:
         """Explicitly close the connection to the sqlite database.
 
         Used during a new object instantiation,
         to avoid sqlite3.OperationalError: database is locked.
+        The entries still queued are written before.
         """
+        self._writer.stop()
         self.conn.commit()
         self.conn.close()
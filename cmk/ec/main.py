@@ -29,6 +29,8 @@ import threading
 import time
 import traceback
 from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from logging import DEBUG, getLogger, Logger
 from pathlib import Path
 from types import FrameType
@@ -64,6 +66,7 @@ from .config import (
 from .core_queries import HostInfo, query_hosts_scheduled_downtime_depth
 from .crash_reporting import CrashReportStore, ECCrashReport
 from .event import create_events_from_syslog_messages, Event, scrub_string
+from .event_store import EventStore, HostKey
 from .helpers import ECLock, parse_bytes_into_syslog_messages
 from .history import ActiveHistoryPeriod, get_logfile, History, HistoryWhat, quote_tab, TimedHistory
 from .history_file import FileHistory
@@ -73,7 +76,6 @@ from .host_config import HostConfig
 from .perfcounters import Perfcounters
 from .query import (
     Columns,
-    filter_operator_in,
     MKClientError,
     Query,
     QueryCOMMAND,
@@ -81,10 +83,19 @@ from .query import (
     QueryREPLICATE,
     StatusTable,
 )
-from .rule_matcher import compile_rule, match, MatchFailure, MatchResult, MatchSuccess, RuleMatcher
+from .rule_evaluator import (
+    add_rule_contact_groups_to_event,
+    Evaluation,
+    replace_groups,
+    rewrite_event,
+    RuleEvaluator,
+    RuleEvaluatorPool,
+)
+from .rule_matcher import compile_rule, MatchFailure, RuleMatcher
 from .rule_packs import load_active_config
 from .settings import create_settings, FileDescriptor, PortNumber, Settings
 from .snmp import SNMPTrapParser
+from .status_journal import StatusHeader, StatusJournal
 from .syslog import SyslogFacility, SyslogPriority
 from .timeperiod import TimePeriods
 
@@ -182,6 +193,7 @@ def create_history_raw(
     logger: Logger,
     event_columns: Columns,
     history_columns: Columns,
+    perfcounters: Perfcounters | None = None,
 ) -> History:
     """Factory for History objects based on the current configuration."""
     match config["archive_mode"]:
@@ -199,6 +211,7 @@ def create_history_raw(
                 logger,
                 event_columns,
                 history_columns,
+                perfcounters,
             )
         case _ as default:
             assert_never(default)
@@ -210,9 +223,12 @@ def create_history(
     logger: Logger,
     event_columns: Columns,
     history_columns: Columns,
+    perfcounters: Perfcounters | None = None,
 ) -> History:
     """Factory for History objects based on the current configuration, optionally augmented with timing information."""
-    history = create_history_raw(settings, config, logger, event_columns, history_columns)
+    history = create_history_raw(
+        settings, config, logger, event_columns, history_columns, perfcounters
+    )
     return TimedHistory(history) if logger.isEnabledFor(DEBUG) else history
 
 
@@ -295,6 +311,17 @@ def process_exists(pid: int) -> bool:
         return False
 
 
+def receive_datagrams(
+    sock: socket.socket, bufsize: int, max_datagrams: int = 1000
+) -> list[tuple[bytes, Any]]:
+    """Receive the datagrams which have arrived, at least one"""
+    datagrams = [sock.recvfrom(bufsize)]
+    with contextlib.suppress(BlockingIOError):
+        while len(datagrams) < max_datagrams:
+            datagrams.append(sock.recvfrom(bufsize, socket.MSG_DONTWAIT))
+    return datagrams
+
+
 def drain_pipe(pipe: FileDescr) -> None:
     while True:
         try:
@@ -314,31 +341,6 @@ def drain_pipe(pipe: FileDescr) -> None:
             break  # No data available
 
 
-def replace_groups(text: str, origtext: str, match_groups: MatchGroups) -> str:
-    # replace \0 with text itself. This allows to add information
-    # in front or and the end of a message
-    text = text.replace("\\0", origtext)
-
-    # Generic replacement with \1, \2, ...
-    match_groups_message = match_groups.get("match_groups_message", False)
-    if match_groups_message is not False:
-        for nr, g in enumerate(match_groups_message):
-            text = text.replace(f"\\{nr + 1}", g)
-
-    # Replacement with keyword
-    # Right now we have
-    # $MATCH_GROUPS_MESSAGE_x$
-    # $MATCH_GROUPS_SYSLOG_APPLICATION_x$
-    for key_prefix, values in match_groups.items():
-        if not isinstance(values, tuple):
-            continue
-
-        for idx, match_value in enumerate(values):
-            text = text.replace(f"${key_prefix.upper()}_{idx + 1}$", match_value)
-
-    return text
-
-
 class MKSignalException(MKException):
     def __init__(self, signum: int) -> None:
         MKException.__init__(self, f"Got signal {signum}")
@@ -393,6 +395,9 @@ class EventServer(ECServerThread):
         self._hash_stats: list[list[int]] = []  # facility/priority
         for _unused_facility in range(32):
             self._hash_stats.append([0] * 8)
+        # The number of times each rule has been tried and the seconds spent on it, by rule ID
+        self._rule_tries: dict[str, int] = {}
+        self._rule_match_time: dict[str, float] = {}
 
         self.host_config = HostConfig(self._logger)
         self._perfcounters = perfcounters
@@ -407,6 +412,8 @@ class EventServer(ECServerThread):
             omd_site_id=omd_site(),
             is_active_time_period=self._time_period.active,
         )
+        self._rule_evaluator = RuleEvaluator(self._rules, None, self._rule_matcher)
+        self._rule_evaluator_pool: RuleEvaluatorPool | None = None
 
         # HACK for testing: The real fix would involve breaking up these huge
         # class monsters.
@@ -734,11 +741,16 @@ class EventServer(ECServerThread):
                 )
                 self.process_syslog_messages(messages, None)
 
-            # Read events from builtin syslog server
+            # Read events from builtin syslog server, all which have arrived, so that their
+            # rules can be evaluated in parallel
             if self._syslog_udp is not None and self._syslog_udp in readable:
-                message, address = self._syslog_udp.recvfrom(4096)
-                self.process_syslog_messages(
-                    [message], parse_address("syslog socket (UDP)", address)
+                debug_logger = self._logger if self._config["debug_rules"] else None
+                self.process_potential_event_instrumented(
+                    event
+                    for message, address in receive_datagrams(self._syslog_udp, 4096)
+                    for event in create_events_from_syslog_messages(
+                        [message], parse_address("syslog socket (UDP)", address), debug_logger
+                    )
                 )
 
             # Read events from builtin snmptrap server
@@ -772,6 +784,13 @@ class EventServer(ECServerThread):
         Processes incoming data, just a wrapper between the real data and the
         handler function to record some statistics etc.
         """
+        events = list(events)
+        with self._lock_configuration:
+            rule_evaluator_pool = self._rule_evaluator_pool
+        if rule_evaluator_pool is not None and len(events) > 1:
+            self._process_events_in_pool(rule_evaluator_pool, events)
+            return
+
         for event in events:
             self._perfcounters.count("messages")
             before = time.time()
@@ -783,6 +802,39 @@ class EventServer(ECServerThread):
             elapsed = time.time() - before
             self._perfcounters.count_time("processing", elapsed)
 
+    def _process_events_in_pool(
+        self, rule_evaluator_pool: RuleEvaluatorPool, events: Sequence[Event]
+    ) -> None:
+        """The rules are evaluated by the pool, the outcome is applied here in the original order"""
+        before = time.time()
+        for _event in events:
+            self._perfcounters.count("messages")
+        # In replication slave mode (when not took over), ignore all events
+        if is_replication_slave(self._config) and self._slave_status["mode"] == "sync":
+            if self.settings.options.debug:
+                self._logger.info("Replication: we are in slave mode, ignoring events")
+            return
+
+        for event in events:
+            self._prepare_event(event)
+        rule_evaluator = rule_evaluator_pool.evaluator
+        applied = 0
+        try:
+            with self._lock_configuration:  # Not closed by a reload while submitting
+                evaluations = rule_evaluator_pool.evaluate(events)
+            for evaluation in evaluations:
+                self._apply_evaluation(rule_evaluator, evaluation)
+                applied += 1
+        except BrokenProcessPool:
+            self._logger.exception("A rule evaluation process died, restarting the processes")
+            self._restart_rule_evaluator_pool(rule_evaluator_pool)
+            for event in events[applied:]:
+                self._apply_evaluation(rule_evaluator, rule_evaluator.evaluate(event))
+
+        elapsed = (time.time() - before) / len(events)
+        for _event in events:
+            self._perfcounters.count_time("processing", elapsed)
+
     def process_syslog_messages(
         self, messages: Iterable[bytes], address: tuple[str, int] | None
     ) -> None:
@@ -884,6 +936,7 @@ class EventServer(ECServerThread):
                             event["last_token"] = (
                                 last_token + new_tokens * secs_per_token
                             )  # not now! would be unfair
+                            self._event_status.event_changed(event)
                             if event["count"] == 0:
                                 self._logger.info(
                                     "Rule %s/%s, event %d: again without allowed rate, dropping event",
@@ -937,6 +990,7 @@ class EventServer(ECServerThread):
                         self._logger.info(
                             "Cannot do rule action: rule %s not present anymore.", event["rule_id"]
                         )
+                    self._event_status.event_changed(event)
 
             # Handle events with a limited lifetime
             elif "live_until" in event and now >= event["live_until"]:
@@ -995,9 +1049,8 @@ class EventServer(ECServerThread):
                 # First look for case 1: rule that already have at least one hit
                 # and this events in the state "counting" exist.
                 events_to_delete: list[tuple[Event, HistoryWhat]] = []
-                events = self._event_status.events()
-                for event in events:
-                    if event["rule_id"] == rule["id"] and event["phase"] == "counting":
+                for event in self._event_status.events_of_rule(rule["id"]):
+                    if event["phase"] == "counting":
                         # time has elapsed. Now lets see if we have reached
                         # the necessary count:
                         if event["count"] < expect["count"]:  # no -> trigger alarm
@@ -1048,10 +1101,8 @@ class EventServer(ECServerThread):
             merge, reset_ack = merge  # type: ignore[unreachable]
 
         if merge != "never":
-            for event in self._event_status.events():
-                if event["rule_id"] == rule["id"] and (
-                    event["phase"] == "open" or (event["phase"] == "ack" and merge == "acked")
-                ):
+            for event in self._event_status.events_of_rule(rule["id"]):
+                if event["phase"] == "open" or (event["phase"] == "ack" and merge == "acked"):
                     merge_event = event
                     break
 
@@ -1070,6 +1121,7 @@ class EventServer(ECServerThread):
             # Better rewrite (again). Rule might have changed. Also we have changed
             # the text and the user might have his own text added via set_text.
             self.rewrite_event(rule, merge_event, MatchGroups(), set_first=False)
+            self._event_status.event_changed(merge_event)
             self._history.add(merge_event, "COUNTFAILED")
         else:
             # Create artificial event from scratch. Make sure that all important
@@ -1094,7 +1146,7 @@ class EventServer(ECServerThread):
                 core_host=HostName(""),
                 host_in_downtime=False,
             )
-            self._add_rule_contact_groups_to_event(rule, event)
+            add_rule_contact_groups_to_event(rule, event)
             self.rewrite_event(rule, event, MatchGroups())
             self._event_status.new_event(event)
             self._history.add(event, "COUNTFAILED")
@@ -1108,6 +1160,7 @@ class EventServer(ECServerThread):
                 rule,
                 event,
             )
+            self._event_status.event_changed(event)
             if rule.get("autodelete"):
                 event["phase"] = "closed"
                 self._event_status.remove_event(event, "AUTODELETE")
@@ -1118,13 +1171,13 @@ class EventServer(ECServerThread):
         self._snmp_trap_parser = SNMPTrapParser(
             self.settings, self._config, self._logger.getChild("snmp")
         ).parse
-        self.compile_rules(self._config["rule_packs"])
         self.host_config = HostConfig(self._logger)
         self._rule_matcher = RuleMatcher(
             logger=self._logger if config["debug_rules"] else None,
             omd_site_id=omd_site(),
             is_active_time_period=self._time_period.active,
         )
+        self.compile_rules(self._config["rule_packs"])
 
     def compile_rules(self, rule_packs: Sequence[ECRulePack]) -> None:
         """Precompile regular expressions and similar stuff."""
@@ -1194,6 +1247,46 @@ class EventServer(ECServerThread):
                         for prio, entries in self._rule_hash[facility].items()
                     ]
                     self._logger.info(" %-12s: %s", SyslogFacility(facility), " ".join(stats))
+        self._update_rule_evaluator()
+
+    def _update_rule_evaluator(self) -> None:
+        self._rule_evaluator = RuleEvaluator(
+            self._rules,
+            self._rule_hash if self._config["rule_optimizer"] else None,
+            self._rule_matcher,
+            # The debug output shall explain why each rule does not match
+            prefilter=self._config["rule_optimizer"] and not self._config["debug_rules"],
+        )
+        if (prefilter := self._rule_evaluator.prefilter) is not None:
+            self._logger.info(
+                "Rule prefilter: %d rules - %d filtered by text, %d by host, %d by application",
+                len(self._rules),
+                prefilter.text.num_filtered,
+                prefilter.host.num_filtered,
+                prefilter.application.num_filtered,
+            )
+        if self._rule_evaluator_pool is not None:
+            self._rule_evaluator_pool.close()
+            self._rule_evaluator_pool = None
+        # The debug output of the rule matching only works in our own process
+        processes = self._config["rule_evaluation_processes"]
+        if processes > 1 and not self._config["debug_rules"]:
+            self._rule_evaluator_pool = RuleEvaluatorPool(self._rule_evaluator, processes)
+            self._logger.info("Evaluating the rules in %d processes", processes)
+
+    def _restart_rule_evaluator_pool(self, broken: RuleEvaluatorPool) -> None:
+        with self._lock_configuration:
+            if self._rule_evaluator_pool is not broken:
+                return  # Replaced by a reload meanwhile
+            broken.close()
+            self._rule_evaluator_pool = RuleEvaluatorPool(
+                broken.evaluator, self._config["rule_evaluation_processes"]
+            )
+
+    def close(self) -> None:
+        """Stop the processes evaluating the rules"""
+        if self._rule_evaluator_pool is not None:
+            self._rule_evaluator_pool.close()
 
     def hash_rule(self, rule: Rule) -> None:
         """Construct rule hash for faster execution."""
@@ -1250,143 +1343,104 @@ class EventServer(ECServerThread):
                 (100.0 * count / float(total_count)),
             )
 
+        self._logger.info("Top 20 of rules by matching time:")
+        for rule_id, seconds in sorted(
+            self._rule_match_time.items(), key=lambda entry: entry[1], reverse=True
+        )[:20]:
+            tries = self._rule_tries[rule_id]
+            self._logger.info(
+                "  %s/%s - %d tries, %.3f s (%.1f us per try)",
+                self._rule_by_id[rule_id]["pack"] if rule_id in self._rule_by_id else "?",
+                rule_id,
+                tries,
+                seconds,
+                1e6 * seconds / tries,
+            )
+
     def process_potential_event(self, event: Event) -> None:
+        self._prepare_event(event)
+        with self._lock_configuration:
+            rule_evaluator = self._rule_evaluator
+        self._apply_evaluation(rule_evaluator, rule_evaluator.evaluate(event))
+
+    def _prepare_event(self, event: Event) -> None:
         self.do_translate_hostname(event)
 
         # Log all incoming messages into a syslog-like text file if that is enabled
         if self._config["log_messages"]:
             self.log_message(event)
 
-        # Rule optimizer
         if self._config["rule_optimizer"]:
             self._hash_stats[event["facility"]][event["priority"]] += 1
-            rule_candidates = self._rule_hash.get(event["facility"], {}).get(event["priority"], [])
-        else:
-            rule_candidates = self._rules
 
-        skip_pack = None
-        for rule in rule_candidates:
-            if skip_pack and rule["pack"] == skip_pack:
-                continue  # still in the rule pack that we want to skip
-            skip_pack = None  # new pack, reset skipping
+    def _apply_evaluation(self, rule_evaluator: RuleEvaluator, evaluation: Evaluation) -> None:
+        """Do what the rules say to the event, changing the event status"""
+        event = evaluation.event
+        self._perfcounters.count("rule_tries", evaluation.tries)
+        for nr, seconds in evaluation.match_times:
+            rule_id = rule_evaluator.rules[nr]["id"]
+            self._rule_tries[rule_id] = self._rule_tries.get(rule_id, 0) + 1
+            self._rule_match_time[rule_id] = self._rule_match_time.get(rule_id, 0.0) + seconds
+        for error in evaluation.errors:
+            self._logger.error(error)
+
+        for hit in evaluation.hits:
+            rule = rule_evaluator.rules[hit.rule]
+            result = hit.result
+            self._perfcounters.count("rule_hits")
+            if self._config["debug_rules"]:
+                self._logger.info("  matching groups:\n%s", pprint.pformat(result.match_groups))
 
-            try:
-                result = self.event_rule_matches(rule, event)
-            except Exception as e:
-                result = MatchFailure(
-                    reason=f"Rule would match, but due to inverted matching does not. {e}"
+            self._event_status.count_rule_match(rule["id"])
+            if self._config["log_rulehits"]:
+                self._logger.info(
+                    "Rule '%s/%s' hit by message %s/%s - '%s'.",
+                    rule["pack"],
+                    rule["id"],
+                    SyslogFacility(event["facility"]),
+                    SyslogPriority(event["priority"]),
+                    event["text"],
                 )
-                self._logger.exception(result.reason)
-
-            if isinstance(result, MatchSuccess):
-                self._perfcounters.count("rule_hits")
-                if self._config["debug_rules"]:
-                    self._logger.info("  matching groups:\n%s", pprint.pformat(result.match_groups))
-
-                self._event_status.count_rule_match(rule["id"])
-                if self._config["log_rulehits"]:
-                    self._logger.info(
-                        "Rule '%s/%s' hit by message %s/%s - '%s'.",
-                        rule["pack"],
-                        rule["id"],
-                        SyslogFacility(event["facility"]),
-                        SyslogPriority(event["priority"]),
-                        event["text"],
-                    )
-
-                if rule.get("drop"):
-                    if rule["drop"] == "skip_pack":
-                        skip_pack = rule["pack"]
-                        if self._config["debug_rules"]:
-                            self._logger.info("  skipping this rule pack (%s)", skip_pack)
-                        continue
-                    self._perfcounters.count("drops")
-                    return
-
-                if result.cancelling:
-                    self._event_status.cancel_events(
-                        self, self._event_columns, event, result.match_groups, rule
-                    )
-                    return
-
-                # Remember the rule id that this event originated from
-                event["rule_id"] = rule["id"]
-
-                # Attach optional contact group information for visibility
-                # and eventually for notifications
-                self._add_rule_contact_groups_to_event(rule, event)
 
-                # Store groups from matching this event. In order to make
-                # persistence easier, we do not save them as list but join
-                # them on ASCII-1.
-                match_groups_message = result.match_groups.get("match_groups_message", ())
-                assert match_groups_message is not False
-                event["match_groups"] = match_groups_message
+            if rule.get("drop"):
+                if rule["drop"] == "skip_pack":
+                    if self._config["debug_rules"]:
+                        self._logger.info("  skipping this rule pack (%s)", rule["pack"])
+                    continue
+                self._perfcounters.count("drops")
+                return
 
-                match_groups_syslog_application = result.match_groups.get(
-                    "match_groups_syslog_application", ()
+            if result.cancelling:
+                self._event_status.cancel_events(
+                    self, self._event_columns, event, result.match_groups, rule
                 )
-                assert match_groups_syslog_application is not False
-                event["match_groups_syslog_application"] = match_groups_syslog_application
-
-                self.rewrite_event(rule, event, result.match_groups)
-
-                # Lookup the monitoring core hosts and add the core host
-                # name to the event when one can be matched.
-                #
-                # Needs to be done AFTER event rewriting, because the rewriting
-                # may change the "host" field.
-                #
-                # For the moment we have no rule/condition matching on this
-                # field. So we only add the core host info for matched events.
-                self._add_core_host_to_new_event(event)
-
-                if "count" in rule:
-                    count = rule["count"]
-                    # Check if a matching event already exists that we need to
-                    # count up. If the count reaches the limit, the event will
-                    # be opened and its rule actions performed.
-                    existing_event = self._event_status.count_event(self, event, count)
-                    if existing_event:
-                        if "delay" in rule:
-                            if self._config["debug_rules"]:
-                                self._logger.info(
-                                    "Event opening will be delayed for %d seconds", rule["delay"]
-                                )
-                            existing_event["delay_until"] = time.time() + rule["delay"]
-                            existing_event["phase"] = "delayed"
-                        else:
-                            event_has_opened(
-                                self._history,
-                                self.settings,
-                                self._config,
-                                self._logger,
-                                self.host_config,
-                                self._event_columns,
-                                rule,
-                                existing_event,
-                            )
-
-                        self._history.add(existing_event, "COUNTREACHED")
+                return
 
-                        if "delay" not in rule and rule.get("autodelete"):
-                            existing_event["phase"] = "closed"
-                            with self._event_status.lock:
-                                self._event_status.remove_event(existing_event, "AUTODELETE")
-                elif rule.get("expect"):
-                    self._event_status.count_expected_event(self, event)
-                else:
+            # Lookup the monitoring core hosts and add the core host
+            # name to the event when one can be matched.
+            #
+            # Needs to be done AFTER event rewriting, because the rewriting
+            # may change the "host" field.
+            #
+            # For the moment we have no rule/condition matching on this
+            # field. So we only add the core host info for matched events.
+            self._add_core_host_to_new_event(event)
+
+            if "count" in rule:
+                count = rule["count"]
+                # Check if a matching event already exists that we need to
+                # count up. If the count reaches the limit, the event will
+                # be opened and its rule actions performed.
+                existing_event = self._event_status.count_event(self, event, count)
+                if existing_event:
                     if "delay" in rule:
                         if self._config["debug_rules"]:
                             self._logger.info(
                                 "Event opening will be delayed for %d seconds", rule["delay"]
                             )
-                        event["delay_until"] = time.time() + rule["delay"]
-                        event["phase"] = "delayed"
+                        existing_event["delay_until"] = time.time() + rule["delay"]
+                        existing_event["phase"] = "delayed"
                     else:
-                        event["phase"] = "open"
-
-                    if self.new_event_respecting_limits(event) and event["phase"] == "open":
                         event_has_opened(
                             self._history,
                             self.settings,
@@ -1395,36 +1449,51 @@ class EventServer(ECServerThread):
                             self.host_config,
                             self._event_columns,
                             rule,
-                            event,
+                            existing_event,
                         )
-                        if rule.get("autodelete"):
-                            event["phase"] = "closed"
-                            with self._event_status.lock:
-                                self._event_status.remove_event(event, "AUTODELETE")
-                return
+
+                    self._history.add(existing_event, "COUNTREACHED")
+                    self._event_status.event_changed(existing_event)
+
+                    if "delay" not in rule and rule.get("autodelete"):
+                        existing_event["phase"] = "closed"
+                        with self._event_status.lock:
+                            self._event_status.remove_event(existing_event, "AUTODELETE")
+            elif rule.get("expect"):
+                self._event_status.count_expected_event(self, event)
+            else:
+                if "delay" in rule:
+                    if self._config["debug_rules"]:
+                        self._logger.info(
+                            "Event opening will be delayed for %d seconds", rule["delay"]
+                        )
+                    event["delay_until"] = time.time() + rule["delay"]
+                    event["phase"] = "delayed"
+                else:
+                    event["phase"] = "open"
+
+                if self.new_event_respecting_limits(event) and event["phase"] == "open":
+                    event_has_opened(
+                        self._history,
+                        self.settings,
+                        self._config,
+                        self._logger,
+                        self.host_config,
+                        self._event_columns,
+                        rule,
+                        event,
+                    )
+                    self._event_status.event_changed(event)
+                    if rule.get("autodelete"):
+                        event["phase"] = "closed"
+                        with self._event_status.lock:
+                            self._event_status.remove_event(event, "AUTODELETE")
+            return
 
         # End of loop over rules.
         if self._config["archive_orphans"]:
             self._event_status.archive_event(event)
 
-    def _add_rule_contact_groups_to_event(self, rule: Rule, event: Event) -> None:
-        if rule.get("contact_groups") is None:
-            event.update(
-                {
-                    "contact_groups": None,
-                    "contact_groups_notify": False,
-                    "contact_groups_precedence": "host",
-                }
-            )
-        else:
-            event.update(
-                {
-                    "contact_groups": rule["contact_groups"]["groups"],
-                    "contact_groups_notify": rule["contact_groups"]["notify"],
-                    "contact_groups_precedence": rule["contact_groups"]["precedence"],
-                }
-            )
-
     def add_core_host_to_event(self, event: Event) -> None:
         event["core_host"] = self.host_config.get_canonical_name(event["host"])
 
@@ -1445,64 +1514,11 @@ class EventServer(ECServerThread):
             )
             return False
 
-    def event_rule_matches(self, rule: Rule, event: Event) -> MatchResult:
-        """
-        Checks if an event matches a rule. Returns either MatchFailure (no match)
-        or a MatchSuccess with a pair of matchtype, groups, where matchtype is False for a
-        normal match and True for a cancelling match and the groups is a tuple
-        if matched regex groups in either text (normal) or match_ok (cancelling)
-        match.
-        """
-        self._perfcounters.count("rule_tries")
-        with self._lock_configuration:
-            return self._rule_matcher.event_rule_matches(rule, event)
-
     def rewrite_event(
         self, rule: Rule, event: Event, match_groups: MatchGroups, set_first: bool = True
     ) -> None:
         """Rewrite texts and compute other fields in the event."""
-        if rule["state"] == -1:
-            prio = event["priority"]
-            if prio <= 3:
-                event["state"] = 2
-            elif prio == 4:
-                event["state"] = 1
-            else:
-                event["state"] = 0
-        elif isinstance(rule["state"], tuple) and rule["state"][0] == "text_pattern":
-            state_patterns = rule["state"][1]
-            text = event["text"]
-            if match(state_patterns.get("2", None), text, complete=False) is not False:
-                event["state"] = 2
-            elif match(state_patterns.get("1", None), text, complete=False) is not False:
-                event["state"] = 1
-            elif match(state_patterns.get("0", None), text, complete=False) is not False:
-                event["state"] = 0
-            else:
-                event["state"] = 3
-        else:
-            event["state"] = rule["state"]
-
-        if ("sl" not in event) or (rule["sl"]["precedence"] == "rule"):
-            event["sl"] = rule["sl"]["value"]
-        if set_first:
-            event["first"] = event["time"]
-        event["last"] = event["time"]
-        if "set_comment" in rule:
-            event["comment"] = replace_groups(rule["set_comment"], event["text"], match_groups)
-        if "set_text" in rule:
-            event["text"] = replace_groups(rule["set_text"], event["text"], match_groups)
-        if "set_host" in rule:
-            event["orig_host"] = event["host"]
-            event["host"] = HostName(replace_groups(rule["set_host"], event["host"], match_groups))
-        if "set_application" in rule:
-            event["application"] = replace_groups(
-                rule["set_application"], event["application"], match_groups
-            )
-        if "set_contact" in rule and "contact" not in event:
-            event["contact"] = replace_groups(
-                rule["set_contact"], event.get("contact", ""), match_groups
-            )
+        rewrite_event(rule, event, match_groups, set_first)
 
     def do_translate_hostname(self, event: Event) -> None:
         try:
@@ -1537,16 +1553,20 @@ class EventServer(ECServerThread):
             # not log.
 
     def get_hosts_with_active_event_limit(self) -> list[str]:
+        with self._event_status.lock:
+            counts = self._event_status.num_existing_events_by_host
         hosts = []
-        for (hostname, core_host), count in self._event_status.num_existing_events_by_host.items():
+        for (hostname, core_host), count in counts.items():
             host_config = self.host_config.get_config_for_host(core_host) if core_host else None
             if count >= self._get_host_event_limit(host_config)[0]:
                 hosts.append(hostname)
         return hosts
 
     def get_rules_with_active_event_limit(self) -> list[str]:
+        with self._event_status.lock:
+            counts = self._event_status.num_existing_events_by_rule
         rule_ids = []
-        for rule_id, num_events in self._event_status.num_existing_events_by_rule.items():
+        for rule_id, num_events in counts.items():
             if rule_id is None:
                 continue  # Ignore rule unrelated overflow events. They have no rule id associated.
             if num_events >= self._get_rule_event_limit(rule_id)[0]:
@@ -1709,7 +1729,7 @@ class EventServer(ECServerThread):
             core_host=None,
             host_in_downtime=False,
         )
-        self._add_rule_contact_groups_to_event(Rule(), new_event)
+        add_rule_contact_groups_to_event(Rule(), new_event)
 
         match ty:
             case "overall":
@@ -1871,14 +1891,13 @@ class StatusTableEvents(StatusTable):
         self._columns_dict = dict(self.columns)
 
     def _enumerate(self, query: QueryGET) -> Iterable[Sequence[object]]:
-        for event in self._event_status.get_events():
-            # Optimize filters that are set by the check_mkevents active check. Since users
-            # may have a lot of those checks running, it is a good idea to optimize this.
-            if not query.only_host or filter_operator_in(event["host"], query.only_host):
-                yield [
-                    event.get(column_name[6:], default)
-                    for column_name, default in self._columns_dict.items()
-                ]
+        # Optimize filters that are set by the check_mkevents active check. Since users
+        # may have a lot of those checks running, it is a good idea to optimize this.
+        for event in self._event_status.events_snapshot(query.only_host):
+            yield [
+                event.get(column_name[6:], default)
+                for column_name, default in self._columns_dict.items()
+            ]
 
 
 class StatusTableHistory(StatusTable):
@@ -2090,6 +2109,13 @@ class StatusServer(ECServerThread):
         self._reopen_sockets = True
 
     def serve(self) -> None:
+        with ThreadPoolExecutor(
+            max_workers=self._config["status_server_threads"], thread_name_prefix="StatusClient"
+        ) as executor:
+            self._serve(executor)
+
+    def _serve(self, executor: ThreadPoolExecutor) -> None:
+        num_threads = self._config["status_server_threads"]
         while not self._terminate_event.is_set():
             try:
                 client_socket = None
@@ -2098,6 +2124,8 @@ class StatusServer(ECServerThread):
                 if self._reopen_sockets:
                     self.reopen_sockets()
                     self._reopen_sockets = False
+                    if self._config["status_server_threads"] != num_threads:
+                        return  # serve() is called again with the new number of threads
 
                 listen_list = [s for s in (self._socket, self._tcp_socket) if s is not None]
                 try:
@@ -2110,7 +2138,6 @@ class StatusServer(ECServerThread):
                 for s in readable:
                     client_socket, addr_info = s.accept()
                     client_socket.settimeout(3)
-                    before = time.time()
                     self._perfcounters.count("connects")
                     if addr_info:
                         allow_commands = self._tcp_allow_commands
@@ -2132,53 +2159,77 @@ class StatusServer(ECServerThread):
                     else:
                         allow_commands = True
 
-                    self.handle_client(
-                        client_socket, allow_commands, addr_info and addr_info[0] or ""
-                    )
-
-                    duration = time.time() - before
-                    self._logger.log(VERBOSE, "Answered request in %0.2f ms", duration * 1000)
-                    self._perfcounters.count_time("request", duration)
+                    if num_threads > 1:
+                        executor.submit(
+                            self._handle_connection, client_socket, allow_commands, addr_info
+                        )
+                    else:
+                        self._handle_connection(client_socket, allow_commands, addr_info)
+                    client_socket = None
 
             except Exception as e:
-                msg = f"Error handling client {addr_info}: {e}"
-                # Do not log a stack trace for client errors, they are not *our* fault.
-                if isinstance(e, MKClientError):
-                    self._logger.error(msg)
-                else:
-                    self._logger.exception(msg)
+                self._logger.exception(f"Error accepting client {addr_info}: {e}")
                 if client_socket:
                     client_socket.close()
                     client_socket = None
                 time.sleep(0.2)
             client_socket = None  # close without danger of exception
 
+    def _handle_connection(
+        self, client_socket: socket.socket, allow_commands: bool, addr_info: Any
+    ) -> None:
+        before = time.time()
+        try:
+            self.handle_client(client_socket, allow_commands, addr_info and addr_info[0] or "")
+        except Exception as e:
+            msg = f"Error handling client {addr_info}: {e}"
+            # Do not log a stack trace for client errors, they are not *our* fault.
+            if isinstance(e, MKClientError):
+                self._logger.error(msg)
+            else:
+                self._logger.exception(msg)
+            client_socket.close()
+            return
+
+        duration = time.time() - before
+        self._logger.log(VERBOSE, "Answered request in %0.2f ms", duration * 1000)
+        self._perfcounters.count_time("request", duration)
+
     def handle_client(
         self, client_socket: socket.socket, allow_commands: bool, client_ip: str
     ) -> None:
         for query in Queries(self.table, client_socket, self._logger):
             self._logger.log(VERBOSE, "Client livestatus query: %r", query)
 
+            # The tables answer GET queries from snapshots, so that neither a slow client nor a
+            # large history query holds the lock. Everything else changes the state.
+            if isinstance(query, QueryGET):
+                self._answer_query_ignoring_epipe(client_socket, query, query.table.query(query))
+                continue
+
             with self._event_status.lock:
                 # TODO: What we really want is a method in Query returning a response instead of this dispatching horror.
-                if isinstance(query, QueryGET):
-                    response: Response = query.table.query(query)
-                elif isinstance(query, QueryREPLICATE):
-                    response = self.handle_replicate(query.method_arg, client_ip)
+                if isinstance(query, QueryREPLICATE):
+                    response: Response = self.handle_replicate(query.method_arg, client_ip)
                 elif isinstance(query, QueryCOMMAND):
                     self.handle_command_request(query.method_arg, allow_commands)
                     response = None  # pylint and mypy are braindead and don't understand that None is a value
                 else:
                     raise NotImplementedError  # can never happen
 
-                try:
-                    self._answer_query(client_socket, query, response)
-                except OSError as e:
-                    if e.errno != errno.EPIPE:
-                        raise
+                self._answer_query_ignoring_epipe(client_socket, query, response)
 
         client_socket.close()  # TODO: This should be in a finally somehow.
 
+    def _answer_query_ignoring_epipe(
+        self, client_socket: socket.socket, query: Query, response: Response
+    ) -> None:
+        try:
+            self._answer_query(client_socket, query, response)
+        except OSError as e:
+            if e.errno != errno.EPIPE:
+                raise
+
     def _answer_query(self, client_socket: socket.socket, query: Query, response: Response) -> None:
         """
         Only GET queries have customizable output formats. COMMAND is always
@@ -2251,14 +2302,18 @@ class StatusServer(ECServerThread):
         if len(arguments) != 2:
             raise MKClientError("Wrong number of arguments for DELETE")
         event_ids, user = arguments
-        ids = {int(event_id) for event_id in event_ids.split(",")}
-        self._event_status.delete_events_by(lambda event: event["id"] in ids, user)
+        ids = sorted({int(event_id) for event_id in event_ids.split(",")})
+        self._event_status.delete_events(
+            [event for event_id in ids if (event := self._event_status.event(event_id))], user
+        )
 
     def handle_command_delete_events_of_host(self, arguments: list[str]) -> None:
         if len(arguments) != 2:
             raise MKClientError("Wrong number of arguments for DELETE_EVENTS_OF_HOST")
         hostname, user = arguments
-        self._event_status.delete_events_by(lambda event: event["host"] == hostname, user)
+        self._event_status.delete_events(
+            self._event_status.events_of_host(HostName(hostname)), user
+        )
 
     def handle_command_update(self, arguments: list[str]) -> None:
         event_ids, user, acknowledged, comment, contact = arguments
@@ -2278,6 +2333,7 @@ class StatusServer(ECServerThread):
                 event["contact"] = contact
             if user:
                 event["owner"] = user
+            self._event_status.event_changed(event)
             self._history.add(event, "UPDATE", user)
 
     def handle_command_create(self, arguments: list[str]) -> None:
@@ -2296,6 +2352,7 @@ class StatusServer(ECServerThread):
             event["state"] = int(newstate)
             if user:
                 event["owner"] = user
+            self._event_status.event_changed(event)
             self._history.add(event, "CHANGESTATE", user)
 
     def handle_command_reload(self) -> None:
@@ -2362,6 +2419,8 @@ class StatusServer(ECServerThread):
                         event,
                         user,
                     )
+            if event is not None:
+                self._event_status.event_changed(event)
 
     def handle_command_switchmode(self, arguments: list[str]) -> None:
         new_mode = arguments[0]
@@ -2454,6 +2513,7 @@ def run_eventd(
                         getLogger("cmk.mkeventd"),
                         lock_configuration,
                         history,
+                        perfcounters,
                         event_status,
                         event_server,
                         status_server,
@@ -2504,6 +2564,7 @@ def run_eventd(
                     logger,
                     lock_configuration,
                     history,
+                    perfcounters,
                     event_status,
                     event_server,
                     status_server,
@@ -2516,6 +2577,8 @@ def run_eventd(
     # Now wait for termination of the server threads
     event_server.join()
     status_server.join()
+    event_server.close()
+    history.close()
 
 
 # .
@@ -2552,6 +2615,7 @@ class EventStatus:
         self.lock = threading.Lock()
         self._history = history
         self._logger = logger
+        self._status_journal = StatusJournal(settings.paths.status_file.value, logger)
         self.flush()
 
     def reload_configuration(self, config: Config, history: History) -> None:
@@ -2559,13 +2623,12 @@ class EventStatus:
         self._history = history
 
     def flush(self) -> None:
-        # TODO: Improve types!
-        self._events: list[Event] = []
+        self._events = EventStore()
         self._next_event_id = 1
         self._rule_stats: dict[str, int] = {}
         # needed for expecting rules
         self._interval_starts: dict[str, int] = {}
-        self._initialize_event_limit_status()
+        self._status_journal.invalidate()
 
         # TODO: might introduce some performance counters, like:
         # - number of received messages
@@ -2573,14 +2636,17 @@ class EventStatus:
         # - number of rule misses
 
     def events(self) -> list[Event]:
-        # TODO: Improve type!
-        return self._events
+        return list(self._events)
 
     def event(self, eid: int) -> Event | None:
-        for event in self._events:
-            if event["id"] == eid:
-                return event
-        return None
+        return self._events.get(eid)
+
+    def events_of_rule(self, rule_id: str) -> list[Event]:
+        return self._events.select(rule_id)
+
+    def event_changed(self, event: Event) -> None:
+        """To be called after changing an open event"""
+        self._events.changed(event)
 
     def interval_start(self, rule_id: str, interval: ExpectInterval) -> int:
         """
@@ -2625,30 +2691,46 @@ class EventStatus:
     def pack_status(self) -> PackedEventStatus:
         return PackedEventStatus(
             next_event_id=self._next_event_id,
-            events=self._events,
+            events=list(self._events),
             rule_stats=self._rule_stats,
             interval_starts=self._interval_starts,
         )
 
     def unpack_status(self, status: PackedEventStatus) -> None:
         self._next_event_id = status["next_event_id"]
-        self._events = status["events"]
+        self._events = EventStore(status["events"])
         self._rule_stats = status["rule_stats"]
         self._interval_starts = status["interval_starts"]
+        self._status_journal.invalidate()
 
     def save_status(self) -> None:
+        """Save the changes since the last save, or the whole state from time to time"""
         now = time.time()
-        status = self.pack_status()
-        path = self.settings.paths.status_file.value
-        path_new = path.parent / (path.name + ".new")
-        # Believe it or not: cPickle is more than two times slower than repr()
-        with path_new.open(mode="wb") as f:
-            f.write((repr(status) + "\n").encode("utf-8"))
-            f.flush()
-            os.fsync(f.fileno())
-        path_new.rename(path)
+        header = StatusHeader(
+            next_event_id=self._next_event_id,
+            rule_stats=self._rule_stats,
+            interval_starts=self._interval_starts,
+        )
+        changed, removed = self._events.take_changes()
+        journal = self._status_journal
+        compact = journal.compaction_needed
+        try:
+            if compact:
+                journal.write_snapshot(header, self._events)
+            else:
+                journal.append(header, changed, removed)
+        except Exception:
+            # The changes are gone from the store now: save everything next time
+            journal.invalidate()
+            raise
         elapsed = time.time() - now
-        self._logger.log(VERBOSE, "Saved event state to %s in %.3fms.", path, elapsed * 1000)
+        self._logger.log(
+            VERBOSE,
+            "Saved %s to %s in %.3fms.",
+            "event state" if compact else f"{len(changed) + len(removed)} event changes",
+            journal.path,
+            elapsed * 1000,
+        )
 
     def reset_counters(self, rule_id: str | None) -> None:
         if rule_id:
@@ -2660,20 +2742,21 @@ class EventStatus:
 
     def load_status(self, event_server: EventServer) -> None:
         path = self.settings.paths.status_file.value
-        if path.exists():
-            try:
-                status = ast.literal_eval(path.read_text(encoding="utf-8"))
-                self._next_event_id = status["next_event_id"]
-                self._events = status["events"]
-                self._rule_stats = status["rule_stats"]
-                self._interval_starts = status.get("interval_starts", {})
-                self._logger.info("Loaded event state from %s.", path)
-            except Exception:
-                self._logger.exception("Error loading event state from %s", path)
-                raise
+        events = list(self._events)
+        try:
+            status = self._status_journal.load()
+        except Exception:
+            self._logger.exception("Error loading event state from %s", path)
+            raise
+        if status is not None:
+            self._next_event_id = status.header["next_event_id"]
+            events = status.events
+            self._rule_stats = status.header["rule_stats"]
+            self._interval_starts = status.header["interval_starts"]
+            self._logger.info("Loaded event state from %s.", path)
 
         # Add new columns and fix broken events
-        for event in self._events:
+        for event in events:
             event.setdefault("ipaddress", "")
             event.setdefault("host", HostName(""))
             event.setdefault("application", "")
@@ -2683,48 +2766,29 @@ class EventStatus:
                 event_server.add_core_host_to_event(event)
                 event["host_in_downtime"] = False
 
-        # core_host is needed to initialize the status
-        self._initialize_event_limit_status()
-
-    def _initialize_event_limit_status(self) -> None:
-        """
-        Called on Event Console initialization from status file to initialize
-        the current event limit state -> Sets internal counters which are
-        updated during runtime.
-        """
-        self.num_existing_events = len(self._events)
-
-        self.num_existing_events_by_host: dict[tuple[str, HostName | None], int] = {}
-        self.num_existing_events_by_rule: dict[Any, int] = {}
-        for event in self._events:
-            self._count_event_add(event)
+        # core_host is needed to index the events
+        self._events = EventStore(events)
+        self._events.take_changes()  # They are saved already, the fixes are done on each load
 
-    def _count_event_add(self, event: Event) -> None:
-        host_key = (event["host"], event["core_host"])
-        if host_key not in self.num_existing_events_by_host:
-            self.num_existing_events_by_host[host_key] = 1
-        else:
-            self.num_existing_events_by_host[host_key] += 1
+    # The event limits are checked against the sizes of the indexes
 
-        if event["rule_id"] not in self.num_existing_events_by_rule:
-            self.num_existing_events_by_rule[event["rule_id"]] = 1
-        else:
-            self.num_existing_events_by_rule[event["rule_id"]] += 1
+    @property
+    def num_existing_events(self) -> int:
+        return len(self._events)
 
-    def _count_event_remove(self, event: Event) -> None:
-        host_key = (event["host"], event["core_host"])
+    @property
+    def num_existing_events_by_host(self) -> Mapping[HostKey, int]:
+        return self._events.counts_by_host()
 
-        self.num_existing_events -= 1
-        self.num_existing_events_by_host[host_key] -= 1
-        self.num_existing_events_by_rule[event["rule_id"]] -= 1
+    @property
+    def num_existing_events_by_rule(self) -> Mapping[str | None, int]:
+        return self._events.counts_by_rule()
 
     def new_event(self, event: Event) -> None:
         self._perfcounters.count("events")
         event["id"] = self._next_event_id
         self._next_event_id += 1
-        self._events.append(event)
-        self.num_existing_events += 1
-        self._count_event_add(event)
+        self._events.add(event)
         self._history.add(event, "NEW")
 
     def archive_event(self, event: Event) -> None:
@@ -2735,49 +2799,36 @@ class EventStatus:
         self._history.add(event, "ARCHIVED")
 
     def remove_event(self, event: Event, delete_reason: HistoryWhat, user: str = "") -> None:
-        try:
-            self._events.remove(event)
+        if self._events.remove(event):
             self._history.add(event, delete_reason, user)
-            self._count_event_remove(event)
-        except ValueError:
-            self._logger.exception("Cannot remove event %d: not present", event["id"])
+        else:
+            self._logger.error("Cannot remove event %d: not present", event["id"])
 
     # protected by self.lock
     def remove_oldest_event(self, ty: LimitKind, event: Event) -> None:
         if ty == "overall":
             self._logger.log(VERBOSE, "  Removing oldest event")
-            oldest_event = self._events[0]
-            self.remove_event(oldest_event, "AUTODELETE")
+            oldest_event = self._events.oldest()
         elif ty == "by_rule" and event["rule_id"] is not None:
             self._logger.log(VERBOSE, '  Removing oldest event of rule "%s"', event["rule_id"])
-            self._remove_oldest_event_of_rule(event["rule_id"])
+            oldest_event = self._events.oldest_of_rule(event["rule_id"])
         elif ty == "by_host" and event["host"] is not None:
             self._logger.log(VERBOSE, '  Removing oldest event of host "%s"', event["host"])
-            self._remove_oldest_event_of_host(event["host"])
-
-    # protected by self.lock
-    def _remove_oldest_event_of_rule(self, rule_id: str) -> None:
-        for event in self._events:
-            if event["rule_id"] == rule_id:
-                self.remove_event(event, "AUTODELETE")
-                return
-
-    # protected by self.lock
-    def _remove_oldest_event_of_host(self, hostname: str) -> None:
-        for event in self._events:
-            if event["host"] == hostname:
-                self.remove_event(event, "AUTODELETE")
-                return
+            oldest_event = self._events.oldest_of_host(event["host"])
+        else:
+            return
+        if oldest_event is not None:
+            self.remove_event(oldest_event, "AUTODELETE")
 
     # protected by self.lock
     def get_num_existing_events_by(self, ty: LimitKind, event: Event) -> int:
         match ty:
             case "overall":
-                return self.num_existing_events
+                return len(self._events)
             case "by_rule":
-                return self.num_existing_events_by_rule.get(event["rule_id"], 0)
+                return self._events.count_of_rule(event["rule_id"])
             case "by_host":
-                return self.num_existing_events_by_host.get((event["host"], event["core_host"]), 0)
+                return self._events.count_of_host((event["host"], event["core_host"]))
             case _ as unreachable:
                 assert_never(unreachable)
 
@@ -2795,10 +2846,9 @@ class EventStatus:
         """
         with self.lock:
             to_delete = []
-            for event in self._events:
-                if event["rule_id"] == rule["id"] and self.cancelling_match(
-                    match_groups, new_event, event, rule
-                ):
+            host = self._cancelling_host(match_groups, new_event, rule)
+            for event in self._events.select(rule["id"], host):
+                if self.cancelling_match(match_groups, new_event, event, rule):
                     # Fill a few fields of the cancelled event with data from
                     # the cancelling event so that action scripts have useful
                     # values and the logfile entry if more relevant.
@@ -2845,11 +2895,8 @@ class EventStatus:
             for e in to_delete:
                 self.remove_event(e, "CANCELLED")
 
-    def cancelling_match(
-        self, match_groups: MatchGroups, new_event: Event, event: Event, rule: Rule
-    ) -> bool:
-        debug = self._config["debug_rules"]
-
+    @staticmethod
+    def _cancelling_host(match_groups: MatchGroups, new_event: Event, rule: Rule) -> HostName:
         # The match_groups of the canceling match only contain the *_ok match groups
         # Since the rewrite definitions are based on the positive match, we need to
         # create some missing keys. O.o
@@ -2864,7 +2911,14 @@ class EventStatus:
         host = new_event["host"]
         if "set_host" in rule:
             host = HostName(replace_groups(rule["set_host"], host, match_groups))
+        return host
 
+    def cancelling_match(
+        self, match_groups: MatchGroups, new_event: Event, event: Event, rule: Rule
+    ) -> bool:
+        debug = self._config["debug_rules"]
+
+        host = self._cancelling_host(match_groups, new_event, rule)
         if event["host"] != host:
             if debug:
                 self._logger.info(
@@ -2970,10 +3024,11 @@ class EventStatus:
                 preserve["contact"] = found["contact"]
         found.update(event)
         found.update(preserve)
+        self._events.changed(found)
 
     def count_expected_event(self, event_server: EventServer, event: Event) -> None:
-        for ev in self._events:
-            if ev["rule_id"] == event["rule_id"] and ev["phase"] == "counting":
+        for ev in self._events.select(event["rule_id"]):
+            if ev["phase"] == "counting":
                 self.count_event_up(ev, event)
                 return
 
@@ -2990,31 +3045,33 @@ class EventStatus:
         since the event has been created because the count was too
         low in the specified period of time.
         """
-        for ev in self._events:
-            if ev["rule_id"] == event["rule_id"]:
-                if ev["phase"] == "ack" and not count["count_ack"]:
-                    continue  # skip acknowledged events
+        candidates = self._events.select(
+            event["rule_id"], event["host"] if count["separate_host"] else None
+        )
+        for ev in candidates:
+            if ev["phase"] == "ack" and not count["count_ack"]:
+                continue  # skip acknowledged events
 
-                if count["separate_host"] and ev["host"] != event["host"]:
-                    continue  # treat events with separated hosts separately
+            if count["separate_host"] and ev["host"] != event["host"]:
+                continue  # treat events with separated hosts separately
 
-                if count["separate_application"] and ev["application"] != event["application"]:
-                    continue  # same for application
+            if count["separate_application"] and ev["application"] != event["application"]:
+                continue  # same for application
 
-                if count["separate_match_groups"] and ev["match_groups"] != event["match_groups"]:
-                    continue
+            if count["separate_match_groups"] and ev["match_groups"] != event["match_groups"]:
+                continue
 
-                count_duration = count.get("count_duration")
-                if count_duration is not None and ev["first"] + count_duration < event["time"]:
-                    # Counting has been discontinued on this event after a certain time
-                    continue
+            count_duration = count.get("count_duration")
+            if count_duration is not None and ev["first"] + count_duration < event["time"]:
+                # Counting has been discontinued on this event after a certain time
+                continue
 
-                if ev["host_in_downtime"] != event["host_in_downtime"]:
-                    continue  # treat events with different downtime states separately
+            if ev["host_in_downtime"] != event["host_in_downtime"]:
+                continue  # treat events with different downtime states separately
 
-                found = ev
-                self.count_event_up(found, event)
-                break
+            found = ev
+            self.count_event_up(found, event)
+            break
         else:
             event["count"] = 1
             event["phase"] = "counting"
@@ -3024,22 +3081,34 @@ class EventStatus:
         # Did we just count the event that was just one too much?
         if found["phase"] == "counting" and found["count"] >= count["count"]:
             found["phase"] = "open"
+            self._events.changed(found)
             return found  # do event action, return found copy of event
         return None  # do not do event action
 
-    def delete_events_by(self, predicate: Callable[[Event], bool], user: str) -> None:
-        for event in self._events[:]:
-            if predicate(event):
-                event["phase"] = "closed"
-                if user:
-                    event["owner"] = user
-                self.remove_event(event, "DELETE", user)
+    def delete_events(self, events: Iterable[Event], user: str) -> None:
+        for event in events:
+            event["phase"] = "closed"
+            if user:
+                event["owner"] = user
+            self.remove_event(event, "DELETE", user)
 
-    def get_events(self) -> Iterable[Event]:
-        return self._events
+    def events_of_host(self, hostname: HostName) -> list[Event]:
+        return self._events.of_hosts({hostname})
+
+    def events_snapshot(self, only_hosts: Iterable[str] | None = None) -> list[Event]:
+        """Copies of the open events as they are at this very moment
+
+        With only_hosts, only the events of these hosts (case insensitively) are copied. The
+        copies can be used without holding the lock, while the events are changed."""
+        with self.lock:
+            events = (
+                self._events if not only_hosts else self._events.of_hosts_ignoring_case(only_hosts)
+            )
+            return [event.copy() for event in events]
 
     def get_rule_stats(self) -> Iterable[tuple[str, int]]:
-        return sorted(self._rule_stats.items(), key=lambda x: x[0])
+        with self.lock:
+            return sorted(self._rule_stats.items(), key=lambda x: x[0])
 
 
 # .
@@ -3350,6 +3419,7 @@ def reload_configuration(
     logger: Logger,
     lock_configuration: ECLock,
     history: History,
+    perfcounters: Perfcounters,
     event_status: EventStatus,
     event_server: EventServer,
     status_server: StatusServer,
@@ -3360,7 +3430,12 @@ def reload_configuration(
 
         history.close()
         history = create_history(
-            settings, config, logger, StatusTableEvents.columns, StatusTableHistory.columns
+            settings,
+            config,
+            logger,
+            StatusTableEvents.columns,
+            StatusTableHistory.columns,
+            perfcounters,
         )
         event_server.reload_configuration(config, history)
 
@@ -3403,8 +3478,14 @@ def main() -> None:
 
         slave_status = default_slave_status_master()
         config = load_configuration(settings, logger, slave_status)
+        perfcounters = Perfcounters(logger.getChild("lock.perfcounters"))
         history = create_history(
-            settings, config, logger, StatusTableEvents.columns, StatusTableHistory.columns
+            settings,
+            config,
+            logger,
+            StatusTableEvents.columns,
+            StatusTableHistory.columns,
+            perfcounters,
         )
 
         pid_path = settings.paths.pid_file.value
@@ -3427,7 +3508,6 @@ def main() -> None:
         settings.paths.status_file.value.parent.mkdir(parents=True, exist_ok=True)
 
         # First do all things that might fail, before daemonizing
-        perfcounters = Perfcounters(logger.getChild("lock.perfcounters"))
         event_status = EventStatus(
             settings, config, perfcounters, history, logger.getChild("EventStatus")
         )
@@ -123,9 +123,10 @@ class Query:
 
 
 def filter_operator_in(a: str, b: Iterable[str]) -> bool:
-    """Implemented as a named function, as it is used in a second filter
-    cmk.ec.main: StatusTableEvents._enumerate
-    not implemented as regex/IGNORECASE due to performance.
+    """Not implemented as regex/IGNORECASE due to performance
+
+    StatusTableEvents preselects the events of an "event_host in" filter the same way, with
+    EventStore.of_hosts_ignoring_case.
     """
     return a.lower() in {e.lower() for e in b}
 
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Matching the incoming events against the rules and rewriting them
+
+This part of the event processing only depends on the configuration, not on the open events, so
+it can be done in worker processes. The event server applies the evaluations to the event status
+one after the other, in the order the events came in.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import time
+import traceback
+from collections.abc import Iterator, Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Final
+
+from cmk.ccc.hostaddress import HostName
+
+from cmk.utils.iterables import chunks
+
+from .config import MatchGroups, Rule
+from .event import Event
+from .rule_matcher import match, MatchFailure, MatchResult, MatchSuccess, RuleMatcher
+from .rule_prefilter import RulePrefilter
+
+# The results are applied in the order of the events, as soon as their chunk is done. With a few
+# chunks per worker, the first ones are applied while the workers still evaluate the others.
+CHUNKS_PER_PROCESS: Final = 4
+
+
+def replace_groups(text: str, origtext: str, match_groups: MatchGroups) -> str:
+    # replace \0 with text itself. This allows to add information
+    # in front or and the end of a message
+    text = text.replace("\\0", origtext)
+
+    # Generic replacement with \1, \2, ...
+    match_groups_message = match_groups.get("match_groups_message", False)
+    if match_groups_message is not False:
+        for nr, g in enumerate(match_groups_message):
+            text = text.replace(f"\\{nr + 1}", g)
+
+    # Replacement with keyword
+    # Right now we have
+    # $MATCH_GROUPS_MESSAGE_x$
+    # $MATCH_GROUPS_SYSLOG_APPLICATION_x$
+    for key_prefix, values in match_groups.items():
+        if not isinstance(values, tuple):
+            continue
+
+        for idx, match_value in enumerate(values):
+            text = text.replace(f"${key_prefix.upper()}_{idx + 1}$", match_value)
+
+    return text
+
+
+def rewrite_event(
+    rule: Rule, event: Event, match_groups: MatchGroups, set_first: bool = True
+) -> None:
+    """Rewrite texts and compute other fields in the event."""
+    if rule["state"] == -1:
+        prio = event["priority"]
+        if prio <= 3:
+            event["state"] = 2
+        elif prio == 4:
+            event["state"] = 1
+        else:
+            event["state"] = 0
+    elif isinstance(rule["state"], tuple) and rule["state"][0] == "text_pattern":
+        state_patterns = rule["state"][1]
+        text = event["text"]
+        if match(state_patterns.get("2", None), text, complete=False) is not False:
+            event["state"] = 2
+        elif match(state_patterns.get("1", None), text, complete=False) is not False:
+            event["state"] = 1
+        elif match(state_patterns.get("0", None), text, complete=False) is not False:
+            event["state"] = 0
+        else:
+            event["state"] = 3
+    else:
+        event["state"] = rule["state"]
+
+    if ("sl" not in event) or (rule["sl"]["precedence"] == "rule"):
+        event["sl"] = rule["sl"]["value"]
+    if set_first:
+        event["first"] = event["time"]
+    event["last"] = event["time"]
+    if "set_comment" in rule:
+        event["comment"] = replace_groups(rule["set_comment"], event["text"], match_groups)
+    if "set_text" in rule:
+        event["text"] = replace_groups(rule["set_text"], event["text"], match_groups)
+    if "set_host" in rule:
+        event["orig_host"] = event["host"]
+        event["host"] = HostName(replace_groups(rule["set_host"], event["host"], match_groups))
+    if "set_application" in rule:
+        event["application"] = replace_groups(
+            rule["set_application"], event["application"], match_groups
+        )
+    if "set_contact" in rule and "contact" not in event:
+        event["contact"] = replace_groups(
+            rule["set_contact"], event.get("contact", ""), match_groups
+        )
+
+
+def add_rule_contact_groups_to_event(rule: Rule, event: Event) -> None:
+    if rule.get("contact_groups") is None:
+        event.update(
+            {
+                "contact_groups": None,
+                "contact_groups_notify": False,
+                "contact_groups_precedence": "host",
+            }
+        )
+    else:
+        event.update(
+            {
+                "contact_groups": rule["contact_groups"]["groups"],
+                "contact_groups_notify": rule["contact_groups"]["notify"],
+                "contact_groups_precedence": rule["contact_groups"]["precedence"],
+            }
+        )
+
+
+@dataclass(frozen=True)
+class RuleHit:
+    rule: int  # The position of the rule in RuleEvaluator.rules
+    result: MatchSuccess
+
+
+@dataclass
+class Evaluation:
+    """The outcome of matching an event against the rules
+
+    Only the last hit may be something else than a rule dropping the event with "skip_pack".
+    In case it is a normal match, the event has already been rewritten by the rule."""
+
+    event: Event
+    hits: list[RuleHit] = field(default_factory=list)
+    # The positions of the rules tried and the seconds it took to match each of them
+    match_times: list[tuple[int, float]] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def tries(self) -> int:
+        return len(self.match_times)
+
+
+class RuleEvaluator:
+    def __init__(
+        self,
+        rules: Sequence[Rule],
+        rule_hash: Mapping[int, Mapping[int, Sequence[Rule]]] | None,
+        rule_matcher: RuleMatcher,
+        prefilter: bool = False,
+    ) -> None:
+        self.rules = rules
+        positions = {id(rule): nr for nr, rule in enumerate(rules)}
+        # The facility/priority buckets of the rule optimizer, with positions instead of rules
+        self._rule_hash = (
+            None
+            if rule_hash is None
+            else {
+                facility: {
+                    priority: [positions[id(rule)] for rule in bucket]
+                    for priority, bucket in buckets.items()
+                }
+                for facility, buckets in rule_hash.items()
+            }
+        )
+        self._rule_matcher = rule_matcher
+        self.prefilter = RulePrefilter(rules) if prefilter else None
+
+    def evaluate(self, event: Event) -> Evaluation:
+        if self._rule_hash is None:
+            candidates: Sequence[int] = range(len(self.rules))
+        else:
+            candidates = self._rule_hash.get(event["facility"], {}).get(event["priority"], [])
+        # The rules not found by the prefilter cannot match, skipping them changes nothing
+        may_match = -1 if self.prefilter is None else self.prefilter.candidates(event)
+
+        evaluation = Evaluation(event=event)
+        skip_pack = None
+        for nr in candidates:
+            if not may_match >> nr & 1:
+                continue
+            rule = self.rules[nr]
+            if skip_pack and rule["pack"] == skip_pack:
+                continue  # still in the rule pack that we want to skip
+            skip_pack = None  # new pack, reset skipping
+
+            start = time.perf_counter()
+            result = self._match(rule, event, evaluation.errors)
+            evaluation.match_times.append((nr, time.perf_counter() - start))
+            if not isinstance(result, MatchSuccess):
+                continue
+
+            evaluation.hits.append(RuleHit(rule=nr, result=result))
+            if rule.get("drop") == "skip_pack":
+                skip_pack = rule["pack"]
+                continue
+            if not rule.get("drop") and not result.cancelling:
+                self._rewrite(rule, event, result.match_groups)
+            break
+        return evaluation
+
+    def _match(self, rule: Rule, event: Event, errors: list[str]) -> MatchResult:
+        try:
+            return self._rule_matcher.event_rule_matches(rule, event)
+        except Exception as e:
+            result = MatchFailure(
+                reason=f"Rule would match, but due to inverted matching does not. {e}"
+            )
+            errors.append(f"{result.reason}\n{traceback.format_exc()}")
+            return result
+
+    @staticmethod
+    def _rewrite(rule: Rule, event: Event, match_groups: MatchGroups) -> None:
+        # Remember the rule id that this event originated from
+        event["rule_id"] = rule["id"]
+
+        # Attach optional contact group information for visibility
+        # and eventually for notifications
+        add_rule_contact_groups_to_event(rule, event)
+
+        # Store groups from matching this event. In order to make
+        # persistence easier, we do not save them as list but join
+        # them on ASCII-1.
+        match_groups_message = match_groups.get("match_groups_message", ())
+        assert match_groups_message is not False
+        event["match_groups"] = match_groups_message
+
+        match_groups_syslog_application = match_groups.get("match_groups_syslog_application", ())
+        assert match_groups_syslog_application is not False
+        event["match_groups_syslog_application"] = match_groups_syslog_application
+
+        rewrite_event(rule, event, match_groups)
+
+
+class RuleEvaluatorPool:
+    """Worker processes evaluating the events, each with its own copy of the evaluator
+
+    The processes are started when the first events are evaluated, not before."""
+
+    def __init__(self, evaluator: RuleEvaluator, processes: int) -> None:
+        self.evaluator = evaluator
+        self._processes = processes
+        self._executor = ProcessPoolExecutor(
+            max_workers=processes,
+            # Forking a process with threads is asking for trouble
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(evaluator,),
+        )
+
+    def evaluate(self, events: Sequence[Event]) -> Iterator[Evaluation]:
+        """The evaluations of the events, in the same order
+
+        The events are submitted right away, only the results are waited for while iterating.
+        Raises BrokenProcessPool if a worker process has died."""
+        futures = [
+            self._executor.submit(_evaluate_in_worker, chunk)
+            for chunk in chunks(events, self._processes * CHUNKS_PER_PROCESS)
+        ]
+        return (evaluation for future in futures for evaluation in future.result())
+
+    def close(self) -> None:
+        """Stop the processes once the submitted events have been evaluated"""
+        self._executor.shutdown(wait=False)
+
+
+_worker_evaluator: RuleEvaluator | None = None
+
+
+def _init_worker(evaluator: RuleEvaluator) -> None:
+    global _worker_evaluator
+    _worker_evaluator = evaluator
+
+
+def _evaluate_in_worker(events: Sequence[Event]) -> list[Evaluation]:
+    assert _worker_evaluator is not None
+    return [_worker_evaluator.evaluate(event) for event in events]
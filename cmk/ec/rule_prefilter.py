@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Finding the rules which may match an event in one pass over its texts
+
+For each of the text, host and application fields, the texts which the patterns of the rules need
+to find are compiled into a single regular expression, a trie of these texts. One scan over the
+field yields all of them which are contained in it, and thereby the rules which may match the
+field. Only the rules which may match all fields are given to the RuleMatcher.
+
+A needed text is known for literal patterns and for regular expressions starting with a literal
+prefix. Rules with other patterns, and rules with inverted matching, may always match. Sets of
+rules are represented as integers, with bit n standing for the rule at position n.
+"""
+
+import re
+from collections.abc import Sequence
+from typing import Final
+
+from .config import Rule, TextPattern
+from .event import Event
+
+# Longer texts are cut, the beginning of a needed text is needed, too
+MAX_LITERAL_LENGTH: Final = 32
+
+_SPECIAL_CHARS: Final = frozenset(".^$*+?{}[]\\|()")
+_QUANTIFIERS: Final = frozenset("*+?{")
+
+type _Trie = dict[str, _Trie]
+
+
+def required_literal(pattern: TextPattern) -> str | None:
+    """A lowercase text contained in every text the pattern matches, None if there is none
+
+    >>> required_literal("disk full")
+    'disk full'
+    >>> required_literal(re.compile(r"^Disk\\.(\\d+) FULL", re.IGNORECASE))
+    'disk.'
+    >>> required_literal(re.compile(r"errors?", re.IGNORECASE))
+    'error'
+    >>> required_literal(re.compile(r"error|warning", re.IGNORECASE)) is None
+    True
+    """
+    if isinstance(pattern, str):
+        literal = pattern
+    else:
+        literal = _literal_prefix(pattern)
+    # Case insensitive matching goes beyond str.lower() outside of ASCII
+    if not literal or not literal.isascii():
+        return None
+    return literal.lower()[:MAX_LITERAL_LENGTH]
+
+
+def _literal_prefix(pattern: re.Pattern[str]) -> str:
+    source = pattern.pattern
+    if "|" in source or pattern.flags & re.VERBOSE:
+        return ""
+    chars = []
+    pos = 1 if source.startswith("^") else 0
+    while pos < len(source):
+        char = source[pos]
+        width = 1
+        if char == "\\":
+            char = source[pos + 1 : pos + 2]
+            width = 2
+            if not char or char.isalnum() or char == "_":
+                break  # a character class, reference or special character
+        elif char in _SPECIAL_CHARS:
+            break
+        if source[pos + width : pos + width + 1] in _QUANTIFIERS:
+            break  # the character may be missing
+        chars.append(char)
+        pos += width
+    return "".join(chars)
+
+
+def _trie_regex(literals: Sequence[str]) -> str:
+    """A regex matching the longest of the literals at a position
+
+    The other literals found at that position are the prefixes of the match."""
+    trie: _Trie = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return _node_regex(trie)
+
+
+def _node_regex(node: _Trie) -> str:
+    branches = [re.escape(char) + _node_regex(child) for char, child in node.items() if char]
+    if not branches:
+        return ""
+    regex = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+    return f"(?:{regex})?" if "" in node else regex
+
+
+class FieldFilter:
+    """The rules which may match a certain field of the events
+
+    With complete matching, literal patterns have to match the whole field, regular expressions
+    may be found anywhere in it, like in rule_matcher.match()."""
+
+    def __init__(self, complete: bool) -> None:
+        self._complete = complete
+        self._all = 0
+        self._unfiltered = 0
+        self._values: dict[str, int] = {}
+        self._literals: dict[str, int] = {}
+        self._found: dict[str, int] = {}
+        self._scanner: re.Pattern[str] | None = None
+
+    def add(self, nr: int, patterns: Sequence[TextPattern] | None) -> None:
+        """Adds the rule at position nr, matching if any of the patterns does
+
+        The rule always matches the field if patterns is None."""
+        bit = 1 << nr
+        self._all |= bit
+        for pattern in patterns or ():
+            if self._complete and isinstance(pattern, str):
+                self._values[pattern] = self._values.get(pattern, 0) | bit
+            elif (literal := required_literal(pattern)) is not None:
+                self._literals[literal] = self._literals.get(literal, 0) | bit
+            else:
+                self._unfiltered |= bit
+        if patterns is None:
+            self._unfiltered |= bit
+
+    def compile(self) -> None:
+        literals = sorted(self._literals)
+        self._found = {}
+        for found in literals:
+            mask = 0
+            for literal in literals:
+                if found.startswith(literal):
+                    mask |= self._literals[literal]
+            self._found[found] = mask
+        self._scanner = re.compile(f"(?=({_trie_regex(literals)}))") if literals else None
+
+    @property
+    def num_filtered(self) -> int:
+        return self._all.bit_count() - self._unfiltered.bit_count()
+
+    def candidates(self, text: str) -> int:
+        if not text.isascii():
+            return self._all
+        lowered = text.lower()
+        mask = self._unfiltered | self._values.get(lowered, 0)
+        if self._scanner is not None:
+            for found in set(self._scanner.findall(lowered)):
+                mask |= self._found[found]
+        return mask
+
+
+class RulePrefilter:
+    def __init__(self, rules: Sequence[Rule]) -> None:
+        self.text = FieldFilter(complete=False)
+        self.host = FieldFilter(complete=True)
+        self.application = FieldFilter(complete=False)
+        for nr, rule in enumerate(rules):
+            if rule.get("invert_matching"):
+                for field_filter in (self.text, self.host, self.application):
+                    field_filter.add(nr, None)
+                continue
+            self.text.add(
+                nr,
+                [rule["match"], *([rule["match_ok"]] if "match_ok" in rule else [])]
+                if "match" in rule
+                else None,
+            )
+            self.host.add(nr, [rule["match_host"]] if "match_host" in rule else None)
+            self.application.add(
+                nr,
+                [
+                    *([rule["match_application"]] if "match_application" in rule else []),
+                    *([rule["cancel_application"]] if "cancel_application" in rule else []),
+                ]
+                or None,
+            )
+        for field_filter in (self.text, self.host, self.application):
+            field_filter.compile()
+
+    def candidates(self, event: Event) -> int:
+        """The positions of the rules which may match the event, as bits"""
+        return (
+            self.text.candidates(event["text"])
+            & self.host.candidates(event["host"])
+            & self.application.candidates(event["application"])
+        )
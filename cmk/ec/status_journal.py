@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""The persisted state of the Event Console: a snapshot and a journal of the changes since
+
+The snapshot is a stream of pickles: a header with the generation, followed by the open events in
+chunks, so that it can be loaded without holding its whole serialization in memory. Every save
+appends a record to the journal, holding the small global state, the events which have been
+changed or created, and the IDs of the removed events. When the journal has grown larger than the
+snapshot, the state is compacted into a new snapshot of the next generation and the journal starts
+over. A journal is only replayed on top of the snapshot of its own generation.
+
+Files written by older versions, a single repr() of the whole state, are still loaded.
+"""
+
+import ast
+import os
+import pickle
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from io import BufferedReader
+from logging import Logger
+from pathlib import Path
+from typing import Any, BinaryIO, Final, TypedDict
+
+from .event import Event
+
+SNAPSHOT_CHUNK_SIZE: Final = 1000
+
+
+class StatusHeader(TypedDict):
+    next_event_id: int
+    rule_stats: dict[str, int]
+    interval_starts: dict[str, int]
+
+
+@dataclass(frozen=True)
+class LoadedStatus:
+    header: StatusHeader
+    events: list[Event]
+
+
+def journal_path(path: Path) -> Path:
+    return path.with_name(f"{path.name}.journal")
+
+
+class StatusJournal:
+    def __init__(self, path: Path, logger: Logger) -> None:
+        self.path = path
+        self._logger = logger
+        self._generation = 0
+        self._snapshot_size = 0
+        self._journal_size = 0
+        self._compaction_needed = True  # Nothing has been written by us so far
+
+    @property
+    def compaction_needed(self) -> bool:
+        return self._compaction_needed or self._journal_size > self._snapshot_size
+
+    def invalidate(self) -> None:
+        """Make the next save a complete snapshot, e.g. after the whole state has been replaced"""
+        self._compaction_needed = True
+
+    def load(self) -> LoadedStatus | None:
+        try:
+            f = self.path.open("rb")
+        except FileNotFoundError:
+            return None
+        with f:
+            if f.peek(1)[:1] == b"{":
+                return _load_legacy(f)
+            snapshot_header = pickle.load(f)
+            events = {event["id"]: event for chunk in _read_pickles(f) for event in chunk}
+            self._generation = snapshot_header["generation"]
+            self._snapshot_size = f.tell()
+        header = self._replay_journal(snapshot_header["status"], events)
+        return LoadedStatus(header=header, events=list(events.values()))
+
+    def _replay_journal(self, header: StatusHeader, events: dict[int, Event]) -> StatusHeader:
+        self._compaction_needed = True
+        try:
+            f = journal_path(self.path).open("rb")
+        except FileNotFoundError:
+            return header
+        with f:
+            try:
+                generation = pickle.load(f)["generation"]
+                if generation != self._generation:
+                    self._logger.warning(
+                        "Ignoring journal %s of generation %d, the snapshot is of generation %d",
+                        f.name,
+                        generation,
+                        self._generation,
+                    )
+                    return header
+                # Changed events keep their position, new ones have the highest IDs so far:
+                # the events stay in the order they have been created.
+                for header, changed, removed in _read_pickles(f):
+                    for event in changed:
+                        events[event["id"]] = event
+                    for event_id in removed:
+                        events.pop(event_id, None)
+            except Exception:
+                # A crash while appending leaves an incomplete record: the records before are fine
+                self._logger.warning("Ignoring the incomplete end of journal %s", f.name)
+                return header
+            self._journal_size = f.tell()
+        self._compaction_needed = False
+        return header
+
+    def write_snapshot(self, header: StatusHeader, events: Iterable[Event]) -> None:
+        generation = self._generation + 1
+        path_new = self.path.with_name(f"{self.path.name}.new")
+        with path_new.open("wb") as f:
+            _dump(f, {"generation": generation, "status": header})
+            chunk: list[Event] = []
+            for event in events:
+                chunk.append(event)
+                if len(chunk) == SNAPSHOT_CHUNK_SIZE:
+                    _dump(f, chunk)
+                    chunk = []
+            if chunk:
+                _dump(f, chunk)
+            snapshot_size = _sync(f)
+
+        journal = journal_path(self.path)
+        journal_new = journal.with_name(f"{journal.name}.new")
+        with journal_new.open("wb") as f:
+            _dump(f, {"generation": generation})
+            journal_size = _sync(f)
+
+        # The snapshot comes first: it makes the old journal obsolete, whether the new one
+        # is in place or not.
+        path_new.rename(self.path)
+        journal_new.rename(journal)
+        self._generation = generation
+        self._snapshot_size = snapshot_size
+        self._journal_size = journal_size
+        self._compaction_needed = False
+
+    def append(
+        self, header: StatusHeader, changed: Iterable[Event], removed: Iterable[int]
+    ) -> None:
+        with journal_path(self.path).open("ab") as f:
+            _dump(f, (header, list(changed), list(removed)))
+            self._journal_size = _sync(f)
+
+
+def _dump(f: BinaryIO, obj: object) -> None:
+    pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _sync(f: BinaryIO) -> int:
+    f.flush()
+    os.fsync(f.fileno())
+    return f.tell()
+
+
+def _read_pickles(f: BufferedReader) -> Iterator[Any]:
+    while f.peek(1):
+        yield pickle.load(f)
+
+
+def _load_legacy(f: BufferedReader) -> LoadedStatus:
+    status = ast.literal_eval(f.read().decode("utf-8"))
+    return LoadedStatus(
+        header=StatusHeader(
+            next_event_id=status["next_event_id"],
+            rule_stats=status["rule_stats"],
+            interval_starts=status.get("interval_starts", {}),
+        ),
+        events=status["events"],
+    )
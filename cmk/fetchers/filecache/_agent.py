@@ -5,16 +5,30 @@
 
 from __future__ import annotations
 
+import zlib
+from typing import Final
+
+from cmk.ccc.exceptions import MKFetcherError
+
 from cmk.utils.agentdatatype import AgentRawData
 
 from ._cache import FileCache
 
 __all__ = ["AgentFileCache"]
 
+# The agent receiver may store the data of the push agents as sent, with this prefix.
+# Keep in sync with cmk.agent_receiver.ingestion.
+COMPRESSED_AGENT_DATA_PREFIX: Final = b"\x00zlib\x00"
+
 
 class AgentFileCache(FileCache[AgentRawData]):
     @staticmethod
     def _from_cache_file(raw_data: bytes) -> AgentRawData:
+        if raw_data.startswith(COMPRESSED_AGENT_DATA_PREFIX):
+            try:
+                return AgentRawData(zlib.decompress(raw_data[len(COMPRESSED_AGENT_DATA_PREFIX) :]))
+            except zlib.error as e:
+                raise MKFetcherError(f"Cannot decompress the agent data: {e}") from e
         return AgentRawData(raw_data)
 
     @staticmethod
@@ -4,7 +4,8 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 """Home of our open source SNMP backends."""
 
+from .bulk import BulkSNMPBackend
 from .classic import ClassicSNMPBackend
 from .stored_walk import StoredWalkSNMPBackend
 
-__all__ = ["ClassicSNMPBackend", "StoredWalkSNMPBackend"]
+__all__ = ["BulkSNMPBackend", "ClassicSNMPBackend", "StoredWalkSNMPBackend"]
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# Copyright (C) 2019 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Minimal BER codec for SNMPv1/v2c messages
+
+Only the subset needed for GET, GETNEXT and GETBULK requests and their
+responses is implemented.  Values are decoded to the same raw byte
+representation the classic backend produces from the Net-SNMP command
+line tools called with `-On -OQ -Ot`.
+"""
+
+import enum
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from cmk.snmplib import OID, SNMPRawValue
+
+__all__ = [
+    "decode_message",
+    "encode_message",
+    "EndOfMib",
+    "PDUType",
+    "SNMPMessage",
+    "VarBind",
+]
+
+_INTEGER = 0x02
+_OCTET_STRING = 0x04
+_NULL = 0x05
+_OBJECT_IDENTIFIER = 0x06
+_SEQUENCE = 0x30
+_IP_ADDRESS = 0x40
+_COUNTER32 = 0x41
+_GAUGE32 = 0x42
+_TIMETICKS = 0x43
+_OPAQUE = 0x44
+_COUNTER64 = 0x46
+_NO_SUCH_OBJECT = 0x80
+_NO_SUCH_INSTANCE = 0x81
+_END_OF_MIB_VIEW = 0x82
+
+_UNSIGNED_TYPES = frozenset({_COUNTER32, _GAUGE32, _TIMETICKS, _COUNTER64})
+
+
+class PDUType(enum.IntEnum):
+    GET = 0xA0
+    GETNEXT = 0xA1
+    RESPONSE = 0xA2
+    GETBULK = 0xA5
+
+
+class EndOfMib(enum.Enum):
+    """Exception values of SNMPv2c varbinds (RFC 3416)"""
+
+    NO_SUCH_OBJECT = _NO_SUCH_OBJECT
+    NO_SUCH_INSTANCE = _NO_SUCH_INSTANCE
+    END_OF_MIB_VIEW = _END_OF_MIB_VIEW
+
+
+VarBind = tuple[OID, SNMPRawValue | EndOfMib | None]
+
+
+@dataclass(frozen=True)
+class SNMPMessage:
+    version: int  # 0: v1, 1: v2c
+    community: bytes
+    pdu_type: PDUType
+    request_id: int
+    # For GETBULK these two carry non-repeaters and max-repetitions.
+    error_status: int
+    error_index: int
+    varbinds: Sequence[VarBind]
+
+
+def _encode_length(length: int) -> bytes:
+    if length < 0x80:
+        return bytes((length,))
+    raw = length.to_bytes((length.bit_length() + 7) // 8, "big")
+    return bytes((0x80 | len(raw),)) + raw
+
+
+def _tlv(tag: int, value: bytes) -> bytes:
+    return bytes((tag,)) + _encode_length(len(value)) + value
+
+
+def _encode_integer(value: int) -> bytes:
+    return _tlv(_INTEGER, value.to_bytes(max(1, (value.bit_length() + 8) // 8), "big", signed=True))
+
+
+def _encode_oid(oid: OID) -> bytes:
+    arcs = [int(a) for a in oid.strip(".").split(".")]
+    if len(arcs) < 2:
+        arcs.append(0)
+    encoded = bytearray()
+    for arc in [40 * arcs[0] + arcs[1], *arcs[2:]]:
+        chunk = [arc & 0x7F]
+        arc >>= 7
+        while arc:
+            chunk.append(0x80 | (arc & 0x7F))
+            arc >>= 7
+        encoded.extend(reversed(chunk))
+    return _tlv(_OBJECT_IDENTIFIER, bytes(encoded))
+
+
+def _encode_value(value: SNMPRawValue | EndOfMib | None) -> bytes:
+    # Only used by test responders: requests always carry NULL values.
+    if value is None:
+        return _tlv(_NULL, b"")
+    if isinstance(value, EndOfMib):
+        return _tlv(value.value, b"")
+    return _tlv(_OCTET_STRING, value)
+
+
+def encode_message(message: SNMPMessage) -> bytes:
+    varbinds = b"".join(
+        _tlv(_SEQUENCE, _encode_oid(oid) + _encode_value(value)) for oid, value in message.varbinds
+    )
+    pdu = _tlv(
+        message.pdu_type,
+        _encode_integer(message.request_id)
+        + _encode_integer(message.error_status)
+        + _encode_integer(message.error_index)
+        + _tlv(_SEQUENCE, varbinds),
+    )
+    return _tlv(
+        _SEQUENCE,
+        _encode_integer(message.version) + _tlv(_OCTET_STRING, message.community) + pdu,
+    )
+
+
+def _decode_tlv(data: bytes, offset: int) -> tuple[int, bytes, int]:
+    tag = data[offset]
+    length = data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        size = length & 0x7F
+        length = int.from_bytes(data[offset : offset + size], "big")
+        offset += size
+    end = offset + length
+    if end > len(data):
+        raise ValueError("Truncated BER data")
+    return tag, data[offset:end], end
+
+
+def _decode_oid(raw: bytes) -> OID:
+    arcs: list[int] = []
+    arc = 0
+    for byte in raw:
+        arc = (arc << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            arcs.append(arc)
+            arc = 0
+    if not arcs:
+        return "."
+    first, second = (arcs[0] // 40, arcs[0] % 40) if arcs[0] < 80 else (2, arcs[0] - 80)
+    return "." + ".".join(map(str, [first, second, *arcs[1:]]))
+
+
+def _decode_value(tag: int, raw: bytes) -> SNMPRawValue | EndOfMib | None:
+    if tag in (_OCTET_STRING, _OPAQUE):
+        return raw
+    if tag == _INTEGER:
+        return str(int.from_bytes(raw, "big", signed=True)).encode()
+    if tag in _UNSIGNED_TYPES:
+        return str(int.from_bytes(raw, "big")).encode()
+    if tag == _OBJECT_IDENTIFIER:
+        return _decode_oid(raw).encode()
+    if tag == _IP_ADDRESS:
+        return ".".join(map(str, raw)).encode()
+    if tag == _NULL:
+        return None
+    if tag in (_NO_SUCH_OBJECT, _NO_SUCH_INSTANCE, _END_OF_MIB_VIEW):
+        return EndOfMib(tag)
+    # Unknown application type, hand out the raw octets
+    return raw
+
+
+def _decode_int(data: bytes, offset: int) -> tuple[int, int]:
+    tag, raw, offset = _decode_tlv(data, offset)
+    if tag != _INTEGER:
+        raise ValueError(f"Expected INTEGER, got tag {tag:#x}")
+    return int.from_bytes(raw, "big", signed=True), offset
+
+
+def decode_message(data: bytes) -> SNMPMessage:
+    tag, body, _end = _decode_tlv(data, 0)
+    if tag != _SEQUENCE:
+        raise ValueError("Not an SNMP message")
+    version, offset = _decode_int(body, 0)
+    _tag, community, offset = _decode_tlv(body, offset)
+    pdu_tag, pdu, _end = _decode_tlv(body, offset)
+    request_id, offset = _decode_int(pdu, 0)
+    error_status, offset = _decode_int(pdu, offset)
+    error_index, offset = _decode_int(pdu, offset)
+    _tag, raw_varbinds, _end = _decode_tlv(pdu, offset)
+
+    varbinds: list[VarBind] = []
+    offset = 0
+    while offset < len(raw_varbinds):
+        _tag, raw_varbind, offset = _decode_tlv(raw_varbinds, offset)
+        _tag, raw_oid, value_offset = _decode_tlv(raw_varbind, 0)
+        value_tag, raw_value, _end = _decode_tlv(raw_varbind, value_offset)
+        varbinds.append((_decode_oid(raw_oid), _decode_value(value_tag, raw_value)))
+
+    return SNMPMessage(
+        version=version,
+        community=community,
+        pdu_type=PDUType(pdu_tag),
+        request_id=request_id,
+        error_status=error_status,
+        error_index=error_index,
+        varbinds=varbinds,
+    )
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# Copyright (C) 2019 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""In-process SNMPv1/v2c backend
+
+The classic backend forks one Net-SNMP process per OID and parses its text
+output.  This backend talks SNMP itself over a UDP socket that lives as long
+as the fetcher worker, batches the columns of a table into shared GETBULK
+requests and hands out `SNMPRowInfo` directly.
+
+SNMPv3 (USM authentication and privacy) is not implemented here, such hosts
+are served by the classic code path.
+"""
+
+import itertools
+import random
+import socket
+import time
+from collections.abc import Mapping, Sequence
+from typing import Final
+
+from cmk.ccc.exceptions import MKSNMPError, MKTimeout
+
+from cmk.utils.log import VERBOSE
+from cmk.utils.sectionname import SectionName
+
+from cmk.snmplib import OID, SNMPContext, SNMPRawValue, SNMPRowInfo, SNMPVersion
+
+from ._ber import decode_message, encode_message, EndOfMib, PDUType, SNMPMessage, VarBind
+from .classic import ClassicSNMPBackend
+
+__all__ = ["BulkSNMPBackend", "SNMPEngine", "get_engine"]
+
+# Net-SNMP defaults, used if the host has no explicit timing configured
+_DEFAULT_TIMEOUT: Final = 1.0
+_DEFAULT_RETRIES: Final = 5
+_MAX_DATAGRAM: Final = 65535
+_TOO_BIG: Final = 1
+# v1 error-status "noSuchName" marks the end of a GETNEXT walk
+_NO_SUCH_NAME: Final = 2
+
+
+def _oid_key(oid: OID) -> tuple[int, ...]:
+    return tuple(int(part) for part in oid.strip(".").split("."))
+
+
+class SNMPEngine:
+    """One long-lived pair of UDP sockets shared by all hosts of a worker"""
+
+    def __init__(self) -> None:
+        self._sockets: dict[socket.AddressFamily, socket.socket] = {}
+        self._request_ids: Final = itertools.count(random.randint(1, 1 << 30))
+
+    def close(self) -> None:
+        for sock in self._sockets.values():
+            sock.close()
+        self._sockets.clear()
+
+    def _socket(self, family: socket.AddressFamily) -> socket.socket:
+        if (sock := self._sockets.get(family)) is None:
+            sock = self._sockets[family] = socket.socket(family, socket.SOCK_DGRAM)
+        return sock
+
+    def request(
+        self,
+        address: tuple[str, int],
+        *,
+        family: socket.AddressFamily,
+        version: int,
+        community: bytes,
+        pdu_type: PDUType,
+        varbinds: Sequence[OID],
+        error_status: int = 0,
+        error_index: int = 0,
+        timeout: float,
+        retries: int,
+    ) -> SNMPMessage:
+        request_id = next(self._request_ids) & 0x7FFFFFFF
+        payload = encode_message(
+            SNMPMessage(
+                version=version,
+                community=community,
+                pdu_type=pdu_type,
+                request_id=request_id,
+                error_status=error_status,
+                error_index=error_index,
+                varbinds=[(oid, None) for oid in varbinds],
+            )
+        )
+        sock = self._socket(family)
+        for _attempt in range(retries + 1):
+            sock.sendto(payload, address)
+            deadline = time.monotonic() + timeout
+            while (remaining := deadline - time.monotonic()) > 0:
+                sock.settimeout(remaining)
+                try:
+                    data, _sender = sock.recvfrom(_MAX_DATAGRAM)
+                except TimeoutError:
+                    break
+                try:
+                    response = decode_message(data)
+                except (ValueError, IndexError):
+                    continue  # garbage on the wire
+                if response.request_id == request_id:
+                    return response
+                # else: late answer to an earlier, already retried request
+        raise MKTimeout(f"Timeout: No Response from {address[0]}")
+
+
+_engine: SNMPEngine | None = None
+
+
+def get_engine() -> SNMPEngine:
+    global _engine
+    if _engine is None:
+        _engine = SNMPEngine()
+    return _engine
+
+
+class BulkSNMPBackend(ClassicSNMPBackend):
+    @property
+    def _in_process(self) -> bool:
+        return self.config.snmp_version is not SNMPVersion.V3
+
+    def get(self, /, oid: OID, *, context: SNMPContext) -> SNMPRawValue | None:
+        if not self._in_process:
+            return super().get(oid, context=context)
+
+        if oid.endswith(".*"):
+            oid_prefix = oid[:-2]
+            pdu_type = PDUType.GETNEXT
+        else:
+            oid_prefix = oid
+            pdu_type = PDUType.GET
+
+        try:
+            response = self._request(pdu_type, [oid_prefix])
+        except MKTimeout as exc:
+            self._logger.log(VERBOSE, f"SNMP error: {exc}")
+            return None
+
+        if response.error_status or not response.varbinds:
+            return None
+        item, value = response.varbinds[0]
+        if value is None or isinstance(value, EndOfMib):
+            return None
+        # In case of .*, check if prefix is the one we are looking for
+        if pdu_type is PDUType.GETNEXT and not item.startswith(oid_prefix + "."):
+            return None
+        return value
+
+    def walk(
+        self,
+        /,
+        oid: str,
+        *,
+        context: SNMPContext,
+        section_name: SectionName | None = None,
+        table_base_oid: str | None = None,
+    ) -> SNMPRowInfo:
+        if not self._in_process:
+            return super().walk(
+                oid, context=context, section_name=section_name, table_base_oid=table_base_oid
+            )
+        return self.walk_many([oid], context=context)[oid]
+
+    def walk_many(
+        self,
+        /,
+        oids: Sequence[OID],
+        *,
+        context: SNMPContext,
+        section_name: SectionName | None = None,
+        table_base_oid: OID | None = None,
+    ) -> Mapping[OID, SNMPRowInfo]:
+        """Walk several subtrees at once
+
+        With GETBULK all subtrees that are not exhausted yet share every
+        request, so fetching a table costs about one round trip per
+        `bulk_walk_size_of` rows instead of one process per column.
+        """
+        if not self._in_process:
+            return super().walk_many(
+                oids, context=context, section_name=section_name, table_base_oid=table_base_oid
+            )
+
+        results: dict[OID, SNMPRowInfo] = {oid: [] for oid in oids}
+        cursors = {oid: "." + oid.strip(".") for oid in results}
+        try:
+            while cursors:
+                pending = list(cursors)
+                answers = self._next_rows([cursors[oid] for oid in pending])
+                for oid, varbinds in zip(pending, answers):
+                    next_cursor = self._collect(oid, cursors[oid], varbinds, results[oid])
+                    if next_cursor is None:
+                        del cursors[oid]
+                    else:
+                        cursors[oid] = next_cursor
+        except MKTimeout as exc:
+            raise MKSNMPError(f"SNMP Error on {self.config.ipaddress}: {exc}") from exc
+
+        for oid, rows in results.items():
+            if not rows:
+                # Like snmpwalk: an empty subtree may still be a scalar
+                if (value := self.get(oid, context=context)) is not None:
+                    rows.append(("." + oid.strip("."), value))
+        return results
+
+    def _next_rows(
+        self, cursors: Sequence[OID], *, bulk: bool | None = None
+    ) -> Sequence[Sequence[VarBind]]:
+        if bulk is None:
+            bulk = self.config.use_bulkwalk
+        if bulk:
+            response = self._request(
+                PDUType.GETBULK,
+                cursors,
+                error_status=0,  # non-repeaters
+                error_index=self.config.bulk_walk_size_of,  # max-repetitions
+            )
+        else:
+            response = self._request(PDUType.GETNEXT, cursors)
+
+        if response.error_status == _NO_SUCH_NAME and self.config.snmp_version is SNMPVersion.V1:
+            if len(cursors) == 1:
+                return [[(cursors[0], EndOfMib.END_OF_MIB_VIEW)]]
+            # v1 aborts the whole PDU; fall back to one request per subtree
+            return [self._next_rows([cursor], bulk=bulk)[0] for cursor in cursors]
+        if response.error_status == _TOO_BIG and len(cursors) > 1:
+            return self._next_rows_halved(cursors, bulk=bulk)
+        if response.error_status:
+            raise MKSNMPError(
+                f"SNMP Error on {self.config.ipaddress}: error-status {response.error_status}"
+            )
+
+        if not response.varbinds:
+            # Nothing to make progress with: ask for fewer subtrees at once
+            # and finally for a single successor.
+            if len(cursors) > 1:
+                return self._next_rows_halved(cursors, bulk=bulk)
+            if bulk:
+                return self._next_rows(cursors, bulk=False)
+            raise MKSNMPError(f"SNMP Error on {self.config.ipaddress}: empty response")
+
+        # GETBULK answers are ordered repetition by repetition.  The agent may
+        # truncate them (RFC 3416, 4.2.3), so the last subtrees can get fewer
+        # varbinds than the first ones or none at all.
+        rows: list[list[VarBind]] = [[] for _cursor in cursors]
+        for index, varbind in enumerate(response.varbinds):
+            rows[index % len(cursors)].append(varbind)
+        return rows
+
+    def _next_rows_halved(
+        self, cursors: Sequence[OID], *, bulk: bool
+    ) -> Sequence[Sequence[VarBind]]:
+        half = len(cursors) // 2
+        return [
+            *self._next_rows(cursors[:half], bulk=bulk),
+            *self._next_rows(cursors[half:], bulk=bulk),
+        ]
+
+    @staticmethod
+    def _collect(
+        oid: OID, cursor: OID, varbinds: Sequence[VarBind], rows: SNMPRowInfo
+    ) -> OID | None:
+        """Append the varbinds within the subtree and return the next cursor
+
+        The walk of the subtree ends (None) on the first varbind outside of it
+        or at the end of the MIB view.  Without any varbinds, e.g. in a
+        truncated response, it continues at the same cursor.
+        """
+        prefix = "." + oid.strip(".") + "."
+        for item, value in varbinds:
+            if value is None or isinstance(value, EndOfMib) or not item.startswith(prefix):
+                return None
+            if rows and _oid_key(item) <= _oid_key(rows[-1][0]):
+                return None  # broken agent, OIDs not increasing would loop forever
+            rows.append((item, value))
+            cursor = item
+        return cursor
+
+    def _request(
+        self,
+        pdu_type: PDUType,
+        varbinds: Sequence[OID],
+        *,
+        error_status: int = 0,
+        error_index: int = 0,
+    ) -> SNMPMessage:
+        if not isinstance(self.config.credentials, str):
+            raise TypeError()
+        settings = self.config.timing
+        family = socket.AF_INET6 if self.config.is_ipv6_primary else socket.AF_INET
+        return get_engine().request(
+            (self.config.ipaddress or "0.0.0.0", self.config.port),
+            family=family,
+            version=0 if self.config.snmp_version is SNMPVersion.V1 else 1,
+            community=self.config.credentials.encode(),
+            pdu_type=pdu_type,
+            varbinds=varbinds,
+            error_status=error_status,
+            error_index=error_index,
+            timeout=settings.get("timeout", _DEFAULT_TIMEOUT),
+            retries=settings.get("retries", _DEFAULT_RETRIES),
+        )
@@ -4,8 +4,9 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 """Abstract classes and types."""
 
+import bisect
 import logging
-from collections.abc import Sequence
+from collections.abc import Iterable, Sequence
 from pathlib import Path
 from typing import Final
 
@@ -17,7 +18,70 @@ from cmk.snmplib import OID, SNMPBackend, SNMPContext, SNMPHostConfig, SNMPRawVa
 
 from ._utils import strip_snmp_value
 
-__all__ = ["StoredWalkSNMPBackend"]
+__all__ = ["StoredWalkSNMPBackend", "WalkIndex"]
+
+
+# The number of walk files kept parsed in memory, the least recently used are dropped first
+_MAX_CACHED_INDEXES: Final = 32
+
+
+class WalkIndex:
+    """Sorted, binary searchable view of a stored walk file
+
+    The file is read and parsed exactly once per (path, size, mtime).
+    All walks of a fetch and all hosts that share the same walk file
+    are served from the same index.
+    """
+
+    _cache: dict[Path, tuple[tuple[int, int, int], "WalkIndex"]] = {}
+
+    def __init__(self, lines: Iterable[str], logger: logging.Logger) -> None:
+        entries = []
+        for line in lines:
+            parts = line.split(None, 1)
+            oid = parts[0].lstrip(".")
+            value = parts[1] if len(parts) > 1 else ""
+            try:
+                key = StoredWalkSNMPBackend._to_bin_string(oid)
+            except MKGeneralException:
+                logger.warning("Skipping invalid line in stored walk: %r", line)
+                continue
+            entries.append((key, oid, value))
+        entries.sort(key=lambda e: e[0])
+        self._keys: Final = [e[0] for e in entries]
+        self._entries: Final = [(e[1], e[2]) for e in entries]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @classmethod
+    def load(cls, path: Path, logger: logging.Logger) -> "WalkIndex":
+        stat = path.stat()
+        stat_key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if (cached := cls._cache.pop(path, None)) is not None and cached[0] == stat_key:
+            index = cached[1]
+        else:
+            index = cls(StoredWalkSNMPBackend.read_walk_from_path(path, logger), logger)
+        cls._cache[path] = (stat_key, index)
+        while len(cls._cache) > _MAX_CACHED_INDEXES:
+            del cls._cache[next(iter(cls._cache))]
+        return index
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        cls._cache.clear()
+
+    def lookup(self, oid: OID, oid_prefix: OID) -> SNMPRowInfo:
+        prefix = StoredWalkSNMPBackend._to_bin_string(oid_prefix)
+        size = len(prefix)
+        rows = []
+        for index in range(bisect.bisect_left(self._keys, prefix), len(self._keys)):
+            if self._keys[index][:size] != prefix:
+                break
+            o, value = self._entries[index]
+            if o == oid or o.startswith(oid_prefix + "."):
+                rows.append(("." + o, strip_snmp_value(value)))
+        return rows
 
 
 class StoredWalkSNMPBackend(SNMPBackend):
@@ -57,30 +121,11 @@ class StoredWalkSNMPBackend(SNMPBackend):
             dot_star = False
 
         self._logger.debug(f"  Loading {oid}")
-        lines = self.read_walk_data()
-
-        begin = 0
-        end = len(lines)
-        hit = None
-        while end - begin > 0:
-            current = (begin + end) // 2
-            parts = lines[current].split(None, 1)
-            comp = parts[0]
-            hit = StoredWalkSNMPBackend._compare_oids(oid_prefix, comp)
-            if hit == 0:
-                break
-            if hit == 1:  # we are too low
-                begin = current + 1
-            else:
-                end = current
+        rowinfo = self.read_walk_index().lookup(oid, oid_prefix)
 
-        if hit != 0:
+        if not rowinfo:
             return []  # not found
 
-        rowinfo = StoredWalkSNMPBackend._collect_until(oid, oid_prefix, lines, current, -1)
-        rowinfo.reverse()
-        rowinfo += StoredWalkSNMPBackend._collect_until(oid, oid_prefix, lines, current + 1, 1)
-
         if dot_star:
             return [rowinfo[0]]
 
@@ -106,15 +151,11 @@ class StoredWalkSNMPBackend(SNMPBackend):
         except OSError:
             raise MKSNMPError(f"No snmpwalk file {self.path}")
 
-    @staticmethod
-    def _compare_oids(a: OID, b: OID) -> int:
-        aa = StoredWalkSNMPBackend._to_bin_string(a)
-        bb = StoredWalkSNMPBackend._to_bin_string(b)
-        if len(aa) <= len(bb) and bb[: len(aa)] == aa:
-            result = 0
-        else:
-            result = (aa > bb) - (aa < bb)
-        return result
+    def read_walk_index(self) -> "WalkIndex":
+        try:
+            return WalkIndex.load(self.path, self._logger)
+        except OSError:
+            raise MKSNMPError(f"No snmpwalk file {self.path}")
 
     @staticmethod
     def _to_bin_string(oid: OID) -> tuple[int, ...]:
@@ -124,33 +165,3 @@ class StoredWalkSNMPBackend(SNMPBackend):
             raise
         except Exception:
             raise MKGeneralException(f"Invalid OID {oid}")
-
-    @staticmethod
-    def _collect_until(
-        oid: OID, oid_prefix: OID, lines: Sequence[str], index: int, direction: int
-    ) -> SNMPRowInfo:
-        rows = []
-        # Handle case, where we run after the end of the lines list
-        if index >= len(lines):
-            if direction > 0:
-                return []
-            index -= 1
-        while True:
-            line = lines[index]
-            parts = line.split(None, 1)
-            o = parts[0]
-            if o.startswith("."):
-                o = o[1:]
-            if o == oid or o.startswith(oid_prefix + "."):
-                if len(parts) > 1:
-                    value = parts[1]
-                else:
-                    value = ""
-                # Fix for missing starting oids
-                rows.append(("." + o, strip_snmp_value(value)))
-                index += direction
-                if index < 0 or index >= len(lines):
-                    break
-            else:
-                break
-        return rows
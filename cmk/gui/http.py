@@ -14,7 +14,7 @@ import urllib.parse
 from collections.abc import Iterator, Mapping
 from contextlib import contextmanager
 from enum import auto, StrEnum
-from typing import Any, cast, Literal, overload, Protocol, TypeVar
+from typing import Any, cast, IO, Literal, overload, Protocol, TypeVar
 
 import flask
 from flask import request as flask_request
@@ -182,6 +182,16 @@ class LegacyUploadMixin:
 
         return upload
 
+    def uploaded_file_stream(self, name: str) -> IO[bytes]:
+        """Like uploaded_file(), but without reading the content into memory
+
+        Large uploads are spooled to disk by werkzeug while the request is parsed."""
+        # TODO: mypy does not know about the related mixin classes, see uploaded_file()
+        f = self.files.get(name)  # type: ignore[attr-defined]
+        if not f:
+            raise MKUserError(name, _("Please choose a file to upload."))
+        return f.stream
+
 
 class LegacyDeprecatedMixin:
     """Some wrappers which are still used while their use is considered deprecated.
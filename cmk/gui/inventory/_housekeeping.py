@@ -10,7 +10,7 @@ from pathlib import Path
 
 from cmk.ccc.hostaddress import HostName
 
-from cmk.utils.structured_data import InventoryPaths
+from cmk.utils.structured_data import InventoryPaths, parse_archive_timestamp
 
 
 class InventoryHousekeeping:
@@ -65,5 +65,8 @@ class InventoryHousekeeping:
         for filename in [
             x for x in self.inv_paths.archive_host(host_name).iterdir() if not x.is_dir()
         ]:
-            timestamps.add(filename.with_suffix("").name)
+            try:
+                timestamps.add(str(parse_archive_timestamp(filename)))
+            except ValueError:
+                continue
         return timestamps
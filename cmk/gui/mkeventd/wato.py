@@ -248,6 +248,7 @@ def register(
     config_var_registry.register(ConfigVariableEventConsoleStatisticsInterval)
     config_var_registry.register(ConfigVariableEventConsoleLogMessages)
     config_var_registry.register(ConfigVariableEventConsoleRuleOptimizer)
+    config_var_registry.register(ConfigVariableEventConsoleRuleEvaluationProcesses)
     config_var_registry.register(ConfigVariableEventConsoleActions)
     config_var_registry.register(ConfigVariableEventConsoleArchiveOrphans)
     config_var_registry.register(ConfigVariableHostnameTranslation)
@@ -256,6 +257,7 @@ def register(
     config_var_registry.register(ConfigVariableEventConsoleHistoryLifetime)
     config_var_registry.register(ConfigVariableEventConsoleSocketQueueLength)
     config_var_registry.register(ConfigVariableEventConsoleEventSocketQueueLength)
+    config_var_registry.register(ConfigVariableEventConsoleStatusServerThreads)
     config_var_registry.register(ConfigVariableEventConsoleTranslateSNMPTraps)
     config_var_registry.register(ConfigVariableEventConsoleSNMPCredentials)
     config_var_registry.register(ConfigVariableEventConsoleDebugRules)
@@ -4166,6 +4168,27 @@ ConfigVariableEventConsoleRuleOptimizer = ConfigVariable(
     ),
 )
 
+ConfigVariableEventConsoleRuleEvaluationProcesses = ConfigVariable(
+    group=ConfigVariableGroupEventConsoleGeneric,
+    domain=ConfigDomainEventConsole,
+    ident="rule_evaluation_processes",
+    valuespec=lambda: Integer(
+        title=_("Number of processes evaluating rules"),
+        help=_(
+            "With more than one process, the incoming messages are matched against the rules "
+            "and rewritten by a pool of worker processes, making use of several CPU cores. "
+            "The outcome is applied to the events one message after the other, in the order "
+            "the messages came in, so counting and cancelling work like with a single process. "
+            "This only pays off with many rules and a high message rate. While the debugging "
+            "of the rule execution is enabled, the rules are always evaluated by the event "
+            "daemon itself."
+        ),
+        minvalue=1,
+        maxvalue=64,
+        unit=_("processes"),
+    ),
+)
+
 ConfigVariableEventConsoleActions = ConfigVariable(
     group=ConfigVariableGroupEventConsoleGeneric,
     domain=ConfigDomainEventConsole,
@@ -4513,6 +4536,26 @@ ConfigVariableEventConsoleEventSocketQueueLength = ConfigVariable(
     ),
 )
 
+ConfigVariableEventConsoleStatusServerThreads = ConfigVariable(
+    group=ConfigVariableGroupEventConsoleGeneric,
+    domain=ConfigDomainEventConsole,
+    ident="status_server_threads",
+    valuespec=lambda: Integer(
+        title=_("Number of threads answering status requests"),
+        help=_(
+            "The Multisite GUI and the active check check_mkevents query the event daemon via "
+            "its status socket. With more than one thread, these requests are answered "
+            "concurrently, so that a slow client or a large history query does not delay the "
+            "other clients. Queries are answered from a copy of the current events and do "
+            "not block the processing of incoming messages. With one thread, the requests are "
+            "answered one after the other."
+        ),
+        minvalue=1,
+        maxvalue=64,
+        unit=_("threads"),
+    ),
+)
+
 ConfigVariableEventConsoleTranslateSNMPTraps = ConfigVariable(
     group=ConfigVariableGroupEventConsoleSNMP,
     domain=ConfigDomainEventConsole,
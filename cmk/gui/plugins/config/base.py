@@ -583,6 +583,7 @@ class CREConfig:
     wato_activation_method: str = "restart"
     wato_write_nagvis_auth: bool = False
     wato_use_git: bool = False
+    wato_stream_config_sync: bool = False
     wato_hidden_users: list = field(default_factory=list)
     wato_user_attrs: Sequence[CustomUserAttrSpec] = field(default_factory=list)
     wato_host_attrs: Sequence[CustomHostAttrSpec] = field(default_factory=list)
@@ -181,6 +181,7 @@ def register(
     config_variable_registry.register(ConfigVariableWATOHideHosttags)
     config_variable_registry.register(ConfigVariableWATOHideVarnames)
     config_variable_registry.register(ConfigVariableWATOUseGit)
+    config_variable_registry.register(ConfigVariableWATOStreamConfigSync)
     config_variable_registry.register(ConfigVariableWATOPrettyPrintConfig)
     config_variable_registry.register(ConfigVariableWATOHideFoldersWithoutReadPermissions)
     config_variable_registry.register(ConfigVariableWATOIconCategories)
@@ -203,6 +204,8 @@ def register(
     config_variable_registry.register(ConfigVariableSimulationMode)
     config_variable_registry.register(ConfigVariableRestartLocking)
     config_variable_registry.register(ConfigVariableDelayPrecompile)
+    config_variable_registry.register(ConfigVariableNagiosConfigProcesses)
+    config_variable_registry.register(ConfigVariableNagiosConfigIncremental)
     config_variable_registry.register(ConfigVariableClusterMaxCachefileAge)
     config_variable_registry.register(ConfigVariablePiggybackMaxCachefileAge)
     config_variable_registry.register(ConfigVariableCheckMKPerfdataWithTimes)
@@ -1996,6 +1999,23 @@ ConfigVariableWATOUseGit = ConfigVariable(
     ),
 )
 
+ConfigVariableWATOStreamConfigSync = ConfigVariable(
+    group=ConfigVariableGroupWATO,
+    domain=ConfigDomainGUI,
+    ident="wato_stream_config_sync",
+    valuespec=lambda: Checkbox(
+        title=_("Stream configuration to remote sites"),
+        label=_("compress and stream the configuration during activation"),
+        help=_(
+            "When enabled, the files synchronized to remote sites during the activation of "
+            "changes are compressed and sent while they are being packed, instead of building "
+            "the whole archive in memory first. This reduces the memory usage of the central "
+            "site for large synchronizations. All remote sites need to run this version of "
+            "Checkmk, older versions can not unpack the compressed archive."
+        ),
+    ),
+)
+
 ConfigVariableWATOPrettyPrintConfig = ConfigVariable(
     group=ConfigVariableGroupWATO,
     domain=ConfigDomainGUI,
@@ -2643,6 +2663,38 @@ ConfigVariableDelayPrecompile = ConfigVariable(
     ),
 )
 
+ConfigVariableNagiosConfigProcesses = ConfigVariable(
+    group=ConfigVariableGroupCheckExecution,
+    domain=ConfigDomainCore,
+    ident="nagios_config_processes",
+    valuespec=lambda: Integer(
+        title=_("Processes creating the Nagios configuration"),
+        help=_(
+            "When activating the changes, the object definitions of the hosts for the Nagios "
+            "core are created by this number of processes. With a large number of hosts, "
+            "more processes reduce the time needed for the activation if there are enough "
+            "CPUs."
+        ),
+        minvalue=1,
+    ),
+)
+
+ConfigVariableNagiosConfigIncremental = ConfigVariable(
+    group=ConfigVariableGroupCheckExecution,
+    domain=ConfigDomainCore,
+    ident="nagios_config_incremental",
+    valuespec=lambda: Checkbox(
+        title=_("Reuse the Nagios objects of unchanged hosts"),
+        label=_("reuse unchanged host objects"),
+        help=_(
+            "If you enable this option, then Checkmk stores the object definitions of the hosts "
+            "for the Nagios core and uses them again when activating the changes, unless the "
+            "configuration, the plug-ins, the attributes or the discovered services of the "
+            "host have changed."
+        ),
+    ),
+)
+
 ConfigVariableClusterMaxCachefileAge = ConfigVariable(
     group=ConfigVariableGroupCheckExecution,
     domain=ConfigDomainCore,
@@ -2713,12 +2765,14 @@ ConfigVariableUseDNSCache = ConfigVariable(
 
 def _transform_snmp_backend_from_valuespec(
     backend: SNMPBackendEnum,
-) -> Literal["classic", "inline"]:
+) -> Literal["classic", "inline", "bulk"]:
     match backend:
         case SNMPBackendEnum.CLASSIC:
             return "classic"
         case SNMPBackendEnum.INLINE:
             return "inline"
+        case SNMPBackendEnum.BULK:
+            return "bulk"
         case _:
             raise MKConfigError("SNMPBackendEnum %r not implemented" % backend)
 
@@ -2735,6 +2789,7 @@ ConfigVariableChooseSNMPBackend = ConfigVariable(
             choices=[
                 (SNMPBackendEnum.CLASSIC, _("Use Classic SNMP Backend")),
                 (SNMPBackendEnum.INLINE, _("Use Inline SNMP Backend")),
+                (SNMPBackendEnum.BULK, _("Use Bulk SNMP Backend")),
             ],
             help=_(
                 "By default Checkmk uses command line calls of Net-SNMP tools like snmpget or "
@@ -2743,7 +2798,9 @@ ConfigVariableChooseSNMPBackend = ConfigVariable(
                 "which calls the respective libraries directly via its python bindings. This "
                 "should increase the performance of SNMP checks in a significant way. Both "
                 "SNMP modes are features which improve the performance for large installations and are "
-                "only available via our subscription."
+                "only available via our subscription. The Bulk SNMP backend talks SNMP v1 and v2c "
+                "directly from the fetcher process and batches the columns of a table into shared "
+                "GETBULK requests. Hosts using SNMPv3 are handled by the Classic backend."
             ),
         ),
         to_valuespec=_transform_snmp_backend_hosts_to_valuespec,
@@ -5166,6 +5223,8 @@ def _transform_snmp_backend_hosts_to_valuespec(backend):
         # We dropped pysnmp during the 2.1 beta because it is currently slow
         # and unreliable.
         return SNMPBackendEnum.CLASSIC
+    if backend == "bulk":
+        return SNMPBackendEnum.BULK
     raise MKConfigError("SNMPBackendEnum %r not implemented" % backend)
 
 
@@ -5176,6 +5235,7 @@ def _valuespec_snmp_backend():
             choices=[
                 (SNMPBackendEnum.INLINE, _("Use Inline SNMP backend")),
                 (SNMPBackendEnum.CLASSIC, _("Use Classic backend")),
+                (SNMPBackendEnum.BULK, _("Use Bulk backend")),
             ],
         ),
         to_valuespec=_transform_snmp_backend_hosts_to_valuespec,
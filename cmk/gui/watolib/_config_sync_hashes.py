@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Persistent cache for the hashes of the files of the config sync"""
+
+import hashlib
+import os
+import time
+from collections.abc import Mapping
+from multiprocessing.pool import ThreadPool
+from pathlib import Path
+from typing import Final
+
+from cmk.ccc import store
+
+# Files modified this shortly before the hashing are not cached: a second modification within
+# the granularity of the file system timestamps would go unnoticed otherwise.
+_RACY_WINDOW_NS: Final = 2 * 10**9
+
+_FileKey = tuple[int, int]  # st_dev, st_ino
+_CacheEntry = tuple[int, int, str]  # st_size, st_mtime_ns, hash
+
+
+def hash_file(file_path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(65536)
+            if not chunk:
+                break
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class FileHashCache:
+    """Remembers the hashes of files across activations
+
+    A file is hashed again only if its inode, size or mtime changed. The ctime is deliberately
+    not part of the key: the config sync snapshots hard link all files, which updates their ctime
+    on every activation.
+    """
+
+    def __init__(self, entries: Mapping[_FileKey, _CacheEntry] | None = None) -> None:
+        self._cached: Final = dict(entries or {})
+        self._seen: Final[dict[_FileKey, _CacheEntry]] = {}
+        self._started_ns: Final = time.time_ns()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path: Path) -> "FileHashCache":
+        try:
+            entries = store.load_object_from_pickle_file(path, default={})
+        except Exception:
+            entries = {}  # It's only a cache
+        return cls(entries if isinstance(entries, dict) else {})
+
+    def save(self, path: Path) -> None:
+        # Only the files seen this time are kept, the others have vanished meanwhile
+        store.save_object_to_pickle_file(path, self._seen)
+
+    def hash_files[K](
+        self, files: Mapping[K, tuple[str, os.stat_result]], workers: int = 1
+    ) -> dict[K, str]:
+        """Return the hashes of the given files, skipping the ones which vanished
+
+        The files which are not cached are hashed with the given number of threads."""
+        hashes: dict[K, str] = {}
+        to_hash: dict[K, tuple[str, os.stat_result]] = {}
+        for key, (path, stat) in files.items():
+            entry = self._cached.get((stat.st_dev, stat.st_ino))
+            if entry is not None and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+                hashes[key] = entry[2]
+                self._seen[(stat.st_dev, stat.st_ino)] = entry
+            else:
+                to_hash[key] = (path, stat)
+
+        self.hits += len(hashes)
+        self.misses += len(to_hash)
+
+        if workers > 1 and len(to_hash) > 1:
+            with ThreadPool(min(workers, len(to_hash))) as pool:
+                computed = pool.map(_try_hash_file, [path for path, _stat in to_hash.values()])
+        else:
+            computed = [_try_hash_file(path) for path, _stat in to_hash.values()]
+
+        for (key, (_path, stat)), file_hash in zip(to_hash.items(), computed):
+            if file_hash is None:
+                continue
+            hashes[key] = file_hash
+            if stat.st_mtime_ns < self._started_ns - _RACY_WINDOW_NS:
+                self._seen[(stat.st_dev, stat.st_ino)] = (stat.st_size, stat.st_mtime_ns, file_hash)
+
+        return hashes
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / total if (total := self.hits + self.misses) else 1.0
+
+
+def _try_hash_file(file_path: str) -> str | None:
+    try:
+        return hash_file(file_path)
+    except FileNotFoundError:
+        return None  # Vanished during processing
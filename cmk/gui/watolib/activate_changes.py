@@ -8,13 +8,13 @@
 from __future__ import annotations
 
 import ast
-import hashlib
 import io
 import logging
 import os
 import re
 import shutil
 import subprocess
+import tempfile
 import time
 import traceback
 from collections.abc import (
@@ -32,7 +32,8 @@ from datetime import datetime
 from itertools import filterfalse
 from multiprocessing.pool import AsyncResult, ThreadPool
 from pathlib import Path
-from typing import Any, assert_never, Literal, NamedTuple, TypedDict
+from stat import S_ISLNK
+from typing import Any, assert_never, IO, Literal, NamedTuple, TypedDict
 from urllib.parse import urlparse
 
 from pydantic import BaseModel
@@ -97,6 +98,7 @@ from cmk.gui.utils.ntop import is_ntop_configured
 from cmk.gui.utils.request_context import copy_request_context
 from cmk.gui.utils.urls import makeuri_contextless
 from cmk.gui.watolib import backup_snapshots
+from cmk.gui.watolib._config_sync_hashes import FileHashCache
 from cmk.gui.watolib.audit_log import log_audit
 from cmk.gui.watolib.automation_commands import AutomationCommand
 from cmk.gui.watolib.automations import RemoteAutomationConfig
@@ -171,6 +173,12 @@ var_dir = cmk.utils.paths.var_dir / "wato"
 
 GENERAL_DIR_EXCLUDE = "__pycache__"
 
+SYNC_ARCHIVE_CHUNK_SIZE = 64 * 1024
+SyncArchiveCompression = Literal["gzip"]
+
+# The hashing of the config sync files releases the GIL, so threads make use of multiple cores
+_CONFIG_SYNC_HASH_WORKERS = 4
+
 ConfigWarnings = dict[ConfigDomainName, list[str]]
 ActivationId = str
 SiteActivationState = dict[str, Any]
@@ -709,22 +717,33 @@ def _synchronize_files(
 
     We build a simple tar archive containing all files to be synchronized.  The list of file to
     be deleted and the current config generation is handed over using dedicated HTTP parameters.
-    """
 
-    sync_archive = _get_sync_archive(files_to_sync, site_config_dir)
+    In streaming mode the archive is compressed and sent while tar is still creating it.
+    """
+    automation_config = RemoteAutomationConfig.from_site_config(active_config.sites[site_id])
+    vars_ = [
+        ("site_id", site_id),
+        ("to_delete", repr(files_to_delete)),
+        ("config_generation", "%d" % remote_config_generation),
+    ]
 
-    site = active_config.sites[site_id]
-    response = cmk.gui.watolib.automations.do_remote_automation(
-        RemoteAutomationConfig.from_site_config(site),
-        "receive-config-sync",
-        [
-            ("site_id", site_id),
-            ("to_delete", repr(files_to_delete)),
-            ("config_generation", "%d" % remote_config_generation),
-        ],
-        files={"sync_archive": io.BytesIO(sync_archive)},
-        debug=active_config.debug,
-    )
+    if active_config.wato_stream_config_sync:
+        with _sync_archive_stream(files_to_sync, site_config_dir) as sync_archive_chunks:
+            response = cmk.gui.watolib.automations.do_remote_automation(
+                automation_config,
+                "receive-config-sync",
+                [*vars_, ("sync_archive_compression", "gzip")],
+                files={"sync_archive": sync_archive_chunks},
+                debug=active_config.debug,
+            )
+    else:
+        response = cmk.gui.watolib.automations.do_remote_automation(
+            automation_config,
+            "receive-config-sync",
+            vars_,
+            files={"sync_archive": io.BytesIO(_get_sync_archive(files_to_sync, site_config_dir))},
+            debug=active_config.debug,
+        )
 
     if response is not True:
         raise MKGeneralException(_("Failed to synchronize with site: %s") % response)
@@ -2012,8 +2031,9 @@ def _initialize_site_activation_state(
 
 def _get_config_sync_file_infos_per_inode(
     replication_paths: Sequence[ReplicationPath],
+    hash_cache: FileHashCache,
 ) -> Mapping[int, ConfigSyncFileInfo]:
-    inode_sync_states = {}
+    paths_per_inode: dict[int, str] = {}
 
     for replication_path in replication_paths:
         replication_path_full = os.path.join(cmk.utils.paths.omd_root, replication_path.site_path)
@@ -2022,21 +2042,19 @@ def _get_config_sync_file_infos_per_inode(
             continue
 
         if replication_path.ty == ReplicationPathType.FILE:
-            inode_sync_states[os.stat(replication_path_full).st_ino] = _get_config_sync_file_info(
-                replication_path_full
-            )
+            paths_per_inode[os.stat(replication_path_full).st_ino] = replication_path_full
         elif replication_path.ty == ReplicationPathType.DIR:
-            _get_replication_dir_config_sync_file_infos_per_inode(
-                inode_sync_states, replication_path_full, replication_path.is_excluded
+            _get_replication_dir_config_sync_paths_per_inode(
+                paths_per_inode, replication_path_full, replication_path.is_excluded
             )
         else:
             raise NotImplementedError()
 
-    return inode_sync_states
+    return _get_config_sync_file_infos_bulk(paths_per_inode, hash_cache)
 
 
-def _get_replication_dir_config_sync_file_infos_per_inode(
-    inode_sync_states: MutableMapping[int, ConfigSyncFileInfo],
+def _get_replication_dir_config_sync_paths_per_inode(
+    paths_per_inode: MutableMapping[int, str],
     replication_path: str,
     replication_path_excluder: Callable[[str], bool],
 ) -> None:
@@ -2050,16 +2068,14 @@ def _get_replication_dir_config_sync_file_infos_per_inode(
             dir_path = os.path.join(root, dir_name)
             try:
                 if os.path.islink(dir_path) and not dir_name == GENERAL_DIR_EXCLUDE:
-                    inode_sync_states[os.stat(dir_path).st_ino] = _get_config_sync_file_info(
-                        dir_path
-                    )
+                    paths_per_inode[os.stat(dir_path).st_ino] = dir_path
             except FileNotFoundError:
                 pass  # Ignore directories vanishing during processing
 
         for file_name in file_names:
             file_path = os.path.join(root, file_name)
             try:
-                inode_sync_states[os.stat(file_path).st_ino] = _get_config_sync_file_info(file_path)
+                paths_per_inode[os.stat(file_path).st_ino] = file_path
             except FileNotFoundError:
                 pass  # Ignore files vanishing during processing
 
@@ -2071,8 +2087,9 @@ def _prepare_for_activation_tasks(
     time_started: float,
     source: ActivationSource,
 ) -> tuple[Mapping[SiteId, ConfigSyncFileInfos], Mapping[SiteId, SiteActivationState]]:
+    hash_cache = FileHashCache.load(_config_sync_file_hashes_path())
     config_sync_file_infos_per_inode = _get_config_sync_file_infos_per_inode(
-        list(replication_path_registry.values())
+        list(replication_path_registry.values()), hash_cache
     )
     central_file_infos_per_site = {}
     site_activation_states_per_site = {}
@@ -2095,13 +2112,15 @@ def _prepare_for_activation_tasks(
 
             if activate_changes.is_sync_needed(site_id):
                 central_file_infos_per_site[site_id] = _get_site_central_file_infos(
-                    site_id, snapshot_settings, config_sync_file_infos_per_inode
+                    site_id, snapshot_settings, config_sync_file_infos_per_inode, hash_cache
                 )
         except Exception as e:
             _handle_activation_changes_exception(
                 logger.getChild(f"site[{site_id}]"), e, site_activation_state
             )
             _finalize_activation(site_id, activation_id, source)
+
+    _save_config_sync_file_hashes(hash_cache)
     return central_file_infos_per_site, site_activation_states_per_site
 
 
@@ -2109,6 +2128,7 @@ def _get_site_central_file_infos(
     site_id: SiteId,
     snapshot_settings: SnapshotSettings,
     config_sync_file_infos_per_inode: Mapping[int, ConfigSyncFileInfo],
+    hash_cache: FileHashCache,
 ) -> ConfigSyncFileInfos:
     # In case we experience performance issues here, we could postpone the hashing of the
     # central files to only be done ad-hoc in get_file_names_to_sync when the other attributes
@@ -2119,6 +2139,7 @@ def _get_site_central_file_infos(
         snapshot_settings.snapshot_components,
         site_config_dir,
         config_sync_file_infos_per_inode,
+        hash_cache,
     )
 
     logger.getChild(f"site[{site_id}]").debug(
@@ -2901,21 +2922,25 @@ def _filter_remote_files(remote_files: set[str]) -> set[str]:
     return remote_files_to_keep
 
 
-def _get_sync_archive(to_sync: list[str], base_dir: Path) -> bytes:
+def _sync_archive_create_command(base_dir: Path) -> list[str]:
     # Use native tar instead of python tarfile for performance reasons
+    return [
+        "tar",
+        "-c",
+        "-C",
+        str(base_dir),
+        "-f",
+        "-",
+        "--null",
+        "-T",
+        "-",
+        "--preserve-permissions",
+    ]
+
+
+def _get_sync_archive(to_sync: list[str], base_dir: Path) -> bytes:
     completed_process = subprocess.run(
-        [
-            "tar",
-            "-c",
-            "-C",
-            str(base_dir),
-            "-f",
-            "-",
-            "--null",
-            "-T",
-            "-",
-            "--preserve-permissions",
-        ],
+        _sync_archive_create_command(base_dir),
         input=b"\0".join(f.encode() for f in to_sync),
         capture_output=True,
         close_fds=True,
@@ -2935,33 +2960,88 @@ def _get_sync_archive(to_sync: list[str], base_dir: Path) -> bytes:
     return completed_process.stdout
 
 
-def _unpack_sync_archive(sync_archive: bytes, base_dir: Path) -> None:
-    completed_process = subprocess.run(
-        [
-            "tar",
-            "-x",
-            "-C",
-            str(base_dir),
-            "-f",
-            "-",
-            "-U",
-            "--recursive-unlink",
-            "--preserve-permissions",
-        ],
-        input=sync_archive,
-        capture_output=True,
-        close_fds=True,
-        shell=False,
-        check=False,
-    )
+@contextmanager
+def _sync_archive_stream(to_sync: list[str], base_dir: Path) -> Iterator[Iterator[bytes]]:
+    """Create a gzip compressed sync archive chunk by chunk while it is being sent
+
+    The file list and the error output go through temporary files. This way tar can never
+    block on a full pipe while the chunks are not consumed."""
+    with tempfile.TemporaryFile() as file_list, tempfile.TemporaryFile() as stderr:
+        file_list.write(b"\0".join(f.encode() for f in to_sync))
+        file_list.seek(0)
+        with subprocess.Popen(
+            [*_sync_archive_create_command(base_dir), "--gzip"],
+            stdin=file_list,
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+            close_fds=True,
+            shell=False,
+        ) as process:
+            try:
+                yield _read_sync_archive_chunks(process, stderr)
+            finally:
+                if process.poll() is None:
+                    process.kill()  # The transfer was aborted
 
-    if completed_process.returncode:
+
+def _read_sync_archive_chunks(
+    process: subprocess.Popen[bytes], stderr: IO[bytes]
+) -> Iterator[bytes]:
+    assert process.stdout is not None
+    while chunk := process.stdout.read(SYNC_ARCHIVE_CHUNK_SIZE):
+        yield chunk
+
+    if returncode := process.wait():
+        stderr.seek(0)
         raise MKGeneralException(
-            _("Failed to create sync archive [%d]: %s")
-            % (completed_process.returncode, completed_process.stderr.decode())
+            _("Failed to create sync archive [%d]: %s") % (returncode, stderr.read().decode())
         )
 
 
+def _unpack_sync_archive(
+    sync_archive: bytes | IO[bytes],
+    base_dir: Path,
+    compression: SyncArchiveCompression | None = None,
+) -> None:
+    """Extract the sync archive, a file object is fed to tar chunk by chunk"""
+    command = [
+        "tar",
+        "-x",
+        "-C",
+        str(base_dir),
+        "-f",
+        "-",
+        "-U",
+        "--recursive-unlink",
+        "--preserve-permissions",
+    ]
+    if compression == "gzip":
+        command.append("--gzip")
+
+    source = io.BytesIO(sync_archive) if isinstance(sync_archive, bytes) else sync_archive
+    with tempfile.TemporaryFile() as stderr:
+        with subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=stderr,
+            bufsize=0,
+            close_fds=True,
+            shell=False,
+        ) as process:
+            assert process.stdin is not None
+            with suppress(BrokenPipeError):  # tar gave up, the exit code tells why
+                shutil.copyfileobj(source, process.stdin, SYNC_ARCHIVE_CHUNK_SIZE)
+            process.stdin.close()
+            returncode = process.wait()
+
+        if returncode:
+            stderr.seek(0)
+            raise MKGeneralException(
+                _("Failed to create sync archive [%d]: %s") % (returncode, stderr.read().decode())
+            )
+
+
 class ConfigSyncFileInfo(NamedTuple):
     st_mode: int
     st_size: int
@@ -3007,7 +3087,11 @@ class AutomationGetConfigSyncState(AutomationCommand[list[ReplicationPath]]):
 
     def execute(self, api_request: list[ReplicationPath]) -> GetConfigSyncStateResponse:
         with store.lock_checkmk_configuration(configuration_lockfile):
-            file_infos = _get_config_sync_file_infos(api_request, base_dir=cmk.utils.paths.omd_root)
+            hash_cache = FileHashCache.load(_config_sync_file_hashes_path())
+            file_infos = _get_config_sync_file_infos(
+                api_request, base_dir=cmk.utils.paths.omd_root, hash_cache=hash_cache
+            )
+            _save_config_sync_file_hashes(hash_cache)
             transport_file_infos = {
                 k: (v.st_mode, v.st_size, v.link_target, v.file_hash) for k, v in file_infos.items()
             }
@@ -3047,18 +3131,21 @@ def _get_config_sync_file_infos(
     replication_paths: list[ReplicationPath],
     base_dir: Path,
     config_sync_file_infos_per_inode: Mapping[int, ConfigSyncFileInfo] | None = None,
+    hash_cache: FileHashCache | None = None,
 ) -> ConfigSyncFileInfos:
     """Scans the given replication paths for the information needed for the config sync
 
     It produces a dictionary of sync file infos. One entry is created for each file.  Directories
     are not added to the dictionary unless it is a symlink.
     Since files to be synced for different site are copied as hardlink, the sync file infos can be
-    precomputed and the relevant info then identified via the files inode
+    precomputed and the relevant info then identified via the files inode. The infos of all
+    other files are computed at once in the end, reusing the hashes of the unchanged files.
     """
     if config_sync_file_infos_per_inode is None:
         config_sync_file_infos_per_inode = {}
 
-    infos = {}
+    infos: dict[str, ConfigSyncFileInfo] = {}
+    uncached_paths: dict[str, str] = {}
     for replication_path in replication_paths:
         replication_path_full = str(base_dir.joinpath(replication_path.site_path))
 
@@ -3067,13 +3154,12 @@ def _get_config_sync_file_infos(
 
         match replication_path.ty:
             case ReplicationPathType.FILE:
-                infos[replication_path.site_path] = _get_config_sync_file_info(
-                    replication_path_full
-                )
+                uncached_paths[replication_path.site_path] = replication_path_full
 
             case ReplicationPathType.DIR:
                 _get_replication_dir_config_sync_file_infos(
                     infos,
+                    uncached_paths,
                     config_sync_file_infos_per_inode,
                     base_dir,
                     replication_path_full,
@@ -3081,11 +3167,18 @@ def _get_config_sync_file_infos(
                 )
             case _:
                 assert_never(replication_path.ty)
+
+    infos.update(
+        _get_config_sync_file_infos_bulk(
+            uncached_paths, FileHashCache() if hash_cache is None else hash_cache
+        )
+    )
     return infos
 
 
 def _get_replication_dir_config_sync_file_infos(
     infos: MutableMapping[str, ConfigSyncFileInfo],
+    uncached_paths: MutableMapping[str, str],
     config_sync_file_infos_per_inode: Mapping[int, ConfigSyncFileInfo],
     base_dir: Path,
     replication_path: str,
@@ -3109,31 +3202,51 @@ def _get_replication_dir_config_sync_file_infos(
                 ):
                     infos[valid_site_path] = sync_file_info
                 else:
-                    infos[valid_site_path] = _get_config_sync_file_info(config_sync_path)
+                    uncached_paths[valid_site_path] = config_sync_path
             except FileNotFoundError:  # e.g. broken symlinks
-                infos[valid_site_path] = _get_config_sync_file_info(config_sync_path)
+                uncached_paths[valid_site_path] = config_sync_path
 
 
-def _get_config_sync_file_info(file_path: str) -> ConfigSyncFileInfo:
-    stat = os.lstat(file_path)
-    is_symlink = os.path.islink(file_path)
-    return ConfigSyncFileInfo(
-        stat.st_mode,
-        stat.st_size,
-        os.readlink(str(file_path)) if is_symlink else None,
-        _create_config_sync_file_hash(file_path) if not is_symlink else None,
+def _get_config_sync_file_infos_bulk[K](
+    file_paths: Mapping[K, str], hash_cache: FileHashCache
+) -> dict[K, ConfigSyncFileInfo]:
+    """Compute the sync infos of the given files, skipping the ones vanishing meanwhile"""
+    stats: dict[K, os.stat_result] = {}
+    link_targets: dict[K, str] = {}
+    for key, file_path in file_paths.items():
+        try:
+            stats[key] = os.lstat(file_path)
+            if S_ISLNK(stats[key].st_mode):
+                link_targets[key] = os.readlink(file_path)
+        except FileNotFoundError:
+            stats.pop(key, None)
+
+    file_hashes = hash_cache.hash_files(
+        {key: (file_paths[key], st) for key, st in stats.items() if key not in link_targets},
+        workers=_CONFIG_SYNC_HASH_WORKERS,
     )
+    return {
+        key: ConfigSyncFileInfo(st.st_mode, st.st_size, link_targets.get(key), file_hashes.get(key))
+        for key, st in stats.items()
+        if key in link_targets or key in file_hashes
+    }
 
 
-def _create_config_sync_file_hash(file_path: str) -> str:
-    sha256 = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        while True:
-            chunk = f.read(65536)
-            if not chunk:
-                break
-            sha256.update(chunk)
-    return sha256.hexdigest()
+def _config_sync_file_hashes_path() -> Path:
+    return wato_var_dir() / "config-sync-file-hashes.pkl"
+
+
+def _save_config_sync_file_hashes(hash_cache: FileHashCache) -> None:
+    try:
+        hash_cache.save(_config_sync_file_hashes_path())
+    except OSError as e:
+        logger.warning("Failed to save the config sync file hashes: %s", e)
+    logger.info(
+        "Config sync file hashes: %d cached, %d computed (%.0f%% hit rate)",
+        hash_cache.hits,
+        hash_cache.misses,
+        hash_cache.hit_rate * 100,
+    )
 
 
 def update_config_generation() -> None:
@@ -3158,9 +3271,10 @@ def _config_generation_path() -> Path:
 
 class ReceiveConfigSyncRequest(NamedTuple):
     site_id: SiteId
-    sync_archive: bytes
+    sync_archive: bytes | IO[bytes]
     to_delete: list[str]
     config_generation: int
+    compression: SyncArchiveCompression | None = None
 
 
 class AutomationReceiveConfigSync(AutomationCommand[ReceiveConfigSyncRequest]):
@@ -3178,12 +3292,31 @@ class AutomationReceiveConfigSync(AutomationCommand[ReceiveConfigSyncRequest]):
         site_id = SiteId(_request.get_ascii_input_mandatory("site_id"))
         verify_remote_site_config(site_id)
 
-        return ReceiveConfigSyncRequest(
-            site_id,
-            _request.uploaded_file("sync_archive")[2],
-            ast.literal_eval(_request.get_str_input_mandatory("to_delete")),
-            _request.get_integer_input_mandatory("config_generation"),
-        )
+        to_delete = ast.literal_eval(_request.get_str_input_mandatory("to_delete"))
+        config_generation = _request.get_integer_input_mandatory("config_generation")
+
+        match compression := _request.get_ascii_input("sync_archive_compression"):
+            case None:
+                return ReceiveConfigSyncRequest(
+                    site_id,
+                    _request.uploaded_file("sync_archive")[2],
+                    to_delete,
+                    config_generation,
+                )
+            case "gzip":
+                # Streamed by the central site, leave it where werkzeug spooled it
+                return ReceiveConfigSyncRequest(
+                    site_id,
+                    _request.uploaded_file_stream("sync_archive"),
+                    to_delete,
+                    config_generation,
+                    compression,
+                )
+            case _:
+                raise MKUserError(
+                    "sync_archive_compression",
+                    _("Unsupported sync archive compression: %s") % compression,
+                )
 
     def execute(self, api_request: ReceiveConfigSyncRequest) -> bool:
         with store.lock_checkmk_configuration(configuration_lockfile):
@@ -3197,7 +3330,9 @@ class AutomationReceiveConfigSync(AutomationCommand[ReceiveConfigSyncRequest]):
                 )
 
             logger.debug("Updating configuration from sync snapshot")
-            self._update_config_on_remote_site(api_request.sync_archive, api_request.to_delete)
+            self._update_config_on_remote_site(
+                api_request.sync_archive, api_request.to_delete, api_request.compression
+            )
 
             logger.debug("Executing post sync actions")
             _execute_post_config_sync_actions(api_request.site_id)
@@ -3205,7 +3340,12 @@ class AutomationReceiveConfigSync(AutomationCommand[ReceiveConfigSyncRequest]):
             logger.debug("Done")
             return True
 
-    def _update_config_on_remote_site(self, sync_archive: bytes, to_delete: list[str]) -> None:
+    def _update_config_on_remote_site(
+        self,
+        sync_archive: bytes | IO[bytes],
+        to_delete: list[str],
+        compression: SyncArchiveCompression | None = None,
+    ) -> None:
         """Use the given tar archive and list of files to be deleted to update the local files"""
         base_dir = cmk.utils.paths.omd_root
         base_folder_path = str(cmk.utils.paths.check_mk_config_dir / "wato")
@@ -3241,7 +3381,7 @@ class AutomationReceiveConfigSync(AutomationCommand[ReceiveConfigSyncRequest]):
                         and not os.listdir(parent)  # It's empty
                     ):
                         os.rmdir(parent)
-            _unpack_sync_archive(sync_archive, base_dir)
+            _unpack_sync_archive(sync_archive, base_dir, compression)
         finally:
             if keep_local_users:
                 _reintegrate_site_local_users(current_users, active_connectors)
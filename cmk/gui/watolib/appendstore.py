@@ -5,6 +5,11 @@
 
 import abc
 import ast
+import bisect
+import json
+import math
+import os
+from array import array
 from collections.abc import Iterator, Sequence
 from contextlib import contextmanager
 from pathlib import Path
@@ -22,10 +27,16 @@ _VT = TypeVar("_VT")
 class ABCAppendStore(Generic[_VT], abc.ABC):
     """Managing a file with structured data that can be appended in a cheap way
 
-    The file holds basic python structures separated by "\\0".
+    The file holds JSON encoded entries separated by "\\0". Files written by
+    earlier versions hold python literals, these are still understood.
+
+    Appending writes to the end of the file without reading it. Stores which
+    know the time of their entries (`indexed`) additionally maintain an index
+    next to the file which lets `read_since()` skip the older entries.
     """
 
     separator = b"\0"
+    indexed = False
 
     @staticmethod
     @abc.abstractmethod
@@ -36,7 +47,7 @@ class ABCAppendStore(Generic[_VT], abc.ABC):
             Abstract static methods do not make any sense.  This should
             either be a free function or on `entry : _VT`.
 
-        Override this to execute some logic before repr()"""
+        Override this to execute some logic before the JSON encoding"""
         raise NotImplementedError()
 
     @staticmethod
@@ -48,18 +59,29 @@ class ABCAppendStore(Generic[_VT], abc.ABC):
             Abstract static methods do not make any sense.  This should
             either be a free function or on `entry : _VT`.
 
-        Override this to execute some logic after literal_eval() to produce _VT objects"""
+        Override this to execute some logic after the decoding to produce _VT objects"""
+        raise NotImplementedError()
+
+    @staticmethod
+    def _entry_time(entry: _VT) -> float:
+        """The time of an entry, needed by indexed stores"""
         raise NotImplementedError()
 
     def __init__(self, path: Path) -> None:
         self._path = path
 
+    @property
+    def _index_path(self) -> Path:
+        # Hidden, so that it is not mistaken for an archived data file
+        return self._path.with_name(f".{self._path.name}.index")
+
     def exists(self) -> bool:
         return self._path.exists()
 
-    def __read_bytes(self) -> list[bytes]:
+    def __read_bytes(self, offset: int = 0) -> list[bytes]:
         try:
             with self._path.open("rb") as f:
+                f.seek(offset)
                 return [entry for entry in f.read().split(self.separator) if entry]
         except FileNotFoundError:
             return []
@@ -67,38 +89,72 @@ class ABCAppendStore(Generic[_VT], abc.ABC):
     def __write_bytes(self, entries: Sequence[bytes]) -> None:
         try:
             content = self.separator.join(entry for entry in entries)
+            self._index_path.unlink(missing_ok=True)
             store.save_bytes_to_file(self._path, content)
         except Exception as e:
             raise MKGeneralException(_('Cannot write file "%s": %s') % (self._path, e))
 
     def __to_bytes(self, entry: _VT) -> bytes:
-        return repr(self._serialize(entry)).encode("utf-8")
+        # JSON never contains a raw "\0" or "\n", so it is safe to use with both separators
+        return json.dumps(self._serialize(entry), separators=(",", ":")).encode("utf-8")
+
+    def __from_bytes(self, raw: bytes) -> _VT:
+        text = raw.decode("utf-8")
+        try:
+            return self._deserialize(json.loads(text))
+        except json.JSONDecodeError:
+            # Entry written before the switch to JSON
+            return self._deserialize(ast.literal_eval(text))
+
+    def __parse(self, raw_entries: Sequence[bytes]) -> list[_VT]:
+        try:
+            return [self.__from_bytes(entry) for entry in raw_entries]
+        except SyntaxError as e:
+            raise MKUserError(
+                None,
+                _(
+                    "The audit log can not be shown because of "
+                    "a syntax error in %s.<br><br>Please review and fix the file "
+                    "content or remove the file before you visit this page "
+                    "again.<br><br>The problematic entry is:<br>%s"
+                )
+                % (self._path, e.text),
+            )
 
     def read(self) -> Sequence[_VT]:
         """Parse the file and return the entries"""
         with store.locked(self._path):
-            try:
-                return [
-                    self._deserialize(ast.literal_eval(entry.decode("utf-8")))
-                    for entry in self.__read_bytes()
-                ]
-            except SyntaxError as e:
-                raise MKUserError(
-                    None,
-                    _(
-                        "The audit log can not be shown because of "
-                        "a syntax error in %s.<br><br>Please review and fix the file "
-                        "content or remove the file before you visit this page "
-                        "again.<br><br>The problematic entry is:<br>%s"
-                    )
-                    % (self._path, e.text),
-                )
+            return self.__parse(self.__read_bytes())
+
+    def read_since(self, timestamp: float) -> Sequence[_VT]:
+        """Return the entries with a time of at least timestamp
+
+        Indexed stores only parse the tail of the file which may hold such entries."""
+        if not self.indexed:
+            return [entry for entry in self.read() if self._entry_time(entry) >= timestamp]
+
+        with store.locked(self._path):
+            if (index := self.__load_index()) is None:
+                entries = self.__rebuild_index()
+            else:
+                # The index holds pairs of (latest time so far, end offset of the entry)
+                position = bisect.bisect_left(index[1::2], timestamp)
+                entries = self.__parse(self.__read_bytes(index[2 * position] if position else 0))
+        return [entry for entry in entries if self._entry_time(entry) >= timestamp]
 
     def append(self, entry: _VT) -> None:
+        record = self.separator + self.__to_bytes(entry)
         with store.locked(self._path):
-            entries = self.__read_bytes()
-            entries.append(self.__to_bytes(entry))
-            self.__write_bytes(entries)
+            fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o660)
+            try:
+                # A single write: O_APPEND puts it at the end of the file, whatever its size
+                os.write(fd, record)
+                stat = os.fstat(fd)
+            finally:
+                os.close(fd)
+
+            if self.indexed:
+                self.__extend_index(stat, stat.st_size - len(record), self._entry_time(entry))
 
     @contextmanager
     def mutable_view(self) -> Iterator[list[_VT]]:
@@ -108,3 +164,77 @@ class ABCAppendStore(Generic[_VT], abc.ABC):
                 yield entries
             finally:
                 self.__write_bytes([self.__to_bytes(entry) for entry in entries])
+
+    # The index is a flat array of int64: the inode of the data file it belongs to, followed by
+    # a pair for each entry. The times are rounded up, which keeps the lookup in read_since() on
+    # the safe side for stores with fractional times.
+
+    def __load_index(self) -> array[int] | None:
+        try:
+            index = array("q", self._index_path.read_bytes())
+            stat = self._path.stat()
+        except (FileNotFoundError, ValueError):
+            return None
+        if not index or index[0] != stat.st_ino or len(index) % 2 != 1:
+            return None
+        if (index[-1] if len(index) > 1 else 0) != stat.st_size:
+            return None  # the data file has been changed behind our back
+        return index
+
+    def __extend_index(self, stat: os.stat_result, previous_size: int, entry_time: float) -> None:
+        if previous_size == 0:
+            index = array("q", [stat.st_ino])
+            max_time = math.ceil(entry_time)
+        elif (loaded := self.__load_index_tail(stat, previous_size)) is None:
+            return  # the index is rebuilt by the next read_since()
+        else:
+            index, max_time = array("q"), max(loaded, math.ceil(entry_time))
+
+        index.extend((max_time, stat.st_size))
+        mode = "wb" if previous_size == 0 else "ab"
+        with self._index_path.open(mode) as f:
+            index.tofile(f)
+
+    def __load_index_tail(self, stat: os.stat_result, previous_size: int) -> int | None:
+        """Check the index against the data file before the append, return the latest time"""
+        try:
+            with self._index_path.open("rb") as f:
+                head = array("q")
+                head.fromfile(f, 1)
+                f.seek(-2 * head.itemsize, os.SEEK_END)
+                tail = array("q")
+                tail.fromfile(f, 2)
+        except (FileNotFoundError, EOFError, OSError):
+            return None
+        if head[0] != stat.st_ino or tail[1] != previous_size:
+            return None
+        return tail[0]
+
+    def __rebuild_index(self) -> list[_VT]:
+        """Parse the whole file and write a fresh index for it"""
+        try:
+            with self._path.open("rb") as f:
+                stat = os.fstat(f.fileno())
+                content = f.read()
+        except FileNotFoundError:
+            return []
+
+        raw_entries: list[bytes] = []
+        ends: list[int] = []
+        offset = 0
+        for raw in content.split(self.separator):
+            offset = min(offset + len(raw) + len(self.separator), len(content))
+            if raw:
+                raw_entries.append(raw)
+                ends.append(offset)
+        if ends:
+            ends[-1] = len(content)  # covers trailing separators
+
+        entries = self.__parse(raw_entries)
+        index = array("q", [stat.st_ino])
+        max_time = -math.inf
+        for entry, end in zip(entries, ends):
+            max_time = max(max_time, math.ceil(self._entry_time(entry)))
+            index.extend((int(max_time), end))
+        store.save_bytes_to_file(self._index_path, index.tobytes())
+        return entries
@@ -46,6 +46,7 @@ class AuditLogFilterRaw(TypedDict, total=False):
 
 class AuditLogStore(ABCAppendStore["AuditLogStore.Entry"]):
     separator = b"\n"
+    indexed = True
 
     def __init__(self, filepath: Path = wato_var_dir() / "log" / "wato_audit.log") -> None:
         super().__init__(path=filepath)
@@ -91,6 +92,10 @@ class AuditLogStore(ABCAppendStore["AuditLogStore.Entry"]):
     def _deserialize(raw: object) -> AuditLogStore.Entry:
         return AuditLogStore.Entry.deserialize(raw)
 
+    @staticmethod
+    def _entry_time(entry: AuditLogStore.Entry) -> float:
+        return entry.time
+
     def clear(self) -> None:
         """Instead of just removing, like ABCAppendStore, archive the existing file"""
         if not self.exists():
@@ -107,12 +112,17 @@ class AuditLogStore(ABCAppendStore["AuditLogStore.Entry"]):
                     break
 
         self._path.rename(newpath)
+        self._index_path.unlink(missing_ok=True)
 
     def read(self, options: AuditLogFilter | None = None) -> Sequence[AuditLogStore.Entry]:
-        entries = super().read()
-
         if options is None:
-            return entries
+            return super().read()
+
+        entries = (
+            self.read_since(options["timestamp_from"])
+            if "timestamp_from" in options
+            else super().read()
+        )
 
         return [entry for entry in entries if AuditLogStore.filter_entry(entry, options)]
 
@@ -150,7 +160,7 @@ class AuditLogStore(ABCAppendStore["AuditLogStore.Entry"]):
         return True
 
     def get_entries_since(self, timestamp: int) -> Sequence[AuditLogStore.Entry]:
-        return [entry for entry in self.read() if entry.time > timestamp]
+        return [entry for entry in self.read_since(timestamp) if entry.time > timestamp]
 
     @classmethod
     def to_json(cls, entries: Sequence[AuditLogStore.Entry]) -> str:
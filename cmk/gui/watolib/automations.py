@@ -13,6 +13,7 @@ import functools
 import json
 import os
 import re
+import secrets
 import subprocess
 import time
 from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
@@ -315,7 +316,7 @@ def _do_remote_automation_serialized(
     automation_config: RemoteAutomationConfig,
     command: str,
     vars_: Sequence[tuple[str, str]],
-    files: Mapping[str, BytesIO] | None,
+    files: Mapping[str, BytesIO | Iterable[bytes]] | None,
     timeout: float | None,
     debug: bool,
 ) -> str:
@@ -338,9 +339,25 @@ def _do_remote_automation_serialized(
         }
     )
 
-    response = get_url(
-        url, automation_config.insecure, data=post_data, files=files, timeout=timeout
-    )
+    buffered_files = {k: f for k, f in (files or {}).items() if isinstance(f, BytesIO)}
+    if files and len(buffered_files) < len(files):
+        # Stream the request body instead of building it in memory (chunked transfer encoding)
+        boundary = secrets.token_hex(16)
+        response = get_url_raw(
+            url,
+            automation_config.insecure,
+            data=_multipart_form_data(post_data, files, boundary),
+            timeout=timeout,
+            add_headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+        ).text
+    else:
+        response = get_url(
+            url,
+            automation_config.insecure,
+            data=post_data,
+            files=buffered_files or None,
+            timeout=timeout,
+        )
 
     auto_logger.debug("RESPONSE: %r", response)
 
@@ -350,6 +367,27 @@ def _do_remote_automation_serialized(
     return response
 
 
+def _multipart_form_data(
+    fields: Mapping[str, str], files: Mapping[str, BytesIO | Iterable[bytes]], boundary: str
+) -> Iterator[bytes]:
+    for name, value in fields.items():
+        yield (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+            f"{value}\r\n"
+        ).encode("utf-8")
+    for name, content in files.items():
+        yield (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{name}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode("utf-8")
+        if isinstance(content, BytesIO):
+            yield content.getvalue()
+        else:
+            yield from content
+        yield b"\r\n"
+    yield f"--{boundary}--\r\n".encode("utf-8")
+
+
 def _sanitize_remote_automation_config(config: RemoteAutomationConfig) -> dict[str, object]:
     return asdict(replace(config, secret="redacted"))
 
@@ -384,9 +422,12 @@ def do_remote_automation(
     command: str,
     vars_: Sequence[tuple[str, str]],
     debug: bool,
-    files: Mapping[str, BytesIO] | None = None,
+    files: Mapping[str, BytesIO | Iterable[bytes]] | None = None,
     timeout: float | None = None,
 ) -> object:
+    """Execute an automation command on a remote site
+
+    Files given as iterables of chunks are streamed to the remote site."""
     serialized_response = _do_remote_automation_serialized(
         automation_config=automation_config,
         command=command,
@@ -412,7 +453,7 @@ def get_url_raw(
     url: str,
     insecure: bool,
     auth: tuple[str, str] | None = None,
-    data: Mapping[str, str] | None = None,
+    data: Mapping[str, str] | Iterable[bytes] | None = None,
     files: Mapping[str, BytesIO] | None = None,
     timeout: float | None = None,
     add_headers: dict[str, str] | None = None,
@@ -7,6 +7,7 @@ from collections.abc import Collection, Iterable, Mapping
 
 from livestatus import SiteConfiguration
 
+import cmk.ccc.version as cmk_version
 from cmk.ccc.hostaddress import HostName
 from cmk.ccc.site import omd_site, SiteId
 
@@ -14,7 +15,9 @@ from cmk.utils.paths import omd_root
 
 from cmk.gui.exceptions import MKUserError
 from cmk.gui.i18n import _
-from cmk.gui.site_config import is_wato_slave_site
+from cmk.gui.site_config import is_wato_slave_site, site_is_local
+from cmk.gui.sites import SiteStatus
+from cmk.gui.sites import states as sites_states
 from cmk.gui.type_defs import GlobalSettings
 from cmk.gui.watolib.site_changes import ChangeSpec
 
@@ -49,10 +52,41 @@ def distribute_piggyback_hub_configs(
     dirty_sites: Collection[SiteId],  # only needed in CME case.
     hosts_sites: Mapping[HostName, SiteId],
 ) -> None:
+    batch_sites = _sites_receiving_batches(
+        _filter_for_enabled_piggyback_hub(global_settings, configured_sites)
+    )
     for destination_site, locations in compute_new_config(
         global_settings, configured_sites, hosts_sites
     ):
-        publish_persisted_locations(destination_site, locations, omd_root, omd_site())
+        publish_persisted_locations(
+            destination_site, locations, omd_root, omd_site(), batch_sites=batch_sites
+        )
+
+
+def _sites_receiving_batches(sites: Mapping[SiteId, SiteConfiguration]) -> frozenset[SiteId]:
+    """The sites running this version or a newer one, which can receive payload batches
+
+    The versions are the ones the GUI already got from the livestatus of the sites. Sites
+    of older or unknown versions, e.g. remote sites not updated yet or currently not
+    reachable, get one message per payload.
+    """
+    site_states = sites_states()
+    this_version = cmk_version.Version.from_str(cmk_version.__version__)
+    return frozenset(
+        site_id
+        for site_id, site_config in sites.items()
+        if site_is_local(site_config, site_id)
+        or _runs_version_or_newer(site_states.get(site_id, SiteStatus({})), this_version)
+    )
+
+
+def _runs_version_or_newer(site_status: SiteStatus, version: cmk_version.Version) -> bool:
+    if not (site_version := site_status.get("livestatus_version")):
+        return False
+    try:
+        return cmk_version.Version.from_str(site_version) >= version
+    except ValueError:
+        return False
 
 
 def compute_new_config(
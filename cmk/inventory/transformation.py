@@ -16,7 +16,12 @@ import cmk.ccc.store
 from cmk.ccc.hostaddress import HostName
 
 import cmk.utils.paths
-from cmk.utils.structured_data import InventoryPaths, TreePath, TreePathGz
+from cmk.utils.structured_data import (
+    InventoryPaths,
+    is_archive_delta,
+    TreePath,
+    TreePathGz,
+)
 
 
 @dataclass(frozen=True)
@@ -99,6 +104,8 @@ def _iter_host_tree_paths_or_unknown_file_paths(
 
         raw_host_name = host_dir.name
         for file_path in file_paths:
+            if is_archive_delta(file_path):
+                continue
             tree_path = TreePath.from_archive_or_delta_cache_file_path(file_path)
             if stat := _compute_file_path_stat(tree_path.legacy):
                 yield _HostTreePath(raw_host_name, tree_path, stat)
@@ -13,6 +13,7 @@ from ._storage import (
     PiggybackMetaData,
     remove_source_status_file,
     store_piggyback_raw_data,
+    watch_new_message_batches,
     watch_new_messages,
 )
 
@@ -27,5 +28,6 @@ __all__ = [
     "PiggybackMetaData",
     "remove_source_status_file",
     "store_piggyback_raw_data",
+    "watch_new_message_batches",
     "watch_new_messages",
 ]
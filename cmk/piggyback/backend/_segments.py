@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Storing the piggyback payloads of a source in one file, a segment
+
+A source sending data for many hosts would create a file per piggybacked host in every check
+cycle. Instead, all its payloads are written to one segment, which replaces the last one in an
+atomic rename.
+
+A segment starts with a header and an index of fixed size entries, sorted by a hash of the name
+of the piggybacked host. The names and the payloads follow. Looking up the payload of one host
+reads only a few pages of the segment.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Final
+
+from cmk.ccc.hostaddress import HostName
+
+# Sources with this number of piggybacked hosts are stored in a segment
+SEGMENT_MIN_HOSTS: Final = 100
+
+_MAGIC: Final = b"CMKPGS01"
+# The magic, the time of the last write and the number of entries
+_HEADER: Final = struct.Struct("<8sqI")
+# The hash of the name, its offset and length, the length of the payload and the last update
+_INDEX_ENTRY: Final = struct.Struct("<QQHIq")
+
+
+@dataclass(frozen=True)
+class SegmentEntry:
+    piggybacked: HostName
+    last_update: int
+    raw_data: bytes
+
+
+@dataclass(frozen=True)
+class SegmentIndexEntry:
+    piggybacked: HostName
+    last_update: int
+
+
+def _name_hash(name: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(name, digest_size=8).digest(), "little")
+
+
+def write_segment(path: Path, entries: Iterable[SegmentEntry], written: int) -> None:
+    """Replace the segment in a race-condition free manner"""
+    encoded = sorted(
+        (_name_hash(name := entry.piggybacked.encode()), name, entry)
+        for entry in {entry.piggybacked: entry for entry in entries}.values()
+    )
+    offset = _HEADER.size + len(encoded) * _INDEX_ENTRY.size
+    index = []
+    for name_hash, name, entry in encoded:
+        index.append(
+            _INDEX_ENTRY.pack(name_hash, offset, len(name), len(entry.raw_data), entry.last_update)
+        )
+        offset += len(name) + len(entry.raw_data)
+
+    path.parent.mkdir(mode=0o770, exist_ok=True, parents=True)
+    with tempfile.NamedTemporaryFile(
+        "wb", dir=str(path.parent), prefix=f".{path.name}.new", delete=False
+    ) as tmp:
+        tmp.write(_HEADER.pack(_MAGIC, written, len(encoded)))
+        tmp.writelines(index)
+        for _hash, name, entry in encoded:
+            tmp.write(name)
+            tmp.write(entry.raw_data)
+    os.rename(tmp.name, str(path))
+
+
+class _Segment:
+    def __init__(self, data: mmap.mmap) -> None:
+        magic, self.written, self._count = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("not a piggyback segment")
+        self._data = data
+
+    def _index_entry(self, nr: int) -> tuple[int, int, int, int, int]:
+        return _INDEX_ENTRY.unpack_from(self._data, _HEADER.size + nr * _INDEX_ENTRY.size)
+
+    def _name(self, offset: int, name_length: int) -> HostName:
+        return HostName(self._data[offset : offset + name_length].decode())
+
+    def index(self) -> Iterator[SegmentIndexEntry]:
+        for nr in range(self._count):
+            _name_hash, offset, name_length, _length, last_update = self._index_entry(nr)
+            yield SegmentIndexEntry(self._name(offset, name_length), last_update)
+
+    def entries(self) -> Iterator[SegmentEntry]:
+        for nr in range(self._count):
+            _name_hash, offset, name_length, length, last_update = self._index_entry(nr)
+            start = offset + name_length
+            yield SegmentEntry(
+                self._name(offset, name_length), last_update, self._data[start : start + length]
+            )
+
+    def find(self, piggybacked: HostName) -> SegmentEntry | None:
+        name = piggybacked.encode()
+        name_hash = _name_hash(name)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._index_entry(middle)[0] < name_hash:
+                low = middle + 1
+            else:
+                high = middle
+        for nr in range(low, self._count):
+            entry_hash, offset, name_length, length, last_update = self._index_entry(nr)
+            if entry_hash != name_hash:
+                break
+            if self._data[offset : offset + name_length] == name:
+                start = offset + name_length
+                return SegmentEntry(piggybacked, last_update, self._data[start : start + length])
+        return None
+
+
+@contextmanager
+def _open_segment(path: Path) -> Iterator[_Segment | None]:
+    """The segment, or None if there is none (anymore)"""
+    try:
+        file = path.open("rb")
+    except FileNotFoundError:
+        yield None
+        return
+    with file:
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # an empty file
+            yield None
+            return
+        with data:
+            try:
+                segment = _Segment(data)
+            except (ValueError, struct.error):
+                yield None  # not a segment at all
+                return
+            yield segment
+
+
+def read_segment_written(path: Path) -> int | None:
+    with _open_segment(path) as segment:
+        return None if segment is None else segment.written
+
+
+def read_segment_entry(path: Path, piggybacked: HostName) -> SegmentEntry | None:
+    with _open_segment(path) as segment:
+        return None if segment is None else segment.find(piggybacked)
+
+
+def read_segment_index(path: Path) -> Sequence[SegmentIndexEntry]:
+    with _open_segment(path) as segment:
+        return [] if segment is None else list(segment.index())
+
+
+def read_segment_entries(path: Path) -> Sequence[SegmentEntry]:
+    with _open_segment(path) as segment:
+        return [] if segment is None else list(segment.entries())
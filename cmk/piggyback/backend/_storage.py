@@ -5,13 +5,15 @@
 
 import datetime
 import errno
+import itertools
 import json
 import logging
 import os
 import shutil
 import tempfile
 import time
-from collections.abc import Iterable, Iterator, Mapping, Sequence
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from contextlib import suppress
 from dataclasses import asdict, dataclass
 from pathlib import Path
 from typing import Self
@@ -19,7 +21,17 @@ from typing import Self
 from cmk.ccc.hostaddress import HostAddress, HostName
 
 from ._inotify import Event, INotify, Masks
-from ._paths import payload_dir, source_status_dir
+from ._paths import payload_dir, segment_dir, source_status_dir
+from ._segments import (
+    read_segment_entries,
+    read_segment_entry,
+    read_segment_index,
+    read_segment_written,
+    SEGMENT_MIN_HOSTS,
+    SegmentEntry,
+    SegmentIndexEntry,
+    write_segment,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -67,25 +79,44 @@ class PiggybackMessage:
 # "source_hostname":
 # - Path(tmp/check_mk/piggyback/HOST/SOURCE).name
 # - Path(tmp/check_mk/piggyback_sources/SOURCE).name
+# - Path(tmp/check_mk/piggyback_segments/SOURCE).name
+#
+# "segment":
+# - tmp/check_mk/piggyback_segments/SOURCE
+#   The payloads of a source with many piggybacked hosts, see _segments.py. For a piggybacked
+#   host, the newer of the payload in the segment and in the piggybacked_host_source counts.
 
 
 def watch_new_messages(omd_root: Path) -> Iterator[PiggybackMessage]:
     """Yields piggyback messages as they come in."""
+    for batch in watch_new_message_batches(omd_root, window=0):
+        yield from batch
+
+
+def watch_new_message_batches(
+    omd_root: Path, window: float
+) -> Iterator[Sequence[PiggybackMessage]]:
+    """Yields the piggyback messages coming in up to `window` seconds after the first one
+
+    All messages of a segment, or of a source writing its files at once, end up in one batch.
+    """
 
     inotify = INotify()
     watch_for_new_piggybacked_hosts = inotify.add_watch(payload_dir(omd_root), Masks.CREATE)
     watch_for_deleted_status_files = inotify.add_watch(source_status_dir(omd_root), Masks.DELETE)
+    segment_dir(omd_root).mkdir(mode=0o770, exist_ok=True, parents=True)
+    watch_for_new_segments = inotify.add_watch(segment_dir(omd_root), Masks.MOVED_TO)
     for folder in _get_piggybacked_host_folders(omd_root):
         inotify.add_watch(folder, Masks.MOVED_TO)
 
-    for event in inotify.read_forever():
+    def _messages_of_event(event: Event) -> Iterator[PiggybackMessage]:
         # check if a new piggybacked host folder was created
         if event.watchee == watch_for_new_piggybacked_hosts:
             if event.type & Masks.CREATE:
                 inotify.add_watch(event.watchee.path / event.name, Masks.MOVED_TO)
                 # Handle all files already in the folder (we rather have duplicates than missing files)
                 yield from get_messages_for(HostAddress(event.name), omd_root)
-            continue
+            return
         if event.watchee == watch_for_deleted_status_files:
             if event.type & Masks.DELETE:
                 source = HostName(event.name)
@@ -99,11 +130,25 @@ def watch_new_messages(omd_root: Path) -> Iterator[PiggybackMessage]:
                         ),
                         b"",
                     )
-            continue
+            return
+        if event.watchee == watch_for_new_segments:
+            if event.type & Masks.MOVED_TO:
+                yield from _get_updated_messages_of_segment(HostName(event.name), omd_root)
+            return
 
         if message := _make_message_from_event(event, omd_root):
             yield message
 
+    while True:
+        batch = [message for event in inotify.read() for message in _messages_of_event(event)]
+        deadline = time.monotonic() + window
+        while (remaining := deadline - time.monotonic()) > 0 and (
+            events := inotify.read(timeout=remaining)
+        ):
+            batch.extend(message for event in events for message in _messages_of_event(event))
+        if batch:
+            yield batch
+
 
 def _make_message_from_event(event: Event, omd_root: Path) -> PiggybackMessage | None:
     source = HostAddress(event.name)
@@ -125,11 +170,32 @@ def _make_message_from_event(event: Event, omd_root: Path) -> PiggybackMessage |
     )
 
 
+def _get_updated_messages_of_segment(
+    source: HostName, omd_root: Path
+) -> Iterator[PiggybackMessage]:
+    """The messages written to the segment by its last update"""
+    segment_path = _get_segment_path(source, omd_root)
+    if (written := read_segment_written(segment_path)) is None:
+        return
+    last_contact = _get_mtime(_get_source_status_file_path(source, omd_root))
+    for entry in read_segment_entries(segment_path):
+        if entry.last_update >= written:
+            yield PiggybackMessage(
+                PiggybackMetaData(
+                    source=source,
+                    piggybacked=entry.piggybacked,
+                    last_update=entry.last_update,
+                    last_contact=last_contact,
+                ),
+                entry.raw_data,
+            )
+
+
 def get_messages_for(
     piggybacked_hostname: HostAddress, omd_root: Path
 ) -> Sequence[PiggybackMessage]:
     """Returns piggyback messages for the given host"""
-    piggyback_meta_data = _get_payload_meta_data(piggybacked_hostname, omd_root)
+    piggyback_meta_data = _get_file_meta_data(piggybacked_hostname, omd_root)
     logger.debug("%s piggyback files for '%s'.", len(piggyback_meta_data), piggybacked_hostname)
 
     piggyback_data = []
@@ -148,15 +214,24 @@ def get_messages_for(
         logger.debug("Read piggyback file '%s'", content_path)
         piggyback_data.append(PiggybackMessage(meta_data, raw_data))
 
-    return piggyback_data
+    for source in _get_segment_sources(omd_root):
+        if entry := read_segment_entry(_get_segment_path(source, omd_root), piggybacked_hostname):
+            piggyback_data.append(
+                PiggybackMessage(
+                    _make_segment_meta_data(source, entry.piggybacked, entry.last_update, omd_root),
+                    entry.raw_data,
+                )
+            )
+
+    return _newest_of_each_source(piggyback_data, lambda message: message.meta)
 
 
 def get_piggybacked_host_with_sources(
     omd_root: Path, piggybacked_hostname: HostName | None = None
 ) -> Mapping[HostAddress, Sequence[PiggybackMetaData]]:
     """Generates all piggyback pig/piggybacked host pairs"""
-    return {
-        piggybacked_host: _get_payload_meta_data(piggybacked_host, omd_root)
+    all_meta_data: dict[HostAddress, list[PiggybackMetaData]] = {
+        piggybacked_host: list(_get_file_meta_data(piggybacked_host, omd_root))
         for piggybacked_host_folder in (
             [d for d in [payload_dir(omd_root) / piggybacked_hostname] if d.exists()]
             if piggybacked_hostname
@@ -164,14 +239,38 @@ def get_piggybacked_host_with_sources(
         )
         if (piggybacked_host := HostAddress(piggybacked_host_folder.name))
     }
+    for meta_data in _get_segment_meta_data(omd_root, piggybacked_hostname):
+        all_meta_data.setdefault(meta_data.piggybacked, []).append(meta_data)
+    return {
+        piggybacked_host: _newest_of_each_source(meta_data, lambda meta_data: meta_data)
+        for piggybacked_host, meta_data in sorted(all_meta_data.items())
+    }
 
 
 def _get_piggybacked_hosts_for_source(omd_root: Path, source: HostName) -> Sequence[HostName]:
-    return [
-        HostName(piggybacked_host.name)
-        for piggybacked_host in _get_piggybacked_host_folders(omd_root)
-        if (piggybacked_host / source).exists()
-    ]
+    return sorted(
+        {
+            HostName(piggybacked_host.name)
+            for piggybacked_host in _get_piggybacked_host_folders(omd_root)
+            if (piggybacked_host / source).exists()
+        }.union(
+            entry.piggybacked for entry in read_segment_index(_get_segment_path(source, omd_root))
+        )
+    )
+
+
+def _newest_of_each_source[T](
+    items: Iterable[T], meta_data_of: Callable[[T], PiggybackMetaData]
+) -> Sequence[T]:
+    """The items with the latest update of each source, from the files and the segments"""
+    newest: dict[HostName, T] = {}
+    for item in items:
+        meta_data = meta_data_of(item)
+        if (known := newest.get(meta_data.source)) is None or (
+            meta_data_of(known).last_update < meta_data.last_update
+        ):
+            newest[meta_data.source] = item
+    return [newest[source] for source in sorted(newest)]
 
 
 def _remove_piggyback_file(piggyback_file_path: Path) -> bool:
@@ -211,6 +310,10 @@ def store_piggyback_raw_data(
     # work as if on the source system
     _write_file_with_mtime(file_path=status_file_path, content=b"", mtime=contact_timestamp)
 
+    if len(piggybacked_raw_data) >= SEGMENT_MIN_HOSTS:
+        _store_segment(source_hostname, piggybacked_raw_data, message_timestamp, omd_root)
+        return
+
     for piggybacked_hostname, lines in piggybacked_raw_data.items():
         logger.debug("Storing piggyback data for: %r", piggybacked_hostname)
         # Raw data is always stored as bytes. Later the content is
@@ -223,6 +326,33 @@ def store_piggyback_raw_data(
         )
 
 
+def _store_segment(
+    source_hostname: HostName,
+    piggybacked_raw_data: Mapping[HostName, Sequence[bytes]],
+    message_timestamp: float,
+    omd_root: Path,
+) -> None:
+    logger.debug("Storing piggyback data of %d hosts in a segment", len(piggybacked_raw_data))
+    segment_path = _get_segment_path(source_hostname, omd_root)
+    last_update = int(message_timestamp)
+    write_segment(
+        segment_path,
+        itertools.chain(
+            # Like the files of the hosts not sent this turn, their payloads are kept
+            (
+                entry
+                for entry in read_segment_entries(segment_path)
+                if entry.piggybacked not in piggybacked_raw_data
+            ),
+            (
+                SegmentEntry(piggybacked_hostname, last_update, b"%s\n" % b"\n".join(lines))
+                for piggybacked_hostname, lines in piggybacked_raw_data.items()
+            ),
+        ),
+        written=last_update,
+    )
+
+
 def _write_file_with_mtime(
     file_path: Path,
     content: bytes,
@@ -252,7 +382,7 @@ def _write_file_with_mtime(
 #   '----------------------------------------------------------------------'
 
 
-def _get_payload_meta_data(
+def _get_file_meta_data(
     piggybacked_hostname: HostName, omd_root: Path
 ) -> Sequence[PiggybackMetaData]:
     """Gather a list of piggyback files to read for further processing.
@@ -281,10 +411,42 @@ def _get_payload_meta_data(
     return meta_data
 
 
+def _get_segment_meta_data(
+    omd_root: Path, piggybacked_hostname: HostName | None
+) -> Iterator[PiggybackMetaData]:
+    for source in _get_segment_sources(omd_root):
+        segment_path = _get_segment_path(source, omd_root)
+        if piggybacked_hostname is None:
+            entries: Iterable[SegmentIndexEntry | SegmentEntry] = read_segment_index(segment_path)
+        else:
+            entries = [
+                entry
+                for entry in [read_segment_entry(segment_path, piggybacked_hostname)]
+                if entry is not None
+            ]
+        for entry in entries:
+            yield _make_segment_meta_data(source, entry.piggybacked, entry.last_update, omd_root)
+
+
+def _make_segment_meta_data(
+    source: HostName, piggybacked: HostName, last_update: int, omd_root: Path
+) -> PiggybackMetaData:
+    return PiggybackMetaData(
+        source=source,
+        piggybacked=piggybacked,
+        last_update=last_update,
+        last_contact=_get_mtime(_get_source_status_file_path(source, omd_root)),
+    )
+
+
 def _get_piggybacked_host_folders(omd_root: Path) -> Sequence[Path]:
     return _files_in(payload_dir(omd_root))
 
 
+def _get_segment_sources(omd_root: Path) -> Sequence[HostName]:
+    return [HostName(segment.name) for segment in _files_in(segment_dir(omd_root))]
+
+
 def _get_source_state_files(omd_root: Path) -> Sequence[Path]:
     return _files_in(source_status_dir(omd_root))
 
@@ -305,6 +467,10 @@ def _get_source_status_file_path(source_hostname: HostName, omd_root: Path) -> P
     return source_status_dir(omd_root) / str(source_hostname)
 
 
+def _get_segment_path(source_hostname: HostName, omd_root: Path) -> Path:
+    return segment_dir(omd_root) / str(source_hostname)
+
+
 def _get_piggybacked_file_path(
     source_hostname: HostName,
     piggybacked_hostname: HostName | HostAddress,
@@ -344,6 +510,7 @@ def cleanup_piggyback_files(cut_off_timestamp: float, omd_root: Path) -> None:
 
     _cleanup_old_source_status_files(_get_source_state_files(omd_root), cut_off_timestamp)
     _cleanup_old_piggybacked_files(piggybacked_hosts_settings, cut_off_timestamp)
+    _cleanup_old_segments(_files_in(segment_dir(omd_root)), cut_off_timestamp)
 
 
 def _cleanup_old_source_status_files(
@@ -395,6 +562,34 @@ def _cleanup_old_piggybacked_files(
         )
 
 
+def _cleanup_old_segments(segments: Iterable[Path], cut_off_timestamp: float) -> None:
+    """Remove the segments of which all payloads exceed the maximum age, and the old payloads
+    of the others"""
+    for segment in segments:
+        try:
+            inode = segment.stat().st_ino
+        except FileNotFoundError:
+            continue
+        entries = read_segment_entries(segment)
+        if all(entry.last_update >= cut_off_timestamp for entry in entries):
+            continue
+        current_entries = [entry for entry in entries if entry.last_update >= cut_off_timestamp]
+        with suppress(FileNotFoundError):
+            if segment.stat().st_ino != inode:
+                continue  # replaced by a new one in the meantime
+            if not current_entries:
+                logger.debug("Piggyback segment '%s' too old. Remove it.", segment)
+                segment.unlink()
+                continue
+            logger.debug(
+                "Piggyback segment '%s' has %d too old payloads. Remove them.",
+                segment,
+                len(entries) - len(current_entries),
+            )
+            written = read_segment_written(segment)
+            write_segment(segment, current_entries, written=written or 0)
+
+
 def _get_mtime(path: Path) -> int | None:
     try:
         # Beware:
@@ -437,7 +632,30 @@ def move_for_host_rename(omd_root: Path, old_host: str, new_host: str) -> tuple[
         old_path.rename(new_path)
         yield "piggyback-pig"
 
-    return tuple(
+    def _rename_in_segments(old_name: str, new_name: str) -> Iterable[str]:
+        renamed = False
+        for segment in _files_in(segment_dir(omd_root)):
+            entries = read_segment_entries(segment)
+            if not any(entry.piggybacked == old_name for entry in entries):
+                continue
+            write_segment(
+                segment,
+                [
+                    SegmentEntry(HostName(new_name), entry.last_update, entry.raw_data)
+                    if entry.piggybacked == old_name
+                    else entry
+                    for entry in entries
+                    if entry.piggybacked != new_name
+                ],
+                written=read_segment_written(segment) or 0,
+            )
+            renamed = True
+        if renamed:
+            yield "piggyback-load"
+
+    return (
         *_rename_piggybacked_dir(old_host, new_host),
         *_rename_payload_file(piggyback_dir, old_host, new_host),
+        *_rename_in_segments(old_host, new_host),
+        *_rename_payload_file(segment_dir(omd_root), old_host, new_host),
     )
@@ -5,7 +5,7 @@
 
 import enum
 import os
-from collections.abc import Mapping
+from collections.abc import Collection, Mapping
 from pathlib import Path
 from typing import Annotated
 
@@ -38,14 +38,20 @@ class ConfigType(enum.Enum):
 class PiggybackHubConfig(BaseModel):
     type: ConfigType
     locations: HostLocations
+    # The sites that can receive payload batches. The others, for example sites of older versions,
+    # get one message per payload. Older hubs ignore this field.
+    batch_sites: frozenset[str] = frozenset()
 
 
 class _PersistedPiggybackHubConfig(BaseModel):
     locations: Mapping[AnnotatedHostName, str] = {}
+    batch_sites: frozenset[str] = frozenset()
 
 
 def save_config(omd_root: Path, config: PiggybackHubConfig) -> None:
-    persisted = _PersistedPiggybackHubConfig(locations=config.locations)
+    persisted = _PersistedPiggybackHubConfig(
+        locations=config.locations, batch_sites=config.batch_sites
+    )
     path = omd_root / RELATIVE_CONFIG_PATH
     path.parent.mkdir(mode=0o770, exist_ok=True, parents=True)
     tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
@@ -55,16 +61,24 @@ def save_config(omd_root: Path, config: PiggybackHubConfig) -> None:
 
 def load_config(omd_root: Path) -> PiggybackHubConfig:
     try:
-        locations = _PersistedPiggybackHubConfig.model_validate_json(
+        persisted = _PersistedPiggybackHubConfig.model_validate_json(
             (omd_root / RELATIVE_CONFIG_PATH).read_text()
-        ).locations
+        )
     except FileNotFoundError:
-        locations = {}
-    return PiggybackHubConfig(type=ConfigType.PERSISTED, locations=locations)
+        persisted = _PersistedPiggybackHubConfig()
+    return PiggybackHubConfig(
+        type=ConfigType.PERSISTED,
+        locations=persisted.locations,
+        batch_sites=persisted.batch_sites,
+    )
 
 
 def publish_persisted_locations(
-    destination_site: str, locations: HostLocations, omd_root: Path, omd_site: str
+    destination_site: str,
+    locations: HostLocations,
+    omd_root: Path,
+    omd_site: str,
+    batch_sites: Collection[str] = (),
 ) -> None:
     """Publish host locations for continuous distribution of piggyback data.
 
@@ -73,13 +87,20 @@ def publish_persisted_locations(
         locations: A mapping of host names to the sites they are monitored on.
         omd_root: The path to the OMD root directory of this site.
         omd_site: The name of this OMD site
+        batch_sites: The sites that can receive payload batches
     """
-    config = PiggybackHubConfig(type=ConfigType.PERSISTED, locations=locations)
+    config = PiggybackHubConfig(
+        type=ConfigType.PERSISTED, locations=locations, batch_sites=frozenset(batch_sites)
+    )
     _publish_config(destination_site, config, omd_root, omd_site)
 
 
 def publish_one_shot_locations(
-    destination_site: str, locations: HostLocations, omd_root: Path, omd_site: str
+    destination_site: str,
+    locations: HostLocations,
+    omd_root: Path,
+    omd_site: str,
+    batch_sites: Collection[str] = (),
 ) -> None:
     """Publish host locations for one-shot distribution of piggyback data.
 
@@ -88,8 +109,11 @@ def publish_one_shot_locations(
         locations: A mapping of host names to the sites they are monitored on.
         omd_root: The path to the OMD root directory of this site.
         omd_site: The name of this OMD site
+        batch_sites: The sites that can receive payload batches
     """
-    config = PiggybackHubConfig(type=ConfigType.ONESHOT, locations=locations)
+    config = PiggybackHubConfig(
+        type=ConfigType.ONESHOT, locations=locations, batch_sites=frozenset(batch_sites)
+    )
     _publish_config(destination_site, config, omd_root, omd_site)
 
 
@@ -22,7 +22,7 @@ from cmk.messaging import Channel, DeliveryTag, QueueName, set_logging_level
 
 from ._config import CONFIG_QUEUE, ConfigType, PiggybackHubConfig, save_config
 from ._payload import (
-    PiggybackPayload,
+    PiggybackPayloadBatch,
     save_payload_on_message,
     send_messages_oneshot,
     SendingPayloadProcess,
@@ -53,7 +53,9 @@ def handle_received_config(
 
         match received.type:
             case ConfigType.ONESHOT:
-                send_messages_oneshot(logger, omd_root, omd_site, received.locations)
+                send_messages_oneshot(
+                    logger, omd_root, omd_site, received.locations, received.batch_sites
+                )
             case ConfigType.PERSISTED:
                 save_config(omd_root, received)
                 reload_config.set()
@@ -121,7 +123,7 @@ def run_piggyback_hub(
             logger,
             omd_root,
             omd_site,
-            PiggybackPayload,
+            PiggybackPayloadBatch,
             save_payload_on_message(logger, omd_root),
             crash_report_callback,
             QueueName("payload"),
@@ -6,21 +6,24 @@
 import logging
 import multiprocessing
 import signal
-from collections.abc import Callable, Mapping, Sequence
+import time
+import zlib
+from collections import defaultdict
+from collections.abc import Callable, Collection, Iterable, Iterator, Mapping, Sequence
 from multiprocessing.synchronize import Event
 from pathlib import Path
-from typing import Self
+from typing import Final, Self
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, model_validator, TypeAdapter
 
 from cmk.ccc.hostaddress import HostName
 
-from cmk.messaging import Channel, CMKConnectionError, DeliveryTag, RoutingKey
+from cmk.messaging import Channel, CMKConnectionError, Connection, DeliveryTag, RoutingKey
 from cmk.piggyback.backend import (
     get_messages_for,
     PiggybackMessage,
     store_piggyback_raw_data,
-    watch_new_messages,
+    watch_new_message_batches,
 )
 
 from ._config import AnnotatedHostName, load_config, PiggybackHubConfig
@@ -42,25 +45,167 @@ class PiggybackPayload(BaseModel):
             contact_timestamp=message.meta.last_contact,
         )
 
+    @classmethod
+    def from_messages(cls, messages: Iterable[PiggybackMessage]) -> Sequence[Self]:
+        """The payloads of the messages, one for all piggybacked hosts of a source update"""
+        raw_data: dict[tuple[HostName, int, int | None], dict[HostName, Sequence[bytes]]] = (
+            defaultdict(dict)
+        )
+        for message in messages:
+            raw_data[(message.meta.source, message.meta.last_update, message.meta.last_contact)][
+                message.meta.piggybacked
+            ] = (message.raw_data,)
+        return [
+            cls(
+                source_host=source_host,
+                raw_data=piggybacked_raw_data,
+                message_timestamp=message_timestamp,
+                contact_timestamp=contact_timestamp,
+            )
+            for (source_host, message_timestamp, contact_timestamp), piggybacked_raw_data in (
+                raw_data.items()
+            )
+        ]
+
+
+_PAYLOADS: Final = TypeAdapter(Sequence[PiggybackPayload])
+
+# The size of the piggyback data in one batch, before the compression
+MAX_BATCH_SIZE: Final = 16 * 1024 * 1024
+
+# The time to collect the payloads of a batch in
+BATCH_WINDOW: Final = 1.0
+
+
+class PiggybackPayloadBatch(BaseModel):
+    """The compressed payloads sent to a site at once"""
+
+    model_config = ConfigDict(ser_json_bytes="base64", val_json_bytes="base64")
+
+    compressed_payloads: bytes
+
+    @model_validator(mode="before")
+    @classmethod
+    def _from_single_payload(cls, data: object) -> object:
+        # As sent by sites of older versions
+        if isinstance(data, dict) and "source_host" in data:
+            return {
+                "compressed_payloads": zlib.compress(
+                    _PAYLOADS.dump_json([PiggybackPayload.model_validate(data)])
+                )
+            }
+        return data
+
+    @classmethod
+    def from_payloads(cls, payloads: Sequence[PiggybackPayload]) -> Self:
+        return cls(compressed_payloads=zlib.compress(_PAYLOADS.dump_json(payloads)))
+
+    def payloads(self) -> Sequence[PiggybackPayload]:
+        return _PAYLOADS.validate_json(zlib.decompress(self.compressed_payloads))
+
+
+def make_batches(messages: Sequence[PiggybackMessage]) -> Iterator[PiggybackPayloadBatch]:
+    """Batches of the payloads of the messages, at most of about MAX_BATCH_SIZE each"""
+    chunk: list[PiggybackMessage] = []
+    chunk_size = 0
+    for message in messages:
+        if chunk and chunk_size + len(message.raw_data) > MAX_BATCH_SIZE:
+            yield PiggybackPayloadBatch.from_payloads(PiggybackPayload.from_messages(chunk))
+            chunk, chunk_size = [], 0
+        chunk.append(message)
+        chunk_size += len(message.raw_data)
+    if chunk:
+        yield PiggybackPayloadBatch.from_payloads(PiggybackPayload.from_messages(chunk))
+
+
+class PayloadPublisher:
+    """Publishes the payloads of messages to a site, in batches if the site can receive them
+
+    Sites of older versions cannot parse batches, they get one PiggybackPayload per message.
+    """
+
+    def __init__(self, conn: Connection) -> None:
+        self._batch_channel = conn.channel(PiggybackPayloadBatch)
+        self._single_channel = conn.channel(PiggybackPayload)
+
+    def publish(
+        self, site_id: str, messages: Sequence[PiggybackMessage], *, batches: bool
+    ) -> tuple[int, int]:
+        """Returns the number of messages published and their size"""
+        if not batches:
+            for message in messages:
+                self._single_channel.publish_for_site(
+                    site_id, PiggybackPayload.from_message(message), routing=RoutingKey("payload")
+                )
+            return len(messages), sum(len(message.raw_data) for message in messages)
+
+        published = list(make_batches(messages))
+        for batch in published:
+            self._batch_channel.publish_for_site(site_id, batch, routing=RoutingKey("payload"))
+        return len(published), sum(len(batch.compressed_payloads) for batch in published)
+
+
+class ThroughputMeter:
+    """Logs the number of payloads and the data handled in the last interval"""
+
+    def __init__(self, logger: logging.Logger, task_name: str, interval: float = 60.0) -> None:
+        self._logger = logger
+        self._task_name = task_name
+        self._interval = interval
+        self._reset(time.monotonic())
+
+    def _reset(self, now: float) -> None:
+        self._start = now
+        self.batches = 0
+        self.payloads = 0
+        self.size = 0
+
+    def add(self, batches: int, payloads: int, size: int) -> None:
+        self.batches += batches
+        self.payloads += payloads
+        self.size += size
+        if (elapsed := (now := time.monotonic()) - self._start) < self._interval:
+            return
+        self._logger.info(
+            "%s: %d payloads in %d batches (%.1f payloads/s, %.1f kB/s compressed)",
+            self._task_name.capitalize(),
+            self.payloads,
+            self.batches,
+            self.payloads / elapsed,
+            self.size / elapsed / 1024,
+        )
+        self._reset(now)
+
 
 def save_payload_on_message(
     logger: logging.Logger,
     omd_root: Path,
-) -> Callable[[Channel[PiggybackPayload], DeliveryTag, PiggybackPayload], None]:
+) -> Callable[[Channel[PiggybackPayloadBatch], DeliveryTag, PiggybackPayloadBatch], None]:
+    throughput = ThroughputMeter(logger, "storing received payloads")
+
     def _on_message(
-        channel: Channel[PiggybackPayload], delivery_tag: DeliveryTag, received: PiggybackPayload
+        channel: Channel[PiggybackPayloadBatch],
+        delivery_tag: DeliveryTag,
+        received: PiggybackPayloadBatch,
     ) -> None:
-        logger.debug(
-            "Received payload for piggybacked host from source host '%s'", received.source_host
-        )
-        store_piggyback_raw_data(
-            source_hostname=received.source_host,
-            piggybacked_raw_data=received.raw_data,
-            message_timestamp=received.message_timestamp,
-            contact_timestamp=received.contact_timestamp,
-            omd_root=omd_root,
-        )
+        payloads = received.payloads()
+        for payload in payloads:
+            logger.debug(
+                "Received payload for %d piggybacked hosts from source host '%s'",
+                len(payload.raw_data),
+                payload.source_host,
+            )
+            store_piggyback_raw_data(
+                source_hostname=payload.source_host,
+                piggybacked_raw_data=payload.raw_data,
+                message_timestamp=payload.message_timestamp,
+                contact_timestamp=payload.contact_timestamp,
+                omd_root=omd_root,
+            )
         channel.acknowledge(delivery_tag)
+        throughput.add(
+            1, sum(len(payload.raw_data) for payload in payloads), len(received.compressed_payloads)
+        )
 
     return _on_message
 
@@ -80,6 +225,7 @@ class SendingPayloadProcess(multiprocessing.Process):
         self.reload_config = reload_config
         self.crash_report_callback = crash_report_callback
         self.task_name = "publishing on queue 'payload'"
+        self.throughput = ThroughputMeter(logger, self.task_name)
 
     def run(self):
         self.logger.info("Starting: %s", self.task_name)
@@ -91,21 +237,24 @@ class SendingPayloadProcess(multiprocessing.Process):
         config = load_config(self.omd_root)
         self.logger.debug("Loaded configuration: %r", config)
 
-        failed_message = None
+        failed_messages: Sequence[PiggybackMessage] = ()
         try:
             while True:
                 with make_connection(self.omd_root, self.site, self.logger, self.task_name) as conn:
                     try:
-                        channel = conn.channel(PiggybackPayload)
-                        if failed_message is not None:
+                        publisher = PayloadPublisher(conn)
+                        if failed_messages:
                             # Retry in case the first time the channel was not available after make_connection
-                            self._handle_message(channel, config, failed_message)
-                            failed_message = None
-                        for piggyback_message in watch_new_messages(self.omd_root):
+                            self._handle_messages(publisher, config, failed_messages)
+                            failed_messages = ()
+                        for piggyback_messages in watch_new_message_batches(
+                            self.omd_root, window=BATCH_WINDOW
+                        ):
+                            failed_messages = piggyback_messages
                             config = self._check_for_config_reload(config)
-                            self._handle_message(channel, config, piggyback_message)
+                            self._handle_messages(publisher, config, piggyback_messages)
+                            failed_messages = ()
                     except CMKConnectionError as exc:
-                        failed_message = piggyback_message
                         self.logger.info("Reconnecting: %s: %s", self.task_name, exc)
         except CMKConnectionError as exc:
             self.logger.error("Connection error: %s: %s", self.task_name, exc)
@@ -115,25 +264,29 @@ class SendingPayloadProcess(multiprocessing.Process):
             self.logger.error(crash_report_msg)
             raise
 
-    def _handle_message(
+    def _handle_messages(
         self,
-        channel: Channel[PiggybackPayload],
+        publisher: PayloadPublisher,
         config: PiggybackHubConfig,
-        message: PiggybackMessage,
+        messages: Sequence[PiggybackMessage],
     ) -> None:
-        if (site_id := config.locations.get(message.meta.piggybacked, self.site)) == self.site:
-            return
+        messages_for_site: dict[str, list[PiggybackMessage]] = defaultdict(list)
+        for message in messages:
+            if (site_id := config.locations.get(message.meta.piggybacked, self.site)) != self.site:
+                messages_for_site[site_id].append(message)
 
-        self.logger.debug(
-            "%s: from host '%s' to host '%s' on site '%s'",
-            self.task_name.title(),
-            message.meta.source,
-            message.meta.piggybacked,
-            site_id,
-        )
-        channel.publish_for_site(
-            site_id, PiggybackPayload.from_message(message), routing=RoutingKey("payload")
-        )
+        for site_id, site_messages in messages_for_site.items():
+            self.logger.debug(
+                "%s: %d payloads from hosts '%s' to site '%s'",
+                self.task_name.title(),
+                len(site_messages),
+                ",".join(sorted({message.meta.source for message in site_messages})),
+                site_id,
+            )
+            published, size = publisher.publish(
+                site_id, site_messages, batches=site_id in config.batch_sites
+            )
+            self.throughput.add(published, len(site_messages), size)
 
     def _check_for_config_reload(self, current_config: PiggybackHubConfig) -> PiggybackHubConfig:
         if not self.reload_config.is_set():
@@ -149,27 +302,26 @@ def send_messages_oneshot(
     omd_root: Path,
     omd_site: str,
     targets: Mapping[HostName, str],
+    batch_sites: Collection[str],
 ) -> None:
     task_name = "sending oneshot messages"
     logger.info("Starting: %s", task_name)
 
-    hub_payloads = [
-        (site_id, PiggybackPayload.from_message(message))
-        for host, site_id in targets.items()
-        for message in get_messages_for(host, omd_root)
-    ]
+    messages_for_site: dict[str, list[PiggybackMessage]] = defaultdict(list)
+    for host, site_id in targets.items():
+        messages_for_site[site_id].extend(get_messages_for(host, omd_root))
 
     try:
         with make_connection(omd_root, omd_site, logger, task_name) as conn:
-            channel = conn.channel(PiggybackPayload)
-            for site, payload in hub_payloads:
+            publisher = PayloadPublisher(conn)
+            for site, messages in messages_for_site.items():
                 logger.debug(
-                    "%s: to site '%s' for host '%s'",
+                    "%s: to site '%s' for hosts '%s'",
                     task_name.title(),
                     site,
-                    ",".join(payload.raw_data),  # it's only one.
+                    ",".join(sorted({message.meta.piggybacked for message in messages})),
                 )
-                channel.publish_for_site(site, payload, routing=RoutingKey("payload"))
+                publisher.publish(site, messages, batches=site in batch_sites)
 
     except CMKConnectionError as exc:
         logger.error("Connection error: %s: %s", task_name, exc)
@@ -53,6 +53,7 @@ SNMPTiming = dict
 class SNMPBackendEnum(enum.Enum):
     INLINE = "Inline"
     CLASSIC = "Classic"
+    BULK = "Bulk"
     STORED_WALK = "StoredWalk"
 
     def serialize(self) -> str:
@@ -218,6 +219,26 @@ class SNMPBackend(abc.ABC):
     ) -> SNMPRowInfo:
         return []
 
+    def walk_many(
+        self,
+        /,
+        oids: Sequence[OID],
+        *,
+        context: SNMPContext,
+        section_name: SectionName | None = None,
+        table_base_oid: OID | None = None,
+    ) -> Mapping[OID, SNMPRowInfo]:
+        """Walk the subtrees of several OIDs, for example the columns of a table
+
+        Backends that can fetch several subtrees in the same requests override this.
+        """
+        return {
+            oid: self.walk(
+                oid, context=context, section_name=section_name, table_base_oid=table_base_oid
+            )
+            for oid in oids
+        }
+
 
 class SpecialColumn(enum.IntEnum):
     # Until we remove all but the first, its worth having an enum
@@ -314,12 +314,14 @@ def apply_hosts_file_to_object(
     path_without_extension: Path,
     host_storage_loaders: list[ABCHostsStorageLoader],
     global_dict: dict[str, Any],
+    *,
+    code_cache: store.CodeCache | None = None,
 ) -> None:
     for storage_loader in host_storage_loaders:
         if storage_loader.file_exists(path_without_extension) and storage_loader.file_valid(
             path_without_extension
         ):
-            storage_loader.read_and_apply(path_without_extension, global_dict)
+            storage_loader.read_and_apply(path_without_extension, global_dict, code_cache)
             return
 
 
@@ -336,7 +338,12 @@ class ABCHostsStorageLoader(abc.ABC, Generic[THostsReadData]):
     def file_valid(self, file_path: Path) -> bool:
         return True
 
-    def read_and_apply(self, file_path: Path, global_dict: dict[str, Any]) -> bool:
+    def read_and_apply(
+        self,
+        file_path: Path,
+        global_dict: dict[str, Any],
+        code_cache: store.CodeCache | None = None,
+    ) -> bool:
         return self.apply(self._storage.read(file_path), global_dict)
 
     @abc.abstractmethod
@@ -345,6 +352,18 @@ class ABCHostsStorageLoader(abc.ABC, Generic[THostsReadData]):
 
 
 class StandardStorageLoader(ABCHostsStorageLoader[str]):
+    def read_and_apply(
+        self,
+        file_path: Path,
+        global_dict: dict[str, Any],
+        code_cache: store.CodeCache | None = None,
+    ) -> bool:
+        if code_cache is None:
+            return super().read_and_apply(file_path, global_dict)
+        code = code_cache.compile(self._storage.add_file_extension(file_path))
+        exec(code, global_dict, global_dict)  # nosec B102 # BNS:aee528
+        return True
+
     def apply(self, data: str, global_dict: dict[str, Any]) -> bool:
         exec(data, global_dict, global_dict)  # nosec B102 # BNS:aee528
         return True
@@ -3,7 +3,7 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
-from collections.abc import Callable, Iterable
+from collections.abc import Callable, Iterable, Sequence
 from typing import TypeVar
 
 T = TypeVar("T")
@@ -15,3 +15,9 @@ def partition(pred: Callable[[T], bool], iterable: Iterable[T]) -> tuple[list[T]
     for x in iterable:
         (yay if pred(x) else nay).append(x)
     return yay, nay
+
+
+def chunks(items: Sequence[T], number: int) -> list[Sequence[T]]:
+    """The items in order, split into at most number slices of about the same size"""
+    size = max(1, -(-len(items) // number))
+    return [items[start : start + size] for start in range(0, len(items), size)]
@@ -31,6 +31,13 @@ class Eventconsolestatus(Table):
     )
     """The average event rate"""
 
+    status_average_history_time = Column(
+        'status_average_history_time',
+        col_type='float',
+        description='The average time of writing a batch of history entries',
+    )
+    """The average time of writing a batch of history entries"""
+
     status_average_message_rate = Column(
         'status_average_message_rate',
         col_type='float',
@@ -171,6 +178,13 @@ class Eventconsolestatus(Table):
     )
     """The number of events received since startup of the Event Console"""
 
+    status_history_queue_depth = Column(
+        'status_history_queue_depth',
+        col_type='int',
+        description='The number of history entries waiting to be written',
+    )
+    """The number of history entries waiting to be written"""
+
     status_message_rate = Column(
         'status_message_rate',
         col_type='float',
@@ -165,9 +165,12 @@ class RulesetMatcher:
 
         self._service_match_cache: dict[
             tuple[
-                tuple[ServiceName | None, int], PreprocessedPattern, tuple[tuple[str, object], ...]
+                ServiceName,
+                _LabelsFingerprint,
+                PreprocessedPattern,
+                LabelGroupsCacheId,
             ],
-            object,
+            bool,
         ] = {}
 
     def clear_caches(self) -> None:
@@ -310,28 +313,26 @@ class RulesetMatcher:
         labels_of_host: Callable[[HostName], Labels],
     ) -> Iterator[TRuleValue]:
         """Returns a generator of the values of the matched rules"""
-        optimized_ruleset = self.ruleset_optimizer.get_service_ruleset(
+        if match_text is None:
+            return
+
+        optimized_ruleset = self.ruleset_optimizer.get_service_ruleset_of_host(
             host_name, ruleset, labels_of_host
         )
+        # Computed once for all rules. A frozenset caches its hash, too.
+        labels_fingerprint = frozenset(service_labels.items()) if service_labels else None
 
         for (
             value,
-            hosts,
+            _hosts,
             service_label_groups,
             service_label_groups_cache_id,
             service_description_condition,
         ) in optimized_ruleset:
-            if match_text is None:
-                continue
-
-            if host_name not in hosts:
-                continue
-
             service_cache_id = (
-                (
-                    match_text,
-                    hash(None if service_labels is None else frozenset(service_labels.items())),
-                ),
+                match_text,
+                # The outcome of rules without label conditions does not depend on the labels
+                labels_fingerprint if service_label_groups else None,
                 service_description_condition,
                 service_label_groups_cache_id,
             )
@@ -351,6 +352,8 @@ class RulesetMatcher:
                 yield value
 
 
+_LabelsFingerprint: TypeAlias = frozenset[tuple[str, str]] | None
+
 # TODO: improve and cleanup types
 _ConditionCacheID: TypeAlias = tuple[
     tuple[str, ...],
@@ -387,37 +390,31 @@ class RulesetOptimizer:
         # is enabled.
         self._all_processed_hosts = self._all_configured_hosts
 
-        # A factor which indicates how much hosts share the same host tag configuration (excluding folders).
-        # len(all_processed_hosts) / len(different tag combinations)
-        # It is used to determine the best rule evualation method
-        self._all_processed_hosts_similarity = 1.0
-
         self.__service_ruleset_cache: dict[
             tuple[int, bool], Sequence[_PreprocessedServiceRule[Any]]
         ] = {}
+        # The rules of the service rulesets which apply to a host, built when first needed
+        self.__service_ruleset_of_host_cache: dict[
+            tuple[int, bool], dict[HostName, Sequence[_PreprocessedServiceRule[Any]]]
+        ] = {}
         self.__host_ruleset_cache: dict[tuple[int, bool], Mapping[HostAddress, Sequence[Any]]] = {}
         self._all_matching_hosts_match_cache: dict[
             tuple[_ConditionCacheID, bool], set[HostName]
         ] = {}
 
-        # Reference dirname -> hosts in this dir including subfolders
-        self._folder_host_lookup: dict[tuple[bool, str], set[HostName]] = {}
-
-        # Provides a list of hosts with the same hosttags, excluding the folder
-        self._hosts_grouped_by_tags: dict[tuple[tuple[TagGroupID, TagID], ...], set[HostName]] = {}
-        # Reference hostname -> tag group reference
-        self._host_grouped_ref: dict[HostName, tuple[tuple[TagGroupID, TagID], ...]] = {}
-
-        # TODO: Clean this one up?
-        self._initialize_host_lookup()
+        # The indexes of the processed hosts (False) and of all configured hosts (True)
+        self._host_indexes: dict[bool, _HostIndex] = {}
 
     def clear_ruleset_caches(self) -> None:
         self.__host_ruleset_cache.clear()
         self.__service_ruleset_cache.clear()
+        self.__service_ruleset_of_host_cache.clear()
 
     def clear_caches(self) -> None:
         self.__host_ruleset_cache.clear()
         self._all_matching_hosts_match_cache.clear()
+        for host_index in self._host_indexes.values():
+            host_index.clear_labels()
 
     def set_all_processed_hosts(self, all_processed_hosts: set[HostName]) -> None:
         involved_clusters: set[HostName] = set()
@@ -436,23 +433,8 @@ class RulesetOptimizer:
         nodes_and_clusters.intersection_update(self._all_configured_hosts)
         self._all_processed_hosts = frozenset(nodes_and_clusters)
 
-        # The folder host lookup includes a list of all -processed- hosts within a given
-        # folder. Any update with set_all_processed hosts invalidates this cache, because
-        # the scope of relevant hosts has changed. This is -good-, since the values in this
-        # lookup are iterated one by one later on in all_matching_hosts
-        self._folder_host_lookup = {}
-
-        used_groups = {
-            self._host_grouped_ref.get(hostname, ()) for hostname in self._all_processed_hosts
-        }
-
-        if not used_groups:
-            self._all_processed_hosts_similarity = 1.0
-            return
-
-        self._all_processed_hosts_similarity = (
-            1.0 * len(self._all_processed_hosts) / len(used_groups)
-        )
+        # The index of the processed hosts only covers the hosts of the previous scope
+        self._host_indexes.pop(False, None)
 
     def get_host_ruleset(
         self,
@@ -539,6 +521,32 @@ class RulesetOptimizer:
 
         return self.__service_ruleset_cache.setdefault(cache_id, _impl(ruleset, with_foreign_hosts))
 
+    def get_service_ruleset_of_host(
+        self,
+        host_name: HostName,
+        ruleset: Sequence[RuleSpec[TRuleValue]],
+        labels_of_host: Callable[[HostName], Labels],
+    ) -> Sequence[_PreprocessedServiceRule[TRuleValue]]:
+        """The rules of get_service_ruleset() whose host conditions match the host
+
+        The services of a host are looked up one after the other. Having the rules of the host at
+        hand saves testing the membership of the host in every rule for every service."""
+        with_foreign_hosts = host_name not in self._all_processed_hosts
+        rules_by_host = self.__service_ruleset_of_host_cache.setdefault(
+            (id(ruleset), with_foreign_hosts), {}
+        )
+        with contextlib.suppress(KeyError):
+            return rules_by_host[host_name]
+
+        return rules_by_host.setdefault(
+            host_name,
+            [
+                rule
+                for rule in self.get_service_ruleset(host_name, ruleset, labels_of_host)
+                if host_name in rule[1]
+            ],
+        )
+
     @staticmethod
     def _convert_pattern_list(patterns: HostOrServiceConditions | None) -> PreprocessedPattern:
         """Compiles a list of service match patterns to a to a single regex
@@ -588,12 +596,14 @@ class RulesetOptimizer:
         except KeyError:
             pass
 
+        host_index = self._host_index(with_foreign_hosts)
         return self._all_matching_hosts_match_cache.setdefault(
             cache_id,
             self._all_matching_hosts_computation(
+                host_index,
                 # Determine match candidates.
                 # If the rule is located in a folder we only need the hosts in that folder.
-                self._get_hosts_within_folder(rule_path, with_foreign_hosts),
+                host_index.hosts_within_folder(rule_path),
                 host_conditions,
                 tag_conditions,
                 label_conditions,
@@ -601,67 +611,32 @@ class RulesetOptimizer:
             ),
         )
 
+    @staticmethod
     def _all_matching_hosts_computation(
-        self,
+        host_index: "_HostIndex",
         hosts_in_rule_scope: set[HostName],
         host_conditions: HostOrServiceConditions | None,
         tag_conditions: Mapping[TagGroupID, TagCondition],
         label_conditions: LabelGroups,
         labels_of_host: Callable[[HostName], Labels],
     ) -> set[HostName]:
-        if tag_conditions and host_conditions is None and not label_conditions:
-            # TODO: Labels could also be optimized like the tags
-            matched_by_tags = self._match_hosts_by_tags(hosts_in_rule_scope, tag_conditions)
-            if matched_by_tags is not None:
-                return matched_by_tags
-
-        only_specific_hosts = (
-            host_conditions is not None
-            and not isinstance(host_conditions, dict)
-            and all(not isinstance(x, dict) for x in host_conditions)
-        )
+        """Narrows down the hosts in the scope of the rule condition by condition
 
+        The tag and label conditions are evaluated with the sets of hosts from the index, only
+        host name regexes need a look at the single hosts still in question. The labels come
+        last: they are only computed for the hosts matching the other conditions."""
         if host_conditions == []:
             return set()  # Empty host list -> Nothing matches
 
-        if not tag_conditions and not label_conditions and not host_conditions:
-            # If no tags are specified and the hostlist only include @all (all hosts)
-            return hosts_in_rule_scope
-
-        if (
-            not tag_conditions
-            and not label_conditions
-            and only_specific_hosts
-            and host_conditions is not None
-        ):
-            # If no tags are specified and there are only specific hosts we already have the matches
-            return hosts_in_rule_scope.intersection(host_conditions)
-
-        # If the rule has only exact host restrictions, we can thin out the list of hosts to check
-        if only_specific_hosts and host_conditions is not None:
-            hosts_to_check = hosts_in_rule_scope.intersection(host_conditions)
-        else:
-            hosts_to_check = hosts_in_rule_scope
-
-        matching: set[HostName] = set()
-        for hostname in hosts_to_check:
-            # When no tag matching is requested, do not filter by tags. Accept all hosts
-            # and filter only by hostlist
-            if tag_conditions and not matches_host_tags(
-                self._host_tags[hostname],
-                tag_conditions,
-            ):
-                continue
-
-            if label_conditions:
-                host_labels = labels_of_host(hostname)
-                if not matches_labels(host_labels, label_conditions):
-                    continue
+        matching = hosts_in_rule_scope
+        for taggroup_id, tag_condition in tag_conditions.items():
+            matching = host_index.hosts_matching_tag_condition(matching, taggroup_id, tag_condition)
 
-            if not matches_host_name(host_conditions, hostname):
-                continue
+        if host_conditions:
+            matching = _hosts_matching_host_name(matching, host_conditions)
 
-            matching.add(hostname)
+        if label_conditions:
+            matching = host_index.hosts_matching_labels(matching, label_conditions, labels_of_host)
 
         return matching
 
@@ -699,95 +674,139 @@ class RulesetOptimizer:
             rule_path,
         )
 
-    # TODO: Generalize this optimization: Build some kind of key out of the tag conditions
-    # (positive, negative, ...). Make it work with the new tag group based "$or" handling.
-    def _match_hosts_by_tags(
-        self,
-        valid_hosts: set[HostName],
-        tag_conditions: Mapping[TagGroupID, TagCondition],
-    ) -> set[HostName] | None:
-        matching = set()
-        negative_match_tags = set()
-        positive_match_tags = set()
-        for taggroup_id, tag_condition in tag_conditions.items():
-            if isinstance(tag_condition, dict):
-                if "$ne" in tag_condition:
-                    negative_match_tags.add(
-                        (
-                            taggroup_id,
-                            cast(TagConditionNE, tag_condition)["$ne"],
-                        )
-                    )
-                    continue
-
-                if "$or" in tag_condition:
-                    return None  # Can not be optimized, makes _all_matching_hosts proceed
+    def _host_index(self, with_foreign_hosts: bool) -> "_HostIndex":
+        with contextlib.suppress(KeyError):
+            return self._host_indexes[with_foreign_hosts]
 
-                if "$nor" in tag_condition:
-                    return None  # Can not be optimized, makes _all_matching_hosts proceed
+        hosts = self._all_configured_hosts if with_foreign_hosts else self._all_processed_hosts
+        # As long as all configured hosts are processed, both are the same
+        host_index = next(
+            (index for index in self._host_indexes.values() if index.hosts is hosts),
+            None,
+        ) or _HostIndex(hosts, self._host_tags, self._host_paths)
+        return self._host_indexes.setdefault(with_foreign_hosts, host_index)
 
-                raise NotImplementedError()
 
-            positive_match_tags.add((taggroup_id, tag_condition))
+class _HostIndex:
+    """The hosts with a given tag, label or folder, for evaluating conditions with set operations
 
-        # TODO:
-        # if has_specific_folder_tag or self._all_processed_hosts_similarity < 3.0:
-        if self._all_processed_hosts_similarity < 3.0:
-            # Without shared folders
-            for hostname in valid_hosts:
-                if positive_match_tags <= self._host_tags[
-                    hostname
-                ] and not negative_match_tags.intersection(self._host_tags[hostname]):
-                    matching.add(hostname)
+    The index is built once per scope of hosts. The labels of a host are added to the index when
+    a label condition is first evaluated for it, they are dropped with clear_labels(), when the
+    labels may have changed."""
 
-            return matching
+    def __init__(
+        self,
+        hosts: frozenset[HostName],
+        host_tags: Mapping[HostName | HostAddress, set[tuple[TagGroupID, TagID]]],
+        host_paths: Mapping[HostName, str],
+    ) -> None:
+        self.hosts = hosts
+        self._hosts_by_tag: dict[tuple[TagGroupID, TagID | None], set[HostName]] = {}
+        self._hosts_by_path: dict[str, set[HostName]] = {}
+        for hostname in hosts:
+            for tag in host_tags[hostname]:
+                self._hosts_by_tag.setdefault(tag, set()).add(hostname)
+            self._hosts_by_path.setdefault(host_paths.get(hostname, "/"), set()).add(hostname)
+        # Reference dirname -> hosts in this dir including subfolders
+        self._hosts_by_folder: dict[str, set[HostName]] = {}
+        self._hosts_by_label: dict[tuple[str, str], set[HostName]] = {}
+        self._labeled_hosts: set[HostName] = set()
 
-        # With shared folders
-        checked_hosts: set[str] = set()
-        for hostname in valid_hosts:
-            if hostname in checked_hosts:
-                continue
+    def clear_labels(self) -> None:
+        self._hosts_by_label = {}
+        self._labeled_hosts = set()
 
-            hosts_with_same_tag = self._filter_hosts_with_same_tags_as_host(hostname, valid_hosts)
-            checked_hosts.update(hosts_with_same_tag)
+    def hosts_within_folder(self, folder_path: str) -> set[HostName]:
+        with contextlib.suppress(KeyError):
+            return self._hosts_by_folder[folder_path]
 
-            if positive_match_tags <= self._host_tags[
-                hostname
-            ] and not negative_match_tags.intersection(self._host_tags[hostname]):
-                matching.update(hosts_with_same_tag)
+        hosts_in_folder: set[HostName] = set()
+        for host_path, hosts in self._hosts_by_path.items():
+            if host_path.startswith(folder_path):
+                hosts_in_folder.update(hosts)
+        return self._hosts_by_folder.setdefault(folder_path, hosts_in_folder)
 
-        return matching
+    def _tagged(self, taggroup_id: TagGroupID, tag_ids: Iterable[TagID | None]) -> set[HostName]:
+        hosts: set[HostName] = set()
+        for tag_id in tag_ids:
+            hosts.update(self._hosts_by_tag.get((taggroup_id, tag_id), ()))
+        return hosts
 
-    def _filter_hosts_with_same_tags_as_host(
+    def hosts_matching_tag_condition(
         self,
-        hostname: HostName,
         hosts: set[HostName],
+        taggroup_id: TagGroupID,
+        tag_condition: TagCondition,
     ) -> set[HostName]:
-        return self._hosts_grouped_by_tags[self._host_grouped_ref[hostname]].intersection(hosts)
-
-    def _get_hosts_within_folder(self, folder_path: str, with_foreign_hosts: bool) -> set[HostName]:
-        cache_id = with_foreign_hosts, folder_path
-        if cache_id not in self._folder_host_lookup:
-            hosts_in_folder = set()
-            relevant_hosts = (
-                self._all_configured_hosts if with_foreign_hosts else self._all_processed_hosts
-            )
-
-            for hostname in relevant_hosts:
-                host_path = self._host_paths.get(hostname, "/")
-                if host_path.startswith(folder_path):
-                    hosts_in_folder.add(hostname)
-
-            self._folder_host_lookup[cache_id] = hosts_in_folder
-            return hosts_in_folder
+        """The hosts matching the condition, see matches_tag_condition()"""
+        if is_tag_condition_ne(tag_condition):
+            return hosts - self._tagged(taggroup_id, [tag_condition["$ne"]])
+        if is_tag_condition_or(tag_condition):
+            return hosts & self._tagged(taggroup_id, tag_condition["$or"])
+        if is_tag_condition_nor(tag_condition):
+            return hosts - self._tagged(taggroup_id, tag_condition["$nor"])
+        if isinstance(tag_condition, dict):
+            raise NotImplementedError()
+        return hosts & self._tagged(taggroup_id, [tag_condition])
+
+    def hosts_matching_labels(
+        self,
+        hosts: set[HostName],
+        required_label_groups: LabelGroups,
+        labels_of_host: Callable[[HostName], Labels],
+    ) -> set[HostName]:
+        """The hosts matching the label groups, see matches_labels()"""
+        if unlabeled_hosts := hosts - self._labeled_hosts:
+            for hostname in unlabeled_hosts:
+                for label in labels_of_host(hostname).items():
+                    self._hosts_by_label.setdefault(label, set()).add(hostname)
+            self._labeled_hosts |= unlabeled_hosts
+
+        overall_match = hosts
+        for group_operator, label_group in required_label_groups:
+            group_match = hosts
+            for label_operator, label in label_group:
+                if not label:
+                    continue
+                try:
+                    key, value = label.split(":")
+                except Exception:
+                    raise NotImplementedError(
+                        f"HALLO DORT: wird hier zu wenig entpackt?  --  {label}"
+                    )
+                group_match = _and_or_not_group_hosts(
+                    group_match,
+                    hosts & self._hosts_by_label.get((key, value), set()),
+                    label_operator,
+                )
+            overall_match = _and_or_not_group_hosts(overall_match, group_match, group_operator)
+        return overall_match
 
-        return self._folder_host_lookup[cache_id]
 
-    def _initialize_host_lookup(self) -> None:
-        for hostname in self._all_configured_hosts:
-            group_ref = tuple(sorted(self._host_tags[hostname]))
-            self._hosts_grouped_by_tags.setdefault(group_ref, set()).add(hostname)
-            self._host_grouped_ref[hostname] = group_ref
+def _hosts_matching_host_name(
+    hosts: set[HostName], host_entries: HostOrServiceConditions
+) -> set[HostName]:
+    """The hosts matching the host name condition, see matches_host_name()"""
+    negate, host_entries = parse_negated_condition_list(host_entries)
+    matched = hosts.intersection(entry for entry in host_entries if not isinstance(entry, dict))
+    if patterns := [entry["$regex"] for entry in host_entries if isinstance(entry, dict)]:
+        pattern = regex(combine_patterns(patterns))
+        matched.update(hostname for hostname in hosts - matched if pattern.match(hostname))
+    # The generic agent host matches negated conditions only
+    matched.discard(HostName(""))
+    return hosts - matched if negate else matched
+
+
+def _and_or_not_group_hosts(
+    given_group_match: set[HostName], new_single_match: set[HostName], operator: AndOrNotLiteral
+) -> set[HostName]:
+    match operator:
+        case "and":
+            return given_group_match & new_single_match
+        case "or":
+            return given_group_match | new_single_match
+        case "not":
+            return given_group_match - new_single_match
 
 
 def _tags_cache_id(tag_or_label_spec: object) -> object:
@@ -41,7 +41,7 @@ from cmk.ccc.hostaddress import HostName
 #   - 'all' -> _use_all
 # TODO Centralize different stores and loaders of tree files:
 #   - inventory/HOSTNAME, inventory/HOSTNAME.gz, inventory/.last
-#   - inventory_archive/HOSTNAME/TIMESTAMP,
+#   - inventory_archive/HOSTNAME/TIMESTAMP, inventory_archive/HOSTNAME/TIMESTAMP.delta.json.gz
 #   - inventory_delta_cache/HOSTNAME/TIMESTAMP_{TIMESTAMP,None}
 #   - status_data/HOSTNAME, status_data/HOSTNAME.gz
 
@@ -123,6 +123,23 @@ class SDBareDeltaTree(TypedDict):
     Nodes: Mapping[SDNodeName, SDBareDeltaTree]
 
 
+class SDRawTablePatch(TypedDict, total=False):
+    KeyColumns: Sequence[SDKey]
+    Rows: Sequence[Mapping[SDKey, SDValue]]
+    RemovedRows: Sequence[Sequence[SDValue]]
+    Retentions: Mapping[
+        SDRowIdent, Mapping[SDKey, tuple[int, int, int, Literal["previous", "current"]]]
+    ]
+
+
+class SDRawTreePatch(TypedDict, total=False):
+    Attributes: SDRawAttributes
+    Table: SDRawTablePatch
+    Nodes: Mapping[SDNodeName, SDRawTreePatch]
+    NewNodes: Mapping[SDNodeName, SDRawTree]
+    RemovedNodes: Sequence[SDNodeName]
+
+
 class _RawIntervalFromConfigMandatory(TypedDict):
     interval: int
     visible_raw_path: str
@@ -1734,6 +1751,28 @@ class TreePathGz:
         self.legacy.unlink(missing_ok=True)
 
 
+_ARCHIVE_DELTA_SUFFIX = ".delta.json.gz"
+
+# Every n-th archived tree is stored as a whole, the others as deltas to their predecessors.
+_ARCHIVE_SNAPSHOT_INTERVAL = 10
+
+
+def is_archive_delta(file_path: Path) -> bool:
+    return file_path.name.endswith(_ARCHIVE_DELTA_SUFFIX)
+
+
+def parse_archive_timestamp(file_path: Path) -> int:
+    # 'file_path' is of the form
+    # - <OMD_ROOT>/var/check_mk/inventory_archive/<HOST>/<TS>.json
+    # - <OMD_ROOT>/var/check_mk/inventory_archive/<HOST>/<TS>.delta.json.gz
+    # - <OMD_ROOT>/var/check_mk/inventory_archive/<HOST>/<TS>
+    return int(
+        file_path.name.removesuffix(_ARCHIVE_DELTA_SUFFIX)
+        if is_archive_delta(file_path)
+        else file_path.with_suffix("").name
+    )
+
+
 class InventoryPaths:
     def __init__(self, omd_root: Path) -> None:
         self.inventory_dir = omd_root / "var/check_mk/inventory"
@@ -1777,6 +1816,9 @@ class InventoryPaths:
             legacy=self.archive_host(host_name) / str(timestamp),
         )
 
+    def archive_delta(self, host_name: HostName, timestamp: int) -> Path:
+        return self.archive_host(host_name) / f"{timestamp}{_ARCHIVE_DELTA_SUFFIX}"
+
     def delta_cache_host(self, host_name: HostName) -> Path:
         return self.delta_cache_dir / str(host_name)
 
@@ -1816,6 +1858,254 @@ def _save_raw_tree_gz(tree_path_gz: TreePathGz, meta_and_raw_tree: SDMetaAndRawT
     store.save_bytes_to_file(tree_path_gz.path, buf.getvalue())
 
 
+def _load_raw_tree_from_tree_path(tree_path: TreePath) -> SDRawTree:
+    if raw := store.load_text_from_file(tree_path.path):
+        raw_tree = json.loads(raw)
+    else:
+        raw_tree = store.load_object_from_file(tree_path.legacy, default=None) or {}
+    if isinstance(raw_tree, dict) and {"Attributes", "Table", "Nodes"} <= set(raw_tree):
+        return raw_tree
+    return serialize_tree(deserialize_tree(raw_tree))
+
+
+def _make_raw_rows_by_ident(raw_table: SDRawTable) -> dict[SDRowIdent, Mapping[SDKey, SDValue]]:
+    key_columns = raw_table.get("KeyColumns", [])
+    rows_by_ident: dict[SDRowIdent, Mapping[SDKey, SDValue]] = {}
+    for row in raw_table.get("Rows", []):
+        ident = _make_row_ident(key_columns, row)
+        rows_by_ident[ident] = {**rows_by_ident.get(ident, {}), **row}
+    return rows_by_ident
+
+
+def _diff_raw_tables(previous: SDRawTable, current: SDRawTable) -> SDRawTablePatch:
+    patch: SDRawTablePatch = {}
+    current_rows_by_ident = _make_raw_rows_by_ident(current)
+    if (key_columns := current.get("KeyColumns", [])) != previous.get("KeyColumns", []):
+        # The row idents depend on the key columns, so all rows are replaced.
+        patch["KeyColumns"] = key_columns
+        patch["Rows"] = list(current_rows_by_ident.values())
+    else:
+        previous_rows_by_ident = _make_raw_rows_by_ident(previous)
+        if removed_rows := [
+            list(ident) for ident in previous_rows_by_ident if ident not in current_rows_by_ident
+        ]:
+            patch["RemovedRows"] = removed_rows
+        if rows := [
+            row
+            for ident, row in current_rows_by_ident.items()
+            if previous_rows_by_ident.get(ident) != row
+        ]:
+            patch["Rows"] = rows
+    if (retentions := current.get("Retentions", {})) != previous.get("Retentions", {}):
+        patch["Retentions"] = retentions
+    return patch
+
+
+def _diff_raw_trees(previous: SDRawTree, current: SDRawTree) -> SDRawTreePatch:
+    """Compute the patch which turns the previous into the current raw tree
+
+    In contrast to the delta trees of the history, the patch is exact: it keeps the retention
+    intervals and does not depend on the values being different from None."""
+    patch: SDRawTreePatch = {}
+    if current["Attributes"] != previous["Attributes"]:
+        patch["Attributes"] = current["Attributes"]
+    if table_patch := _diff_raw_tables(previous["Table"], current["Table"]):
+        patch["Table"] = table_patch
+
+    previous_nodes = previous["Nodes"]
+    current_nodes = current["Nodes"]
+    if nodes := {
+        name: node_patch
+        for name, node in current_nodes.items()
+        if name in previous_nodes and (node_patch := _diff_raw_trees(previous_nodes[name], node))
+    }:
+        patch["Nodes"] = nodes
+    if new_nodes := {
+        name: node for name, node in current_nodes.items() if name not in previous_nodes
+    }:
+        patch["NewNodes"] = new_nodes
+    if removed_nodes := [name for name in previous_nodes if name not in current_nodes]:
+        patch["RemovedNodes"] = removed_nodes
+    return patch
+
+
+def _apply_raw_table_patch(raw_table: SDRawTable, patch: SDRawTablePatch) -> SDRawTable:
+    rows_by_ident: dict[SDRowIdent, Mapping[SDKey, SDValue]]
+    if "KeyColumns" in patch:
+        key_columns = patch["KeyColumns"]
+        rows_by_ident = {}
+    else:
+        key_columns = raw_table.get("KeyColumns", [])
+        rows_by_ident = _make_raw_rows_by_ident(raw_table)
+
+    for raw_ident in patch.get("RemovedRows", []):
+        rows_by_ident.pop(tuple(raw_ident), None)
+    for row in patch.get("Rows", []):
+        rows_by_ident[_make_row_ident(key_columns, row)] = row
+
+    patched_table: SDRawTable = {}
+    if rows_by_ident:
+        patched_table.update({"KeyColumns": key_columns, "Rows": list(rows_by_ident.values())})
+    if retentions := patch.get("Retentions", raw_table.get("Retentions", {})):
+        patched_table["Retentions"] = retentions
+    return patched_table
+
+
+def _apply_raw_tree_patch(raw_tree: SDRawTree, patch: SDRawTreePatch) -> SDRawTree:
+    nodes_patch = patch.get("Nodes", {})
+    removed_nodes = set(patch.get("RemovedNodes", []))
+    return SDRawTree(
+        Attributes=patch.get("Attributes", raw_tree["Attributes"]),
+        Table=(
+            _apply_raw_table_patch(raw_tree["Table"], patch["Table"])
+            if "Table" in patch
+            else raw_tree["Table"]
+        ),
+        Nodes={
+            **{
+                name: _apply_raw_tree_patch(node, nodes_patch[name])
+                if name in nodes_patch
+                else node
+                for name, node in raw_tree["Nodes"].items()
+                if name not in removed_nodes
+            },
+            **patch.get("NewNodes", {}),
+        },
+    )
+
+
+class _RawArchiveDelta(TypedDict):
+    previous: int
+    patch: SDRawTreePatch
+    entry: tuple[int, int, int, SDRawDeltaTree]
+
+
+class _CorruptedArchiveError(Exception):
+    def __init__(self, file_path: Path) -> None:
+        super().__init__(file_path)
+        self.file_path = file_path
+
+
+def _save_raw_archive_delta(file_path: Path, raw_archive_delta: _RawArchiveDelta) -> None:
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode="wb") as f:
+        f.write((json.dumps(raw_archive_delta) + "\n").encode("utf-8"))
+    store.save_bytes_to_file(file_path, buf.getvalue())
+
+
+def _load_raw_archive_delta(file_path: Path) -> _RawArchiveDelta:
+    try:
+        return json.loads(gzip.decompress(store.load_bytes_from_file(file_path, default=b"")))
+    except (MKGeneralException, OSError, EOFError, ValueError) as e:
+        raise _CorruptedArchiveError(file_path) from e
+
+
+def _history_path_key(history_path: HistoryPath) -> Path:
+    return (
+        history_path.tree_path.path if history_path.delta_path is None else history_path.delta_path
+    )
+
+
+def _load_raw_history_tree(
+    previous_raw_tree: SDRawTree, previous: HistoryPath, current: HistoryPath
+) -> SDRawTree:
+    if current.delta_path is None:
+        return _load_raw_tree_from_tree_path(current.tree_path)
+    raw_archive_delta = _load_raw_archive_delta(current.delta_path)
+    if raw_archive_delta["previous"] != previous.timestamp:
+        # The archived tree this delta is based on has been removed.
+        raise _CorruptedArchiveError(current.delta_path)
+    return _apply_raw_tree_patch(previous_raw_tree, raw_archive_delta["patch"])
+
+
+def _load_raw_archived_tree(
+    history_paths: Sequence[HistoryPath], lookup: dict[Path, SDRawTree]
+) -> SDRawTree:
+    """Reconstruct the tree of the last history path
+
+    Starting from the latest snapshot or already reconstructed tree, the deltas are replayed."""
+    start = len(history_paths) - 1
+    while (
+        start > 0
+        and history_paths[start].delta_path is not None
+        and _history_path_key(history_paths[start]) not in lookup
+    ):
+        start -= 1
+
+    if (key := _history_path_key(first := history_paths[start])) not in lookup:
+        if first.delta_path is not None:
+            raise _CorruptedArchiveError(first.delta_path)
+        lookup[key] = _load_raw_tree_from_tree_path(first.tree_path)
+
+    raw_tree = lookup[key]
+    for previous, current in zip(history_paths[start:], history_paths[start + 1 :]):
+        raw_tree = lookup[_history_path_key(current)] = _load_raw_history_tree(
+            raw_tree, previous, current
+        )
+    return raw_tree
+
+
+def _collect_archive_paths(inv_paths: InventoryPaths, host_name: HostName) -> HistoryPaths:
+    paths = []
+    corrupted = []
+    for file_path in inv_paths.archive_host(host_name).iterdir():
+        try:
+            timestamp = parse_archive_timestamp(file_path)
+        except ValueError:
+            corrupted.append(file_path)
+            continue
+        paths.append(
+            HistoryPath(
+                tree_path=inv_paths.archive_tree(host_name, timestamp),
+                timestamp=timestamp,
+                delta_path=file_path,
+            )
+            if is_archive_delta(file_path)
+            else HistoryPath(
+                tree_path=TreePath.from_archive_or_delta_cache_file_path(file_path),
+                timestamp=timestamp,
+            )
+        )
+    return HistoryPaths(paths=sorted(paths, key=lambda hp: hp.timestamp), corrupted=corrupted)
+
+
+def _make_raw_archive_delta(
+    inv_paths: InventoryPaths, host_name: HostName, timestamp: int, raw_tree: SDRawTree
+) -> _RawArchiveDelta | None:
+    try:
+        archive_paths = _collect_archive_paths(inv_paths, host_name)
+    except FileNotFoundError:
+        return None
+
+    if not (history_paths := [hp for hp in archive_paths.paths if hp.timestamp < timestamp]):
+        return None
+
+    deltas = 0
+    for history_path in reversed(history_paths):
+        if history_path.delta_path is None:
+            break
+        deltas += 1
+    if deltas >= _ARCHIVE_SNAPSHOT_INTERVAL - 1:
+        return None
+
+    try:
+        previous_raw_tree = _load_raw_archived_tree(history_paths, {})
+    except _CorruptedArchiveError:
+        return None
+
+    # The history entry is computed once here, so the history does not need to diff the trees.
+    entry = HistoryEntry.from_delta_tree(
+        timestamp,
+        deserialize_tree(raw_tree).difference(deserialize_tree(previous_raw_tree)),
+    )
+    return _RawArchiveDelta(
+        previous=history_paths[-1].timestamp,
+        patch=_diff_raw_trees(previous_raw_tree, raw_tree),
+        entry=(entry.new, entry.changed, entry.removed, serialize_delta_tree(entry.delta_tree)),
+    )
+
+
 def _archive_inventory_tree(inv_paths: InventoryPaths, host_name: HostName) -> None:
     tree_path = inv_paths.inventory_tree(host_name)
     is_json = False
@@ -1832,6 +2122,18 @@ def _archive_inventory_tree(inv_paths: InventoryPaths, host_name: HostName) -> N
     tree_path_gz = inv_paths.inventory_tree_gz(host_name)
     archive_tree_path = inv_paths.archive_tree(host_name, int(mtime))
 
+    if is_json and (
+        raw_archive_delta := _make_raw_archive_delta(
+            inv_paths, host_name, int(mtime), _load_raw_tree_from_tree_path(tree_path)
+        )
+    ):
+        _save_raw_archive_delta(inv_paths.archive_delta(host_name, int(mtime)), raw_archive_delta)
+        tree_path.unlink(missing_ok=True)
+        tree_path_gz.unlink(missing_ok=True)
+        tree_path.legacy.unlink(missing_ok=True)
+        tree_path_gz.legacy.unlink(missing_ok=True)
+        return
+
     if is_json:
         archive_tree_path.parent.mkdir(parents=True, exist_ok=True)
         tree_path.rename(archive_tree_path)
@@ -1948,6 +2250,8 @@ class RawInventoryStore:
 class HistoryPath:
     tree_path: TreePath
     timestamp: int
+    # Set if the tree is archived as a delta to its predecessor
+    delta_path: Path | None = None
 
 
 @dataclass(frozen=True)
@@ -1991,6 +2295,7 @@ class InventoryStore:
     def __init__(self, omd_root: Path) -> None:
         self.inv_paths = InventoryPaths(omd_root)
         self._lookup: dict[tuple[Path, Path], ImmutableTree] = {}
+        self._lookup_raw: dict[Path, SDRawTree] = {}
 
     def load_inventory_tree(self, *, host_name: HostName) -> ImmutableTree:
         return _load_tree_from_tree_path(self.inv_paths.inventory_tree(host_name))
@@ -2043,39 +2348,28 @@ class InventoryStore:
             return tree
 
         try:
-            latest_archive_file_path = max(
-                self.inv_paths.archive_host(host_name).iterdir(),
-                key=lambda fp: int(fp.with_suffix("").name),
-            )
-        except (FileNotFoundError, ValueError):
+            history_paths = _collect_archive_paths(self.inv_paths, host_name).paths
+        except FileNotFoundError:
             return ImmutableTree()
 
-        return _load_tree_from_tree_path(
-            TreePath.from_archive_or_delta_cache_file_path(latest_archive_file_path)
-        )
+        if not history_paths:
+            return ImmutableTree()
+
+        try:
+            return self.lookup_history_tree(history_paths, history_paths[-1])
+        except _CorruptedArchiveError:
+            return ImmutableTree()
 
     def archive_inventory_tree(self, *, host_name: HostName) -> None:
         _archive_inventory_tree(self.inv_paths, host_name)
 
     def collect_archive_files(self, *, host_name: HostName) -> HistoryPaths:
         try:
-            archive_host_file_paths = list(self.inv_paths.archive_host(host_name).iterdir())
+            archive_paths = _collect_archive_paths(self.inv_paths, host_name)
         except FileNotFoundError:
             return HistoryPaths(paths=[], corrupted=[])
 
-        paths = []
-        corrupted = []
-        for file_path in archive_host_file_paths:
-            try:
-                paths.append(
-                    HistoryPath(
-                        tree_path=TreePath.from_archive_or_delta_cache_file_path(file_path),
-                        timestamp=int(file_path.with_suffix("").name),
-                    )
-                )
-            except ValueError:
-                corrupted.append(file_path)
-
+        paths = list(archive_paths.paths)
         tree_path = self.inv_paths.inventory_tree(host_name)
         try:
             paths.append(
@@ -2096,7 +2390,10 @@ class InventoryStore:
             except FileNotFoundError:
                 pass
 
-        return HistoryPaths(paths=sorted(paths, key=lambda hp: hp.timestamp), corrupted=corrupted)
+        return HistoryPaths(
+            paths=sorted(paths, key=lambda hp: hp.timestamp),
+            corrupted=archive_paths.corrupted,
+        )
 
     def load_history_entry(
         self, *, host_name: HostName, previous_timestamp: int, current_timestamp: int
@@ -2127,6 +2424,53 @@ class InventoryStore:
 
         return self._lookup.setdefault(key, _load_tree_from_tree_path(tree_path))
 
+    def lookup_history_tree(
+        self, history_paths: Sequence[HistoryPath], history_path: HistoryPath
+    ) -> ImmutableTree:
+        # Raises _CorruptedArchiveError if the deltas cannot be replayed
+        if history_path.delta_path is None:
+            return self.lookup_tree(history_path.tree_path)
+
+        key = (history_path.delta_path, history_path.delta_path)
+        if key in self._lookup:
+            return self._lookup[key]
+
+        raw_tree = _load_raw_archived_tree(
+            history_paths[: history_paths.index(history_path) + 1], self._lookup_raw
+        )
+        return self._lookup.setdefault(key, deserialize_tree(raw_tree))
+
+    def load_archived_tree(self, *, host_name: HostName, timestamp: int) -> ImmutableTree:
+        """Load the inventory tree of the host at the given time"""
+        history_paths = [
+            hp
+            for hp in self.collect_archive_files(host_name=host_name).paths
+            if hp.timestamp <= timestamp
+        ]
+        if not history_paths:
+            return ImmutableTree()
+
+        try:
+            return self.lookup_history_tree(history_paths, history_paths[-1])
+        except _CorruptedArchiveError:
+            return ImmutableTree()
+
+    def load_archived_history_entry(
+        self, *, previous: HistoryPath, current: HistoryPath
+    ) -> HistoryEntry | None:
+        if current.delta_path is None:
+            return None
+
+        try:
+            raw_archive_delta = _load_raw_archive_delta(current.delta_path)
+        except _CorruptedArchiveError:
+            return None
+
+        if raw_archive_delta["previous"] != previous.timestamp:
+            return None
+
+        return HistoryEntry.from_raw(current.timestamp, raw_archive_delta["entry"])
+
     def save_history_entry(
         self,
         *,
@@ -2180,8 +2524,16 @@ def load_history(
     filter_tree: Sequence[SDFilterChoice] | None,
 ) -> History:
     files = inv_store.collect_archive_files(host_name=host_name)
+    corrupted = list(files.corrupted)
     entries: list[HistoryEntry] = []
     for previous, current in filter_history_paths(_get_pairs(files.paths)):
+        if (
+            entry := inv_store.load_archived_history_entry(previous=previous, current=current)
+        ) is not None:
+            if entry.new or entry.changed or entry.removed:
+                entries.append(entry)
+            continue
+
         if (
             entry := inv_store.load_history_entry(
                 host_name=host_name,
@@ -2192,8 +2544,13 @@ def load_history(
             entries.append(entry)
             continue
 
-        previous_tree = inv_store.lookup_tree(previous.tree_path)
-        current_tree = inv_store.lookup_tree(current.tree_path)
+        try:
+            previous_tree = inv_store.lookup_history_tree(files.paths, previous)
+            current_tree = inv_store.lookup_history_tree(files.paths, current)
+        except _CorruptedArchiveError as e:
+            corrupted.append(e.file_path)
+            continue
+
         entry = HistoryEntry.from_delta_tree(
             current.timestamp, current_tree.difference(previous_tree)
         )
@@ -2207,7 +2564,7 @@ def load_history(
             entries.append(entry)
 
     if filter_tree is None:
-        return History(entries=entries, corrupted=files.corrupted)
+        return History(entries=entries, corrupted=corrupted)
 
     return History(
         entries=[
@@ -2215,5 +2572,5 @@ def load_history(
             for e in entries
             if (d := e.delta_tree.filter(filter_tree))
         ],
-        corrupted=files.corrupted,
+        corrupted=corrupted,
     )
@@ -3,13 +3,16 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
-from collections.abc import Callable
+import asyncio
+import hashlib
+import time
+from collections.abc import Awaitable, Callable, Coroutine
 from enum import Enum
 from http import HTTPStatus
-from typing import Concatenate, ParamSpec, TypeVar
+from typing import Concatenate, Final, Generic, ParamSpec, TypeVar
 from urllib.parse import quote
 
-import requests
+import httpx
 from fastapi import HTTPException
 from fastapi.security import HTTPBasicCredentials
 from pydantic import BaseModel, UUID4
@@ -57,48 +60,110 @@ def _credentials_to_rest_api_auth(credentials: HTTPBasicCredentials) -> str:
     return f"Bearer {credentials.username} {credentials.password}"
 
 
-def _forward_post(
+# Mass rollouts of agents register thousands of hosts within minutes. The connections to the
+# local Apache are kept open, and the rarely changing answers are kept for a while.
+_MAX_CONNECTIONS: Final = 20
+_EDITION_TTL: Final = 300.0
+_HOST_CONFIGURATION_TTL: Final = 60.0
+_CONTROLLER_CERT_SETTINGS_TTL: Final = 300.0
+
+_client_of_loop: tuple[asyncio.AbstractEventLoop, httpx.AsyncClient] | None = None
+
+
+def _client() -> httpx.AsyncClient:
+    """The pooled client of the running event loop"""
+    global _client_of_loop
+    loop = asyncio.get_running_loop()
+    if _client_of_loop is None or _client_of_loop[0] is not loop:
+        _client_of_loop = (
+            loop,
+            httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=_MAX_CONNECTIONS,
+                    max_keepalive_connections=_MAX_CONNECTIONS,
+                ),
+                timeout=30,
+            ),
+        )
+    return _client_of_loop[1]
+
+
+_TKey = TypeVar("_TKey")
+_TValue = TypeVar("_TValue")
+
+
+class _TTLCache(Generic[_TKey, _TValue]):
+    """Values which expire `ttl` seconds after they were added"""
+
+    def __init__(self, ttl: float, max_size: int = 10000) -> None:
+        self._ttl = ttl
+        self._max_size = max_size
+        self._entries: dict[_TKey, tuple[float, _TValue]] = {}
+
+    def lookup(self, key: _TKey) -> _TValue | None:
+        if (entry := self._entries.get(key)) is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        return entry[1]
+
+    def add(self, key: _TKey, value: _TValue) -> None:
+        now = time.monotonic()
+        if len(self._entries) >= self._max_size:
+            self._entries = {k: e for k, e in self._entries.items() if e[0] >= now}
+            if len(self._entries) >= self._max_size:
+                self._entries.clear()
+        self._entries[key] = (now + self._ttl, value)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def _credentials_key(credentials: HTTPBasicCredentials) -> str:
+    """The answers are cached per user, but without keeping the passwords"""
+    return hashlib.sha256(f"{credentials.username}\0{credentials.password}".encode()).hexdigest()
+
+
+async def _forward_post(
     endpoint: str,
     credentials: HTTPBasicCredentials,
     json_body: dict[str, object],
-) -> requests.Response:
-    return requests.post(
+) -> httpx.Response:
+    return await _client().post(
         f"{_local_rest_api_url()}/{endpoint}",
         headers={
             "Authorization": _credentials_to_rest_api_auth(credentials),
             "Accept": "application/json",
         },
         json=json_body,
-        timeout=30,
     )
 
 
-def _forward_get(
+async def _forward_get(
     endpoint: str,
     credentials: HTTPBasicCredentials,
-) -> requests.Response:
-    return requests.get(
+) -> httpx.Response:
+    return await _client().get(
         f"{_local_rest_api_url()}/{endpoint}",
         headers={
             "Authorization": _credentials_to_rest_api_auth(credentials),
         },
-        timeout=30,
     )
 
 
-def _forward_put(
+async def _forward_put(
     endpoint: str,
     credentials: HTTPBasicCredentials,
     json_body: dict[str, object],
-) -> requests.Response:
-    return requests.put(
+) -> httpx.Response:
+    return await _client().put(
         f"{_local_rest_api_url()}/{endpoint}",
         headers={
             "Authorization": _credentials_to_rest_api_auth(credentials),
             "Accept": "application/json",
         },
         json=json_body,
-        timeout=30,
     )
 
 
@@ -107,16 +172,16 @@ _TEndpointReturn = TypeVar("_TEndpointReturn")
 
 
 def log_http_exception(
-    endpoint_call: Callable[_TEndpointParams, _TEndpointReturn],
-) -> Callable[Concatenate[str, _TEndpointParams], _TEndpointReturn]:
-    def wrapper(
+    endpoint_call: Callable[_TEndpointParams, Awaitable[_TEndpointReturn]],
+) -> Callable[Concatenate[str, _TEndpointParams], Coroutine[None, None, _TEndpointReturn]]:
+    async def wrapper(
         log_text: str,
         /,
         *args: _TEndpointParams.args,
         **kwargs: _TEndpointParams.kwargs,
     ) -> _TEndpointReturn:
         try:
-            return endpoint_call(*args, **kwargs)
+            return await endpoint_call(*args, **kwargs)
         except HTTPException as http_excpt:
             logger.error(
                 "%s. Error message: %s",
@@ -132,19 +197,31 @@ class ControllerCertSettings(BaseModel, frozen=True):
     lifetime_in_months: int
 
 
+_CONTROLLER_CERT_SETTINGS_CACHE: Final[_TTLCache[str, ControllerCertSettings]] = _TTLCache(
+    _CONTROLLER_CERT_SETTINGS_TTL
+)
+
+
 @log_http_exception
-def controller_certificate_settings(
+async def controller_certificate_settings(
     site_internal_secret: B64SiteInternalSecret,
 ) -> ControllerCertSettings:
-    response = requests.get(
+    if (
+        settings := _CONTROLLER_CERT_SETTINGS_CACHE.lookup(
+            key := hashlib.sha256(site_internal_secret.encode()).hexdigest()
+        )
+    ) is not None:
+        return settings
+    response = await _client().get(
         f"{_local_rest_api_url()}/agent_controller_certificates_settings",
         headers={
             "Authorization": f"InternalToken {site_internal_secret}",
         },
-        timeout=30,
     )
     _verify_response(response, HTTPStatus.OK)
-    return ControllerCertSettings.model_validate(response.json())
+    settings = ControllerCertSettings.model_validate(response.json())
+    _CONTROLLER_CERT_SETTINGS_CACHE.add(key, settings)
+    return settings
 
 
 class RegisterResponse(BaseModel, frozen=True):
@@ -152,12 +229,12 @@ class RegisterResponse(BaseModel, frozen=True):
 
 
 @log_http_exception
-def register(
+async def register(
     credentials: HTTPBasicCredentials,
     uuid: UUID4,
     host_name: str,
 ) -> RegisterResponse:
-    response = _forward_put(
+    response = await _forward_put(
         f"objects/host_config_internal/{_url_encode_hostname(host_name)}/actions/register/invoke",
         credentials,
         {
@@ -175,8 +252,8 @@ def register(
 
 
 @log_http_exception
-def get_root_cert(credentials: HTTPBasicCredentials) -> str:
-    response = _forward_get(
+async def get_root_cert(credentials: HTTPBasicCredentials) -> str:
+    response = await _forward_get(
         "root_cert",
         credentials,
     )
@@ -185,11 +262,11 @@ def get_root_cert(credentials: HTTPBasicCredentials) -> str:
 
 
 @log_http_exception
-def post_csr(
+async def post_csr(
     credentials: HTTPBasicCredentials,
     csr: str,
 ) -> str:
-    response = _forward_post(
+    response = await _forward_post(
         "csr",
         credentials,
         {"csr": csr},
@@ -225,13 +302,24 @@ def _url_encode_hostname(host_name: str) -> str:
     return quote(host_name, safe="")  # '/' is not "safe" here
 
 
+_HOST_CONFIGURATION_CACHE: Final[_TTLCache[tuple[str, str], HostConfiguration]] = _TTLCache(
+    _HOST_CONFIGURATION_TTL
+)
+
+
 @log_http_exception
-def host_configuration(
+async def host_configuration(
     credentials: HTTPBasicCredentials,
     host_name: str,
 ) -> HostConfiguration:
     if (
-        response := _forward_get(
+        host_config := _HOST_CONFIGURATION_CACHE.lookup(
+            key := (_credentials_key(credentials), host_name)
+        )
+    ) is not None:
+        return host_config
+    if (
+        response := await _forward_get(
             f"objects/host_config_internal/{_url_encode_hostname(host_name)}",
             credentials,
         )
@@ -242,16 +330,18 @@ def host_configuration(
             detail=f"Host {host_name} does not exist.",
         )
     _verify_response(response, HTTPStatus.OK)
-    return HostConfiguration(**response.json())
+    host_config = HostConfiguration(**response.json())
+    _HOST_CONFIGURATION_CACHE.add(key, host_config)
+    return host_config
 
 
 @log_http_exception
-def link_host_with_uuid(
+async def link_host_with_uuid(
     credentials: HTTPBasicCredentials,
     host_name: str,
     uuid: UUID4,
 ) -> None:
-    response = _forward_put(
+    response = await _forward_put(
         f"objects/host_config_internal/{_url_encode_hostname(host_name)}/actions/link_uuid/invoke",
         credentials,
         {"uuid": str(uuid)},
@@ -259,18 +349,25 @@ def link_host_with_uuid(
     _verify_response(response, HTTPStatus.NO_CONTENT)
 
 
+_EDITION_CACHE: Final[_TTLCache[str, CMKEdition]] = _TTLCache(_EDITION_TTL)
+
+
 @log_http_exception
-def cmk_edition(credentials: HTTPBasicCredentials) -> CMKEdition:
-    response = _forward_get(
+async def cmk_edition(credentials: HTTPBasicCredentials) -> CMKEdition:
+    if (edition := _EDITION_CACHE.lookup(key := _credentials_key(credentials))) is not None:
+        return edition
+    response = await _forward_get(
         "version",
         credentials,
     )
     _verify_response(response, HTTPStatus.OK)
-    return CMKEdition[response.json()["edition"]]
+    edition = CMKEdition[response.json()["edition"]]
+    _EDITION_CACHE.add(key, edition)
+    return edition
 
 
 def _verify_response(
-    response: requests.Response,
+    response: httpx.Response,
     expected_status_code: HTTPStatus,
 ) -> None:
     if response.status_code != expected_status_code:
@@ -4,9 +4,12 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 from enum import Enum
-from zlib import decompress
+from typing import BinaryIO
+from zlib import decompress, decompressobj
 from zlib import error as zlibError
 
+_CHUNK_SIZE = 64 * 1024
+
 
 class DecompressionError(Exception): ...
 
@@ -37,3 +40,33 @@ class Decompressor(Enum):
             return decompress(data)
         except zlibError as e:
             raise DecompressionError(f"Decompression with zlib failed: {e}") from e
+
+    def decompress_stream(self, source: BinaryIO, target: BinaryIO) -> None:
+        """
+        >>> from io import BytesIO
+        >>> from zlib import compress
+        >>> Decompressor("zlib").decompress_stream(BytesIO(compress(b"blablub")), target := BytesIO())
+        >>> target.getvalue()
+        b'blablub'
+        """
+        {Decompressor.ZLIB: Decompressor._zlib_decompress_stream}[self](source, target)
+
+    @staticmethod
+    def _zlib_decompress_stream(source: BinaryIO, target: BinaryIO) -> None:
+        """
+        >>> from io import BytesIO
+        >>> from zlib import compress
+        >>> Decompressor._zlib_decompress_stream(BytesIO(compress(b"blablub")[:-2]), BytesIO())
+        Traceback (most recent call last):
+            ...
+        packages.cmk-agent-receiver.cmk.agent_receiver.decompression.DecompressionError: ...
+        """
+        decompressor = decompressobj()
+        try:
+            while chunk := source.read(_CHUNK_SIZE):
+                target.write(decompressor.decompress(chunk))
+            target.write(decompressor.flush())
+        except zlibError as e:
+            raise DecompressionError(f"Decompression with zlib failed: {e}") from e
+        if not decompressor.eof:
+            raise DecompressionError("Decompression with zlib failed: incomplete data")
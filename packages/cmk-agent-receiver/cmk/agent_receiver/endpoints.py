@@ -3,10 +3,7 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
-import os
-import tempfile
 from functools import cache
-from pathlib import Path
 from typing import assert_never
 
 from cryptography.x509 import Certificate
@@ -42,6 +39,7 @@ from .checkmk_rest_api import (
     register,
 )
 from .decompression import DecompressionError, Decompressor
+from .ingestion import store_agent_data, store_compressed_agent_data
 from .log import logger
 from .models import (
     CertificateRenewalBody,
@@ -84,12 +82,14 @@ def _validate_uuid_against_csr(uuid: UUID4, csr_field: CsrField) -> None:
         )
 
 
-def _sign_agent_csr(uuid: UUID4, csr_field: CsrField) -> Certificate:
+async def _sign_agent_csr(uuid: UUID4, csr_field: CsrField) -> Certificate:
     return sign_agent_csr(
         csr_field.csr,
-        controller_certificate_settings(
-            f"uuid={uuid} Querying agent controller certificate settings failed",
-            internal_credentials(),
+        (
+            await controller_certificate_settings(
+                f"uuid={uuid} Querying agent controller certificate settings failed",
+                internal_credentials(),
+            )
         ).lifetime_in_months,
         agent_root_ca(),
         current_time_naive(),
@@ -113,12 +113,12 @@ async def register_existing(
     _validate_uuid_against_csr(registration_body.uuid, registration_body.csr)
     root_cert = _pem_serizialized_site_root_cert()
     agent_cert = serialize_to_pem(
-        _sign_agent_csr(
+        await _sign_agent_csr(
             registration_body.uuid,
             registration_body.csr,
         )
     )
-    register_response = register(
+    register_response = await register(
         f"uuid={registration_body.uuid} Registration failed",
         credentials,
         registration_body.uuid,
@@ -144,11 +144,11 @@ async def pairing(
 ) -> PairingResponse:
     uuid = uuid_from_pem_csr(pairing_body.csr)
 
-    root_cert = get_root_cert(
+    root_cert = await get_root_cert(
         f"uuid={uuid} Getting root cert failed",
         credentials,
     )
-    client_cert = post_csr(
+    client_cert = await post_csr(
         f"uuid={uuid} CSR signing failed",
         credentials,
         pairing_body.csr,
@@ -191,13 +191,13 @@ async def register_with_hostname(
     registration_body: RegistrationWithHNBody,
 ) -> Response:
     _validate_registration_request(
-        host_configuration(
+        await host_configuration(
             f"uuid={registration_body.uuid} Getting host configuration failed",
             credentials,
             registration_body.host_name,
         )
     )
-    link_host_with_uuid(
+    await link_host_with_uuid(
         f"uuid={registration_body.uuid} Linking host with UUID failed",
         credentials,
         registration_body.host_name,
@@ -220,7 +220,7 @@ async def register_new(
     credentials: HTTPBasicCredentials = Depends(security),
     registration_body: RegisterNewBody,
 ) -> RegisterNewResponse:
-    _validate_is_allowed(credentials, registration_body.uuid)
+    await _validate_is_allowed(credentials, registration_body.uuid)
     _validate_uuid_against_csr(registration_body.uuid, registration_body.csr)
 
     root_cert = _pem_serizialized_site_root_cert()
@@ -232,7 +232,7 @@ async def register_new(
             username=credentials.username,
             agent_labels=registration_body.agent_labels,
             agent_cert=serialize_to_pem(
-                _sign_agent_csr(
+                await _sign_agent_csr(
                     registration_body.uuid,
                     registration_body.csr,
                 )
@@ -263,7 +263,7 @@ async def register_new_ongoing(
     | RegisterNewOngoingResponseDeclined
     | RegisterNewOngoingResponseSuccess
 ):
-    _validate_is_allowed(credentials, uuid)
+    await _validate_is_allowed(credentials, uuid)
 
     try:
         r4r = R4R.read(uuid)
@@ -326,9 +326,9 @@ async def register_new_ongoing(
     assert_never(r4r.status)
 
 
-def _validate_is_allowed(credentials: HTTPBasicCredentials, uuid: UUID4) -> None:
+async def _validate_is_allowed(credentials: HTTPBasicCredentials, uuid: UUID4) -> None:
     if not (
-        edition := cmk_edition(
+        edition := await cmk_edition(
             f"uuid={uuid} Querying Checkmk edition failed",
             credentials,
         )
@@ -345,22 +345,6 @@ def _validate_is_allowed(credentials: HTTPBasicCredentials, uuid: UUID4) -> None
         )
 
 
-def _store_agent_data(
-    target_dir: Path,
-    decompressed_data: bytes,
-) -> None:
-    target_dir.resolve().mkdir(parents=True, exist_ok=True)
-    with tempfile.NamedTemporaryFile(
-        dir=target_dir,
-        delete=False,
-    ) as temp_file:
-        try:
-            temp_file.write(decompressed_data)
-            os.rename(temp_file.name, target_dir / "agent_output")
-        finally:
-            Path(temp_file.name).unlink(missing_ok=True)
-
-
 @UUID_VALIDATION_ROUTER.post(
     "/agent_data/{uuid}",
     status_code=HTTP_204_NO_CONTENT,
@@ -406,7 +390,12 @@ async def agent_data(
         ) from e
 
     try:
-        decompressed_agent_data = decompressor(monitoring_data.file.read())
+        await store_agent_data(
+            host.source_path,
+            monitoring_data.file,
+            decompressor,
+            store_compressed=store_compressed_agent_data(),
+        )
     except DecompressionError as e:
         logger.error(
             "uuid=%s Decompression of agent data failed: %s",
@@ -418,11 +407,6 @@ async def agent_data(
             detail="Decompression of agent data failed",
         ) from e
 
-    _store_agent_data(
-        host.source_path,
-        decompressed_agent_data,
-    )
-
     logger.info(
         "uuid=%s Agent data saved",
         uuid,
@@ -505,7 +489,7 @@ async def renew_certificate(
             detail="Host is not registered",
         ) from e
 
-    agent_cert = _sign_agent_csr(uuid, cert_renewal_body.csr)
+    agent_cert = await _sign_agent_csr(uuid, cert_renewal_body.csr)
 
     logger.info(
         "uuid=%s Certificate renewal succeeded",
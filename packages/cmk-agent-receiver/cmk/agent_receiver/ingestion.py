@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Storing the agent data sent by the push agents
+
+Decompressing and writing the data blocks on CPU and disk, so it is done in a thread pool,
+keeping the event loop of the worker free for the other requests. The uploads waiting for a free
+thread show how far behind the worker is.
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import BinaryIO, Final
+
+from starlette.concurrency import run_in_threadpool
+
+from .decompression import Decompressor
+from .log import logger
+
+# Agent data stored as sent by the agent starts with this prefix. It never starts an agent output.
+# Keep in sync with cmk.fetchers.filecache.
+COMPRESSED_AGENT_DATA_PREFIX: Final = b"\x00zlib\x00"
+
+# The number of uploads stored at the same time by a worker
+INGESTION_THREADS: Final = 8
+
+_AGENT_OUTPUT: Final = "agent_output"
+
+
+class IngestionStats:
+    """The backpressure of the agent data ingestion of this worker, logged once a minute"""
+
+    def __init__(self, interval: float = 60.0) -> None:
+        self._interval = interval
+        self.waiting = 0
+        self._reset(time.monotonic())
+
+    def _reset(self, now: float) -> None:
+        self._start = now
+        self.uploads = 0
+        self.max_waiting = 0
+        self.wait_time = 0.0
+        self.store_time = 0.0
+        self.received_bytes = 0
+
+    def queued(self) -> None:
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def started(self) -> None:
+        self.waiting -= 1
+
+    def stored(self, *, wait_time: float, store_time: float, received_bytes: int) -> None:
+        self.uploads += 1
+        self.wait_time += wait_time
+        self.store_time += store_time
+        self.received_bytes += received_bytes
+        if (elapsed := (now := time.monotonic()) - self._start) < self._interval:
+            return
+        logger.info(
+            "Agent data of %d uploads stored (%.1f/s, %.1f kB/s received), "
+            "waiting for a thread: %d now, %d at most, %.1f ms on average, "
+            "storing: %.1f ms on average",
+            self.uploads,
+            self.uploads / elapsed,
+            self.received_bytes / elapsed / 1024,
+            self.waiting,
+            self.max_waiting,
+            1000 * self.wait_time / self.uploads,
+            1000 * self.store_time / self.uploads,
+        )
+        self._reset(now)
+
+
+STATS: Final = IngestionStats()
+
+_THREADS: Final = asyncio.Semaphore(INGESTION_THREADS)
+
+
+def store_compressed_agent_data() -> bool:
+    """Whether to store the agent data as sent, leaving the decompression to the fetcher"""
+    return os.environ.get("AGENT_RECEIVER_STORE_COMPRESSED", "") == "on"
+
+
+async def store_agent_data(
+    target_dir: Path,
+    data: BinaryIO,
+    decompressor: Decompressor,
+    *,
+    store_compressed: bool,
+) -> None:
+    """Store the agent data in a thread of the pool
+
+    Raises a DecompressionError if the data cannot be decompressed."""
+    queued = time.monotonic()
+    STATS.queued()
+    try:
+        await _THREADS.acquire()
+    finally:
+        STATS.started()
+    started = time.monotonic()
+    try:
+        await run_in_threadpool(_store_agent_data, target_dir, data, decompressor, store_compressed)
+    finally:
+        _THREADS.release()
+        STATS.stored(
+            wait_time=started - queued,
+            store_time=time.monotonic() - started,
+            received_bytes=data.tell(),
+        )
+
+
+def _store_agent_data(
+    target_dir: Path,
+    data: BinaryIO,
+    decompressor: Decompressor,
+    store_compressed: bool,
+) -> None:
+    target_dir.resolve().mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        dir=target_dir,
+        delete=False,
+    ) as temp_file:
+        try:
+            if store_compressed:
+                temp_file.write(COMPRESSED_AGENT_DATA_PREFIX)
+                shutil.copyfileobj(data, temp_file)
+            else:
+                decompressor.decompress_stream(data, temp_file)
+            temp_file.flush()
+            os.rename(temp_file.name, target_dir / _AGENT_OUTPUT)
+        finally:
+            Path(temp_file.name).unlink(missing_ok=True)
@@ -3,38 +3,48 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import asyncio
+
+import httpx
 import pytest
 from fastapi import HTTPException
 from fastapi.security import HTTPBasicCredentials
 from pydantic import UUID4
 from pytest_mock import MockerFixture
-from requests import Response
 
-from cmk.agent_receiver.checkmk_rest_api import link_host_with_uuid
+from cmk.agent_receiver import checkmk_rest_api
+from cmk.agent_receiver.checkmk_rest_api import (
+    cmk_edition,
+    CMKEdition,
+    host_configuration,
+    HostConfiguration,
+    link_host_with_uuid,
+)
 
 
 def test_link_host_with_uuid_unauthorized(
     mocker: MockerFixture,
     uuid: UUID4,
 ) -> None:
-    response = Response()
-    response.status_code = 403
-    response._content = (  # noqa: SLF001
-        b'{"title": "You do not have the permission for agent pairing.", "status": 403}'
+    response = httpx.Response(
+        403,
+        content=b'{"title": "You do not have the permission for agent pairing.", "status": 403}',
     )
     mocker.patch(
         "cmk.agent_receiver.checkmk_rest_api._forward_put",
         return_value=response,
     )
     with pytest.raises(HTTPException) as excpt_info:
-        link_host_with_uuid(
-            "some log message",
-            HTTPBasicCredentials(
-                username="amdin",
-                password="password",
-            ),
-            "some_host",
-            uuid,
+        asyncio.run(
+            link_host_with_uuid(
+                "some log message",
+                HTTPBasicCredentials(
+                    username="amdin",
+                    password="password",
+                ),
+                "some_host",
+                uuid,
+            )
         )
 
     assert excpt_info.value.status_code == 403
@@ -45,18 +55,55 @@ def test_link_host_with_uuid_ok(
     mocker: MockerFixture,
     uuid: UUID4,
 ) -> None:
-    response = Response()
-    response.status_code = 204
     mocker.patch(
         "cmk.agent_receiver.checkmk_rest_api._forward_put",
-        return_value=response,
+        return_value=httpx.Response(204),
+    )
+    asyncio.run(
+        link_host_with_uuid(
+            "some log message",
+            HTTPBasicCredentials(
+                username="amdin",
+                password="password",
+            ),
+            "some_host",
+            uuid,
+        )
     )
-    link_host_with_uuid(
-        "some log message",
-        HTTPBasicCredentials(
-            username="amdin",
-            password="password",
-        ),
-        "some_host",
-        uuid,
+
+
+def test_cmk_edition_cached(mocker: MockerFixture) -> None:
+    checkmk_rest_api._EDITION_CACHE.clear()  # noqa: SLF001
+    forward_get = mocker.patch(
+        "cmk.agent_receiver.checkmk_rest_api._forward_get",
+        return_value=httpx.Response(200, json={"edition": "cce"}),
     )
+    credentials = HTTPBasicCredentials(username="amdin", password="password")
+
+    assert asyncio.run(cmk_edition("some log message", credentials)) is CMKEdition.cce
+    assert asyncio.run(cmk_edition("some log message", credentials)) is CMKEdition.cce
+    forward_get.assert_called_once()
+
+    asyncio.run(
+        cmk_edition("some log message", HTTPBasicCredentials(username="amdin", password="other"))
+    )
+    assert forward_get.call_count == 2
+
+
+def test_host_configuration_not_found_not_cached(mocker: MockerFixture) -> None:
+    checkmk_rest_api._HOST_CONFIGURATION_CACHE.clear()  # noqa: SLF001
+    forward_get = mocker.patch(
+        "cmk.agent_receiver.checkmk_rest_api._forward_get",
+        return_value=httpx.Response(404),
+    )
+    credentials = HTTPBasicCredentials(username="amdin", password="password")
+
+    with pytest.raises(HTTPException):
+        asyncio.run(host_configuration("some log message", credentials, "some_host"))
+
+    forward_get.return_value = httpx.Response(200, json={"site": "heute", "is_cluster": False})
+    for _ in range(2):
+        assert asyncio.run(
+            host_configuration("some log message", credentials, "some_host")
+        ) == HostConfiguration(site="heute", is_cluster=False)
+    assert forward_get.call_count == 2
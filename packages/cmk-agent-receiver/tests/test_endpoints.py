@@ -56,7 +56,7 @@ def test_register_existing_ok(
     uuid: UUID4,
     serialized_csr: str,
 ) -> None:
-    def rest_api_register_mock(*_args: object, **_kwargs: object) -> RegisterResponse:
+    async def rest_api_register_mock(*_args: object, **_kwargs: object) -> RegisterResponse:
         _symlink_push_host(tmp_path, uuid)
         return RegisterResponse(connection_mode=ConnectionMode.PULL)
 
@@ -680,6 +680,27 @@ def test_agent_data_success(
     assert response.status_code == 204
 
 
+@pytest.mark.usefixtures("symlink_push_host")
+def test_agent_data_store_compressed(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    client: TestClient,
+    uuid: UUID4,
+    agent_data_headers: MutableMapping[str, str],
+) -> None:
+    monkeypatch.setenv("AGENT_RECEIVER_STORE_COMPRESSED", "on")
+    response = client.post(
+        f"/agent_data/{uuid}",
+        headers=agent_data_headers,
+        files={"monitoring_data": ("filename", io.BytesIO(compress(b"mock file")))},
+    )
+
+    file_path = tmp_path / "push-agent" / "hostname" / "agent_output"
+    assert file_path.read_bytes() == b"\x00zlib\x00" + compress(b"mock file")
+
+    assert response.status_code == 204
+
+
 @pytest.fixture(name="registration_status_headers")
 def fixture_registration_status_headers(uuid: UUID4) -> dict[str, str]:
     return {
@@ -6,14 +6,18 @@
 functionality is the locked file opening realized with the File() context
 manager."""
 
+import importlib.util
 import logging
+import marshal
 import pickle
 import pprint
 import shutil
+import struct
 from collections.abc import Mapping
-from contextlib import nullcontext
+from contextlib import nullcontext, suppress
 from pathlib import Path
-from typing import Any
+from types import CodeType
+from typing import Any, Final
 
 from cmk.ccc.exceptions import MKGeneralException, MKTerminate, MKTimeout
 from cmk.ccc.i18n import _
@@ -44,6 +48,7 @@ from cmk import trace
 
 __all__ = [
     "BytesSerializer",
+    "CodeCache",
     "DimSerializer",
     "FileIo",
     "ObjectStore",
@@ -321,3 +326,51 @@ def try_load_file_from_pickle_cache(
 def clear_pickled_files_cache(temp_dir: Path) -> None:
     """Remove all cached pickle files"""
     shutil.rmtree(_pickled_files_cache_dir(temp_dir), ignore_errors=True)
+
+
+def _compiled_files_cache_dir(temp_dir: Path) -> Path:
+    return temp_dir / "compiled_files_cache"
+
+
+# The Python version of the code, the size and the modification time of the compiled file
+_CODE_HEADER: Final = struct.Struct(f"<{len(importlib.util.MAGIC_NUMBER)}sqq")
+
+
+class CodeCache:
+    """Compiles Python files, with the code objects cached in the tmpfs
+
+    Compiling big configuration files, e.g. the rules.mk files, takes much longer than loading
+    their marshalled code. A cached code object is used as long as the size and the modification
+    time of the file are the same. The cached files are located in the tmpfs directory under the
+    same relative site path, like the pickled files cache.
+    """
+
+    def __init__(self, *, temp_dir: Path, root_dir: Path) -> None:
+        self._cache_dir = _compiled_files_cache_dir(temp_dir)
+        self._root_dir = root_dir
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, path: Path) -> CodeType:
+        try:
+            relative_path = path.relative_to(self._root_dir)
+        except ValueError:
+            self.misses += 1
+            return compile(path.read_text(), path, "exec")
+        cache_path = self._cache_dir / relative_path.parent / (relative_path.name + ".marshal")
+
+        stat = path.stat()
+        header = _CODE_HEADER.pack(importlib.util.MAGIC_NUMBER, stat.st_size, stat.st_mtime_ns)
+        with suppress(FileNotFoundError, EOFError, ValueError, TypeError):
+            raw = cache_path.read_bytes()
+            if raw.startswith(header):
+                code = marshal.loads(raw[len(header) :])
+                self.hits += 1
+                return code
+
+        self.misses += 1
+        code = compile(path.read_text(), path, "exec")
+        with suppress(OSError):
+            cache_path.parent.mkdir(exist_ok=True, parents=True)
+            save_bytes_to_file(cache_path, header + marshal.dumps(code))
+        return code
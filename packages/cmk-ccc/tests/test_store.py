@@ -251,6 +251,49 @@ def test_save_to_mk_file(tmp_path: Path) -> None:
     assert actual == {"x": {"a": 1, "y": 1}}
 
 
+def _exec_code(code: object) -> dict[str, object]:
+    into_dict: dict[str, object] = {}
+    exec(code, into_dict, into_dict)  # type: ignore[arg-type]  # nosec B102 # BNS:aee528
+    return {key: value for key, value in into_dict.items() if key != "__builtins__"}
+
+
+def test_code_cache(tmp_path: Path) -> None:
+    path = tmp_path / "site" / "etc" / "rules.mk"
+    path.parent.mkdir(parents=True)
+    path.write_text("x = {'a': 1}\n")
+
+    code_cache = store.CodeCache(temp_dir=tmp_path / "tmp", root_dir=tmp_path / "site")
+    assert _exec_code(code_cache.compile(path)) == {"x": {"a": 1}}
+    assert (tmp_path / "tmp" / "compiled_files_cache" / "etc" / "rules.mk.marshal").exists()
+    assert _exec_code(code_cache.compile(path)) == {"x": {"a": 1}}
+    assert (code_cache.hits, code_cache.misses) == (1, 1)
+
+    path.write_text("x = {'a': 2, 'b': 3}\n")
+    assert _exec_code(code_cache.compile(path)) == {"x": {"a": 2, "b": 3}}
+    assert (code_cache.hits, code_cache.misses) == (1, 2)
+
+
+def test_code_cache_broken_cache_file(tmp_path: Path) -> None:
+    path = tmp_path / "rules.mk"
+    path.write_text("x = 1\n")
+    code_cache = store.CodeCache(temp_dir=tmp_path / "tmp", root_dir=tmp_path)
+    code_cache.compile(path)
+
+    cache_path = tmp_path / "tmp" / "compiled_files_cache" / "rules.mk.marshal"
+    cache_path.write_bytes(cache_path.read_bytes()[:-3])
+    assert _exec_code(code_cache.compile(path)) == {"x": 1}
+    assert code_cache.misses == 2
+
+
+def test_code_cache_outside_root_dir(tmp_path: Path) -> None:
+    path = tmp_path / "rules.mk"
+    path.write_text("x = 1\n")
+    code_cache = store.CodeCache(temp_dir=tmp_path / "tmp", root_dir=tmp_path / "site")
+
+    assert _exec_code(code_cache.compile(path)) == {"x": 1}
+    assert not (tmp_path / "tmp").exists()
+
+
 def test_acquire_lock_not_existing(tmp_path: Path) -> None:
     assert store.acquire_lock(tmp_path / "asd") is True
 
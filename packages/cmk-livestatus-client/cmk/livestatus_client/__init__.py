@@ -7,11 +7,13 @@
 from __future__ import annotations
 
 import ast
+import codecs
 import contextlib
 import json
 import os
 import re
 import select
+import selectors
 import socket
 import ssl
 import threading
@@ -172,6 +174,12 @@ tracer = trace.get_tracer()
 # Keep a global array of persistent connections
 persistent_connections: dict[str, socket.socket] = {}
 
+# Timeout for reading the payload of a response once its header has arrived.
+# 30 seconds should be more than enough for the maximum telegram size of 100MB
+RESPONSE_TIMEOUT = 30
+# Upper bound for a single recv() while collecting responses from several sites
+RECEIVE_CHUNK_SIZE = 4 * 1024 * 1024
+
 # Regular expression for removing Cache: headers if caching is not allowed
 remove_cache_regex = re.compile("\nCache:[^\n]*")
 
@@ -304,6 +312,13 @@ class Helpers:
     def query(self, query: QueryTypes, add_headers: str = "") -> LivestatusResponse:
         raise NotImplementedError()
 
+    def query_stream(self, query: QueryTypes, add_headers: str = "") -> Iterator[LivestatusRow]:
+        """Issues a query and returns an iterator over the rows of the response
+
+        Connections able to decode the response while receiving it yield the first rows before
+        the last ones have arrived."""
+        yield from self.query(query, add_headers)
+
     def query_value(self, query: QueryTypes, deflt: Any = no_default) -> LivestatusColumn:
         """Issues a query that returns exactly one line and one columns and returns
         the response as a single value"""
@@ -701,29 +716,41 @@ class SingleSiteConnection(Helpers):
                 pass
 
     def receive_data(self, size: int, timeout: float | None = None) -> bytes:
+        data = BytesIO()
+        for packet in self.receive_data_chunks(size, timeout):
+            data.write(packet)
+        return data.getvalue()
+
+    def receive_data_chunks(self, size: int, timeout: float | None = None) -> Iterator[bytes]:
+        """Yield the next size bytes from the socket as they arrive
+
+        The timeout only accounts for the time spent waiting for the socket, not for the
+        time the caller needs to process the chunks."""
         if self.socket is None:
             raise MKLivestatusSocketError("Socket to '%s' is not connected" % self.socketurl)
 
-        data = BytesIO()
         self.socket.settimeout(timeout)
-        receive_start = time.time()
-        while size > 0:
+        received = 0
+        waited = 0.0
+        while received < size:
+            wait_start = time.time()
             if is_socket_readable(self.socket, 0.1):
-                packet = self.socket.recv(size)
+                packet = self.socket.recv(min(size - received, RECEIVE_CHUNK_SIZE))
+                waited += time.time() - wait_start
                 if not packet:
                     raise MKLivestatusSocketClosed(
                         "Read zero data from socket, remote peer closed connection."
                     )
-                size -= len(packet)
-                data.write(packet)
-            if timeout is not None and (time.time() - receive_start) > timeout:
+                received += len(packet)
+                yield packet
+            else:
+                waited += time.time() - wait_start
+            if timeout is not None and waited > timeout:
                 raise MKLivestatusSocketError(
                     f"{timeout}s while reading data from socket. "
-                    "Received data: {data.getbuffer().nbytes}/{size} bytes"
+                    f"Received data: {received}/{size} bytes"
                 )
 
-        return data.getvalue()
-
     def do_query(self, query: Query, add_headers: str = "") -> LivestatusResponse:
         with (
             tracer.span(
@@ -799,86 +826,85 @@ class SingleSiteConnection(Helpers):
         timeout_at: float | None = None,
     ) -> bytes:
         try:
-            # Headers are always ASCII encoded
-            resp = self.receive_data(16)
-            code = resp[0:3].decode("ascii")
-            try:
-                length = int(resp[4:15].lstrip())
-            except Exception:
-                self.disconnect()
-                raise MKLivestatusSocketError(
-                    f"Malformed response header {resp!r}. Livestatus TCP socket might be "
-                    "unreachable or wrong encryption settings are used."
-                )
-
-            # Apply a lower timeout for the content because the data is already available
-            # in the socket. The liveproxyd (same system) has the complete data available
-            # while the data from a standard connection can still take some time.
-            # 30 seconds should be more than enough for the maximum telegram size of 100MB
-            data = self.receive_data(length, 30)
+            with _translate_response_errors(suppress_exceptions):
+                # Headers are always ASCII encoded
+                code, length = self.parse_response_header(self.receive_data(16))
 
-            if code == "200":
-                return data
+                # Apply a lower timeout for the content because the data is already available
+                # in the socket. The liveproxyd (same system) has the complete data available
+                # while the data from a standard connection can still take some time.
+                # 30 seconds should be more than enough for the maximum telegram size of 100MB
+                return self.check_response_code(code, self.receive_data(length, RESPONSE_TIMEOUT))
 
-            error_info = data.decode("utf-8")
-            if code == "404":
-                raise MKLivestatusTableNotFoundError(f"Not Found ({code}): {error_info!r}")
-
-            if code == "413":
-                raise MKLivestatusPayloadTooLargeError(error_info)
+        except (MKLivestatusSocketClosed, OSError) as e:
+            return self.reconnect_and_receive(query, suppress_exceptions, e, timeout_at)
 
-            if code == "495":
-                raise MKLivestatusCertificateError(error_info)
+    def reconnect_and_receive(
+        self,
+        query: str,
+        suppress_exceptions: tuple[type[Exception], ...],
+        error: MKLivestatusSocketClosed | OSError,
+        timeout_at: float | None = None,
+    ) -> bytes:
+        """Recover from a broken connection while waiting for the response to query"""
+        # In case of an IO error or the other side having
+        # closed the socket do a reconnect and try again
+        self.disconnect()
+
+        # In case of unix socket connections, do not start any reconnection attempts
+        # The other side (liveproxyd) might have had a good reason to disconnect
+        # Note: In most scenarios the liveproxyd still tries to send back a reasonable
+        # error response back to the client
+        if self.socket and self.socket.family == socket.AF_UNIX:
+            raise MKLivestatusSocketError("Unix socket was closed by peer")
+
+        now = time.time()
+        if not timeout_at or timeout_at > now:
+            if timeout_at is None:
+                # Try until timeout reached in case there was a timeout configured.
+                # Otherwise only retry once.
+                timeout_at = now
+                if self.timeout:
+                    timeout_at += self.timeout
 
-            if code == "502":
-                raise MKLivestatusBadGatewayError(error_info)
+            time.sleep(0.1)
+            self.connect()
+            self.send_query(query)
+            # do not send query again -> danger of infinite loop
+            return self.receive_raw_response(query, suppress_exceptions, timeout_at)
+        raise MKLivestatusSocketError(str(error))
+
+    def parse_response_header(self, header: bytes) -> tuple[str, int]:
+        """Split a fixed16 response header into status code and payload length"""
+        code = header[0:3].decode("ascii")
+        try:
+            return code, int(header[4:15].lstrip())
+        except Exception:
+            self.disconnect()
+            raise MKLivestatusSocketError(
+                f"Malformed response header {header!r}. Livestatus TCP socket might be "
+                "unreachable or wrong encryption settings are used."
+            )
 
-            raise MKLivestatusQueryError(f"{code}: {error_info}")
+    @staticmethod
+    def check_response_code(code: str, data: bytes) -> bytes:
+        if code == "200":
+            return data
 
-        except (MKLivestatusSocketClosed, OSError) as e:
-            # In case of an IO error or the other side having
-            # closed the socket do a reconnect and try again
-            self.disconnect()
+        error_info = data.decode("utf-8")
+        if code == "404":
+            raise MKLivestatusTableNotFoundError(f"Not Found ({code}): {error_info!r}")
 
-            # In case of unix socket connections, do not start any reconnection attempts
-            # The other side (liveproxyd) might have had a good reason to disconnect
-            # Note: In most scenarios the liveproxyd still tries to send back a reasonable
-            # error response back to the client
-            if self.socket and self.socket.family == socket.AF_UNIX:
-                raise MKLivestatusSocketError("Unix socket was closed by peer")
-
-            now = time.time()
-            if not timeout_at or timeout_at > now:
-                if timeout_at is None:
-                    # Try until timeout reached in case there was a timeout configured.
-                    # Otherwise only retry once.
-                    timeout_at = now
-                    if self.timeout:
-                        timeout_at += self.timeout
-
-                time.sleep(0.1)
-                self.connect()
-                self.send_query(query)
-                # do not send query again -> danger of infinite loop
-                return self.receive_raw_response(query, suppress_exceptions, timeout_at)
-            raise MKLivestatusSocketError(str(e))
+        if code == "413":
+            raise MKLivestatusPayloadTooLargeError(error_info)
 
-        except suppress_exceptions:
-            raise
+        if code == "495":
+            raise MKLivestatusCertificateError(error_info)
 
-        except MKLivestatusCertificateError as e:
-            raise MKLivestatusCertificateError(
-                "SSL certificate verification failed. "
-                "The remote certificate(s) might not be trusted. Edit this site's Livestatus encryption to trust them. "
-                "Technical error: %s" % e
-            )
+        if code == "502":
+            raise MKLivestatusBadGatewayError(error_info)
 
-        except Exception as e:
-            # Catches
-            # MKLivestatusQueryError
-            # MKLivestatusSocketError
-            # FIXME: ? self.disconnect()
-            raise MKLivestatusSocketError("Unhandled exception: %s" % e)
+        raise MKLivestatusQueryError(f"{code}: {error_info}")
 
     def parse_raw_response(self, raw_response: bytes, query: Query) -> LivestatusResponse:
         data = raw_response.decode("utf-8")
@@ -923,6 +949,76 @@ class SingleSiteConnection(Helpers):
                 row.insert(0, b"")
         return response
 
+    @override
+    def query_stream(self, query: QueryTypes, add_headers: str = "") -> Iterator[LivestatusRow]:
+        """Issue a query and yield the rows while the response is still being received
+
+        The response is never held in memory as a whole. Rows which have been handed out can
+        not be taken back, so a connection breaking down in the middle of the response is not
+        retried but raises MKLivestatusSocketError. Abandoning the iterator closes the
+        connection.
+        """
+        normalized_query = Query(query) if not isinstance(query, Query) else query
+        if self.limit is not None:
+            normalized_query = Query(
+                "%sLimit: %d\n" % (normalized_query, self.limit),
+                normalized_query.suppress_exceptions,
+            )
+
+        with (
+            tracer.span(
+                "query_stream",
+                kind=trace.SpanKind.CLIENT,
+                attributes={
+                    "cmk.livestatus.target_site_id": str(self.site_name),
+                },
+            ) as span,
+            _livestatus_output_format_switcher(normalized_query, self),
+        ):
+            str_query = self.build_query(normalized_query, add_headers)
+            span.set_attribute("cmk.livestatus.query", str_query)
+
+            self.send_query(str_query)
+            complete = False
+            try:
+                for row in self._receive_rows(
+                    str_query, normalized_query.suppress_exceptions, _RowDecoder(self._output_format)
+                ):
+                    if self.prepend_site:
+                        row.insert(0, b"")
+                    yield row
+                complete = True
+            finally:
+                if not complete:
+                    # The rest of the response would garble the next query
+                    self.disconnect()
+
+    def _receive_rows(
+        self, query: str, suppress_exceptions: tuple[type[Exception], ...], decoder: _RowDecoder
+    ) -> Iterator[LivestatusRow]:
+        try:
+            with _translate_response_errors(suppress_exceptions):
+                code, length = self.parse_response_header(self.receive_data(16))
+                if code != "200":
+                    self.check_response_code(code, self.receive_data(length, RESPONSE_TIMEOUT))
+        except (MKLivestatusSocketClosed, OSError) as e:
+            # Nothing has been handed out yet, so the query may still be repeated
+            yield from decoder.feed(self.reconnect_and_receive(query, suppress_exceptions, e))
+            yield from decoder.finish()
+            return
+
+        chunks = self.receive_data_chunks(length, RESPONSE_TIMEOUT)
+        while True:
+            try:
+                with _translate_response_errors(suppress_exceptions):
+                    chunk = next(chunks, None)
+            except (MKLivestatusSocketClosed, OSError) as e:
+                raise MKLivestatusSocketError(f"Connection lost while receiving the response: {e}")
+            if chunk is None:
+                break
+            yield from decoder.feed(chunk)
+        yield from decoder.finish()
+
     def command(
         self,
         command: str,
@@ -1283,13 +1379,7 @@ class MultiSiteConnection(Helpers):
         Limit: is simply applied to all sites - resulting in possibly more results then Limit
         requests.
         """
-        stillalive = []
-        if self.only_sites is not None:
-            connect_to_sites = [c for c in self.connections if c[0] in self.only_sites]
-            # Unused sites are assumed to be alive
-            stillalive.extend([c for c in self.connections if c[0] not in self.only_sites])
-        else:
-            connect_to_sites = self.connections
+        stillalive, connect_to_sites = self._split_queried_sites()
 
         with tracer.span("query_parallel", attributes={"cmk.livestatus.query": str(query)}):
             # First send all queries
@@ -1306,9 +1396,59 @@ class MultiSiteConnection(Helpers):
             # Convert responses to python format
             result = self._parse_responses(query, site_responses, stillalive)
 
-        self.connections = stillalive
+        self._keep_connections(stillalive)
         return LivestatusResponse(result)
 
+    def query_parallel_iter(
+        self, query: QueryTypes, add_headers: str = ""
+    ) -> Iterator[tuple[SiteId, LivestatusResponse]]:
+        """Query all sites in parallel and yield the rows of each site as soon as they arrive
+
+        The sites are yielded in the order their responses complete, so a slow site does not
+        hold back the results of the others. Sites failing to answer are recorded in the
+        deadsites and skipped. Like query_parallel(), the Limit: is applied to every site.
+        """
+        normalized_query = Query(query) if not isinstance(query, Query) else query
+        stillalive, connect_to_sites = self._split_queried_sites()
+
+        with (
+            _livestatus_output_format_switcher(normalized_query, self),
+            tracer.span(
+                "query_parallel_iter", attributes={"cmk.livestatus.query": str(normalized_query)}
+            ),
+        ):
+            retrieve_responses = self._send_queries(
+                normalized_query,
+                add_headers,
+                connect_to_sites,
+                limit_header="Limit: %d\n" % self.limit if self.limit is not None else "",
+            )
+            for connected_site, raw_response in self._receive_responses_as_completed(
+                normalized_query, retrieve_responses, stillalive
+            ):
+                num_alive = len(stillalive)
+                result = self._parse_responses(
+                    normalized_query, [(connected_site, raw_response)], stillalive
+                )
+                if len(stillalive) > num_alive:
+                    yield connected_site.id, LivestatusResponse(result)
+
+        self._keep_connections(stillalive)
+
+    def _split_queried_sites(self) -> tuple[ConnectedSites, ConnectedSites]:
+        if self.only_sites is None:
+            return [], self.connections
+        # Unused sites are assumed to be alive
+        return (
+            [c for c in self.connections if c[0] not in self.only_sites],
+            [c for c in self.connections if c[0] in self.only_sites],
+        )
+
+    def _keep_connections(self, stillalive: ConnectedSites) -> None:
+        # Responses may complete in any order, keep the configured order of the sites
+        alive = {connected_site.id for connected_site in stillalive}
+        self.connections = [c for c in self.connections if c.id in alive]
+
     def _send_queries(
         self, query: Query, add_headers: str, connect_to_sites: ConnectedSites, limit_header: str
     ) -> list[tuple[str, trace.Span, ConnectedSite]]:
@@ -1343,39 +1483,100 @@ class MultiSiteConnection(Helpers):
         retrieve_responses: list[tuple[str, trace.Span, ConnectedSite]],
         stillalive: ConnectedSites,
     ) -> list[tuple[ConnectedSite, bytes]]:
-        site_responses: list[tuple[ConnectedSite, bytes]] = []
-        for str_query, request_span, connected_site in retrieve_responses:
-            with tracer.span(
-                f"receive_from_site[{connected_site.id}]",
-                kind=trace.SpanKind.CONSUMER,
-                links=[trace.Link(request_span.get_span_context())],
-                attributes={
-                    "cmk.livestatus.query": str_query,
-                    "cmk.livestatus.target_site_id": str(connected_site.id),
-                },
-            ):
-                try:
-                    site_responses.append(
-                        (
-                            connected_site,
-                            connected_site.connection.receive_raw_response(
-                                str_query, query.suppress_exceptions
-                            ),
-                        )
-                    )
-                except query.suppress_exceptions:
-                    # Mostly handles exception types MKLivestatusTableNotFoundError
-                    stillalive.append(connected_site)
-                    continue
-                except LivestatusTestingError:
-                    raise
-                except Exception as e:
-                    connected_site.connection.disconnect()
+        # The responses are read as they arrive, but parsed in the order of the sites
+        order = {
+            connected_site.id: index
+            for index, (_query, _span, connected_site) in enumerate(retrieve_responses)
+        }
+        return sorted(
+            self._receive_responses_as_completed(query, retrieve_responses, stillalive),
+            key=lambda site_response: order[site_response[0].id],
+        )
+
+    def _receive_responses_as_completed(
+        self,
+        query: Query,
+        retrieve_responses: list[tuple[str, trace.Span, ConnectedSite]],
+        stillalive: ConnectedSites,
+    ) -> Iterator[tuple[ConnectedSite, bytes]]:
+        """Wait for the responses of all sites at once and yield them as they complete"""
+        with selectors.DefaultSelector() as selector:
+            for str_query, request_span, connected_site in retrieve_responses:
+                if (sock := connected_site.connection.socket) is None:
                     self.deadsites[connected_site.id] = {
-                        "exception": e,
+                        "exception": MKLivestatusSocketError(
+                            "Socket to '%s' is not connected" % connected_site.connection.socketurl
+                        ),
                         "site": connected_site.config,
                     }
-        return site_responses
+                    continue
+                reader = _ResponseReader(str_query, request_span, connected_site, sock)
+                selector.register(sock, selectors.EVENT_READ, reader)
+
+            try:
+                while selector.get_map():
+                    readers: list[_ResponseReader] = [
+                        key.data for key in selector.get_map().values()
+                    ]
+                    # SSL sockets may hold decrypted data which select() does not know about
+                    timeout = 0.0 if any(reader.has_pending_data() for reader in readers) else 1.0
+                    ready = {id(key.data) for key, _events in selector.select(timeout)}
+                    for reader in readers:
+                        if not (
+                            id(reader) in ready or reader.has_pending_data() or reader.expired()
+                        ):
+                            continue
+                        try:
+                            if not reader.read():
+                                continue
+                        except Exception as e:
+                            reader.error = e
+                        selector.unregister(reader.sock)
+                        reader.done()
+                        yield from self._receive_site_response(query, reader, stillalive)
+            finally:
+                # Abandoned by the caller: the unread responses would garble the next query
+                for key in list(selector.get_map().values()):
+                    key.data.connected_site.connection.disconnect()
+
+    def _receive_site_response(
+        self, query: Query, reader: _ResponseReader, stillalive: ConnectedSites
+    ) -> Iterator[tuple[ConnectedSite, bytes]]:
+        connected_site = reader.connected_site
+        connection = connected_site.connection
+        with tracer.span(
+            f"receive_from_site[{connected_site.id}]",
+            kind=trace.SpanKind.CONSUMER,
+            links=[trace.Link(reader.request_span.get_span_context())],
+            attributes={
+                "cmk.livestatus.query": reader.str_query,
+                "cmk.livestatus.target_site_id": str(connected_site.id),
+            },
+        ):
+            try:
+                if isinstance(reader.error, MKLivestatusSocketClosed | OSError):
+                    raw_response = connection.reconnect_and_receive(
+                        reader.str_query, query.suppress_exceptions, reader.error
+                    )
+                else:
+                    with _translate_response_errors(query.suppress_exceptions):
+                        if reader.error is not None:
+                            raise reader.error
+                        raw_response = reader.response()
+            except query.suppress_exceptions:
+                # Mostly handles exception types MKLivestatusTableNotFoundError
+                stillalive.append(connected_site)
+                return
+            except LivestatusTestingError:
+                raise
+            except Exception as e:
+                connection.disconnect()
+                self.deadsites[connected_site.id] = {
+                    "exception": e,
+                    "site": connected_site.config,
+                }
+                return
+        yield connected_site, raw_response
 
     def _parse_responses(
         self,
@@ -1540,6 +1741,153 @@ def _combine_query(query: str, headers: str | list[str]) -> str:
     return query + "\n" + headers
 
 
+@contextlib.contextmanager
+def _translate_response_errors(suppress_exceptions: tuple[type[Exception], ...]) -> Iterator[None]:
+    """Unify the errors raised while receiving a response
+
+    Socket errors are left untouched, the caller may want to reconnect."""
+    try:
+        yield
+
+    except (MKLivestatusSocketClosed, OSError):
+        raise
+
+    except suppress_exceptions:
+        raise
+
+    except MKLivestatusCertificateError as e:
+        raise MKLivestatusCertificateError(
+            "SSL certificate verification failed. "
+            "The remote certificate(s) might not be trusted. Edit this site's Livestatus encryption to trust them. "
+            "Technical error: %s" % e
+        )
+
+    except Exception as e:
+        # Catches
+        # MKLivestatusQueryError
+        # MKLivestatusSocketError
+        # FIXME: ? self.disconnect()
+        raise MKLivestatusSocketError("Unhandled exception: %s" % e)
+
+
+class _RowDecoder:
+    """Decodes the rows of a response while it is being received
+
+    Both output formats put every row on a line of its own and never use line breaks within
+    a row, so all the data up to the last line break are complete rows."""
+
+    def __init__(self, output_format: LivestatusOutputFormat) -> None:
+        self._loads: Callable[[str], Any] = (
+            json.loads if output_format is LivestatusOutputFormat.JSON else ast.literal_eval
+        )
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._pending = ""
+        self._started = False
+        self._finished = False
+
+    def feed(self, data: bytes) -> LivestatusResponse:
+        self._pending += self._text.decode(data)
+        if (end := self._pending.rfind("\n") + 1) == 0:
+            return LivestatusResponse([])
+        lines, self._pending = self._pending[:end], self._pending[end:]
+        return self._decode(lines)
+
+    def finish(self) -> LivestatusResponse:
+        rows = self._decode(self._pending + self._text.decode(b"", final=True))
+        self._pending = ""
+        if not self._finished:
+            raise MKLivestatusQueryError("Malformed raw response output")
+        return rows
+
+    def _decode(self, lines: str) -> LivestatusResponse:
+        if not (lines := lines.strip()):
+            return LivestatusResponse([])
+        if self._finished:
+            raise MKLivestatusQueryError("Malformed raw response output")
+        if not self._started:
+            if not lines.startswith("["):
+                raise MKLivestatusQueryError("Malformed raw response output")
+            lines = lines[1:]
+            self._started = True
+        # Every row but the last one is followed by a comma, the last one by the closing bracket
+        if lines.endswith(","):
+            lines = lines[:-1]
+        elif lines.endswith("]"):
+            lines = lines[:-1]
+            self._finished = True
+        else:
+            raise MKLivestatusQueryError("Malformed raw response output")
+        try:
+            rows = self._loads(f"[{lines}]")
+        except (ValueError, SyntaxError):
+            raise MKLivestatusQueryError("Malformed raw response output")
+        return LivestatusResponse(rows)
+
+
+class _ResponseReader:
+    """Assembles the response of one site from whatever data its socket has available"""
+
+    def __init__(
+        self,
+        str_query: str,
+        request_span: trace.Span,
+        connected_site: ConnectedSite,
+        sock: socket.socket,
+    ) -> None:
+        self.str_query = str_query
+        self.request_span = request_span
+        self.connected_site = connected_site
+        self.sock = sock
+        self.error: Exception | None = None
+        self._code: str | None = None
+        self._buffer = bytearray()
+        self._missing = 16
+        self._deadline: float | None = None
+        sock.settimeout(0)
+
+    def has_pending_data(self) -> bool:
+        return isinstance(self.sock, ssl.SSLSocket) and self.sock.pending() > 0
+
+    def expired(self) -> bool:
+        return self._deadline is not None and time.time() > self._deadline
+
+    def read(self) -> bool:
+        """Consume the available data and tell whether the response is complete"""
+        if self.expired():
+            raise MKLivestatusSocketError(
+                f"{RESPONSE_TIMEOUT}s while reading data from socket. "
+                f"Received data: {len(self._buffer)}/{len(self._buffer) + self._missing} bytes"
+            )
+        while self._missing:
+            try:
+                packet = self.sock.recv(min(self._missing, RECEIVE_CHUNK_SIZE))
+            except (BlockingIOError, ssl.SSLWantReadError):
+                return False
+            if not packet:
+                raise MKLivestatusSocketClosed(
+                    "Read zero data from socket, remote peer closed connection."
+                )
+            self._buffer += packet
+            self._missing -= len(packet)
+            if not self._missing and self._code is None:
+                # Headers are always ASCII encoded
+                self._code, self._missing = self.connected_site.connection.parse_response_header(
+                    bytes(self._buffer)
+                )
+                self._buffer.clear()
+                self._deadline = time.time() + RESPONSE_TIMEOUT
+        return True
+
+    def done(self) -> None:
+        # Leave the socket as the blocking receive path does
+        with contextlib.suppress(OSError):
+            self.sock.settimeout(RESPONSE_TIMEOUT)
+
+    def response(self) -> bytes:
+        assert self._code is not None
+        return SingleSiteConnection.check_response_code(self._code, bytes(self._buffer))
+
+
 def is_socket_readable(sock: socket.socket, select_timeout: float = 1.0) -> bool:
     # SSL sockets may not return any fileno in the select, since the data lingers around in pending
     # https://stackoverflow.com/questions/3187565/select-and-ssl-in-python
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""A tiny SNMPv1/v2c agent serving a fixed MIB from memory
+
+It answers GET, GETNEXT and GETBULK on a local UDP port and stands in for a
+real snmpd in unit tests of the SNMP backends.  With `max_bulk_varbinds` it
+truncates its GETBULK responses like an agent short of buffer space may do
+(RFC 3416, 4.2.3).
+"""
+
+import bisect
+import socket
+import threading
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+
+from cmk.fetchers.snmp_backend._ber import (
+    decode_message,
+    encode_message,
+    EndOfMib,
+    PDUType,
+    SNMPMessage,
+    VarBind,
+)
+
+
+def _key(oid: str) -> tuple[int, ...]:
+    return tuple(int(a) for a in oid.strip(".").split("."))
+
+
+class SNMPAgent:
+    def __init__(
+        self,
+        mib: Mapping[str, bytes],
+        community: bytes = b"public",
+        max_bulk_varbinds: int | None = None,
+    ) -> None:
+        self._mib = {_key(oid): value for oid, value in mib.items()}
+        self._keys = sorted(self._mib)
+        self._community = community
+        self._max_bulk_varbinds = max_bulk_varbinds
+        self.requests = 0
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.settimeout(0.1)
+        self._stopped = threading.Event()
+        self.port: int = self._sock.getsockname()[1]
+
+    def _get(self, oid: str) -> VarBind:
+        return oid, self._mib.get(_key(oid), EndOfMib.NO_SUCH_OBJECT)
+
+    def _next(self, oid: str) -> VarBind:
+        index = bisect.bisect_right(self._keys, _key(oid))
+        if index >= len(self._keys):
+            return oid, EndOfMib.END_OF_MIB_VIEW
+        key = self._keys[index]
+        return "." + ".".join(map(str, key)), self._mib[key]
+
+    def _answer(self, request: SNMPMessage) -> list[VarBind]:
+        match request.pdu_type:
+            case PDUType.GET:
+                return [self._get(oid) for oid, _v in request.varbinds]
+            case PDUType.GETNEXT:
+                return [self._next(oid) for oid, _v in request.varbinds]
+            case PDUType.GETBULK:
+                cursors = [oid for oid, _v in request.varbinds]
+                varbinds = []
+                for _repetition in range(request.error_index):
+                    answers = [self._next(cursor) for cursor in cursors]
+                    varbinds.extend(answers)
+                    cursors = [oid for oid, _v in answers]
+                return varbinds[: self._max_bulk_varbinds]
+        return []
+
+    def serve_forever(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                data, sender = self._sock.recvfrom(65535)
+            except TimeoutError:
+                continue
+            request = decode_message(data)
+            if request.community != self._community:
+                continue
+            self.requests += 1
+            response = SNMPMessage(
+                version=request.version,
+                community=request.community,
+                pdu_type=PDUType.RESPONSE,
+                request_id=request.request_id,
+                error_status=0,
+                error_index=0,
+                varbinds=self._answer(request),
+            )
+            self._sock.sendto(encode_message(response), sender)
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def close(self) -> None:
+        self._sock.close()
+
+
+@contextmanager
+def running_snmp_agent(
+    mib: Mapping[str, bytes], *, max_bulk_varbinds: int | None = None
+) -> Iterator[SNMPAgent]:
+    agent = SNMPAgent(mib, max_bulk_varbinds=max_bulk_varbinds)
+    thread = threading.Thread(target=agent.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield agent
+    finally:
+        agent.stop()
+        thread.join()
+        agent.close()
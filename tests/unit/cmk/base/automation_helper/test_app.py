@@ -5,10 +5,12 @@
 
 import asyncio
 import logging
+import os
 import sys
 import time
 from collections.abc import Callable
 from dataclasses import dataclass
+from pathlib import Path
 from typing import override
 
 import pytest
@@ -32,8 +34,9 @@ from cmk.base.automation_helper._app import (
     AutomationEngine,
     HealthCheckResponse,
     make_application,
+    MetricsResponse,
 )
-from cmk.base.automation_helper._cache import Cache
+from cmk.base.automation_helper._cache import Cache, CacheError
 from cmk.base.automation_helper._config import ReloaderConfig
 from cmk.base.automations import AutomationError
 from cmk.base.config import ConfigCache, LoadingResult
@@ -104,6 +107,7 @@ def _make_test_client(
         poll_interval=1.0,
         cooldown_interval=5.0,
     ),
+    read_only_workers: int = 0,
 ) -> TestClient:
     return TestClient(
         make_application(
@@ -112,6 +116,7 @@ def _make_test_client(
             reloader_config=reloader_config,
             reload_config=reload_config,
             clear_caches_before_each_call=clear_caches_before_each_call,
+            read_only_workers=read_only_workers,
         )
     )
 
@@ -223,7 +228,17 @@ def test_automation_reloads_if_necessary(mocker: MockerFixture, cache: Cache) ->
         last_reload_before_cache_update = HealthCheckResponse.model_validate(
             client.get("/health").json()
         ).last_reload_at
-        cache.store_last_detected_change(time.time())
+        detected_change = time.time()
+        cache.store_last_detected_change(detected_change)
+        # the change is pushed to the application, the automation itself does not ask Redis
+        wait_until(
+            lambda: HealthCheckResponse.model_validate(
+                client.get("/health").json()
+            ).last_detected_change
+            == detected_change,
+            timeout=1,
+            interval=0.025,
+        )
         client.post("/automation", json=_EXAMPLE_AUTOMATION_PAYLOAD)
         assert (
             HealthCheckResponse.model_validate(client.get("/health").json()).last_reload_at
@@ -237,6 +252,100 @@ def test_automation_reloads_if_necessary(mocker: MockerFixture, cache: Cache) ->
     mock_clear_caches_before_each_call.assert_called_once()
 
 
+def test_automation_reloads_without_change_subscription(
+    mocker: MockerFixture, cache: Cache
+) -> None:
+    mocker.patch.object(
+        Cache, "subscribe_to_changes", side_effect=CacheError("Redis is unavailable")
+    )
+    mock_reload_config = mocker.MagicMock()
+    with _make_test_client(
+        _DummyAutomationEngineSuccess(),
+        cache,
+        mock_reload_config,
+        mocker.MagicMock(),
+        reloader_config=ReloaderConfig(active=False, poll_interval=1.0, cooldown_interval=5.0),
+    ) as client:
+        cache.store_last_detected_change(time.time())
+        # nothing is pushed, so the automation asks Redis itself
+        client.post("/automation", json=_EXAMPLE_AUTOMATION_PAYLOAD)
+
+    # once at application startup, once when the endpoint is called
+    assert mock_reload_config.call_count == 2
+
+
+def test_read_only_automation_in_worker_pool(mocker: MockerFixture, cache: Cache) -> None:
+    mock_reload_config = mocker.MagicMock()
+    with _make_test_client(
+        _DummyAutomationEngineSuccess(),
+        cache,
+        mock_reload_config,
+        lambda config_cache: None,
+        read_only_workers=2,
+    ) as client:
+        responses = [
+            client.post(
+                "/automation",
+                json=AutomationPayload(
+                    name="get-configuration", args=[], stdin="", log_level=logging.INFO
+                ).model_dump(),
+            )
+            for _ in range(3)
+        ]
+        metrics = MetricsResponse.model_validate(client.get("/metrics").json())
+
+    for resp in responses:
+        assert resp.status_code == 200
+        assert AutomationResponse.model_validate(resp.json()) == AutomationResponse(
+            serialized_result_or_error_code="dummy_serialized",
+            stdout="stdout_success",
+            stderr="stderr_success",
+        )
+    mock_reload_config.assert_called_once()  # only at application startup
+    assert metrics.in_flight == 0
+    assert metrics.completed == metrics.concurrently_completed == 3
+
+
+@dataclass(frozen=True)
+class _DummyAutomationEngineDyingOnce:
+    died_marker: Path
+
+    def execute(
+        self,
+        cmd: str,
+        args: list[str],
+        plugins: AgentBasedPlugins | None,
+        loading_result: LoadingResult | None,
+    ) -> _DummyAutomationResult:
+        if not self.died_marker.exists():
+            self.died_marker.touch()
+            os._exit(1)
+        return _DummyAutomationEngineSuccess().execute(cmd, args, plugins, loading_result)
+
+
+def test_read_only_automation_retried_in_new_pool(
+    mocker: MockerFixture, cache: Cache, tmp_path: Path
+) -> None:
+    with _make_test_client(
+        _DummyAutomationEngineDyingOnce(tmp_path / "died"),
+        cache,
+        mocker.MagicMock(),
+        lambda config_cache: None,
+        read_only_workers=1,
+    ) as client:
+        resp = client.post(
+            "/automation",
+            json=AutomationPayload(
+                name="get-configuration", args=[], stdin="", log_level=logging.INFO
+            ).model_dump(),
+        )
+        metrics = MetricsResponse.model_validate(client.get("/metrics").json())
+
+    assert resp.status_code == 200
+    assert AutomationResponse.model_validate(resp.json()).stdout == "stdout_success"
+    assert metrics.concurrently_completed == 1
+
+
 def test_health_check(cache: Cache) -> None:
     loaded_config = EMPTYCONFIG
     with _make_test_client(
@@ -3,6 +3,7 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import threading
 import time
 from collections.abc import Generator
 
@@ -31,3 +32,21 @@ def test_get_last_change_detected_unset(cache: Cache) -> None:
 def test_reload_required(cache: Cache) -> None:
     cache.store_last_detected_change(1.0)
     assert cache.reload_required(0.0)
+
+
+def test_subscribe_to_changes(cache: Cache) -> None:
+    received: list[float] = []
+    event = threading.Event()
+
+    def callback(last_change: float) -> None:
+        received.append(last_change)
+        event.set()
+
+    subscription = cache.subscribe_to_changes(callback)
+    try:
+        cache.store_last_detected_change(42.0)
+        assert event.wait(timeout=5)
+    finally:
+        subscription.stop()
+
+    assert received == [42.0]
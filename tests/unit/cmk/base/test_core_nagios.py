@@ -25,21 +25,26 @@ import cmk.ccc.debug
 import cmk.ccc.version as cmk_version
 from cmk.ccc.hostaddress import HostAddress, HostName
 
-from cmk.utils import paths
+from cmk.utils import config_warnings, paths
 from cmk.utils.config_path import VersionedConfigPath
 from cmk.utils.labels import ABCLabelConfig, LabelManager, Labels
+from cmk.utils.licensing.cre_handler import CRELicensingHandler
+from cmk.utils.notify import NotificationHostConfig
 from cmk.utils.servicename import ServiceName
 
 from cmk.checkengine.plugins import AgentBasedPlugins, AutocheckEntry, CheckPlugin, CheckPluginName
 
 from cmk.base import config
 from cmk.base.core_nagios._create_config import (
+    _create_all_host_objects,
     _format_nagios_object,
+    create_config,
     create_nagios_config_commands,
     create_nagios_host_spec,
     create_nagios_servicedefs,
     NagiosConfig,
 )
+from cmk.base.core_nagios._host_objects import host_fingerprint, HostObjects, HostObjectsStore
 from cmk.base.core_nagios._precompile_host_checks import (
     dump_precompiled_hostcheck,
     HostCheckStore,
@@ -1010,3 +1015,117 @@ def test_create_nagios_config_commands(
 
     assert license_counter["services"] == 1
     assert outfile.getvalue() == expected_result
+
+
+def _host_objects(hostname: HostName) -> HostObjects:
+    return HostObjects(
+        text=f"define host {{\n  host_name\t{hostname}\n}}\n",
+        notification_config=NotificationHostConfig(host_labels={}, service_labels={}, tags={}),
+        num_services=1,
+        warnings=(f"warning of {hostname}",),
+        hostgroups_to_define=frozenset({f"group-{hostname}"}),
+        servicegroups_to_define=frozenset(),
+        contactgroups_to_define=frozenset(),
+        checknames_to_define=frozenset({CheckPluginName("uptime")}),
+        active_checks_to_define={},
+        custom_commands_to_define=frozenset(),
+        hostcheck_commands_to_define=((f"check-mk-host-custom-{hostname}", "echo"),),
+    )
+
+
+@pytest.mark.parametrize("processes", [1, 3])
+def test_create_all_host_objects(processes: int) -> None:
+    hostnames = [HostName(f"host{nr}") for nr in range(20)]
+    config_warnings.initialize()
+
+    all_host_objects = _create_all_host_objects(hostnames, _host_objects, processes)
+
+    assert all_host_objects == [_host_objects(hostname) for hostname in hostnames]
+    if processes > 1:
+        # only the warnings of the first host have been created in this process
+        assert config_warnings.g_configuration_warnings == [
+            f"warning of {hostname}" for hostname in hostnames[1:]
+        ]
+
+    cfg = NagiosConfig(outfile := io.StringIO(), hostnames)
+    for host_objects in all_host_objects:
+        cfg.add_host_objects(host_objects)
+    assert outfile.getvalue().count("define host") == 20
+    assert cfg.hostgroups_to_define == {f"group-{hostname}" for hostname in hostnames}
+    assert len(cfg.hostcheck_commands_to_define) == 20
+
+
+def test_create_config_in_processes_and_incremental(
+    monkeypatch: MonkeyPatch, tmp_path: Path
+) -> None:
+    ts = Scenario()
+    hostnames = [HostName(f"host{nr}") for nr in range(10)]
+    for hostname in hostnames:
+        ts.add_host(hostname)
+    ts.set_option("ipaddresses", {hostname: "127.0.0.1" for hostname in hostnames})
+    ts.set_option(
+        "host_check_commands",
+        [{"id": "01", "condition": {}, "value": ("service", "Check_MK")}],
+    )
+    config_cache = ts.apply(monkeypatch)
+    monkeypatch.setattr(config, "get_resource_macros", lambda: {})
+    ip_address_of = config.ConfiguredIPLookup(
+        config_cache, error_handler=config.handle_ip_lookup_failure
+    )
+
+    def created_config(processes: int, host_objects_store: HostObjectsStore | None) -> str:
+        create_config(
+            outfile := io.StringIO(),
+            tmp_path,
+            config_cache,
+            config_cache.make_passive_service_name_config(),
+            {},
+            hostnames,
+            CRELicensingHandler(),
+            {},
+            ip_address_of,
+            lambda *a: (),
+            processes=processes,
+            host_objects_store=host_objects_store,
+        )
+        return outfile.getvalue()
+
+    expected = created_config(1, None)
+    assert "check-mk-host-custom-host3" in expected
+    assert created_config(3, None) == expected
+
+    host_objects_store = HostObjectsStore(tmp_path / "nagios_host_objects.pkl")
+    assert created_config(1, host_objects_store) == expected
+    monkeypatch.setattr(
+        "cmk.base.core_nagios._create_config._create_host_objects",
+        lambda *args, **kwargs: pytest.fail("unchanged hosts are created again"),
+    )
+    assert created_config(1, host_objects_store) == expected
+
+
+def test_host_objects_store(tmp_path: Path) -> None:
+    host_objects_store = HostObjectsStore(tmp_path / "core" / "nagios_host_objects.pkl")
+    assert not host_objects_store.load()
+
+    host_objects_store.save({HostName("host"): ("fingerprint", _host_objects(HostName("host")))})
+    assert host_objects_store.load() == {
+        HostName("host"): ("fingerprint", _host_objects(HostName("host")))
+    }
+
+    (tmp_path / "core" / "nagios_host_objects.pkl").write_bytes(b"broken")
+    assert not host_objects_store.load()
+
+
+def test_host_fingerprint(monkeypatch: MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setattr(paths, "autochecks_dir", tmp_path)
+    attributes = {"alias": "host", "address": "127.0.0.1"}
+    fingerprint = host_fingerprint("digest", [attributes], [HostName("host")])
+
+    assert host_fingerprint("digest", [dict(attributes)], [HostName("host")]) == fingerprint
+    assert host_fingerprint("other", [attributes], [HostName("host")]) != fingerprint
+    assert (
+        host_fingerprint("digest", [attributes | {"alias": "other"}], [HostName("host")])
+        != fingerprint
+    )
+    (tmp_path / "host.mk").write_text("[]\n")
+    assert host_fingerprint("digest", [attributes], [HostName("host")]) != fingerprint
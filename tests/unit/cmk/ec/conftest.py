@@ -108,6 +108,7 @@ def fixture_history_sqlite(settings: ec.Settings, config: Config) -> Iterator[SQ
     yield history
 
     history.flush()
+    history.close()
 
 
 @pytest.fixture(name="perfcounters")
@@ -6,7 +6,6 @@
 
 import datetime
 import logging
-import shlex
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
@@ -17,14 +16,10 @@ from cmk.ccc.hostaddress import HostName
 import cmk.ec.export as ec
 from cmk.ec.config import Config
 from cmk.ec.history import _current_history_period
-from cmk.ec.history_file import (
-    _grep_pipeline,
-    convert_history_line,
-    FileHistory,
-    parse_history_file,
-)
+from cmk.ec.history_file import convert_history_line, FileHistory, LineFilter, parse_history_file
+from cmk.ec.history_file_index import HistoryFileIndexes, index_path
 from cmk.ec.main import StatusTableHistory
-from cmk.ec.query import QueryFilter, QueryGET, StatusTable
+from cmk.ec.query import OperatorName, QueryFilter, QueryGET, StatusTable
 
 
 def test_file_add_get(history: FileHistory) -> None:
@@ -93,19 +88,126 @@ def test_history_parse(tmp_path: Path) -> None:
         column_name="event_id",
         operator_name="=",
         predicate=lambda x: True,
-        argument="1",
+        argument=5,
     )
-    tac = f"nl -b a {shlex.quote(str(path))} | tac"
-    cmd = " | ".join([tac] + _grep_pipeline([filter_]))
 
     new_entries = parse_history_file(
         StatusTableHistory.columns,
         path,
+        LineFilter([filter_]),
         lambda x: True,
-        cmd,
         None,
         logging.getLogger("cmk.mkeventd"),
+        indexes=HistoryFileIndexes(),
+        growing=False,
     )
 
-    assert len(new_entries) == 4
-    assert new_entries[0][1] == 1666942292.3000507
+    assert len(new_entries) == 1
+    assert new_entries[0][0] == 2
+    assert new_entries[0][1] == 1666942292.2998602
+
+
+def test_history_parse_uses_index(tmp_path: Path) -> None:
+    line = "{time}\tNEW\t\t\t{id}\t1\ttext\t1.0\t1.0\t\t0\t{host}\t\tOMD\t0\t6\t9\tr1\t0\topen\t\t\t\t\t\thost\t{host}\t0\t\n"
+    path = tmp_path / "history_test.log"
+    path.write_text(
+        "".join(line.format(time=100 + nr, id=nr, host=f"h{nr % 2}") for nr in range(6))
+    )
+    since = QueryFilter(
+        column_name="history_time",
+        operator_name=">",
+        predicate=lambda x: True,
+        argument=101.5,
+    )
+    host = QueryFilter(
+        column_name="event_host",
+        operator_name="in",
+        predicate=lambda x: True,
+        argument=["h1"],
+    )
+
+    indexes = HistoryFileIndexes()
+
+    def parse(filters: list[QueryFilter]) -> list[int]:
+        entries = parse_history_file(
+            StatusTableHistory.columns,
+            path,
+            LineFilter(filters),
+            lambda x: True,
+            None,
+            logging.getLogger("cmk.mkeventd"),
+            indexes=indexes,
+            growing=False,
+        )
+        return [entry[0] for entry in entries]
+
+    assert parse([]) == [6, 5, 4, 3, 2, 1]
+    assert index_path(path).exists()
+    assert parse([since]) == [6, 5, 4, 3]
+    assert parse([since, host]) == [6, 4]
+
+    with path.open("a") as f:
+        f.write(line.format(time=106, id=6, host="h1"))
+        f.write("107\tNEW")  # incomplete
+
+    assert parse([since, host]) == [7, 6, 4]
+    assert parse([host]) == [7, 6, 4, 2]
+
+
+_LINE = "{time}\tNEW\t\t\t{id}\t1\t{text}\t1.0\t1.0\t\t0\t{host}\t\tOMD\t0\t6\t9\tr1\t0\topen\t\t\t\t\t\thost\t{host}\t0\t\n"
+
+
+def _filter(column_name: str, operator_name: OperatorName, argument: object) -> QueryFilter:
+    return QueryFilter(
+        column_name=column_name,
+        operator_name=operator_name,
+        predicate=lambda x: True,
+        argument=argument,
+    )
+
+
+def test_line_filter_is_case_insensitive_for_in(tmp_path: Path) -> None:
+    path = tmp_path / "history_test.log"
+    path.write_text(
+        "".join(
+            _LINE.format(time=100 + nr, id=nr, text="text", host=host)
+            for nr, host in enumerate(["Host1", "host1", "HOST2"])
+        )
+    )
+    with path.open("rb") as f:
+        index = HistoryFileIndexes().load(path, f, growing=False)
+
+    assert LineFilter([_filter("event_host", "in", ["HOST1"])]).candidates(index) == [1, 0]
+    assert LineFilter([_filter("event_host", "=~", "host2")]).candidates(index) == [2]
+
+
+def test_line_filter_searches_columns() -> None:
+    line = _LINE.format(time=100, id=1, text="Disk Full", host="h1").encode()
+
+    assert LineFilter([_filter("event_text", "~", "^Disk")]).may_match(line)
+    assert not LineFilter([_filter("event_text", "~", "^disk")]).may_match(line)
+    assert LineFilter([_filter("event_text", "~~", "^disk f")]).may_match(line)
+    assert LineFilter([_filter("event_text", "=~", "disk full")]).may_match(line)
+    assert not LineFilter([_filter("event_text", "=~", "disk empty")]).may_match(line)
+
+
+def test_growing_history_file_index_is_kept_in_memory(tmp_path: Path) -> None:
+    current = tmp_path / "2.log"
+    current.write_text(_LINE.format(time=100, id=1, text="text", host="h1"))
+    indexes = HistoryFileIndexes()
+
+    with current.open("rb") as f:
+        indexes.load(current, f, growing=True)
+    assert not index_path(current).exists()
+
+    with current.open("a") as f:
+        f.write(_LINE.format(time=101, id=2, text="text", host="h1"))
+    with current.open("rb") as f:
+        assert len(indexes.load(current, f, growing=True)) == 2
+    assert not index_path(current).exists()
+
+    # The history has moved on to the next file
+    (tmp_path / "3.log").write_text("")
+    with (tmp_path / "3.log").open("rb") as f:
+        indexes.load(tmp_path / "3.log", f, growing=True)
+    assert index_path(current).exists()
@@ -6,15 +6,23 @@
 
 import logging
 import sqlite3
-from collections.abc import Iterator
+import threading
+from collections.abc import Iterator, Sequence
 
 import pytest
 
 from cmk.ccc.hostaddress import HostName
 
 import cmk.ec.export as ec
-from cmk.ec.history_sqlite import filters_to_sqlite_query, SQLiteHistory
-from cmk.ec.main import StatusTableHistory
+from cmk.ec.config import Config
+from cmk.ec.history_sqlite import (
+    filters_to_sqlite_query,
+    HistoryWriter,
+    SQLiteHistory,
+    SQLiteSettings,
+)
+from cmk.ec.main import StatusTableEvents, StatusTableHistory
+from cmk.ec.perfcounters import Perfcounters
 from cmk.ec.query import QueryFilter, QueryGET, StatusTable
 
 
@@ -208,6 +216,7 @@ def test_housekeeping(history_sqlite: SQLiteHistory) -> None:
     event2 = ec.Event(host=HostName("ABC2"), text="Event2 text", core_host=HostName("ABC"))
     history_sqlite.add(event=event1, what="NEW")
     history_sqlite.add(event=event2, what="NEW")
+    history_sqlite.drain()
 
     with history_sqlite.conn as connection:
         cur = connection.cursor()
@@ -218,3 +227,69 @@ def test_housekeeping(history_sqlite: SQLiteHistory) -> None:
         history_sqlite.housekeeping()
         cur.execute("SELECT count(*) FROM history;")
         assert cur.fetchone()["count(*)"] == 1
+
+
+def test_history_writer_group_commits() -> None:
+    batches: list[Sequence[Sequence[object]]] = []
+    perfcounters = Perfcounters(logging.getLogger("cmk.mkeventd"))
+    writer = HistoryWriter(
+        batches.append,
+        logging.getLogger("cmk.mkeventd"),
+        perfcounters,
+        max_batch_size=3,
+        max_batch_delay=60,
+    )
+    for nr in range(7):
+        writer.put((nr,))
+    writer.drain()
+
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert [row for batch in batches for row in batch] == [(nr,) for nr in range(7)]
+    assert perfcounters._gauges["history_queue_depth"] == 0
+    assert "history" in perfcounters._times
+
+    writer.put((7,))
+    writer.stop()
+    assert batches[-1] == [(7,)]
+
+
+def test_history_writer_drain_does_not_wait_for_later_rows() -> None:
+    batches: list[Sequence[Sequence[object]]] = []
+    writer = HistoryWriter(
+        batches.append, logging.getLogger("cmk.mkeventd"), max_batch_size=10, max_batch_delay=60
+    )
+    writer.put((0,))
+    stop_producing = threading.Event()
+
+    def produce() -> None:
+        while not stop_producing.is_set():
+            writer.put((1,))
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    try:
+        drainer = threading.Thread(target=writer.drain)
+        drainer.start()
+        drainer.join(timeout=10)
+        assert not drainer.is_alive()
+        assert batches[0][0] == (0,)
+    finally:
+        stop_producing.set()
+        producer.join()
+        writer.stop()
+
+
+def test_close_writes_queued_entries(settings: ec.Settings, config: Config) -> None:
+    database = settings.paths.history_dir.value / "history.sqlite"
+    history = SQLiteHistory(
+        SQLiteSettings.from_settings(settings, database=database),
+        config | {"archive_mode": "sqlite"},
+        logging.getLogger("cmk.mkeventd"),
+        StatusTableEvents.columns,
+        StatusTableHistory.columns,
+    )
+    history.add(event=ec.Event(host=HostName("ABC1"), text="Event1 text"), what="NEW")
+    history.close()
+
+    with sqlite3.connect(database) as connection:
+        assert connection.execute("SELECT count(*) FROM history;").fetchone() == (1,)
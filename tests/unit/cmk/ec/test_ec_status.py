@@ -4,6 +4,7 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 import time
+from typing import Any
 
 import pytest
 
@@ -25,6 +26,46 @@ def test_handle_client(status_server: StatusServer) -> None:
     assert "event_id" in response[0]
 
 
+def test_get_query_does_not_hold_lock(
+    event_status: EventStatus, status_server: StatusServer
+) -> None:
+    """The lock is released before the response is sent"""
+    event_status.new_event(new_event({"host": HostName("heute"), "core_host": None}))
+
+    class LockCheckingSocket(FakeStatusSocket):
+        def sendall(self, b: Any, flags: int = 4711) -> None:
+            assert event_status.lock.acquire(blocking=False)
+            event_status.lock.release()
+            super().sendall(b, flags)
+
+    s = LockCheckingSocket(b"GET events")
+    status_server.handle_client(s, True, "127.0.0.1")
+
+    response = s.get_response()
+    assert len(response) == 2
+    assert response[1][response[0].index("event_host")] == "heute"
+
+
+def test_events_snapshot(event_status: EventStatus) -> None:
+    event_status.new_event(new_event({"host": HostName("heute"), "core_host": None}))
+
+    (snapshot,) = event_status.events_snapshot()
+    (event,) = event_status.events()
+    event["phase"] = "ack"
+
+    assert snapshot["phase"] == "open"
+
+
+def test_events_snapshot_of_hosts(event_status: EventStatus) -> None:
+    for host in ("heute", "Morgen", "gestern"):
+        event_status.new_event(new_event({"host": HostName(host), "core_host": None}))
+
+    assert [event["host"] for event in event_status.events_snapshot({"HEUTE", "morgen"})] == [
+        "heute",
+        "Morgen",
+    ]
+
+
 def test_mkevent_check_query_perf(
     config: ec.ConfigFromWATO, event_status: EventStatus, status_server: StatusServer
 ) -> None:
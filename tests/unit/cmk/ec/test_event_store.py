@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+from tests.unit.cmk.ec.helpers import new_event
+
+from cmk.ccc.hostaddress import HostName
+
+import cmk.ec.export as ec
+from cmk.ec.event_store import EventStore
+
+
+def _event(event_id: int, rule_id: str, host: str, core_host: str | None = None) -> ec.Event:
+    return new_event(
+        ec.Event(
+            id=event_id,
+            rule_id=rule_id,
+            host=HostName(host),
+            core_host=None if core_host is None else HostName(core_host),
+        )
+    )
+
+
+def test_lookups() -> None:
+    events = [
+        _event(1, "r1", "h1", "h1"),
+        _event(2, "r2", "h1"),
+        _event(3, "r1", "h2", "h2"),
+        _event(4, "r1", "h1", "h1"),
+    ]
+    store = EventStore(events)
+
+    assert len(store) == 4
+    assert list(store) == events
+    assert store.get(3) is events[2]
+    assert store.get(5) is None
+    assert store.select("r1") == [events[0], events[2], events[3]]
+    assert store.select("r1", HostName("h1")) == [events[0], events[3]]
+    assert store.select("r3", HostName("h1")) == []
+    assert store.of_hosts({HostName("h1")}) == [events[0], events[1], events[3]]
+    assert store.count_of_rule("r1") == 3
+    assert store.count_of_host((HostName("h1"), HostName("h1"))) == 2
+    assert store.counts_by_host() == {
+        (HostName("h1"), HostName("h1")): 2,
+        (HostName("h1"), None): 1,
+        (HostName("h2"), HostName("h2")): 1,
+    }
+    assert store.oldest() is events[0]
+    assert store.oldest_of_rule("r2") is events[1]
+    assert store.oldest_of_host(HostName("h2")) is events[2]
+
+
+def test_remove() -> None:
+    events = [_event(1, "r1", "h1"), _event(2, "r1", "h2")]
+    store = EventStore(events)
+
+    for event in store:  # Iterating over a copy
+        assert store.remove(event)
+    assert not store.remove(events[0])
+
+    assert len(store) == 0
+    assert store.oldest() is None
+    assert store.counts_by_rule() == {}
+    assert store.counts_by_host() == {}
+
+
+def test_changed() -> None:
+    events = [_event(1, "r1", "h1"), _event(2, "r1", "h2")]
+    store = EventStore(events)
+
+    events[1]["host"] = HostName("h1")
+    store.changed(events[1])
+
+    assert store.select("r1", HostName("h1")) == events
+    assert store.of_hosts({HostName("h2")}) == []
+    assert store.oldest_of_host(HostName("h1")) is events[0]
+    assert store.remove(events[1])
+    assert store.counts_by_host() == {(HostName("h1"), None): 1}
+
+
+def test_take_changes() -> None:
+    events = [_event(1, "r1", "h1"), _event(2, "r1", "h2"), _event(3, "r1", "h3")]
+    store = EventStore(events)
+    assert store.take_changes() == (events, [])
+
+    store.add(event := _event(4, "r2", "h1"))
+    store.changed(events[1])
+    store.changed(_event(5, "r1", "h1"))  # not part of the store
+    store.remove(events[2])
+    assert store.take_changes() == ([events[1], event], [3])
+
+    store.changed(event)
+    store.remove(event)
+    assert store.take_changes() == ([], [4])
+    assert store.take_changes() == ([], [])
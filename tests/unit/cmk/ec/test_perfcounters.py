@@ -69,6 +69,14 @@ def test_perfcounters_do_statistics(monkeypatch: pytest.MonkeyPatch) -> None:
     assert pytest.approx(c._average_rates["messages"]) == 0.5899999999999999
 
 
+def test_perfcounters_set_gauge() -> None:
+    c = Perfcounters(logger)
+    assert c._gauges["history_queue_depth"] == 0
+    c.set_gauge("history_queue_depth", 42)
+    assert c._gauges["history_queue_depth"] == 42
+    assert c.get_status()[-1] == 42
+
+
 def test_perfcounters_columns_match_status_length() -> None:
     c = Perfcounters(logger)
     assert len(c.status_columns()) == len(c.get_status())
@@ -126,6 +134,9 @@ def test_perfcounters_correct_status_values() -> None:
             counter_name = column_name.split("_")[-2]
             assert column_value == c._rates.get(counter_name, 0.0)
 
+        elif column_name.removeprefix("status_") in c._gauges:
+            assert column_value == c._gauges[column_name.removeprefix("status_")]
+
         elif column_name.startswith("status_"):
             counter_name = "_".join(column_name.split("_")[1:])
             assert column_value == c._counters[counter_name], (
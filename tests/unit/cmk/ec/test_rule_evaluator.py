@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import logging
+from collections.abc import Iterator, Sequence
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from tests.unit.cmk.ec.helpers import new_event
+
+from cmk.ccc.hostaddress import HostName
+from cmk.ccc.site import SiteId
+
+import cmk.ec.export as ec
+from cmk.ec.config import Config, ServiceLevel
+from cmk.ec.main import (
+    create_history,
+    EventServer,
+    EventStatus,
+    StatusTableEvents,
+    StatusTableHistory,
+)
+from cmk.ec.rule_evaluator import Evaluation, RuleEvaluator, RuleEvaluatorPool
+from cmk.ec.rule_matcher import compile_rule, RuleMatcher
+
+
+def _rule(rule_id: str, pack: str, **attrs: object) -> ec.Rule:
+    rule = ec.Rule(
+        id=rule_id,
+        pack=pack,
+        state=1,
+        sl=ServiceLevel(precedence="message", value=0),
+        **attrs,  # type: ignore[typeddict-item]
+    )
+    compile_rule(rule)
+    return rule
+
+
+def _always_active(name: str) -> bool:
+    return True
+
+
+def _rule_evaluator() -> RuleEvaluator:
+    return RuleEvaluator(
+        [
+            _rule("skip", "first", match="skip", drop="skip_pack"),
+            _rule("skipped", "first", match="skip"),
+            _rule("rewrite", "second", match=r"(\d+)", set_text=r"number \1"),
+            _rule("cancel", "second", match="never", match_ok="cancel"),
+        ],
+        None,
+        RuleMatcher(None, SiteId("heute"), _always_active),
+    )
+
+
+def test_evaluate() -> None:
+    rule_evaluator = _rule_evaluator()
+
+    evaluation = rule_evaluator.evaluate(new_event(ec.Event(text="skip 42")))
+    assert [hit.rule for hit in evaluation.hits] == [0, 2]
+    assert evaluation.tries == 2
+    assert evaluation.event["rule_id"] == "rewrite"
+    assert evaluation.event["text"] == "number 42"
+    assert evaluation.event["state"] == 1
+
+    evaluation = rule_evaluator.evaluate(new_event(ec.Event(text="cancel")))
+    assert [(hit.rule, hit.result.cancelling) for hit in evaluation.hits] == [(3, True)]
+    assert evaluation.event["text"] == "cancel"
+    assert evaluation.event["rule_id"] == "815"  # not rewritten
+
+    evaluation = rule_evaluator.evaluate(new_event(ec.Event(text="nothing")))
+    assert evaluation.hits == []
+    assert evaluation.tries == 4
+
+
+def test_pool_evaluates_in_order() -> None:
+    rule_evaluator = _rule_evaluator()
+    texts = [f"message {nr}" if nr % 3 else "cancel" for nr in range(50)]
+
+    pool = RuleEvaluatorPool(rule_evaluator, 2)
+    try:
+        evaluations = list(pool.evaluate([new_event(ec.Event(text=text)) for text in texts]))
+    finally:
+        pool.close()
+
+    assert [evaluation.event["text"] for evaluation in evaluations] == [
+        rule_evaluator.evaluate(new_event(ec.Event(text=text))).event["text"] for text in texts
+    ]
+
+
+def test_pool_evaluates_submitted_events_after_close() -> None:
+    pool = RuleEvaluatorPool(_rule_evaluator(), 2)
+    evaluations = pool.evaluate([new_event(ec.Event(text=f"message {nr}")) for nr in range(10)])
+    pool.close()
+
+    assert [evaluation.event["text"] for evaluation in evaluations] == [
+        f"number {nr}" for nr in range(10)
+    ]
+
+
+def _reload_with_pool(event_server: EventServer, settings: ec.Settings, config: Config) -> None:
+    rule = ec.Rule(
+        id="open",
+        state=2,
+        sl=ServiceLevel(precedence="message", value=0),
+        match="host",
+        set_text=r"\0 opened",
+    )
+    config = config | {
+        "rule_packs": [ec.default_rule_pack([rule])],
+        "rule_evaluation_processes": 2,
+    }
+    event_server.reload_configuration(
+        config,
+        create_history(
+            settings,
+            config,
+            logging.getLogger("cmk.mkeventd"),
+            StatusTableEvents.columns,
+            StatusTableHistory.columns,
+        ),
+    )
+
+
+def _process_events(event_server: EventServer) -> None:
+    try:
+        event_server.process_potential_event_instrumented(
+            new_event(ec.Event(host=HostName(f"host-{nr}"), text=f"host {nr}")) for nr in range(20)
+        )
+    finally:
+        event_server.close()
+
+
+def test_process_events_in_pool(
+    event_server: EventServer, event_status: EventStatus, settings: ec.Settings, config: Config
+) -> None:
+    _reload_with_pool(event_server, settings, config)
+    _process_events(event_server)
+
+    assert [(event["id"], event["text"], event["state"]) for event in event_status.events()] == [
+        (nr + 1, f"host {nr} opened", 2) for nr in range(20)
+    ]
+    assert list(event_status.get_rule_stats()) == [("open", 20)]
+
+
+def test_process_events_in_broken_pool(
+    event_server: EventServer,
+    event_status: EventStatus,
+    settings: ec.Settings,
+    config: Config,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    def evaluate_broken(
+        self: RuleEvaluatorPool, events: Sequence[ec.Event]
+    ) -> Iterator[Evaluation]:
+        yield self.evaluator.evaluate(events[0])
+        raise BrokenProcessPool("A child process terminated abruptly")
+
+    _reload_with_pool(event_server, settings, config)
+    broken_pool = event_server._rule_evaluator_pool
+    monkeypatch.setattr(broken_pool, "evaluate", evaluate_broken.__get__(broken_pool))
+    _process_events(event_server)
+
+    assert [(event["id"], event["text"]) for event in event_status.events()] == [
+        (nr + 1, f"host {nr} opened") for nr in range(20)
+    ]
+    assert event_server._rule_evaluator_pool is not broken_pool
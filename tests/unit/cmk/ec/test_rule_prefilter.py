@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import re
+
+import pytest
+
+from tests.unit.cmk.ec.helpers import new_event
+
+from cmk.ccc.hostaddress import HostName
+from cmk.ccc.site import SiteId
+
+import cmk.ec.export as ec
+from cmk.ec.config import ServiceLevel, TextPattern
+from cmk.ec.rule_evaluator import RuleEvaluator
+from cmk.ec.rule_matcher import compile_rule, RuleMatcher
+from cmk.ec.rule_prefilter import FieldFilter, required_literal, RulePrefilter
+
+
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        ("disk full", "disk full"),
+        (re.compile(r"Disk Full", re.IGNORECASE), "disk full"),
+        (re.compile(r"^disk\.\d+", re.IGNORECASE), "disk."),
+        (re.compile(r"disk\s+full", re.IGNORECASE), "disk"),
+        (re.compile(r"errors?", re.IGNORECASE), "error"),
+        (re.compile(r"disk (full|empty)", re.IGNORECASE), None),
+        (re.compile(r"[dD]isk", re.IGNORECASE), None),
+        (re.compile(r"(?i)disk"), None),
+        (re.compile(r"d?isk", re.IGNORECASE), None),
+        ("grüße", None),
+        ("x" * 100, "x" * 32),
+    ],
+)
+def test_required_literal(pattern: TextPattern, expected: str | None) -> None:
+    assert required_literal(pattern) == expected
+
+
+def _field_filter(complete: bool, *rule_patterns: list[TextPattern] | None) -> FieldFilter:
+    field_filter = FieldFilter(complete=complete)
+    for nr, patterns in enumerate(rule_patterns):
+        field_filter.add(nr, patterns)
+    field_filter.compile()
+    return field_filter
+
+
+def _positions(mask: int) -> list[int]:
+    return [nr for nr in range(mask.bit_length()) if mask >> nr & 1]
+
+
+def test_field_filter_finds_all_literals() -> None:
+    field_filter = _field_filter(
+        False,
+        ["disk"],
+        ["disk full"],
+        ["full"],
+        [re.compile(r"dis\w", re.IGNORECASE)],
+        [re.compile(r"(a|b)", re.IGNORECASE)],
+        None,
+        ["nothing", "isk f"],
+        ["disk", "disk full"],
+    )
+
+    assert _positions(field_filter.candidates("The DISK FULL")) == [0, 1, 2, 3, 4, 5, 6, 7]
+    assert _positions(field_filter.candidates("disk empty")) == [0, 3, 4, 5, 7]
+    assert _positions(field_filter.candidates("empty")) == [4, 5]
+    # Case insensitive matching of non-ASCII text is not done by the prefilter
+    assert _positions(field_filter.candidates("äöü")) == [0, 1, 2, 3, 4, 5, 6, 7]
+    assert field_filter.num_filtered == 6
+
+
+def test_field_filter_complete() -> None:
+    field_filter = _field_filter(True, ["myhost"], [re.compile("host", re.IGNORECASE)])
+
+    assert _positions(field_filter.candidates("MyHost")) == [0, 1]
+    assert _positions(field_filter.candidates("myhost2")) == [1]
+    assert _positions(field_filter.candidates("other")) == []
+
+
+def _rule(rule_id: str, **attrs: object) -> ec.Rule:
+    rule = ec.Rule(
+        id=rule_id,
+        pack="pack",
+        state=1,
+        sl=ServiceLevel(precedence="message", value=0),
+        **attrs,  # type: ignore[typeddict-item]
+    )
+    compile_rule(rule)
+    return rule
+
+
+RULES = [
+    _rule("text", match="disk full"),
+    _rule("cancel", match="disk full", match_ok="disk ok"),
+    _rule("regex", match=r"^kernel: .* oops \d+"),
+    _rule("any", match=r"(error|warning)"),
+    _rule("host", match="full", match_host="web01"),
+    _rule("host_regex", match_host=r"^db\d+"),
+    _rule("application", match_application="sshd", cancel_application=r"cron\["),
+    _rule("inverted", match="disk full", match_host="web01", invert_matching=True),
+]
+
+EVENTS = [
+    new_event(ec.Event(text=text, host=HostName(host), application=application))
+    for text in ("Disk FULL on /var", "disk ok", "kernel: CPU1 oops 42", "some error", "nothing")
+    for host in ("web01", "db12", "other")
+    for application in ("sshd", "cron[4711]", "")
+]
+
+
+def test_prefilter_candidates() -> None:
+    prefilter = RulePrefilter(RULES)
+    candidates = prefilter.candidates(
+        new_event(ec.Event(text="disk full", host=HostName("web01"), application="sshd"))
+    )
+    assert [RULES[nr]["id"] for nr in _positions(candidates)] == [
+        "text",
+        "cancel",
+        "any",
+        "host",
+        "application",
+        "inverted",
+    ]
+
+
+@pytest.mark.parametrize("event", EVENTS)
+def test_prefilter_does_not_change_evaluation(event: ec.Event) -> None:
+    rule_matcher = RuleMatcher(None, SiteId("heute"), lambda name: True)
+    expected = RuleEvaluator(RULES, None, rule_matcher).evaluate(dict(event))  # type: ignore[arg-type]
+    evaluation = RuleEvaluator(RULES, None, rule_matcher, prefilter=True).evaluate(dict(event))  # type: ignore[arg-type]
+
+    assert evaluation.hits == expected.hits
+    assert evaluation.event == expected.event
+    assert evaluation.tries <= expected.tries
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import logging
+from pathlib import Path
+
+from tests.unit.cmk.ec.helpers import new_event
+
+from cmk.ccc.hostaddress import HostName
+
+import cmk.ec.export as ec
+from cmk.ec.main import EventServer, EventStatus
+from cmk.ec.status_journal import journal_path, StatusHeader, StatusJournal
+
+_LOGGER = logging.getLogger("cmk.mkeventd")
+
+
+def _header(next_event_id: int) -> StatusHeader:
+    return StatusHeader(next_event_id=next_event_id, rule_stats={"r1": 3}, interval_starts={})
+
+
+def _event(event_id: int, text: str = "") -> ec.Event:
+    return new_event(ec.Event(id=event_id, text=text, core_host=None))
+
+
+def test_snapshot_and_journal(tmp_path: Path) -> None:
+    journal = StatusJournal(tmp_path / "status", _LOGGER)
+    assert journal.load() is None
+    assert journal.compaction_needed
+
+    journal.write_snapshot(_header(4), [_event(1), _event(2), _event(3)])
+    assert not journal.compaction_needed
+    journal.append(_header(5), [_event(2, "changed"), _event(4)], [1])
+    journal.append(_header(6), [_event(5)], [4])
+
+    status = StatusJournal(tmp_path / "status", _LOGGER).load()
+    assert status is not None
+    assert status.header == _header(6)
+    assert [(event["id"], event["text"]) for event in status.events] == [
+        (2, "changed"),
+        (3, ""),
+        (5, ""),
+    ]
+
+
+def test_compaction(tmp_path: Path) -> None:
+    journal = StatusJournal(tmp_path / "status", _LOGGER)
+    journal.write_snapshot(_header(2), [_event(1)])
+    while not journal.compaction_needed:
+        journal.append(_header(2), [_event(1, "x" * 100)], [])
+
+    journal.write_snapshot(_header(3), [_event(1, "compacted"), _event(2)])
+
+    assert not journal.compaction_needed
+    status = StatusJournal(tmp_path / "status", _LOGGER).load()
+    assert status is not None
+    assert [event["text"] for event in status.events] == ["compacted", ""]
+
+
+def test_incomplete_journal(tmp_path: Path) -> None:
+    journal = StatusJournal(tmp_path / "status", _LOGGER)
+    journal.write_snapshot(_header(2), [_event(1)])
+    journal.append(_header(3), [_event(2)], [])
+    journal.append(_header(4), [_event(3)], [])
+    with journal_path(tmp_path / "status").open("r+b") as f:
+        f.truncate(f.seek(0, 2) - 10)
+
+    reloaded = StatusJournal(tmp_path / "status", _LOGGER)
+    status = reloaded.load()
+    assert status is not None
+    assert status.header == _header(3)
+    assert [event["id"] for event in status.events] == [1, 2]
+    assert reloaded.compaction_needed
+
+
+def test_journal_of_other_generation(tmp_path: Path) -> None:
+    journal = StatusJournal(tmp_path / "status", _LOGGER)
+    journal.write_snapshot(_header(2), [_event(1)])
+    journal.append(_header(3), [_event(2)], [])
+    old_journal = journal_path(tmp_path / "status").read_bytes()
+    journal.write_snapshot(_header(3), [_event(1, "compacted")])
+    # As if the daemon crashed between replacing the snapshot and the journal
+    journal_path(tmp_path / "status").write_bytes(old_journal)
+
+    status = StatusJournal(tmp_path / "status", _LOGGER).load()
+    assert status is not None
+    assert status.header == _header(3)
+    assert [event["text"] for event in status.events] == ["compacted"]
+
+
+def test_legacy_status_file(tmp_path: Path) -> None:
+    event = _event(1)
+    (tmp_path / "status").write_text(
+        repr({"next_event_id": 2, "events": [event], "rule_stats": {"r1": 3}}) + "\n"
+    )
+
+    journal = StatusJournal(tmp_path / "status", _LOGGER)
+    status = journal.load()
+    assert status is not None
+    assert status.header == _header(2)
+    assert status.events == [event]
+    assert journal.compaction_needed
+
+
+def test_save_and_load_status(event_status: EventStatus, event_server: EventServer) -> None:
+    for host in ("h1", "h2", "h3"):
+        event_status.new_event(new_event(ec.Event(host=HostName(host), core_host=None)))
+    event_status.save_status()
+    first, second, third = event_status.events()
+    second["phase"] = "ack"
+    event_status.event_changed(second)
+    event_status.remove_event(third, "DELETE")
+    event_status.save_status()
+
+    reloaded = EventStatus(
+        event_status.settings,
+        event_status._config,
+        event_status._perfcounters,
+        event_status._history,
+        _LOGGER,
+    )
+    reloaded.load_status(event_server)
+
+    assert reloaded.events() == [first, second]
+    event = new_event(ec.Event(host=HostName("h4"), core_host=None))
+    reloaded.new_event(event)
+    assert event["id"] == 4
+
+
+def test_save_status_appends_changes(event_status: EventStatus) -> None:
+    path = event_status._status_journal.path
+    event_status.new_event(new_event(ec.Event(host=HostName("h1"), core_host=None)))
+    event_status.save_status()
+    snapshot = path.read_bytes()
+    journal_sizes = [journal_path(path).stat().st_size]
+
+    for host in ("h2", "h3"):
+        event_status.new_event(new_event(ec.Event(host=HostName(host), core_host=None)))
+        event_status.save_status()
+        journal_sizes.append(journal_path(path).stat().st_size)
+
+    assert path.read_bytes() == snapshot
+    assert journal_sizes[0] < journal_sizes[1] < journal_sizes[2]
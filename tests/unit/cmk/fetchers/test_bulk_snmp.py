@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import shutil
+from collections.abc import Iterator
+
+import pytest
+
+from tests.testlib.unit.snmp_agent import running_snmp_agent, SNMPAgent
+
+from cmk.ccc.hostaddress import HostAddress, HostName
+
+from cmk.utils.log import logger
+
+from cmk.snmplib import SNMPBackendEnum, SNMPHostConfig, SNMPVersion
+
+from cmk.fetchers.snmp_backend import BulkSNMPBackend, ClassicSNMPBackend
+from cmk.fetchers.snmp_backend._ber import (
+    decode_message,
+    encode_message,
+    EndOfMib,
+    PDUType,
+    SNMPMessage,
+)
+
+_MIB = {
+    ".1.3.6.1.2.1.1.1.0": b"Linux box",
+    ".1.3.6.1.2.1.1.5.0": b"box",
+    **{f".1.3.6.1.2.1.2.2.1.1.{i}": str(i).encode() for i in range(1, 31)},
+    **{f".1.3.6.1.2.1.2.2.1.2.{i}": f"eth{i}".encode() for i in range(1, 31)},
+}
+_COLUMNS = [".1.3.6.1.2.1.2.2.1.1", ".1.3.6.1.2.1.2.2.1.2"]
+
+
+@pytest.fixture(name="agent", scope="module")
+def fixture_agent() -> Iterator[SNMPAgent]:
+    with running_snmp_agent(_MIB) as agent:
+        yield agent
+
+
+def _config(port: int, *, version: SNMPVersion = SNMPVersion.V2C) -> SNMPHostConfig:
+    return SNMPHostConfig(
+        is_ipv6_primary=False,
+        hostname=HostName("localhost"),
+        ipaddress=HostAddress("127.0.0.1"),
+        credentials="public",
+        port=port,
+        bulkwalk_enabled=True,
+        snmp_version=version,
+        bulk_walk_size_of=10,
+        timing={"timeout": 1, "retries": 0},
+        oid_range_limits={},
+        snmpv3_contexts=[],
+        character_encoding=None,
+        snmp_backend=SNMPBackendEnum.BULK,
+    )
+
+
+def _backend(port: int, *, version: SNMPVersion = SNMPVersion.V2C) -> BulkSNMPBackend:
+    return BulkSNMPBackend(_config(port, version=version), logger)
+
+
+def _expected_rows(column: str) -> list[tuple[str, bytes]]:
+    return [(oid, value) for oid, value in _MIB.items() if oid.startswith(column + ".")]
+
+
+def test_ber_roundtrip() -> None:
+    message = SNMPMessage(
+        version=1,
+        community=b"public",
+        pdu_type=PDUType.RESPONSE,
+        request_id=4711,
+        error_status=0,
+        error_index=0,
+        varbinds=[
+            (".1.3.6.1.2.1.1.1.0", b"x" * 300),
+            (".1.3.6.1.4.1.99999.4294967295", None),
+            (".1.3.6.1.2.1.1.2.0", EndOfMib.END_OF_MIB_VIEW),
+        ],
+    )
+    assert decode_message(encode_message(message)) == message
+
+
+def test_get(agent: SNMPAgent) -> None:
+    backend = _backend(agent.port)
+    assert backend.get(".1.3.6.1.2.1.1.5.0", context="") == b"box"
+    assert backend.get(".1.3.6.1.2.1.1.4.0", context="") is None
+    assert backend.get(".1.3.6.1.2.1.1.*", context="") == b"Linux box"
+
+
+@pytest.mark.parametrize("version", [SNMPVersion.V1, SNMPVersion.V2C])
+def test_walk(agent: SNMPAgent, version: SNMPVersion) -> None:
+    assert _backend(agent.port, version=version).walk(".1.3.6.1.2.1.2.2.1.2", context="") == [
+        (f".1.3.6.1.2.1.2.2.1.2.{i}", f"eth{i}".encode()) for i in range(1, 31)
+    ]
+
+
+def test_walk_scalar(agent: SNMPAgent) -> None:
+    assert _backend(agent.port).walk(".1.3.6.1.2.1.1.5.0", context="") == [
+        (".1.3.6.1.2.1.1.5.0", b"box")
+    ]
+
+
+def test_walk_many_shares_requests(agent: SNMPAgent) -> None:
+    backend = _backend(agent.port)
+    before = agent.requests
+    result = backend.walk_many(_COLUMNS, context="")
+    # 30 rows in chunks of 10 repetitions, both columns in the same PDUs
+    assert agent.requests - before == 4
+    assert result == {column: backend.walk(column, context="") for column in _COLUMNS}
+
+
+@pytest.mark.parametrize("max_bulk_varbinds", [1, 3, 0])
+def test_walk_many_truncated_responses(max_bulk_varbinds: int) -> None:
+    # Truncation leaves the second column without varbinds in some or all
+    # responses, with 0 every GETBULK comes back empty.
+    with running_snmp_agent(_MIB, max_bulk_varbinds=max_bulk_varbinds) as agent:
+        result = _backend(agent.port).walk_many(_COLUMNS, context="")
+    assert result == {column: _expected_rows(column) for column in _COLUMNS}
+
+
+@pytest.mark.skipif(shutil.which("snmpbulkwalk") is None, reason="Net-SNMP is not installed")
+@pytest.mark.parametrize("max_bulk_varbinds", [None, 3])
+def test_walk_many_matches_classic_walk(max_bulk_varbinds: int | None) -> None:
+    with running_snmp_agent(_MIB, max_bulk_varbinds=max_bulk_varbinds) as agent:
+        config = _config(agent.port)
+        classic = ClassicSNMPBackend(config, logger)
+        assert BulkSNMPBackend(config, logger).walk_many(_COLUMNS, context="") == {
+            column: classic.walk(column, context="") for column in _COLUMNS
+        }
+
+
+def test_collect_stops_at_oids_not_increasing() -> None:
+    rows: list[tuple[str, bytes]] = []
+    assert (
+        BulkSNMPBackend._collect(
+            ".1.3.6.1.2.1.2.2.1.2",
+            ".1.3.6.1.2.1.2.2.1.2",
+            [
+                (".1.3.6.1.2.1.2.2.1.2.9", b"eth9"),
+                (".1.3.6.1.2.1.2.2.1.2.10", b"eth10"),
+                (".1.3.6.1.2.1.2.2.1.2.2", b"eth2"),
+            ],
+            rows,
+        )
+        is None
+    )
+    assert rows == [
+        (".1.3.6.1.2.1.2.2.1.2.9", b"eth9"),
+        (".1.3.6.1.2.1.2.2.1.2.10", b"eth10"),
+    ]
+
+
+def test_collect_keeps_cursor_without_varbinds() -> None:
+    rows = [(".1.3.6.1.2.1.2.2.1.2.9", b"eth9")]
+    assert (
+        BulkSNMPBackend._collect(".1.3.6.1.2.1.2.2.1.2", ".1.3.6.1.2.1.2.2.1.2.9", [], rows)
+        == ".1.3.6.1.2.1.2.2.1.2.9"
+    )
+    assert rows == [(".1.3.6.1.2.1.2.2.1.2.9", b"eth9")]
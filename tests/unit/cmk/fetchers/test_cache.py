@@ -5,9 +5,15 @@
 
 import json
 import logging
+import zlib
+from pathlib import Path
+
+import pytest
+
+from cmk.ccc.exceptions import MKFetcherError
 
 from cmk.fetchers import Mode
-from cmk.fetchers.filecache import MaxAge
+from cmk.fetchers.filecache import AgentFileCache, FileCacheMode, MaxAge
 
 from cmk.checkengine.parser import SectionStore
 
@@ -40,3 +46,30 @@ class TestMaxAge:
         assert max_age.get(Mode.DISCOVERY) == 69
         assert max_age.get(Mode.INVENTORY) == 1337
         assert max_age.get(Mode.NONE) == 0
+
+
+class TestAgentFileCache:
+    @staticmethod
+    def _file_cache(path: Path) -> AgentFileCache:
+        return AgentFileCache(
+            path_template=str(path),
+            max_age=MaxAge.unlimited(),
+            simulation=False,
+            use_only_cache=True,
+            file_cache_mode=FileCacheMode.READ,
+        )
+
+    def test_read(self, tmp_path: Path) -> None:
+        (path := tmp_path / "agent_output").write_bytes(b"<<<check_mk>>>\n")
+        assert self._file_cache(path).read(Mode.CHECKING) == b"<<<check_mk>>>\n"
+
+    def test_read_compressed(self, tmp_path: Path) -> None:
+        (path := tmp_path / "agent_output").write_bytes(
+            b"\x00zlib\x00" + zlib.compress(b"<<<check_mk>>>\n")
+        )
+        assert self._file_cache(path).read(Mode.CHECKING) == b"<<<check_mk>>>\n"
+
+    def test_read_compressed_broken(self, tmp_path: Path) -> None:
+        (path := tmp_path / "agent_output").write_bytes(b"\x00zlib\x00<<<check_mk>>>\n")
+        with pytest.raises(MKFetcherError):
+            self._file_cache(path).read(Mode.CHECKING)
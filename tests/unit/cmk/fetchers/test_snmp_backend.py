@@ -10,7 +10,8 @@ from pathlib import Path
 import pytest
 
 import cmk.fetchers.snmp_backend._utils as utils
-from cmk.fetchers.snmp_backend import StoredWalkSNMPBackend
+from cmk.fetchers.snmp_backend import stored_walk
+from cmk.fetchers.snmp_backend.stored_walk import StoredWalkSNMPBackend, WalkIndex
 
 
 @pytest.mark.parametrize(
@@ -28,21 +29,6 @@ def test_strip_snmp_value(value: str, expected: bytes) -> None:
 
 @pytest.mark.usefixtures("create_files")
 class TestStoredWalkSNMPBackend:
-    @pytest.mark.parametrize(
-        "a, b, result",
-        [
-            ("1.2.3", "1.2.3", 0),
-            ("1.2.3", ".1.2.3", 0),
-            (".1.2.3", "1.2.3", 0),
-            (".1.2.3", ".1.2.3", 0),
-            ("1.2.3", "1.2.3.4", 0),
-            ("1.2.3.4", "1.2.3", 1),
-            ("1.2.3", "4.5.6", -1),
-        ],
-    )
-    def test_compare_oids(self, a: str, b: str, result: int) -> None:
-        assert StoredWalkSNMPBackend._compare_oids(a, b) == result
-
     def test_read_walk_data(self, tmpdir: Path) -> None:
         assert StoredWalkSNMPBackend.read_walk_from_path(
             tmpdir / "walkdata" / "1.txt", logging.getLogger("test")
@@ -58,6 +44,52 @@ class TestStoredWalkSNMPBackend:
         ]
 
 
+class TestWalkIndex:
+    def test_lookup(self) -> None:
+        index = WalkIndex(
+            [".1.2.10 ten\n", ".1.2.3 three\n", ".1.2.3.1 sub\n", ".1.3 other\n", ".1.2 base\n"],
+            logging.getLogger("test"),
+        )
+        assert index.lookup("1.2.3", "1.2.3") == [(".1.2.3", b"three"), (".1.2.3.1", b"sub")]
+        assert index.lookup("1.2", "1.2") == [
+            (".1.2", b"base"),
+            (".1.2.3", b"three"),
+            (".1.2.3.1", b"sub"),
+            (".1.2.10", b"ten"),
+        ]
+        assert not index.lookup("1.4", "1.4")
+
+    def test_load_is_cached_per_file(self, tmp_path: Path) -> None:
+        WalkIndex.clear_cache()
+        path = tmp_path / "walk"
+        path.write_text(".1.2.3 foo\n")
+        logger = logging.getLogger("test")
+        index = WalkIndex.load(path, logger)
+        assert WalkIndex.load(path, logger) is index
+
+        path.write_text(".1.2.3 foo\n.1.2.4 bar\n")
+        assert len(WalkIndex.load(path, logger)) == 2
+
+    def test_skips_invalid_lines(self, caplog: pytest.LogCaptureFixture) -> None:
+        index = WalkIndex([".1.2.3 foo\n", ".1.2.x bar\n", ". empty\n"], logging.getLogger("test"))
+
+        assert index.lookup("1.2", "1.2") == [(".1.2.3", b"foo")]
+        assert len(caplog.records) == 2
+
+    def test_cache_is_bounded(self, tmp_path: Path) -> None:
+        WalkIndex.clear_cache()
+        logger = logging.getLogger("test")
+        paths = [tmp_path / f"walk{nr}" for nr in range(stored_walk._MAX_CACHED_INDEXES + 1)]
+        for path in paths:
+            path.write_text(".1.2.3 foo\n")
+        first = WalkIndex.load(paths[0], logger)
+        for path in paths[1:]:
+            WalkIndex.load(path, logger)
+
+        assert len(WalkIndex._cache) == stored_walk._MAX_CACHED_INDEXES
+        assert WalkIndex.load(paths[0], logger) is not first
+
+
 @pytest.fixture
 def create_files(tmpdir):
     tmpdir.mkdir("walkdata")
@@ -202,3 +202,28 @@ def test_no_archive_tree_3(tmp_path: Path) -> None:
     assert delta_cache_tree_1_2.exists()
     assert not delta_cache_tree_2_3.exists()
     assert not delta_cache_tree_3_100.exists()
+
+
+def test_archive_delta(tmp_path: Path) -> None:
+    inv_paths = InventoryPaths(tmp_path)
+    archive_tree_1 = inv_paths.archive_tree(HostName("hostname"), 1)
+    archive_delta_2 = inv_paths.archive_delta(HostName("hostname"), 2)
+    delta_cache_tree_None_1 = inv_paths.delta_cache_tree(HostName("hostname"), -1, 1)
+    delta_cache_tree_1_2 = inv_paths.delta_cache_tree(HostName("hostname"), 1, 2)
+    delta_cache_tree_2_3 = inv_paths.delta_cache_tree(HostName("hostname"), 2, 3)
+    for file_path in [
+        archive_tree_1.path,
+        archive_delta_2,
+        delta_cache_tree_None_1.path,
+        delta_cache_tree_1_2.path,
+        delta_cache_tree_2_3.path,
+    ]:
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.touch()
+
+    InventoryHousekeeping(tmp_path)()
+    assert archive_tree_1.exists()
+    assert archive_delta_2.exists()
+    assert delta_cache_tree_None_1.exists()
+    assert delta_cache_tree_1_2.exists()
+    assert not delta_cache_tree_2_3.exists()
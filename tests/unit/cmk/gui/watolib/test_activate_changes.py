@@ -14,6 +14,7 @@ from unittest.mock import patch
 
 import pytest
 from werkzeug import datastructures as werkzeug_datastructures
+from werkzeug.formparser import parse_form_data
 
 from tests.testlib.common.repo import is_enterprise_repo, is_managed_repo
 from tests.testlib.unit.rabbitmq import get_expected_definition
@@ -28,10 +29,12 @@ import cmk.utils.paths
 
 import cmk.gui.watolib.utils
 from cmk.gui.http import Request
-from cmk.gui.watolib import activate_changes
+from cmk.gui.watolib import activate_changes, automations
+from cmk.gui.watolib._config_sync_hashes import FileHashCache
 from cmk.gui.watolib.activate_changes import (
     ActivationCleanupJob,
     ConfigSyncFileInfo,
+    ConfigSyncFileInfos,
     default_rabbitmq_definitions,
 )
 from cmk.gui.watolib.config_sync import (
@@ -550,6 +553,44 @@ def test_get_config_sync_file_infos() -> None:
     }
 
 
+def test_get_config_sync_file_infos_reuses_cached_hashes(tmp_path: Path) -> None:
+    base_dir = cmk.utils.paths.omd_root / "replication"
+    _create_get_config_sync_file_infos_test_config(base_dir)
+    # Files modified within the last seconds are not cached
+    for path in base_dir.rglob("*"):
+        if path.is_file() and not path.is_symlink():
+            os.utime(path, (1700000000, 1700000000))
+
+    replication_paths = [
+        ReplicationPath.make(ty=ReplicationPathType.DIR, ident="etc", site_path="etc"),
+        ReplicationPath.make(ty=ReplicationPathType.FILE, ident="f2", site_path="bla/blub/f2"),
+    ]
+    def get_infos(hash_cache: FileHashCache | None = None) -> ConfigSyncFileInfos:
+        return activate_changes._get_config_sync_file_infos(
+            replication_paths, base_dir, hash_cache=hash_cache
+        )
+
+    uncached = get_infos()
+    cache_path = tmp_path / "hashes.pkl"
+
+    first = FileHashCache.load(cache_path)
+    assert get_infos(first) == uncached
+    assert (first.hits, first.misses) == (0, 7)
+    first.save(cache_path)
+
+    second = FileHashCache.load(cache_path)
+    assert get_infos(second) == uncached
+    assert (second.hits, second.misses) == (7, 0)
+
+    base_dir.joinpath("etc/d4/x1").write_text("Däng9")
+    os.utime(base_dir / "etc/d4/x1", (1700000001, 1700000001))
+    third = FileHashCache.load(cache_path)
+    infos = get_infos(third)
+    assert (third.hits, third.misses) == (6, 1)
+    assert infos["etc/d4/x1"].file_hash == get_infos()["etc/d4/x1"].file_hash
+    assert infos["etc/d4/x1"].file_hash != uncached["etc/d4/x1"].file_hash
+
+
 def _create_get_config_sync_file_infos_test_config(base_dir: Path) -> None:
     base_dir.joinpath("etc/d1").mkdir(parents=True, exist_ok=True)
 
@@ -812,7 +853,42 @@ def test_get_sync_archive(tmp_path: Path) -> None:
         )
 
 
+def test_streamed_sync_archive(tmp_path: Path) -> None:
+    central_path = tmp_path / "central"
+    remote_path = tmp_path / "remote"
+    remote_path.mkdir()
+    to_sync = _create_test_sync_files(central_path)
+
+    with activate_changes._sync_archive_stream(to_sync, central_path) as sync_archive_chunks:
+        body = b"".join(
+            automations._multipart_form_data(
+                {"sync_archive_compression": "gzip"},
+                {"sync_archive": sync_archive_chunks},
+                "b0undary",
+            )
+        )
+    _stream, form, files = parse_form_data(
+        {
+            "REQUEST_METHOD": "POST",
+            "CONTENT_TYPE": "multipart/form-data; boundary=b0undary",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": io.BytesIO(body),
+        }
+    )
+    assert form["sync_archive_compression"] == "gzip"
+
+    activate_changes._unpack_sync_archive(files["sync_archive"].stream, remote_path, "gzip")
+    assert remote_path.joinpath("etc/abc").read_text(encoding="utf-8") == "gä"
+    assert remote_path.joinpath("file-to-dir/aaa").exists()
+    assert os.readlink(remote_path / "working-symlink") == "ding"
+    assert os.readlink(remote_path / "broken-symlink") == "eeg"
+
+
 def _get_test_sync_archive(tmp_path: Path) -> bytes:
+    return activate_changes._get_sync_archive(_create_test_sync_files(tmp_path), tmp_path)
+
+
+def _create_test_sync_files(tmp_path: Path) -> list[str]:
     tmp_path.joinpath("etc").mkdir(parents=True, exist_ok=True)
     with tmp_path.joinpath("etc/abc").open("w", encoding="utf-8") as f:
         f.write("gä")
@@ -830,17 +906,14 @@ def _get_test_sync_archive(tmp_path: Path) -> bytes:
     tmp_path.joinpath("broken-symlink").symlink_to("eeg")
     tmp_path.joinpath("working-symlink").symlink_to("ding")
 
-    return activate_changes._get_sync_archive(
-        [
-            "etc/abc",
-            "file-to-dir/aaa",
-            "ding",
-            "dir-to-file",
-            "broken-symlink",
-            "working-symlink",
-        ],
-        tmp_path,
-    )
+    return [
+        "etc/abc",
+        "file-to-dir/aaa",
+        "ding",
+        "dir-to-file",
+        "broken-symlink",
+        "working-symlink",
+    ]
 
 
 class TestAutomationReceiveConfigSync:
@@ -944,6 +1017,33 @@ class TestAutomationReceiveConfigSync:
             )
         )
 
+    def test_get_request_streamed(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        request_context: None,
+    ) -> None:
+        sync_archive = io.BytesIO(b"some data")
+        request = Request({})
+        request.set_var("site_id", "NO_SITE")
+        request.set_var("to_delete", "[]")
+        request.set_var("config_generation", "123")
+        request.set_var("sync_archive_compression", "gzip")
+        request.files = werkzeug_datastructures.ImmutableMultiDict(
+            {
+                "sync_archive": werkzeug_datastructures.FileStorage(
+                    stream=sync_archive,
+                    filename="sync_archive",
+                    name="sync_archive",
+                )
+            }
+        )
+        monkeypatch.setattr(activate_changes, "_request", request)
+
+        api_request = activate_changes.AutomationReceiveConfigSync().get_request()
+        assert api_request.compression == "gzip"
+        # Handed over without reading it into memory
+        assert api_request.sync_archive is sync_archive
+
 
 def test_get_current_config_generation() -> None:
     assert activate_changes._get_current_config_generation() == 0
@@ -34,7 +34,7 @@ def test_mutable_view(tmp_path: Path) -> None:
         view.append({"foo": 1})
         view.append({"bar": 2})
 
-    file.read_bytes() == b'{"foo": 1}\0{"bar": 2}\0'
+    assert file.read_bytes() == b'{"foo":1}\0{"bar":2}'
 
 
 def test_append(tmp_path: Path) -> None:
@@ -44,4 +44,62 @@ def test_append(tmp_path: Path) -> None:
     store.append({"foo": 1})
     store.append({"bar": 2})
 
-    file.read_bytes() == b'{"foo": 1}\0{"bar": 2}\0'
+    assert file.read_bytes() == b'\0{"foo":1}\0{"bar":2}'
+
+
+def test_append_to_legacy_file(tmp_path: Path) -> None:
+    file = tmp_path / "test"
+    store = AppendStoreTest(file)
+
+    file.write_bytes(b"{'foo': (1, None)}\0{'bar': True}")
+    store.append({"baz": [None]})
+
+    assert file.read_bytes() == b"{'foo': (1, None)}\0{'bar': True}\0{\"baz\":[null]}"
+    assert store.read() == [{"foo": (1, None)}, {"bar": True}, {"baz": [None]}]
+
+
+class IndexedAppendStoreTest(ABCAppendStore[dict[str, int]]):
+    separator = b"\n"
+    indexed = True
+
+    @staticmethod
+    def _serialize(entry: dict[str, int]) -> object:
+        return entry
+
+    @staticmethod
+    def _deserialize(raw: object) -> dict[str, int]:
+        assert isinstance(raw, dict)
+        return raw
+
+    @staticmethod
+    def _entry_time(entry: dict[str, int]) -> float:
+        return entry["time"]
+
+
+def test_read_since(tmp_path: Path) -> None:
+    store = IndexedAppendStoreTest(tmp_path / "test")
+    for t in (1, 3, 2, 5, 8):
+        store.append({"time": t})
+
+    assert store.read_since(0) == store.read()
+    assert store.read_since(3) == [{"time": 3}, {"time": 5}, {"time": 8}]
+    assert store.read_since(6) == [{"time": 8}]
+    assert not store.read_since(9)
+
+
+def test_read_since_rebuilds_index(tmp_path: Path) -> None:
+    file = tmp_path / "test"
+    store = IndexedAppendStoreTest(file)
+    file.write_bytes(b"{'time': 1}\n{'time': 4}\n")
+
+    assert store.read_since(2) == [{"time": 4}]
+
+    store.append({"time": 6})
+    assert store.read_since(5) == [{"time": 6}]
+
+    with store.mutable_view() as view:
+        view[:] = [{"time": 7}, {"time": 9}]
+
+    assert store.read_since(8) == [{"time": 9}]
+    store.append({"time": 10})
+    assert store.read_since(8) == [{"time": 9}, {"time": 10}]
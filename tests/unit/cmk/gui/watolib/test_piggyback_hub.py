@@ -7,14 +7,18 @@ from contextlib import AbstractContextManager as ContextManager
 from contextlib import nullcontext as does_not_raise
 
 import pytest
+from pytest_mock import MockerFixture
 
 from livestatus import SiteConfiguration
 
+import cmk.ccc.version as cmk_version
 from cmk.ccc.hostaddress import HostAddress
 from cmk.ccc.site import SiteId
 
 from cmk.gui.exceptions import MKUserError
+from cmk.gui.sites import SiteStatus
 from cmk.gui.type_defs import GlobalSettings
+from cmk.gui.watolib import piggyback_hub
 from cmk.gui.watolib.piggyback_hub import _validate_piggyback_hub_config, compute_new_config
 
 
@@ -62,6 +66,25 @@ def test_update_sites_with_hub_config() -> None:
     ]
 
 
+def test_sites_receiving_batches(mocker: MockerFixture) -> None:
+    mocker.patch.object(piggyback_hub, "site_is_local", lambda site_config, site_id: False)
+    mocker.patch.object(
+        piggyback_hub,
+        "sites_states",
+        lambda: {
+            SiteId("new"): SiteStatus(state="online", livestatus_version=cmk_version.__version__),
+            SiteId("old"): SiteStatus(state="online", livestatus_version="2.3.0p1"),
+            SiteId("down"): SiteStatus(state="down"),
+        },
+    )
+    sites = {
+        site_id: default_site_config() | {"id": site_id}
+        for site_id in (SiteId("new"), SiteId("old"), SiteId("down"), SiteId("unknown"))
+    }
+
+    assert piggyback_hub._sites_receiving_batches(sites) == {SiteId("new")}
+
+
 @pytest.mark.parametrize(
     ["settings_per_site", "expected_raises"],
     [
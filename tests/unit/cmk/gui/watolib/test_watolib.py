@@ -140,6 +140,8 @@ def test_registered_configvars() -> None:
         "mkeventd_pprint_rules",
         "mkeventd_service_levels",
         "multisite_draw_ruleicon",
+        "nagios_config_incremental",
+        "nagios_config_processes",
         "notification_backlog",
         "notification_bulk_interval",
         "notification_fallback_email",
@@ -161,6 +163,7 @@ def test_registered_configvars() -> None:
         "restart_locking",
         "retention_interval",
         "rrdcached_tuning",
+        "rule_evaluation_processes",
         "rule_optimizer",
         "selection_livetime",
         "service_view_grouping",
@@ -183,6 +186,7 @@ def test_registered_configvars() -> None:
         "staleness_threshold",
         "start_url",
         "statistics_interval",
+        "status_server_threads",
         "table_row_limit",
         "tcp_connect_timeout",
         "translate_snmptraps",
@@ -205,6 +209,7 @@ def test_registered_configvars() -> None:
         "wato_icon_categories",
         "wato_max_snapshots",
         "wato_pprint_config",
+        "wato_stream_config_sync",
         "wato_use_git",
         "graph_timeranges",
         "agent_controller_certificates",
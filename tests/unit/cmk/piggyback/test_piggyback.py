@@ -224,6 +224,113 @@ def test_get_source_and_piggyback_hosts() -> None:
     }
 
 
+def _store_many_hosts(source: HostAddress, timestamp: float, first: int = 0) -> None:
+    backend.store_piggyback_raw_data(
+        source,
+        {HostAddress(f"host{nr}"): (b"line %d" % nr,) for nr in range(first, first + 150)},
+        message_timestamp=timestamp,
+        contact_timestamp=timestamp,
+        omd_root=cmk.utils.paths.omd_root,
+    )
+
+
+def test_store_piggyback_raw_data_in_segment() -> None:
+    _store_many_hosts(HostAddress("source1"), _REF_TIME)
+
+    assert not (cmk.utils.paths.omd_root / "tmp/check_mk/piggyback").exists()
+    stored = _get_only_raw_data_element(HostAddress("host42"))
+    assert stored.meta == backend.PiggybackMetaData(
+        source=HostAddress("source1"),
+        piggybacked=HostAddress("host42"),
+        last_update=int(_REF_TIME),
+        last_contact=int(_REF_TIME),
+    )
+    assert stored.raw_data == b"line 42\n"
+    assert not backend.get_messages_for(HostAddress("host150"), cmk.utils.paths.omd_root)
+
+
+def test_store_piggyback_raw_data_in_segment_keeps_not_updated() -> None:
+    _store_many_hosts(HostAddress("source1"), _REF_TIME)
+    _store_many_hosts(HostAddress("source1"), _REF_TIME + 10, first=100)
+
+    assert _get_only_raw_data_element(HostAddress("host0")).meta.last_update == _REF_TIME
+    assert _get_only_raw_data_element(HostAddress("host100")).meta.last_update == _REF_TIME + 10
+    assert _get_only_raw_data_element(HostAddress("host0")).meta.last_contact == _REF_TIME + 10
+
+
+def test_newest_of_segment_and_file_wins() -> None:
+    _store_many_hosts(HostAddress("source1"), _REF_TIME)
+    backend.store_piggyback_raw_data(
+        HostAddress("source1"),
+        {HostAddress("host1"): _PAYLOAD},
+        message_timestamp=_REF_TIME + 10,
+        contact_timestamp=_REF_TIME + 10,
+        omd_root=cmk.utils.paths.omd_root,
+    )
+    assert _get_only_raw_data_element(HostAddress("host1")).raw_data == b"pay\nload\n"
+
+    _store_many_hosts(HostAddress("source1"), _REF_TIME + 20)
+    assert _get_only_raw_data_element(HostAddress("host1")).raw_data == b"line 1\n"
+
+
+def test_get_piggybacked_host_with_sources_from_segment() -> None:
+    _store_many_hosts(HostAddress("source1"), _REF_TIME)
+    backend.store_piggyback_raw_data(
+        HostAddress("source2"),
+        {HostAddress("host1"): _PAYLOAD},
+        message_timestamp=_REF_TIME,
+        contact_timestamp=_REF_TIME,
+        omd_root=cmk.utils.paths.omd_root,
+    )
+
+    piggybacked = backend.get_piggybacked_host_with_sources(cmk.utils.paths.omd_root)
+
+    assert len(piggybacked) == 150
+    assert [m.source for m in piggybacked[HostAddress("host1")]] == ["source1", "source2"]
+    assert backend.get_piggybacked_host_with_sources(
+        cmk.utils.paths.omd_root, HostAddress("host2")
+    ) == {
+        HostAddress("host2"): [
+            backend.PiggybackMetaData(
+                source=HostAddress("source1"),
+                piggybacked=HostAddress("host2"),
+                last_update=int(_REF_TIME),
+                last_contact=int(_REF_TIME),
+            )
+        ]
+    }
+
+
+def test_cleanup_piggyback_segments() -> None:
+    _store_many_hosts(HostAddress("source1"), _REF_TIME)
+    _store_many_hosts(HostAddress("source1"), _REF_TIME + 10, first=100)
+    _store_many_hosts(HostAddress("source2"), _REF_TIME)
+
+    backend.cleanup_piggyback_files(_REF_TIME + 5, cmk.utils.paths.omd_root)
+
+    assert not backend.get_messages_for(HostAddress("host0"), cmk.utils.paths.omd_root)
+    assert [
+        m.meta.source
+        for m in backend.get_messages_for(HostAddress("host120"), cmk.utils.paths.omd_root)
+    ] == ["source1"]
+
+
+def test_move_for_host_rename_in_segment() -> None:
+    _store_many_hosts(HostAddress("source1"), _REF_TIME)
+
+    assert backend.move_for_host_rename(
+        cmk.utils.paths.omd_root, HostAddress("host1"), HostAddress("renamed")
+    ) == ("piggyback-load",)
+    assert backend.move_for_host_rename(
+        cmk.utils.paths.omd_root, HostAddress("source1"), HostAddress("source9")
+    ) == ("piggyback-pig",)
+
+    stored = _get_only_raw_data_element(HostAddress("renamed"))
+    assert stored.meta.source == HostAddress("source9")
+    assert stored.raw_data == b"line 1\n"
+    assert not backend.get_messages_for(HostAddress("host1"), cmk.utils.paths.omd_root)
+
+
 class TestPiggybackMetaData:
     def test_serialization_roundtrip(self) -> None:
         pmd = backend.PiggybackMetaData(
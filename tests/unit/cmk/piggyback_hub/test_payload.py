@@ -6,6 +6,8 @@
 import logging
 from unittest.mock import Mock
 
+import pytest
+
 from cmk.ccc.hostaddress import HostName
 
 import cmk.utils.paths
@@ -29,7 +31,7 @@ def test__on_message() -> None:
     )
     on_message = payload.save_payload_on_message(test_logger, cmk.utils.paths.omd_root)
 
-    on_message(Mock(), DeliveryTag(0), input_payload)
+    on_message(Mock(), DeliveryTag(0), payload.PiggybackPayloadBatch.from_payloads([input_payload]))
 
     expected_payload = [
         PiggybackMessage(
@@ -44,3 +46,100 @@ def test__on_message() -> None:
     ]
     actual_payload = get_messages_for(HostName("target"), cmk.utils.paths.omd_root)
     assert actual_payload == expected_payload
+
+
+def _message(source: str, piggybacked: str, last_update: int) -> PiggybackMessage:
+    return PiggybackMessage(
+        meta=PiggybackMetaData(
+            source=HostName(source),
+            piggybacked=HostName(piggybacked),
+            last_update=last_update,
+            last_contact=1640000000,
+        ),
+        raw_data=b"data of %s\n" % piggybacked.encode(),
+    )
+
+
+def test_payloads_from_messages() -> None:
+    payloads = payload.PiggybackPayload.from_messages(
+        [
+            _message("source1", "host1", 1640000020),
+            _message("source1", "host2", 1640000020),
+            _message("source2", "host1", 1640000020),
+            _message("source1", "host3", 1640000030),
+        ]
+    )
+
+    assert [(p.source_host, p.message_timestamp, list(p.raw_data)) for p in payloads] == [
+        ("source1", 1640000020, ["host1", "host2"]),
+        ("source2", 1640000020, ["host1"]),
+        ("source1", 1640000030, ["host3"]),
+    ]
+
+
+def test_batch_roundtrip() -> None:
+    payloads = payload.PiggybackPayload.from_messages(
+        [_message("source", f"host{nr}", 1640000020) for nr in range(200)]
+    )
+    batch = payload.PiggybackPayloadBatch.from_payloads(payloads)
+
+    received = payload.PiggybackPayloadBatch.model_validate_json(batch.model_dump_json())
+
+    assert [p.model_dump_json() for p in received.payloads()] == [
+        p.model_dump_json() for p in payloads
+    ]
+    assert len(received.compressed_payloads) < len(payloads[0].model_dump_json()) / 4
+
+
+def test_batch_from_single_payload() -> None:
+    single = payload.PiggybackPayload.from_message(_message("source", "host", 1640000020))
+
+    received = payload.PiggybackPayloadBatch.model_validate_json(single.model_dump_json())
+
+    assert [p.model_dump_json() for p in received.payloads()] == [single.model_dump_json()]
+
+
+def test_make_batches(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(payload, "MAX_BATCH_SIZE", 45)
+    messages = [_message("source", f"host{nr}", 1640000020) for nr in range(5)]
+
+    batches = list(payload.make_batches(messages))
+
+    assert [[list(p.raw_data) for p in batch.payloads()] for batch in batches] == [
+        [["host0", "host1", "host2"]],
+        [["host3", "host4"]],
+    ]
+
+
+def test__on_message_stores_batch_at_once() -> None:
+    on_message = payload.save_payload_on_message(
+        logging.getLogger("test"), cmk.utils.paths.omd_root
+    )
+    messages = [_message("source", f"host{nr}", 1640000020) for nr in range(150)]
+    channel = Mock()
+
+    for batch in payload.make_batches(messages):
+        on_message(channel, DeliveryTag(0), batch)
+
+    channel.acknowledge.assert_called_once_with(DeliveryTag(0))
+    assert [m.raw_data for m in get_messages_for(HostName("host42"), cmk.utils.paths.omd_root)] == [
+        b"data of host42\n\n"
+    ]
+
+
+def test_publisher_sends_single_payloads_to_sites_without_batches() -> None:
+    conn = Mock()
+    batch_channel, single_channel = Mock(), Mock()
+    conn.channel.side_effect = lambda model: (
+        batch_channel if model is payload.PiggybackPayloadBatch else single_channel
+    )
+    publisher = payload.PayloadPublisher(conn)
+    messages = [_message("source", f"host{nr}", 1640000020) for nr in range(3)]
+
+    assert publisher.publish("old_site", messages, batches=False) == (3, 42)
+    assert [call.args[1] for call in single_channel.publish_for_site.call_args_list] == [
+        payload.PiggybackPayload.from_message(message) for message in messages
+    ]
+
+    published, _size = publisher.publish("new_site", messages, batches=True)
+    assert published == batch_channel.publish_for_site.call_count == 1
@@ -32,6 +32,7 @@ from cmk.snmplib import (
     SNMPContextConfig,
     SNMPContextTimeout,
     SNMPHostConfig,
+    SNMPRowInfo,
     SNMPTable,
     SNMPVersion,
     SpecialColumn,
@@ -112,6 +113,34 @@ def test_get_snmp_table(
     assert get_all_snmp_tables(snmp_info) == expected_values
 
 
+def test_get_snmp_table_walks_columns_together() -> None:
+    class Backend(SNMPTestBackend):
+        def walk_many(self, /, oids, *, context, **kw):
+            walked.append(list(oids))
+            return super().walk_many(oids, context=context, **kw)
+
+    walked: list[list[str]] = []
+    walk_cache: dict[tuple[str, str, bool], SNMPRowInfo] = {}
+    tree = BackendSNMPTree(
+        base=".1.2.3",
+        oids=[
+            BackendOIDSpec(SpecialColumn.END, "string", False),
+            BackendOIDSpec("1", "string", False),
+            BackendOIDSpec("2", "binary", False),
+        ],
+    )
+    for _round in range(2):
+        assert get_snmp_table(
+            section_name=SectionName("unit_test"),
+            tree=tree,
+            walk_cache=walk_cache,
+            backend=Backend(SNMPConfig, logger),
+            log=logger.debug,
+        ) == [[str(r), "C0FEFE", [67, 48, 70, 69, 70, 69]] for r in (1, 2, 3)]
+
+    assert walked == [[".1.2.3.1", ".1.2.3.2"]]
+
+
 @pytest.mark.parametrize(
     "encoding, columns, expected",
     [
@@ -15,6 +15,9 @@ from tests.testlib.unit.base_configuration_scenario import Scenario
 from cmk.ccc.hostaddress import HostName
 
 from cmk.utils.rulesets.ruleset_matcher import (
+    matches_host_name,
+    matches_host_tags,
+    matches_labels,
     matches_tag_condition,
     RuleConditionsSpec,
     RulesetMatcher,
@@ -871,3 +874,151 @@ def test_ruleset_matcher_get_host_values_changed_labels() -> None:
     # until we clear the caches
     matcher.clear_caches()
     assert matcher.get_host_values(HostName("host1"), rules, those_labels) == ["value_that"]
+
+
+@pytest.mark.parametrize(
+    "condition",
+    [
+        pytest.param({}, id="no conditions"),
+        pytest.param({"host_folder": "/abc/"}, id="folder"),
+        pytest.param({"host_tags": {TagGroupID("os"): TagID("linux")}}, id="tag"),
+        pytest.param({"host_tags": {TagGroupID("os"): {"$ne": TagID("linux")}}}, id="ne"),
+        pytest.param(
+            {"host_tags": {TagGroupID("os"): {"$or": [TagID("linux"), TagID("aix")]}}}, id="or"
+        ),
+        pytest.param(
+            {
+                "host_tags": {
+                    TagGroupID("os"): {"$nor": [TagID("linux"), TagID("aix")]},
+                    TagGroupID("criticality"): TagID("prod"),
+                }
+            },
+            id="nor and tag",
+        ),
+        pytest.param(
+            {
+                "host_label_groups": [
+                    ("and", [("and", "env:prod"), ("or", "env:test")]),
+                    ("not", [("and", "team:db")]),
+                ]
+            },
+            id="label groups",
+        ),
+        pytest.param({"host_name": ["host1", {"$regex": "host-[23]$"}]}, id="host names"),
+        pytest.param({"host_name": {"$nor": [{"$regex": "host-"}]}}, id="negated host names"),
+        pytest.param({"host_name": []}, id="empty host list"),
+        pytest.param(
+            {
+                "host_folder": "/abc/",
+                "host_tags": {TagGroupID("criticality"): {"$ne": TagID("test")}},
+                "host_label_groups": [("and", [("not", "team:db")])],
+                "host_name": {"$nor": ["host-2"]},
+            },
+            id="everything",
+        ),
+    ],
+)
+def test_ruleset_optimizer_matches_like_single_hosts(condition: RuleConditionsSpec) -> None:
+    host_tags = {
+        HostName("host1"): {
+            TagGroupID("os"): TagID("linux"),
+            TagGroupID("criticality"): TagID("prod"),
+        },
+        HostName("host-2"): {
+            TagGroupID("os"): TagID("aix"),
+            TagGroupID("criticality"): TagID("test"),
+        },
+        HostName("host-3"): {
+            TagGroupID("os"): TagID("windows"),
+            TagGroupID("criticality"): TagID("prod"),
+        },
+        HostName("host-4"): {
+            TagGroupID("os"): TagID("linux"),
+            TagGroupID("criticality"): TagID("test"),
+        },
+        HostName(""): {
+            TagGroupID("os"): TagID("windows"),
+            TagGroupID("criticality"): TagID("prod"),
+        },
+    }
+    host_paths = {
+        HostName("host1"): "/abc/",
+        HostName("host-2"): "/abc/def/",
+        HostName("host-3"): "/abcdef/",
+        HostName("host-4"): "/",
+    }
+    host_labels = {
+        HostName("host1"): {"env": "prod", "team": "db"},
+        HostName("host-2"): {"env": "test"},
+        HostName("host-3"): {"env": "prod"},
+    }
+    matcher = RulesetMatcher(
+        host_tags=host_tags,
+        host_paths=host_paths,
+        all_configured_hosts=frozenset(host_tags),
+        clusters_of={},
+        nodes_of={},
+    )
+
+    def labels_of_host(host_name: HostName) -> Mapping[str, str]:
+        return host_labels.get(host_name, {})
+
+    expected = {
+        host_name
+        for host_name, tags in host_tags.items()
+        if host_paths.get(host_name, "/").startswith(condition.get("host_folder", "/"))
+        and matches_host_tags(set(tags.items()), condition.get("host_tags", {}))
+        and matches_labels(labels_of_host(host_name), condition.get("host_label_groups", []))
+        and matches_host_name(condition.get("host_name"), host_name)
+        and condition.get("host_name") != []
+    }
+    assert (
+        matcher.ruleset_optimizer._all_matching_hosts(condition, False, labels_of_host) == expected
+    )
+
+
+def test_ruleset_matcher_service_ruleset_of_host() -> None:
+    matcher = RulesetMatcher(
+        host_tags={HostName("host1"): {}, HostName("host2"): {}},
+        host_paths={},
+        all_configured_hosts=frozenset((HostName("host1"), HostName("host2"))),
+        clusters_of={},
+        nodes_of={},
+    )
+    rules: Sequence[RuleSpec[str]] = [
+        {
+            "id": "id0",
+            "value": "host1_cpu",
+            "condition": {"host_name": ["host1"], "service_description": [{"$regex": "CPU"}]},
+        },
+        {
+            "id": "id1",
+            "value": "labeled",
+            "condition": {"service_label_groups": [("and", [("and", "os:linux")])]},
+        },
+        {
+            "id": "id2",
+            "value": "host2",
+            "condition": {"host_name": ["host2"]},
+        },
+    ]
+
+    def labels_of_host(host_name: HostName) -> Mapping[str, str]:
+        return {}
+
+    def values(host_name: str, service_name: str, service_labels: Mapping[str, str]) -> list[str]:
+        return matcher.service_extra_conf(
+            HostName(host_name), ServiceName(service_name), service_labels, rules, labels_of_host
+        )
+
+    assert values("host1", "CPU load", {}) == ["host1_cpu"]
+    assert values("host1", "CPU load", {"os": "linux"}) == ["host1_cpu", "labeled"]
+    assert values("host1", "Memory", {"os": "linux"}) == ["labeled"]
+    assert values("host2", "CPU load", {"os": "windows"}) == ["host2"]
+    assert values("host2", "CPU load", {"os": "linux"}) == ["labeled", "host2"]
+    assert [
+        rule[0]
+        for rule in matcher.ruleset_optimizer.get_service_ruleset_of_host(
+            HostName("host1"), rules, labels_of_host
+        )
+    ] == ["host1_cpu", "labeled"]
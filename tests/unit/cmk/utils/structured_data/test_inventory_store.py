@@ -6,6 +6,7 @@
 import gzip
 import io
 import json
+import os
 from pathlib import Path
 
 import cmk.ccc.store
@@ -13,9 +14,12 @@ from cmk.ccc.hostaddress import HostName
 
 from cmk.utils.structured_data import (
     deserialize_tree,
+    HistoryEntry,
+    ImmutableTree,
     InventoryStore,
     load_history,
     make_meta,
+    RetentionInterval,
     SDKey,
     SDMetaAndRawTree,
     SDNodeName,
@@ -234,3 +238,124 @@ def test_load_history(tmp_path: Path) -> None:
     assert delta_cache_file_paths
     for delta_cache_file_path in delta_cache_file_paths:
         assert delta_cache_file_path.suffixes == [".json"]
+
+
+def _archive_raw_tree(idx: int) -> SDRawTree:
+    key_columns = [SDKey("name")] if idx < 6 else [SDKey("name"), SDKey("version")]
+    nodes = {
+        SDNodeName("software"): SDRawTree(
+            Attributes={},
+            Table={
+                "KeyColumns": key_columns,
+                "Rows": [
+                    {SDKey("name"): f"package-{i}", SDKey("version"): f"{i}.{idx // 2}"}
+                    for i in range(idx, idx + 5)
+                ],
+            },
+            Nodes={},
+        ),
+    }
+    if idx % 3:
+        nodes[SDNodeName("hardware")] = SDRawTree(
+            Attributes={"Pairs": {SDKey("cpus"): idx % 2 or None}},
+            Table={},
+            Nodes={},
+        )
+    return SDRawTree(
+        Attributes={
+            "Pairs": {SDKey("key"): "val"},
+            "Retentions": {SDKey("key"): (idx, 10, 20, "current")},
+        },
+        Table={},
+        Nodes=nodes,
+    )
+
+
+def _archive_trees(tmp_path: Path, host_name: HostName, count: int) -> InventoryStore:
+    inv_store = InventoryStore(tmp_path)
+    for idx in range(count):
+        inv_store.save_inventory_tree(
+            host_name=host_name,
+            tree=deserialize_tree(_archive_raw_tree(idx)),
+            meta=make_meta(do_archive=True),
+        )
+        os.utime(tmp_path / "var/check_mk/inventory/hostname.json", (100 + idx, 100 + idx))
+        inv_store.archive_inventory_tree(host_name=host_name)
+    return inv_store
+
+
+def test_archive_inventory_tree_as_deltas(tmp_path: Path) -> None:
+    host_name = HostName("hostname")
+    _archive_trees(tmp_path, host_name, 12)
+
+    assert sorted(
+        p.name for p in (tmp_path / "var/check_mk/inventory_archive/hostname").iterdir()
+    ) == sorted(
+        ["100.json", "110.json"]
+        + [f"{ts}.delta.json.gz" for ts in range(101, 110)]
+        + ["111.delta.json.gz"]
+    )
+    assert not (tmp_path / "var/check_mk/inventory/hostname.json").exists()
+    assert not (tmp_path / "var/check_mk/inventory/hostname.json.gz").exists()
+
+    inv_store = InventoryStore(tmp_path)
+    for idx in range(12):
+        tree = inv_store.load_archived_tree(host_name=host_name, timestamp=100 + idx)
+        assert tree == deserialize_tree(_archive_raw_tree(idx))
+        assert tree.attributes.retentions == {
+            SDKey("key"): RetentionInterval(idx, 10, 20, "current")
+        }
+    assert inv_store.load_previous_inventory_tree(host_name=host_name) == deserialize_tree(
+        _archive_raw_tree(11)
+    )
+
+
+def test_load_history_from_archive_deltas(tmp_path: Path) -> None:
+    host_name = HostName("hostname")
+    _archive_trees(tmp_path, host_name, 12)
+
+    history = load_history(
+        InventoryStore(tmp_path),
+        host_name,
+        filter_history_paths=lambda ps: ps,
+        filter_tree=None,
+    )
+    assert not history.corrupted
+    expected_entries = [
+        HistoryEntry.from_delta_tree(
+            100 + idx,
+            deserialize_tree(_archive_raw_tree(idx)).difference(
+                deserialize_tree(_archive_raw_tree(idx - 1)) if idx else ImmutableTree()
+            ),
+        )
+        for idx in range(12)
+    ]
+    assert [(e.timestamp, e.new, e.changed, e.removed) for e in history.entries] == [
+        (e.timestamp, e.new, e.changed, e.removed) for e in expected_entries
+    ]
+    assert [e.delta_tree.get_tree((SDNodeName("hardware"),)) for e in history.entries] == [
+        e.delta_tree.get_tree((SDNodeName("hardware"),)) for e in expected_entries
+    ]
+    # Only the snapshots need to be diffed
+    assert sorted(
+        p.name for p in (tmp_path / "var/check_mk/inventory_delta_cache/hostname").iterdir()
+    ) == ["109_110.json", "None_100.json"]
+
+
+def test_load_history_without_archive_snapshot(tmp_path: Path) -> None:
+    host_name = HostName("hostname")
+    _archive_trees(tmp_path, host_name, 3)
+    (tmp_path / "var/check_mk/inventory_archive/hostname/100.json").unlink()
+
+    inv_store = InventoryStore(tmp_path)
+    history = load_history(
+        inv_store,
+        host_name,
+        filter_history_paths=lambda ps: ps,
+        filter_tree=None,
+    )
+    assert [e.timestamp for e in history.entries] == [102]
+    assert history.corrupted == [
+        tmp_path / "var/check_mk/inventory_archive/hostname/101.delta.json.gz"
+    ]
+    assert not inv_store.load_archived_tree(host_name=host_name, timestamp=102)
@@ -3,9 +3,15 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+from pathlib import Path
+
 import pytest
 
+from cmk.ccc import store
+
 from cmk.utils.host_storage import (
+    apply_hosts_file_to_object,
+    get_host_storage_loaders,
     get_hosts_file_variables,
     get_standard_hosts_storage,
     StandardStorageLoader,
@@ -91,3 +97,21 @@ def tests_standard_format_loader():
     variables = get_hosts_file_variables()
     standard_loader.apply(_hosts_mk_test_data, variables)
     assert variables["all_hosts"] == ["test"]
+
+
+def test_standard_format_loader_with_code_cache(tmp_path: Path) -> None:
+    (tmp_path / "hosts.mk").write_text(_hosts_mk_test_data)
+    code_cache = store.CodeCache(temp_dir=tmp_path / "tmp", root_dir=tmp_path)
+
+    for _run in range(2):
+        variables = get_hosts_file_variables()
+        apply_hosts_file_to_object(
+            tmp_path / "hosts",
+            get_host_storage_loaders("standard"),
+            variables,
+            code_cache=code_cache,
+        )
+        assert variables["all_hosts"] == ["test"]
+        assert variables["ipaddresses"] == {"test": "1.2.3.4"}
+
+    assert (code_cache.hits, code_cache.misses) == (1, 1)
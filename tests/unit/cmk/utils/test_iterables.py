@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import pytest
+
+from cmk.utils.iterables import chunks
+
+
+@pytest.mark.parametrize(
+    "items, number, expected",
+    [
+        ([], 4, []),
+        ([1, 2], 4, [[1], [2]]),
+        ([1, 2, 3, 4, 5], 2, [[1, 2, 3], [4, 5]]),
+        ([1, 2, 3, 4], 2, [[1, 2], [3, 4]]),
+    ],
+)
+def test_chunks(items: list[int], number: int, expected: list[list[int]]) -> None:
+    assert chunks(items, number) == expected
@@ -7,6 +7,7 @@
 import errno
 import socket
 import ssl
+import threading
 from collections.abc import Sequence
 from contextlib import closing
 from pathlib import Path
@@ -22,6 +23,8 @@ from omdlib.certs import CertificateAuthority
 from cmk.utils.certs import root_cert_path, RootCA
 from cmk.utils.livestatus_helpers.testing import MockLiveStatusConnection
 
+from cmk.livestatus_client import _RowDecoder
+
 
 # Override top level fixture to make livestatus connects possible here
 @pytest.fixture(autouse=True, scope="module")
@@ -338,3 +341,96 @@ def test_livestatus_lql(
     result: str,
 ) -> None:
     assert livestatus.livestatus_lql(*args) == result
+
+
+def _serve_livestatus(server: socket.socket, payload: bytes, answer: threading.Event) -> None:
+    conn, _addr = server.accept()
+    with conn:
+        query = b""
+        while not query.endswith(b"\n\n"):
+            query += conn.recv(4096)
+        answer.wait(timeout=5)
+        conn.sendall(b"200 %11d\n" % len(payload) + payload)
+
+
+def test_query_parallel_iter_yields_in_completion_order(tmp_path: Path) -> None:
+    answers = {livestatus.SiteId(name): threading.Event() for name in ("slow", "fast")}
+    servers = []
+    for site_id, answer in answers.items():
+        server = socket.socket(socket.AF_UNIX)
+        server.bind(str(tmp_path / site_id))
+        server.listen(1)
+        servers.append(server)
+        threading.Thread(
+            target=_serve_livestatus,
+            args=(server, b'[["%s"]]' % site_id.encode(), answer),
+            daemon=True,
+        ).start()
+
+    live = livestatus.MultiSiteConnection(
+        livestatus.SiteConfigurations(
+            {
+                site_id: {"socket": f"unix:{tmp_path / site_id}"}  # type: ignore[typeddict-item]
+                for site_id in answers
+            }
+        )
+    )
+    answers[livestatus.SiteId("fast")].set()
+    results = live.query_parallel_iter("GET hosts\nColumns: name\n")
+    try:
+        assert next(results) == ("fast", [["fast"]])
+        answers[livestatus.SiteId("slow")].set()
+        assert list(results) == [("slow", [["slow"]])]
+    finally:
+        for server in servers:
+            server.close()
+
+    assert not live.deadsites
+    assert [connected_site.id for connected_site in live.connections] == ["slow", "fast"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_row_decoder(chunk_size: int) -> None:
+    payload = '[["häst",1],\n["b\\u00e4r",[2,3]],\n["c",{}]]\n'.encode()
+    decoder = _RowDecoder(livestatus.LivestatusOutputFormat.JSON)
+    rows = []
+    for start in range(0, len(payload), chunk_size):
+        rows.extend(decoder.feed(payload[start : start + chunk_size]))
+    rows.extend(decoder.finish())
+    assert rows == [["häst", 1], ["bär", [2, 3]], ["c", {}]]
+
+
+@pytest.mark.parametrize("payload", [b"", b"[[1],\n", b"[[1]]\n[[2]]\n", b"{}\n"])
+def test_row_decoder_malformed(payload: bytes) -> None:
+    decoder = _RowDecoder(livestatus.LivestatusOutputFormat.PYTHON)
+    with pytest.raises(livestatus.MKLivestatusQueryError):
+        list(decoder.feed(payload))
+        list(decoder.finish())
+
+
+def test_query_stream_yields_rows_before_the_response_is_complete(tmp_path: Path) -> None:
+    server = socket.socket(socket.AF_UNIX)
+    server.bind(str(tmp_path / "live"))
+    server.listen(1)
+    first_row_received = threading.Event()
+
+    def serve() -> None:
+        conn, _addr = server.accept()
+        with conn:
+            query = b""
+            while not query.endswith(b"\n\n"):
+                query += conn.recv(4096)
+            first, second = b"[['a'],\n", b"['b']]\n"
+            conn.sendall(b"200 %11d\n" % len(first + second) + first)
+            first_row_received.wait(timeout=5)
+            conn.sendall(second)
+
+    threading.Thread(target=serve, daemon=True).start()
+    live = livestatus.SingleSiteConnection(f"unix:{tmp_path / 'live'}")
+    try:
+        rows = live.query_stream("GET hosts\nColumns: name\n")
+        assert next(rows) == ["a"]
+        first_row_received.set()
+        assert list(rows) == [["b"]]
+    finally:
+        server.close()